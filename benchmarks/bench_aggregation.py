@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+"""Benchmark aggregate_worker_measurements against the per-dimension implementation.
+
+Generates synthetic worker extractions (mixed ints, floats, numeric strings,
+booleans, non-numeric strings and nulls in a pl.Object value column, as
+workers produce them) for many dimensions spread over several
+granularities and aggregation functions. Runs the current vectorized
+aggregation and the previous implementation (per-row map_elements coercion,
+one filter per dimension, chained full joins), checks that both return
+identical frames, and reports the speedup. With --shards, also writes the
+extractions as Parquet shards and times the out-of-core streaming
+aggregation over them. With --rollup, times bringing every decomposable
+time-varying dimension to monthly buckets from the run's rollup cache
+against aggregating the raw extractions again.
+
+Usage:
+    uv run python benchmarks/bench_aggregation.py
+    uv run python benchmarks/bench_aggregation.py --rows 2000000 --dims 80
+    uv run python benchmarks/bench_aggregation.py --shards
+    uv run python benchmarks/bench_aggregation.py --rollup
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add project root to path for benchmarks imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from causal_agent.utils.aggregations import (
+    _aggregation_expr,
+    _coerce_value_to_numeric,
+    _truncate_to_granularity,
+    aggregate_worker_measurements,
+)
+from causal_agent.utils.rollup import ROLLUP_AGGREGATIONS, RollupCache, can_roll_up
+from causal_agent.utils.runs import SHARDS_DIR, write_extraction_shards
+
+GRANULARITIES = ["hourly", "daily", "daily", "weekly", "monthly", None]
+AGGREGATIONS = ["mean", "sum", "count", "max", "last", "median", "p90", "std", "n_unique", "instability"]
+
+
+def make_schema(n_dims: int, seed: int) -> dict:
+    """Schema of observed dimensions cycling through granularities and aggregations."""
+    rng = random.Random(seed)
+    return {
+        "dimensions": [
+            {
+                "name": f"dim_{i:03d}",
+                "observability": "observed",
+                "causal_granularity": GRANULARITIES[i % len(GRANULARITIES)],
+                "aggregation": rng.choice(AGGREGATIONS),
+            }
+            for i in range(n_dims)
+        ]
+    }
+
+
+def make_extractions(n_rows: int, n_dims: int, n_workers: int, seed: int) -> list[pl.DataFrame]:
+    """Worker DataFrames (dimension, value, timestamp) with an Object value column."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+
+    def value():
+        roll = rng.random()
+        if roll < 0.5:
+            return rng.randint(0, 100)
+        if roll < 0.8:
+            return rng.uniform(0, 10)
+        if roll < 0.88:
+            return str(rng.randint(0, 100))
+        if roll < 0.94:
+            return rng.random() < 0.5
+        if roll < 0.97:
+            return rng.choice(["high", "low", " 7 ", "1_000"])
+        return None
+
+    rows = {
+        "dimension": [f"dim_{rng.randrange(n_dims):03d}" for _ in range(n_rows)],
+        "value": [value() for _ in range(n_rows)],
+        "timestamp": [
+            (start + timedelta(minutes=rng.randrange(365 * 24 * 60))).strftime("%Y-%m-%d %H:%M")
+            if rng.random() > 0.01 else "unknown"
+            for _ in range(n_rows)
+        ],
+    }
+    df = pl.DataFrame(rows, schema={"dimension": pl.Utf8, "value": pl.Object, "timestamp": pl.Utf8})
+    size = -(-n_rows // n_workers)
+    return [df.slice(i, size) for i in range(0, n_rows, size)]
+
+
+def aggregate_per_dimension(dataframes: list[pl.DataFrame], schema: dict) -> dict[str, pl.DataFrame]:
+    """The previous implementation: map_elements coercion, per-dimension filters and full joins."""
+    combined = pl.concat(dataframes, how="vertical")
+    dim_info = {
+        dim["name"]: (dim.get("causal_granularity"), dim.get("aggregation", "mean"))
+        for dim in schema["dimensions"]
+        if dim.get("observability") != "latent"
+    }
+    combined = combined.with_columns(
+        pl.col("timestamp").str.to_datetime(strict=False, time_zone="UTC").alias("parsed_ts"),
+        pl.col("value").map_elements(_coerce_value_to_numeric, return_dtype=pl.Float64).alias("numeric_value"),
+    )
+    dims_by_granularity: dict[str | None, list[str]] = {}
+    for dim_name, (granularity, _) in dim_info.items():
+        dims_by_granularity.setdefault(granularity, []).append(dim_name)
+
+    results = {}
+    for granularity, dim_names in dims_by_granularity.items():
+        if granularity is None:
+            cols = {}
+            for dim_name in dim_names:
+                dim_data = combined.filter(pl.col("dimension") == dim_name)
+                if not dim_data.is_empty():
+                    cols[dim_name] = [dim_data.select(_aggregation_expr(dim_info[dim_name][1], "numeric_value")).item()]
+            if cols:
+                results["time_invariant"] = pl.DataFrame(cols)
+            continue
+        gran_data = combined.filter(pl.col("parsed_ts").is_not_null() & pl.col("dimension").is_in(dim_names))
+        dim_dfs = []
+        for dim_name in dim_names:
+            dim_data = gran_data.filter(pl.col("dimension") == dim_name)
+            if dim_data.is_empty():
+                continue
+            dim_data = dim_data.with_columns(
+                _truncate_to_granularity(pl.col("parsed_ts"), granularity).alias("time_bucket")
+            )
+            dim_dfs.append(
+                dim_data.group_by("time_bucket")
+                .agg(_aggregation_expr(dim_info[dim_name][1], "numeric_value").alias(dim_name))
+                .sort("time_bucket")
+            )
+        if dim_dfs:
+            result = dim_dfs[0]
+            for df in dim_dfs[1:]:
+                result = result.join(df, on="time_bucket", how="full", coalesce=True)
+            results[granularity] = result.sort("time_bucket")
+    return results
+
+
+def _time(fn, *args, repeats: int) -> tuple[float, dict]:
+    best, result = float("inf"), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark worker measurement aggregation")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Extraction rows")
+    parser.add_argument("--dims", type=int, default=60, help="Dimensions")
+    parser.add_argument("--workers", type=int, default=5000, help="Worker DataFrames the rows are split into")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per implementation (best is reported)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--shards", action="store_true", help="Also time aggregation from Parquet shards")
+    parser.add_argument("--rollup", action="store_true", help="Also time monthly rollups from the rollup cache")
+    args = parser.parse_args()
+
+    schema = make_schema(args.dims, args.seed)
+    dataframes = make_extractions(args.rows, args.dims, args.workers, args.seed)
+    print(f"{args.rows:,} rows, {args.dims} dimensions, {len(dataframes)} worker frames")
+
+    old_seconds, old = _time(aggregate_per_dimension, dataframes, schema, repeats=args.repeats)
+    new_seconds, new = _time(aggregate_worker_measurements, dataframes, schema, repeats=args.repeats)
+
+    assert old.keys() == new.keys(), (old.keys(), new.keys())
+    for granularity in old:
+        assert_frame_equal(old[granularity], new[granularity])
+    print("Results identical for:", ", ".join(f"{g} {df.shape}" for g, df in new.items()))
+    print(f"per-dimension: {old_seconds:.2f}s  vectorized: {new_seconds:.2f}s  speedup: {old_seconds / new_seconds:.1f}x")
+
+    if args.shards:
+        with tempfile.TemporaryDirectory() as run_dir:
+            write_extraction_shards(Path(run_dir), dataframes)
+            shard_dir = Path(run_dir) / SHARDS_DIR
+            shard_seconds, sharded = _time(aggregate_worker_measurements, shard_dir, schema, repeats=args.repeats)
+        for granularity in new:
+            assert_frame_equal(new[granularity], sharded[granularity])
+        print(f"streaming from {len(dataframes)} shards: {shard_seconds:.2f}s (results identical)")
+
+
+    if args.rollup:
+        monthly = [
+            dim for dim in schema["dimensions"]
+            if dim["causal_granularity"] and dim["aggregation"] in ROLLUP_AGGREGATIONS
+            and can_roll_up(dim["causal_granularity"], "monthly")
+        ]
+        with tempfile.TemporaryDirectory() as run_dir:
+            path = Path(run_dir) / "rollup.parquet"
+            aggregate_worker_measurements(dataframes, schema, rollup_path=path)
+            cache = RollupCache.load(path)
+
+            def roll_up_all():
+                return [cache.roll_up(dim["name"], dim["aggregation"], "monthly") for dim in monthly]
+
+            rollup_seconds, rolled = _time(roll_up_all, repeats=args.repeats)
+        raw_schema = {"dimensions": [{**dim, "causal_granularity": "monthly"} for dim in monthly]}
+        raw_seconds, raw = _time(aggregate_worker_measurements, dataframes, raw_schema, repeats=args.repeats)
+        for dim, frame in zip(monthly, rolled):
+            assert_frame_equal(frame, raw["monthly"].select("time_bucket", dim["name"]))
+        print(
+            f"{len(monthly)} dimensions to monthly: raw re-aggregation {raw_seconds:.2f}s  "
+            f"rollup cache {rollup_seconds:.2f}s (results identical)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""Micro-benchmark each registered aggregator at high group cardinality.
+
+Times one group_by per aggregator in AGGREGATION_REGISTRY over random
+values in many small groups (the shape of hourly time buckets x dimensions
+in a long run), along with the previous Python-callback entropy for
+comparison. Ordered aggregators (instability, trend) are timed with their
+order_by column, as aggregate_worker_measurements runs them.
+
+Usage:
+    uv run python benchmarks/bench_aggregators.py
+    uv run python benchmarks/bench_aggregators.py --rows 5000000 --groups 500000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path for benchmarks imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import polars as pl
+
+from causal_agent.utils.aggregations import AGGREGATION_METADATA, AGGREGATION_REGISTRY, _aggregation_expr
+
+
+def python_entropy(col: str) -> pl.Expr:
+    """The previous entropy: value_counts plus a Python map_batches callback per group."""
+    return (
+        pl.col(col)
+        .value_counts()
+        .struct.field("count")
+        .cast(pl.Float64)
+        .map_batches(lambda s: pl.Series([-((p := s / s.sum()) * (p + 1e-10).log()).sum()]))
+        .first()
+    )
+
+
+def make_rows(n_rows: int, n_groups: int, seed: int) -> pl.DataFrame:
+    """Rows (group, ts, value) with integer-ish values (so entropy has repeats) and 5% nulls."""
+    index = pl.int_range(n_rows, eager=True)
+    return pl.DataFrame({
+        "group": index.sample(n_rows, with_replacement=True, seed=seed) % n_groups,
+        "parsed_ts": index.sample(n_rows, with_replacement=True, seed=seed + 1) % 3600,
+        "value": (index.sample(n_rows, with_replacement=True, seed=seed + 2) % 200).cast(pl.Float64),
+    }).with_columns(
+        # Values 0-9, with the 5% of rows at 190-199 nulled
+        pl.when(pl.col("value") < 190).then(pl.col("value") % 10).alias("value")
+    )
+
+
+def time_agg(df: pl.DataFrame, expr: pl.Expr, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        df.group_by("group").agg(expr)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark aggregators at high group cardinality")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows")
+    parser.add_argument("--groups", type=int, default=100_000, help="Distinct groups")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per aggregator (best is reported)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args()
+
+    df = make_rows(args.rows, args.groups, args.seed)
+    print(f"{args.rows:,} rows in {args.groups:,} groups")
+    print(f"{'aggregator':<20} {'seconds':>8}  flags")
+
+    for name in sorted(AGGREGATION_REGISTRY):
+        meta = AGGREGATION_METADATA[name]
+        seconds = time_agg(df, _aggregation_expr(name, "value"), args.repeats)
+        flags = ", ".join(flag for flag in ("ordered", "python_fallback") if getattr(meta, flag))
+        print(f"{name:<20} {seconds:>8.3f}  {flags}")
+
+    seconds = time_agg(df, python_entropy("value"), args.repeats)
+    print(f"{'entropy (python)':<20} {seconds:>8.3f}  python_fallback")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""Benchmark tool-loop history compaction on worker calls.
+
+Runs the worker conversation on the same chunks with compaction off and with
+the model's configured compaction policy (see the `compaction` block in
+config.yaml), and reports input/output tokens, turns and latency per worker
+call.
+
+The default model is the offline causal-mock provider with several
+validation drafts per answer, which shows the token effect (its latency does
+not depend on prompt size). Pass a real model to measure latency as well.
+
+Usage:
+    uv run python benchmarks/bench_compaction.py
+    uv run python benchmarks/bench_compaction.py --drafts 4 -n 50
+    uv run python benchmarks/bench_compaction.py --model openrouter/google/gemini-2.0-flash-001 -n 10
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to path for benchmarks imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from inspect_ai.model import Model, get_model
+
+from causal_agent.utils.config import CompactionPolicy, get_config
+from causal_agent.utils.data import QUERIES_DIR, load_text_chunks
+from causal_agent.utils.enrichment import enrich_chunk
+from causal_agent.utils.llm import GenerationStats, make_worker_tools, multi_turn_generate
+from causal_agent.workers.agents import _build_worker_messages
+
+from benchmarks.bench_offline_pipeline import write_synthetic_input
+
+SCHEMA_PATH = Path(__file__).parent.parent / "data/eval/example_dag2.json"
+
+
+async def run_policy(
+    model: Model,
+    chunks: list[str],
+    question: str,
+    schema: dict,
+    policy: CompactionPolicy,
+) -> list[GenerationStats]:
+    """Run the worker conversation on every chunk under one compaction policy."""
+    tools = make_worker_tools(schema)
+
+    async def run_one(chunk: str) -> GenerationStats:
+        stats = GenerationStats()
+        messages = _build_worker_messages(enrich_chunk(chunk), question, schema)
+        await multi_turn_generate(messages=messages, model=model, tools=tools, stats=stats, compaction=policy)
+        return stats
+
+    return await asyncio.gather(*(run_one(chunk) for chunk in chunks))
+
+
+def _mean(values: list[float]) -> float:
+    return sum(values) / len(values) if values else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tool-loop history compaction")
+    parser.add_argument("-n", type=int, default=20, help="Number of chunks")
+    parser.add_argument("--model", default="causal-mock/compaction", help="Worker model")
+    parser.add_argument("--drafts", type=int, default=3, help="Validation drafts per answer (causal-mock only)")
+    args = parser.parse_args()
+
+    model_args = {"tool_calls": args.drafts} if args.model.startswith("causal-mock/") else {}
+    model = get_model(args.model, **model_args)
+    schema = json.loads(SCHEMA_PATH.read_text())
+    question = (QUERIES_DIR / "procrastination-patterns.txt").read_text().strip()
+    chunk_size = get_config().stage2_workers.chunk_size
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = Path(tmp) / "synthetic.txt"
+        write_synthetic_input(input_path, days=max(1, args.n * chunk_size // 100 + 1), lines_per_day=100, seed=42)
+        chunks = load_text_chunks(input_path, chunk_size=chunk_size)[: args.n]
+
+    configured = get_config().compaction.policy_for(str(model))
+    policies = {
+        "off": CompactionPolicy(enabled=False),
+        f"on ({configured.reasoning_history})": CompactionPolicy(reasoning_history=configured.reasoning_history),
+    }
+
+    print(f"Model: {model}, {len(chunks)} chunks")
+    header = f"{'compaction':<12} {'turns':>6} {'input tok':>10} {'output tok':>11} {'latency s':>10}"
+    print(f"\n{header}\n{'-' * len(header)}")
+    input_means = {}
+    for name, policy in policies.items():
+        stats = asyncio.run(run_policy(model, chunks, question, schema, policy))
+        input_means[name] = _mean([s.input_tokens for s in stats])
+        print(
+            f"{name:<12} {_mean([s.turns for s in stats]):>6.2f} {input_means[name]:>10.0f} "
+            f"{_mean([s.output_tokens for s in stats]):>11.0f} {_mean([s.elapsed_seconds for s in stats]):>10.2f}"
+        )
+
+    off, on = input_means.values()
+    if off:
+        print(f"\nInput-token reduction per worker call: {1 - on / off:.1%}")
+
+
+if __name__ == "__main__":
+    main()
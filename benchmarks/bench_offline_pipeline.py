@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+"""Benchmark stage 1 through aggregation offline with the causal-mock provider.
+
+Generates a synthetic preprocessed file, proposes a structure and runs all
+worker chunks against `causal-mock` models (see utils/mock_model.py), then
+aggregates. No network access is needed, so throughput numbers are
+reproducible across machines and changes. Mock latency, tool-call pattern
+and injected errors come from the `mock_model` block of config.yaml.
+
+Usage:
+    uv run python benchmarks/bench_offline_pipeline.py
+    uv run python benchmarks/bench_offline_pipeline.py --days 365 --lines-per-day 200
+"""
+
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from causal_agent.orchestrator.agents import propose_structure_async
+from causal_agent.utils.aggregations import aggregate_worker_measurements
+from causal_agent.utils.config import get_config
+from causal_agent.utils.data import QUERIES_DIR, load_text_chunks
+from causal_agent.workers.agents import process_chunks_async
+
+ACTIVITIES = ["Search", "Visited", "Watched", "Listened to", "Used"]
+
+
+def write_synthetic_input(path: Path, days: int, lines_per_day: int, seed: int) -> int:
+    """Write a preprocessed-format file of random activity lines. Returns the line count."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    n_lines = 0
+    with open(path, "w") as f:
+        for day in range(days):
+            minutes = sorted(rng.sample(range(24 * 60), min(lines_per_day, 24 * 60)))
+            for minute in minutes:
+                ts = start + timedelta(days=day, minutes=minute)
+                activity = rng.choice(ACTIVITIES)
+                f.write(f"[{ts:%Y-%m-%d %H:%M}] [{activity}] synthetic entry {n_lines}\n")
+                n_lines += 1
+    return n_lines
+
+
+async def run(chunks: list[str], question: str) -> dict:
+    """Run stage 1, stage 2 and aggregation, timing each."""
+    timings = {}
+    start = time.perf_counter()
+    schema = await propose_structure_async(question, chunks[:10], model_name="causal-mock/orchestrator")
+    timings["stage1"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = await process_chunks_async(chunks, question, schema, model_name="causal-mock/worker")
+    timings["stage2"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    measurements = aggregate_worker_measurements([wr.dataframe for wr in results], schema)
+    timings["aggregation"] = time.perf_counter() - start
+
+    timings["extractions"] = sum(wr.dataframe.height for wr in results)
+    timings["turns"] = sum(wr.stats.turns for wr in results)
+    timings["tokens"] = sum(wr.stats.total_tokens for wr in results)
+    timings["granularities"] = {g: df.shape for g, df in measurements.items()}
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end throughput benchmark")
+    parser.add_argument("--days", type=int, default=90, help="Days of synthetic data")
+    parser.add_argument("--lines-per-day", type=int, default=100, help="Lines per day")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the synthetic data")
+    args = parser.parse_args()
+
+    question = (QUERIES_DIR / "procrastination-patterns.txt").read_text().strip()
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = Path(tmp) / "synthetic.txt"
+        n_lines = write_synthetic_input(input_path, args.days, args.lines_per_day, args.seed)
+        chunks = load_text_chunks(input_path, chunk_size=get_config().stage2_workers.chunk_size)
+
+    mock = get_config().mock_model
+    print(
+        f"Input: {n_lines} lines, {len(chunks)} worker chunks, "
+        f"mock latency {mock.latency_median}s (sigma {mock.latency_sigma})"
+    )
+    timings = asyncio.run(run(chunks, question))
+
+    print(f"\n{'phase':<12} {'seconds':>9}")
+    print("-" * 22)
+    for phase in ("stage1", "stage2", "aggregation"):
+        print(f"{phase:<12} {timings[phase]:>9.2f}")
+    print(f"\nStage 2 throughput: {len(chunks) / timings['stage2']:.1f} chunks/s")
+    print(f"Extractions: {timings['extractions']}, turns: {timings['turns']}, tokens: {timings['tokens']}")
+    for granularity, shape in timings["granularities"].items():
+        print(f"  {granularity}: {shape[0]} rows x {shape[1]} columns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""Benchmark validate_structure as the orchestrator's validation tool calls it.
+
+Builds a large structure (daily dimensions, one outcome, lagged edges plus
+a block of contemporaneous edges that all point at each other, so it has
+far too many simple cycles to list) and times:
+
+- a cold call (validation caches cleared)
+- a repeat call on the same structure
+- a call after a small edit (one dimension's description changed)
+
+Usage:
+    uv run python benchmarks/bench_structure_validation.py
+    uv run python benchmarks/bench_structure_validation.py --dims 500 --cyclic 30
+"""
+
+import argparse
+import copy
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path for benchmarks imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import networkx  # noqa: F401  (imported here so the cold call does not pay for it)
+
+from causal_agent.orchestrator.schemas import _edge_with_lag, _validate_dimension, _validate_edge, validate_structure
+
+
+def make_structure(n_dims: int, n_cyclic: int, edges_per_dim: int) -> dict:
+    """Endogenous daily dimensions; the first n_cyclic form a complete contemporaneous digraph."""
+    names = [f"var_{i}" for i in range(n_dims)]
+    dimensions = [
+        {
+            "name": name, "description": f"{name} description", "role": "endogenous",
+            "is_outcome": i == 0, "observability": "observed", "how_to_measure": f"Extract {name}",
+            "temporal_status": "time_varying", "causal_granularity": "daily",
+            "measurement_granularity": "finest", "measurement_dtype": "continuous", "aggregation": "mean",
+        }
+        for i, name in enumerate(names)
+    ]
+    edges = [
+        {"cause": names[(i + k) % n_dims], "effect": names[i], "description": "", "lagged": True}
+        for i in range(n_dims)
+        for k in range(1, edges_per_dim + 1)
+    ]
+    edges += [
+        {"cause": cause, "effect": effect, "description": "", "lagged": False}
+        for cause in names[:n_cyclic]
+        for effect in names[:n_cyclic]
+        if cause != effect
+    ]
+    return {"dimensions": dimensions, "edges": edges}
+
+
+def time_call(data: dict, repeats: int) -> tuple[float, list[str]]:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        _, errors = validate_structure(data)
+        best = min(best, time.perf_counter() - start)
+    return best, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark memoized DSEM structure validation")
+    parser.add_argument("--dims", type=int, default=200, help="Dimensions")
+    parser.add_argument("--edges-per-dim", type=int, default=3, help="Lagged inbound edges per dimension")
+    parser.add_argument("--cyclic", type=int, default=20, help="Dimensions in the contemporaneous cycle block")
+    parser.add_argument("--repeats", type=int, default=5, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    data = make_structure(args.dims, args.cyclic, args.edges_per_dim)
+    print(f"{len(data['dimensions'])} dimensions, {len(data['edges'])} edges")
+
+    _validate_dimension.cache_clear()
+    _validate_edge.cache_clear()
+    _edge_with_lag.cache_clear()
+    start = time.perf_counter()
+    _, errors = validate_structure(data)
+    print(f"{'cold':<12} {1000 * (time.perf_counter() - start):>8.1f} ms  ({len(errors)} errors)")
+
+    seconds, _ = time_call(data, args.repeats)
+    print(f"{'repeat':<12} {1000 * seconds:>8.1f} ms")
+
+    edited = copy.deepcopy(data)
+    edited["dimensions"][-1]["description"] = "edited"
+    seconds, _ = time_call(edited, 1)
+    print(f"{'small edit':<12} {1000 * seconds:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
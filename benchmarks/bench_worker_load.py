@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+"""Load-test the worker stage over HTTP against the local mock server.
+
+Starts tools/mock_openai_server.py in-process (or uses --url), points the
+OpenRouter provider at it, and runs `process_chunks_async` on synthetic
+chunks at each concurrency level. Reports throughput, per-chunk latency
+percentiles, and how many injected or throttled errors the client retried
+through versus how many chunks failed.
+
+Usage:
+    uv run python benchmarks/bench_worker_load.py
+    uv run python benchmarks/bench_worker_load.py --concurrency 10 100 1000 --chunks 2000 --error-rate 0.02
+    uv run python benchmarks/bench_worker_load.py --url http://127.0.0.1:8765/v1
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+# Add project root to path for benchmarks/tools imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from causal_agent.utils.config import get_config
+from causal_agent.utils.data import QUERIES_DIR, load_text_chunks
+from causal_agent.workers.agents import process_chunks_async
+
+from benchmarks.bench_offline_pipeline import write_synthetic_input
+from tools.mock_openai_server import add_server_arguments, server_config_from_args, start_server
+
+SCHEMA_PATH = Path(__file__).parent.parent / "data/eval/example_dag2.json"
+
+
+def _server_call(base_url: str, path: str, method: str = "GET") -> dict:
+    root = base_url.removesuffix("/v1")
+    request = urllib.request.Request(f"{root}{path}", method=method, data=b"" if method == "POST" else None)
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else float("nan")
+
+
+async def run_levels(
+    base_url: str,
+    model_name: str,
+    levels: list[int],
+    chunks: list[str],
+    question: str,
+    schema: dict,
+) -> list[dict]:
+    """Run all concurrency levels in one event loop (the provider's HTTP client is loop-bound)."""
+    rows = []
+    for concurrency in levels:
+        _server_call(base_url, "/reset", method="POST")
+        # Inspect sizes a model's connection semaphore on first use, keyed by API key,
+        # so each level needs its own key (and model name, as models are memoized)
+        os.environ["OPENROUTER_API_KEY"] = f"mock-{concurrency}"
+        start = time.perf_counter()
+        results = await process_chunks_async(
+            chunks, question, schema, f"{model_name}-c{concurrency}",
+            max_concurrency=concurrency, return_exceptions=True,
+        )
+        elapsed = time.perf_counter() - start
+
+        succeeded = [r for r in results if not isinstance(r, BaseException)]
+        latencies = [r.stats.elapsed_seconds for r in succeeded]
+        server = _server_call(base_url, "/stats")
+        rows.append({
+            "concurrency": concurrency,
+            "chunks_per_s": len(chunks) / elapsed,
+            "p50": _percentile(latencies, 0.5),
+            "p90": _percentile(latencies, 0.9),
+            "p99": _percentile(latencies, 0.99),
+            "failed": len(results) - len(succeeded),
+            "errors": server["throttled"] + server["injected_429"] + server["injected_500"],
+            "requests": server["requests"],
+            "server_in_flight": server["max_in_flight"],
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test workers against the mock OpenAI server")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 100, 1000], help="Levels to run")
+    parser.add_argument("--chunks", type=int, default=1000, help="Chunks per level")
+    parser.add_argument("--model", default="openrouter/mock/worker", help="OpenAI-compatible worker model")
+    parser.add_argument("--url", help="Base URL of a running mock server (default: start one in-process)")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        server = start_server(server_config_from_args(args))
+        base_url = server.base_url
+    os.environ["OPENROUTER_BASE_URL"] = base_url
+
+    schema = json.loads(SCHEMA_PATH.read_text())
+    question = (QUERIES_DIR / "procrastination-patterns.txt").read_text().strip()
+    chunk_size = get_config().stage2_workers.chunk_size
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = Path(tmp) / "synthetic.txt"
+        days = max(1, args.chunks * chunk_size // 100 + 1)
+        write_synthetic_input(input_path, days, 100, seed=42)
+        chunks = load_text_chunks(input_path, chunk_size=chunk_size)[: args.chunks]
+
+    print(f"Server: {base_url}, model: {args.model}, {len(chunks)} chunks per level")
+    rows = asyncio.run(run_levels(base_url, args.model, args.concurrency, chunks, question, schema))
+
+    header = (
+        f"{'concurrency':>11} {'chunks/s':>9} {'p50 s':>7} {'p90 s':>7} {'p99 s':>7} "
+        f"{'requests':>9} {'errors':>7} {'failed':>7} {'srv max':>8}"
+    )
+    print(f"\n{header}\n{'-' * len(header)}")
+    for row in rows:
+        print(
+            f"{row['concurrency']:>11} {row['chunks_per_s']:>9.1f} {row['p50']:>7.2f} {row['p90']:>7.2f} "
+            f"{row['p99']:>7.2f} {row['requests']:>9} {row['errors']:>7} {row['failed']:>7} "
+            f"{row['server_in_flight']:>8}"
+        )
+    print("\nerrors: 429/500 responses (retried by the client); failed: chunks that still failed")
+
+    if server is not None:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
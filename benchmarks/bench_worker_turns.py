@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""Benchmark generate-loop turns per worker chunk with and without enrichment.
+
+Compares two worker configurations on the same sampled chunks:
+- baseline: raw chunk, parse_date/calculate helper tools available
+- enriched: chunk annotated by utils/enrichment.py, helper tools removed
+
+Usage:
+    uv run python benchmarks/bench_worker_turns.py
+    uv run python benchmarks/bench_worker_turns.py -n 20 --model openrouter/google/gemini-2.0-flash-001
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add project root to path for evals.common import
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from inspect_ai.model import get_model
+
+from causal_agent.utils.config import get_config
+from causal_agent.utils.enrichment import enrich_chunk
+from causal_agent.utils.llm import GenerationStats, make_worker_tools, multi_turn_generate
+from causal_agent.workers.agents import _build_worker_messages
+
+from evals.common import get_sample_chunks_worker, load_eval_config, load_example_dag
+
+VARIANTS = {
+    "baseline": {"enrich": False, "helpers": True},
+    "enriched": {"enrich": True, "helpers": False},
+}
+
+
+async def run_variant(
+    model_name: str,
+    chunks: list[str],
+    question: str,
+    schema: dict,
+    enrich: bool,
+    helpers: bool,
+) -> list[GenerationStats]:
+    """Run one worker configuration over all chunks, collecting per-chunk stats."""
+    model = get_model(model_name)
+    tools = make_worker_tools(schema, include_helpers=helpers)
+
+    async def run_one(chunk: str) -> GenerationStats:
+        stats = GenerationStats()
+        messages = _build_worker_messages(enrich_chunk(chunk) if enrich else chunk, question, schema)
+        await multi_turn_generate(messages=messages, model=model, tools=tools, stats=stats)
+        return stats
+
+    return await asyncio.gather(*(run_one(chunk) for chunk in chunks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark worker turns with/without chunk enrichment")
+    parser.add_argument("-n", type=int, default=10, help="Number of chunks to sample")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for chunk sampling")
+    parser.add_argument("--model", type=str, default=None, help="Worker model (default: stage2 model from config)")
+    parser.add_argument("-i", "--input", type=str, help="Input file name (in data/processed/)")
+    args = parser.parse_args()
+
+    model_name = args.model or get_config().stage2_workers.model
+    schema = load_example_dag()
+    question = next(q["question"] for q in load_eval_config()["questions"] if q["id"] == 4)
+    chunks = get_sample_chunks_worker(args.n, args.seed, args.input)
+
+    print(f"Model: {model_name}")
+    print(f"Chunks: {len(chunks)}")
+    print(f"\n{'variant':<10} {'turns/chunk':>12} {'tool calls/chunk':>17}")
+    print("-" * 41)
+
+    means = {}
+    for name, variant in VARIANTS.items():
+        stats = asyncio.run(run_variant(model_name, chunks, question, schema, **variant))
+        mean_turns = sum(s.turns for s in stats) / len(stats)
+        mean_calls = sum(s.tool_calls for s in stats) / len(stats)
+        means[name] = mean_turns
+        print(f"{name:<10} {mean_turns:>12.2f} {mean_calls:>17.2f}")
+
+    if means["baseline"]:
+        reduction = 1 - means["enriched"] / means["baseline"]
+        print(f"\nTurn-count reduction: {reduction:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,14 @@
 """Shared utilities for evals."""
 
 import json
-import re
 from pathlib import Path
 
 import yaml
-from inspect_ai.model import get_model
+from inspect_ai.model import GenerateConfig, get_model
 from inspect_ai.solver import Generate, TaskState, solver
 from inspect_ai.tool import Tool
 
+from causal_agent.utils.json_extract import extract_json
 from causal_agent.utils.llm import get_generate_config, multi_turn_generate
 from causal_agent.utils.data import (
     DATA_DIR,
@@ -35,6 +35,8 @@ def get_eval_questions() -> list[dict]:
 def tool_assisted_generate(
     tools: list[Tool],
     follow_ups: list[str] | None = None,
+    profile: str = "default",
+    config: GenerateConfig | None = None,
 ):
     """Solver that runs multi-turn generation with tools.
 
@@ -44,20 +46,24 @@ def tool_assisted_generate(
     Args:
         tools: List of tools available to the model
         follow_ups: Optional follow-up prompts after initial response
+        profile: Generation profile from config.yaml (e.g. "orchestrator", "worker")
+        config: Optional settings applied over the profile (e.g. for calibration sweeps)
     """
 
     @solver
     def _solver():
         async def solve(state: TaskState, generate: Generate) -> TaskState:
             model = get_model()
-            config = get_generate_config()
+            generate_config = get_generate_config(profile)
+            if config is not None:
+                generate_config = generate_config.merge(config)
 
             completion = await multi_turn_generate(
                 messages=list(state.messages),
                 model=model,
                 follow_ups=follow_ups,
                 tools=tools,
-                config=config,
+                config=generate_config,
             )
 
             state.output.completion = completion
@@ -108,30 +114,15 @@ def get_sample_chunks_worker(n_chunks: int, seed: int, input_file: str | None =
 
 
 def extract_json_from_response(text: str) -> str | None:
-    """Extract JSON from model response, handling markdown code blocks."""
-    # Try to find JSON in code blocks first
-    code_block_pattern = r"```(?:json)?\s*\n?([\s\S]*?)\n?```"
-    matches = re.findall(code_block_pattern, text)
-
-    for match in matches:
-        try:
-            json.loads(match.strip())
-            return match.strip()
-        except json.JSONDecodeError:
-            continue
-
-    # Try to find raw JSON object
-    brace_pattern = r"\{[\s\S]*\}"
-    matches = re.findall(brace_pattern, text)
-
-    for match in matches:
-        try:
-            json.loads(match)
-            return match
-        except json.JSONDecodeError:
-            continue
-
-    return None
+    """Extract the JSON object from a model response as a JSON string.
+
+    Uses the shared single-pass extractor (utils/json_extract.py), so
+    trivial defects such as trailing commas are repaired.
+    """
+    extraction = extract_json(text)
+    if extraction is None:
+        return None
+    return json.dumps(extraction.data)
 
 
 def load_example_dag() -> dict:
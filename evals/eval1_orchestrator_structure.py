@@ -199,6 +199,7 @@ def orchestrator_eval(
             tool_assisted_generate(
                 tools=[validate_dsem_structure()],
                 follow_ups=[STRUCTURE_REVIEW_REQUEST],
+                profile="orchestrator",
             ),
         ],
         scorer=dsem_structure_scorer(),
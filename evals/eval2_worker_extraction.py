@@ -18,16 +18,19 @@ import json
 
 from inspect_ai import Task, task
 from inspect_ai.dataset import MemoryDataset, Sample
+from inspect_ai.model import GenerateConfig
 from inspect_ai.scorer import Score, Target, mean, scorer, stderr
 from inspect_ai.solver import TaskState, system_message
 
-from causal_agent.workers.prompts import WORKER_WO_PROPOSALS_SYSTEM, WORKER_USER
+from causal_agent.workers.prompts import WORKER_ANNOTATIONS_NOTE, WORKER_WO_PROPOSALS_SYSTEM, WORKER_USER
 from causal_agent.workers.schemas import WorkerOutput
 from causal_agent.workers.agents import (
     _format_dimensions,
     _get_observed_dimension_dtypes,
     _get_outcome_description,
 )
+from causal_agent.utils.config import get_config
+from causal_agent.utils.enrichment import enrich_chunk
 from causal_agent.utils.llm import make_worker_tools
 
 from evals.common import (
@@ -82,9 +85,12 @@ def create_eval_dataset(
 
     # Get chunks (using worker chunk size from config)
     chunks = get_sample_chunks_worker(n_chunks, seed, input_file)
+    enrich = get_config().stage2_workers.enrich_chunks
 
     samples = []
     for i, chunk in enumerate(chunks):
+        if enrich:
+            chunk = enrich_chunk(chunk)
         user_prompt = WORKER_USER.format(
             question=question,
             outcome_description=outcome_description,
@@ -255,6 +261,8 @@ def worker_eval(
     seed: int = 42,
     input_file: str | None = None,
     question: str = DEFAULT_QUESTION,
+    reasoning_effort: str | None = None,
+    reasoning_tokens: int | None = None,
 ):
     """Evaluate LLM ability to extract dimension values from chunks.
 
@@ -263,6 +271,8 @@ def worker_eval(
         seed: Random seed for chunk sampling (reproducibility)
         input_file: Specific preprocessed file name, or None for latest
         question: The causal question to use
+        reasoning_effort: Override the worker profile's reasoning effort
+        reasoning_tokens: Override the worker profile's reasoning token budget
     """
     # Load schema for tools (same schema for all samples)
     schema = load_example_dag()
@@ -275,8 +285,15 @@ def worker_eval(
             question=question,
         ),
         solver=[
-            system_message(WORKER_WO_PROPOSALS_SYSTEM),
-            tool_assisted_generate(tools=make_worker_tools(schema)),
+            system_message(
+                WORKER_WO_PROPOSALS_SYSTEM
+                + (WORKER_ANNOTATIONS_NOTE if get_config().stage2_workers.enrich_chunks else "")
+            ),
+            tool_assisted_generate(
+                tools=make_worker_tools(schema),
+                profile="worker",
+                config=GenerateConfig(reasoning_effort=reasoning_effort, reasoning_tokens=reasoning_tokens),
+            ),
         ],
         scorer=worker_extraction_scorer(),
     )
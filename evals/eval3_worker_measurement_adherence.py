@@ -30,6 +30,7 @@ from causal_agent.workers.agents import (
     _get_outcome_description,
 )
 from causal_agent.utils.llm import get_generate_config, make_worker_tools, multi_turn_generate, parse_json_response
+from causal_agent.utils.ratelimit import limited_generate
 
 from evals.common import (
     get_eval_questions,
@@ -123,7 +124,7 @@ async def generate_worker_output(
         ),
     ]
 
-    config = get_generate_config()
+    config = get_generate_config("worker")
 
     completion = await multi_turn_generate(
         messages=messages,
@@ -295,7 +296,7 @@ def judge_solver(model_ids: list[str] | None = None, worker_timeout: float | Non
 
             # Generate judge response
             judge_model = get_model()
-            response = await judge_model.generate(state.messages, config=get_generate_config())
+            response = await limited_generate(judge_model, state.messages, config=get_generate_config("judge"))
             state.output.completion = response.completion
 
             return state
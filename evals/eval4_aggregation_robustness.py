@@ -147,7 +147,7 @@ async def generate_worker_output(
         ),
     ]
 
-    config = get_generate_config()
+    config = get_generate_config("worker")
 
     completion = await multi_turn_generate(
         messages=messages,
@@ -29,6 +29,7 @@ from causal_agent.workers.agents import (
     _get_outcome_description,
 )
 from causal_agent.utils.llm import get_generate_config, make_worker_tools, multi_turn_generate, parse_json_response
+from causal_agent.utils.ratelimit import limited_generate
 
 from evals.common import (
     get_sample_chunks_worker,
@@ -151,7 +152,7 @@ async def generate_worker_output(
         ),
     ]
 
-    config = get_generate_config()
+    config = get_generate_config("worker")
 
     completion = await multi_turn_generate(
         messages=messages,
@@ -327,7 +328,7 @@ def judge_solver(worker_model: str | None = None, worker_timeout: float | None =
 
             # Generate judge response
             judge = get_model(JUDGE_MODEL)
-            response = await judge.generate(state.messages, config=get_generate_config())
+            response = await limited_generate(judge, state.messages, config=get_generate_config("judge"))
             state.output.completion = response.completion
 
             return state
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+"""Calibrate generation profile reasoning settings on the worker eval.
+
+Runs the eval2 worker extraction task on one fixed chunk sample for every
+combination of reasoning effort and reasoning token budget, and reports
+the quality/latency trade-off: mean eval2 score, per-call latency
+percentiles, and output tokens. Settings on the Pareto front (no other
+setting is both better-scoring and faster) are marked, as are settings
+whose p90 latency exceeds the profile's latency budget. Copy the chosen
+setting into `generation_profiles` in config.yaml.
+
+Usage:
+    uv run python evals/scripts/calibrate_profiles.py --model openrouter/google/gemini-2.0-flash-001
+    uv run python evals/scripts/calibrate_profiles.py --efforts low medium high --reasoning-tokens 2048 8192 32768 -n 20
+"""
+
+import argparse
+import itertools
+import sys
+from pathlib import Path
+
+# Add project root to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from inspect_ai import eval as inspect_eval
+from inspect_ai.log import EvalLog
+
+from causal_agent.utils.config import get_config
+
+from evals.eval2_worker_extraction import worker_eval
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else float("nan")
+
+
+def summarize(log: EvalLog, effort: str, tokens: int) -> dict:
+    """Score, latency and token statistics of one calibration run."""
+    samples = log.samples or []
+    scores = [
+        float(score.value)
+        for sample in samples
+        for score in (sample.scores or {}).values()
+        if isinstance(score.value, (int, float))
+    ]
+    latencies = [sample.total_time for sample in samples if sample.total_time is not None]
+    output_tokens = [
+        sum(usage.output_tokens for usage in (sample.model_usage or {}).values()) for sample in samples
+    ]
+    return {
+        "effort": effort,
+        "reasoning_tokens": tokens,
+        "status": log.status,
+        "score": sum(scores) / len(scores) if scores else float("nan"),
+        "p50": _percentile(latencies, 0.5),
+        "p90": _percentile(latencies, 0.9),
+        "output_tokens": sum(output_tokens) / len(output_tokens) if output_tokens else float("nan"),
+    }
+
+
+def pareto_front(rows: list[dict]) -> set[int]:
+    """Indices of successful rows not dominated in (higher score, lower p50 latency)."""
+    successful = [row for row in rows if row["status"] == "success"]
+    front = set()
+    for i, row in enumerate(rows):
+        if row["status"] != "success":
+            continue
+        dominated = any(
+            other["score"] >= row["score"] and other["p50"] <= row["p50"]
+            and (other["score"] > row["score"] or other["p50"] < row["p50"])
+            for other in successful
+        )
+        if not dominated:
+            front.add(i)
+    return front
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep reasoning settings on the worker eval")
+    parser.add_argument("--model", default=None, help="Worker model (default: stage2 model from config)")
+    parser.add_argument("--profile", default="worker", help="Profile whose latency budget to check against")
+    parser.add_argument("--efforts", nargs="+", default=["low", "medium", "high"], help="Reasoning efforts")
+    parser.add_argument(
+        "--reasoning-tokens", type=int, nargs="+", default=[2048, 8192, 32768], help="Reasoning token budgets"
+    )
+    parser.add_argument("-n", "--n-chunks", type=int, default=10, help="Chunks in the fixed sample")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the chunk sample")
+    parser.add_argument("-i", "--input", type=str, help="Input file name (in data/processed/)")
+    parser.add_argument("--log-dir", default="logs/calibration", help="Inspect log directory")
+    args = parser.parse_args()
+
+    model = args.model or get_config().stage2_workers.model
+    budget = get_config().generation_profiles[args.profile].latency_budget_seconds
+    settings = list(itertools.product(args.efforts, args.reasoning_tokens))
+    tasks = [
+        worker_eval(
+            n_chunks=args.n_chunks,
+            seed=args.seed,
+            input_file=args.input,
+            reasoning_effort=effort,
+            reasoning_tokens=tokens,
+        )
+        for effort, tokens in settings
+    ]
+
+    print(f"Model: {model}, {len(settings)} settings x {args.n_chunks} chunks")
+    logs = inspect_eval(tasks, model=model, log_dir=args.log_dir, max_tasks=len(tasks))
+    rows = [summarize(log, effort, tokens) for log, (effort, tokens) in zip(logs, settings)]
+    front = pareto_front(rows)
+
+    header = f"{'effort':<8} {'reasoning':>9} {'score':>7} {'p50 s':>7} {'p90 s':>7} {'out tok':>8}  notes"
+    print(f"\n{header}\n{'-' * len(header)}")
+    for i, row in enumerate(rows):
+        notes = []
+        if row["status"] != "success":
+            notes.append(row["status"])
+        elif i in front:
+            notes.append("pareto")
+        if budget is not None and row["p90"] > budget:
+            notes.append(f"p90 over {budget:.0f}s budget")
+        print(
+            f"{row['effort']:<8} {row['reasoning_tokens']:>9} {row['score']:>7.1f} {row['p50']:>7.1f} "
+            f"{row['p90']:>7.1f} {row['output_tokens']:>8.0f}  {', '.join(notes)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@
 Usage:
     uv run python scripts/sample_data_chunks.py
     uv run python scripts/sample_data_chunks.py -n 3
+    uv run python scripts/sample_data_chunks.py -n 5 --method diverse  # Skip near-duplicate chunks
     uv run python scripts/sample_data_chunks.py -i google_activity_20251208.txt -n 5
     uv run python scripts/sample_data_chunks.py --prompt  # Include system prompt for training data generation
 """
@@ -14,6 +15,7 @@ from causal_agent.utils.data import (
     CHUNK_SIZE,
     SAMPLE_CHUNKS,
     PROCESSED_DIR,
+    SAMPLE_METHODS,
     get_latest_preprocessed_file,
     sample_chunks,
 )
@@ -28,6 +30,7 @@ def main():
     parser.add_argument("-n", type=int, default=SAMPLE_CHUNKS, help="Number of chunks to sample")
     parser.add_argument("-i", "--input", type=str, help="Input file name (in data/processed/)")
     parser.add_argument("--seed", type=int, help="Random seed for reproducibility")
+    parser.add_argument("--method", choices=SAMPLE_METHODS, default="spaced", help="Sampling method")
     parser.add_argument("--prompt", action="store_true", help="Include system prompt for training data generation")
     args = parser.parse_args()
 
@@ -43,7 +46,7 @@ def main():
     print(f"Chunk size: {CHUNK_SIZE} lines per chunk", file=__import__("sys").stderr)
 
     # Sample chunks
-    chunks = sample_chunks(input_file, args.n, args.seed)
+    chunks = sample_chunks(input_file, args.n, args.seed, method=args.method)
 
     # Build output
     output_parts = []
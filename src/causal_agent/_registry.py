@@ -0,0 +1,4 @@
+"""Inspect AI extensions, loaded through the `inspect_ai` entry point."""
+
+from causal_agent.utils.mock_model import causal_mock  # noqa: F401
+from causal_agent.utils.streaming import openrouter_stream  # noqa: F401
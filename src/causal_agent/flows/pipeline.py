@@ -6,18 +6,40 @@ Orchestrates all stages from structure proposal to intervention analysis.
 from prefect import flow
 from prefect.utilities.annotations import unmapped
 
+from causal_agent.orchestrator.schemas import DSEMStructure
+from causal_agent.utils.alignment import align_design_matrices
+from causal_agent.utils.budget import RunBudget
+from causal_agent.utils.config import get_config
 from causal_agent.utils.data import (
     resolve_input_path,
     load_query,
-    SAMPLE_CHUNKS,
 )
+from causal_agent.utils.measurements import MeasurementSet
+from causal_agent.utils.online_aggregation import OnlineAggregator
+from causal_agent.utils.runs import (
+    ROLLUP_FILE,
+    SHARDS_DIR,
+    init_run_dir,
+    load_rollup_cache,
+    new_run_id,
+    save_coverage,
+    save_measurements,
+)
+from causal_agent.utils.streaming import start_partial_aggregation
 from .stages import (
     # Stage 1
     load_orchestrator_chunks,
+    select_orchestrator_sample,
     propose_structure,
     # Stage 2
     load_worker_chunks,
     populate_dimensions,
+    populate_dimensions_adaptive,
+    populate_dimensions_budgeted,
+    populate_dimensions_batch,
+    collect_worker_results,
+    WorkerOutcomeWriter,
+    report_coverage,
     aggregate_measurements,
     # Stage 3
     check_identifiability,
@@ -35,6 +57,7 @@ def causal_inference_pipeline(
     query_file: str,
     target_effects: list[str],
     input_file: str | None = None,
+    run_id: str | None = None,
 ):
     """
     Main causal inference pipeline.
@@ -43,8 +66,11 @@ def causal_inference_pipeline(
         query_file: Filename in data/queries/ (e.g., 'smoking-cancer')
         target_effects: Causal effects to estimate
         input_file: Filename in data/processed/ (default: latest file)
+        run_id: Id for the run's artifact directory in data/runs/ (default: timestamp)
     """
     # Stage 0: Load question and resolve input path
+    # The run budget (deadline/tokens) counts from here; stage 2 enforces it
+    budget = RunBudget.from_config()
     question = load_query(query_file)
     print(f"Query: {query_file}")
     print(f"Question: {question[:100]}..." if len(question) > 100 else f"Question: {question}")
@@ -55,29 +81,105 @@ def causal_inference_pipeline(
     # Stage 1: Propose structure from sample (orchestrator chunk size)
     orchestrator_chunks = load_orchestrator_chunks(input_path)
     print(f"Loaded {len(orchestrator_chunks)} orchestrator chunks")
-    schema = propose_structure(question, orchestrator_chunks[:SAMPLE_CHUNKS])
+    orchestrator_sample = select_orchestrator_sample(input_path, question, orchestrator_chunks)
+    schema = propose_structure(question, orchestrator_sample)
+
+    run_id = run_id or new_run_id()
+    run_dir = init_run_dir(run_id, question, schema)
+    print(f"Run artifacts: {run_dir}")
 
     # Stage 2: Parallel dimension population (worker chunk size)
     # Each worker returns a WorkerResult with extractions as a Polars dataframe
+    worker_config = get_config().stage2_workers
     worker_chunks = load_worker_chunks(input_path)
     print(f"Loaded {len(worker_chunks)} worker chunks")
-    worker_results = populate_dimensions.map(
-        worker_chunks,
-        question=unmapped(question),
-        schema=unmapped(schema),
-    )
+    # Streamed extractions feed partial time series in the run directory while workers run,
+    # and each finished result commits its streamed rows into the run's aggregation
+    partial = start_partial_aggregation(run_dir, schema) if worker_config.streaming.enabled else None
+    # Online aggregation folds each result in as it finishes, positioned by its place in the file
+    online = OnlineAggregator(schema) if worker_config.online_aggregation and partial is None else None
+    if partial is not None:
+        fold = partial.commit
+    elif online is not None:
+        fold = lambda position, result: online.fold(result.dataframe, position)
+    else:
+        fold = None
+    # Each result is persisted (extraction log, shard) as it finishes and folded in; its rows are then
+    # released unless the in-memory aggregation below still needs them (coverage keeps only the chunk)
+    outcomes = WorkerOutcomeWriter(run_dir, keep_rows=False if fold is not None else None)
+
+    def on_result(position, result):
+        if fold is not None:
+            fold(position, result)
+        outcomes(position, result)
+
+    if worker_config.batch.enabled:
+        # Submit every chunk as a provider batch: cheaper and off the interactive rate limits
+        worker_results, dead_letters = populate_dimensions_batch(worker_chunks, question, schema, run_dir)
+        for position, result in enumerate(worker_results):
+            on_result(position, result)
+    elif worker_config.adaptive_chunking:
+        # Split failing chunks and merge empty runs; partition is learned across runs
+        worker_results, dead_letters = populate_dimensions_adaptive(
+            input_path, question, schema, budget=budget if budget.limited else None, on_result=on_result
+        )
+    elif budget.limited:
+        # Dispatch chunk by chunk; subsample over time as the budget runs out
+        worker_results, dead_letters = populate_dimensions_budgeted(
+            worker_chunks, question, schema, budget, on_result=on_result
+        )
+    else:
+        worker_futures = populate_dimensions.with_options(
+            timeout_seconds=worker_config.timeout_seconds,
+        ).map(
+            worker_chunks,
+            question=unmapped(question),
+            schema=unmapped(schema),
+        )
+        # Failed chunks go to the dead-letter store; the run continues on the rest
+        worker_results, dead_letters = collect_worker_results(worker_futures, worker_chunks, on_result=on_result)
+    if partial is not None:
+        partial.close()
+    outcomes.finish(dead_letters)
+    if dead_letters:
+        print(
+            f"{len(dead_letters)} chunks dead-lettered. "
+            f"Re-drive with: python -m causal_agent.flows.redrive {run_id}"
+        )
 
     # Stage 2b: Aggregate measurements into time-series by causal_granularity
-    measurements = aggregate_measurements(worker_results, schema)
+    # Coverage reports how much of each time bucket's data finished (budget, dead letters)
+    coverage = report_coverage(worker_chunks, worker_results, schema)
+    save_coverage(run_dir, coverage)
+    if partial is not None or online is not None:
+        aggregator = partial.online if partial is not None else online
+        measurements = MeasurementSet(aggregator.result())
+        # Rollup partials from the online states, as the batch aggregation below writes them
+        aggregator.rollup_cache().save(run_dir / ROLLUP_FILE)
+    else:
+        # With extraction shards, aggregate out of core from disk instead of the in-memory results
+        shard_dir = run_dir / SHARDS_DIR if worker_config.extraction_shards else None
+        measurements = aggregate_measurements(
+            worker_results, schema, shard_dir=shard_dir, rollup_path=run_dir / ROLLUP_FILE
+        )
     for granularity, df in measurements.items():
         n_dims = len([c for c in df.columns if c != "time_bucket"])
         if granularity == "time_invariant":
             print(f"  {granularity}: {n_dims} dimensions")
         else:
             print(f"  {granularity}: {df.height} time points × {n_dims} dimensions")
+    # Memory-mappable Arrow IPC: later stages and reruns read the matrices without re-aggregating
+    save_measurements(run_dir, measurements)
 
     # TODO: Stage 2c - Merge proposed dimensions from workers (disabled, proved brittle)
 
+    # Stage 2d: Align causes with each endogenous variable at its timescale (lags, broadcasts, rollups)
+    design_matrices = align_design_matrices(
+        measurements, DSEMStructure.model_validate(schema), load_rollup_cache(run_dir)
+    )
+    for variable, design in design_matrices.items():
+        print(f"  {variable} ({design.granularity}): {design.frame.height} time points × {len(design.columns)} predictors")
+
     # Stage 3: Identifiability
     identifiable = check_identifiability(schema["dag"], target_effects)
     # TODO: conditional logic for sensitivity analysis
@@ -87,7 +189,7 @@ def causal_inference_pipeline(
     priors = elicit_priors(model_spec)
 
     # Stage 5: Fit and intervene
-    fitted = fit_model(model_spec, priors, worker_chunks)
+    fitted = fit_model(model_spec, priors, measurements)
     results = run_interventions(fitted, target_effects)
 
     return results
@@ -0,0 +1,94 @@
+"""Re-drive dead-lettered worker chunks of a pipeline run.
+
+Reprocesses only the chunks in a run's dead-letter store, optionally with a
+different worker model, appends the recovered extractions to the run's
+extraction log, and re-aggregates the full log. Chunks that fail again stay
+in the store.
+
+Usage:
+    uv run python -m causal_agent.flows.redrive 20250101_120000
+    uv run python -m causal_agent.flows.redrive 20250101_120000 --model openrouter/anthropic/claude-haiku-4.5
+"""
+
+import argparse
+
+from prefect import flow
+from prefect.utilities.annotations import unmapped
+
+from causal_agent.utils.aggregations import aggregate_worker_measurements
+from causal_agent.utils.measurements import MeasurementSet
+from causal_agent.utils.runs import (
+    DEAD_LETTERS_FILE,
+    ROLLUP_FILE,
+    SHARDS_DIR,
+    append_extractions,
+    get_run_dir,
+    load_extractions,
+    load_run_inputs,
+    save_measurements,
+    write_extraction_shards,
+)
+from causal_agent.workers.dead_letter import DeadLetterStore
+from .stages import collect_worker_results, populate_dimensions
+
+
+@flow(log_prints=True)
+def redrive_dead_letters(run_id: str, model: str | None = None) -> MeasurementSet:
+    """
+    Re-drive a run's dead-lettered chunks and re-aggregate its measurements.
+
+    Args:
+        run_id: Run id (directory name in data/runs/)
+        model: Worker model for the re-drive (default: stage2 model from config)
+
+    Returns:
+        Aggregated measurements over all extractions of the run, by granularity
+        (also saved to the run directory, replacing those of the original run)
+    """
+    run_dir = get_run_dir(run_id)
+    question, schema = load_run_inputs(run_dir)
+    store = DeadLetterStore(run_dir / DEAD_LETTERS_FILE)
+    shard_dir = run_dir / SHARDS_DIR
+    letters = store.load()
+    print(f"Re-driving {len(letters)} dead-lettered chunks")
+
+    if letters:
+        chunks = [letter.chunk for letter in letters]
+        futures = populate_dimensions.map(
+            chunks,
+            question=unmapped(question),
+            schema=unmapped(schema),
+            model_name=unmapped(model),
+        )
+        results, still_failed = collect_worker_results(
+            futures,
+            chunks,
+            chunk_ids=[letter.chunk_id for letter in letters],
+            model_name=model,
+        )
+        append_extractions(run_dir, [wr.dataframe for wr in results])
+        if shard_dir.exists():
+            write_extraction_shards(run_dir, [wr.dataframe for wr in results])
+        store.replace(still_failed)
+        print(f"Recovered {len(results)} chunks, {len(still_failed)} still dead-lettered")
+
+    # A sharded run is aggregated out of core rather than loading the whole log
+    source = shard_dir if shard_dir.exists() else [load_extractions(run_dir)]
+    measurements = MeasurementSet(aggregate_worker_measurements(source, schema, rollup_path=run_dir / ROLLUP_FILE))
+    save_measurements(run_dir, measurements)
+    return measurements
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-drive dead-lettered worker chunks")
+    parser.add_argument("run_id", help="Run id (directory name in data/runs/)")
+    parser.add_argument("--model", type=str, help="Worker model for the re-drive")
+    args = parser.parse_args()
+
+    measurements = redrive_dead_letters(args.run_id, args.model)
+    for granularity, df in measurements.items():
+        print(f"  {granularity}: {df.height} rows x {len(df.columns)} columns")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,18 @@
 
 from .stage1_structure import (
     load_orchestrator_chunks,
+    select_orchestrator_sample,
     propose_structure,
 )
 from .stage2_workers import (
     load_worker_chunks,
     populate_dimensions,
+    populate_dimensions_adaptive,
+    populate_dimensions_budgeted,
+    populate_dimensions_batch,
+    collect_worker_results,
+    WorkerOutcomeWriter,
+    report_coverage,
     aggregate_measurements,
 )
 from .stage3_identifiability import (
@@ -25,10 +32,17 @@ from .stage5_inference import (
 __all__ = [
     # Stage 1
     "load_orchestrator_chunks",
+    "select_orchestrator_sample",
     "propose_structure",
     # Stage 2
     "load_worker_chunks",
     "populate_dimensions",
+    "populate_dimensions_adaptive",
+    "populate_dimensions_budgeted",
+    "populate_dimensions_batch",
+    "collect_worker_results",
+    "WorkerOutcomeWriter",
+    "report_coverage",
     "aggregate_measurements",
     # Stage 3
     "check_identifiability",
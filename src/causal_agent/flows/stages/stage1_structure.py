@@ -10,10 +10,16 @@ from prefect import task
 from prefect.cache_policies import INPUTS
 
 from causal_agent.orchestrator.agents import propose_structure as propose_structure_agent
+from causal_agent.utils.config import get_config
 from causal_agent.utils.data import (
     load_text_chunks as load_text_chunks_util,
     get_orchestrator_chunk_size,
 )
+from causal_agent.utils.diversity import diverse_sample
+from causal_agent.utils.search_index import load_or_build_index, question_aware_sample
+
+# How stage 1 picks the chunks shown to the orchestrator
+SAMPLING_STRATEGIES = ("first", "question", "diverse")
 
 
 @task(cache_policy=INPUTS)
@@ -22,6 +28,32 @@ def load_orchestrator_chunks(input_path: Path) -> list[str]:
     return load_text_chunks_util(input_path, chunk_size=get_orchestrator_chunk_size())
 
 
+@task(cache_policy=INPUTS)
+def select_orchestrator_sample(input_path: Path, question: str, chunks: list[str]) -> list[str]:
+    """Pick the chunks shown to the orchestrator (stage1_structure_proposal.sampling).
+
+    - first: the first sample_chunks chunks of the file
+    - question: the chunks most relevant to the question (BM25 over the
+      file's saved line index) plus chunks spread evenly over time
+    - diverse: one chunk per group of near-duplicate chunks (MinHash + LSH),
+      largest groups first
+
+    Raises:
+        ValueError: If the sampling strategy is unknown
+    """
+    stage1 = get_config().stage1_structure_proposal
+    if stage1.sampling not in SAMPLING_STRATEGIES:
+        raise ValueError(
+            f"Unknown sampling '{stage1.sampling}'. Available: {', '.join(SAMPLING_STRATEGIES)}"
+        )
+    if stage1.sampling == "first":
+        return chunks[: stage1.sample_chunks]
+    if stage1.sampling == "diverse":
+        return [chunks[i] for i in diverse_sample(chunks, stage1.sample_chunks)]
+    scores = load_or_build_index(input_path).score_chunks(question, get_orchestrator_chunk_size())
+    return [chunks[i] for i in question_aware_sample(scores, stage1.sample_chunks, stage1.relevant_fraction)]
+
+
 @task(retries=2, retry_delay_seconds=30, cache_policy=INPUTS)
 def propose_structure(question: str, data_sample: list[str]) -> dict:
     """Orchestrator proposes dimensions, autocorrelations, time granularities, DAG."""
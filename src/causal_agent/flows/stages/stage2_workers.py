@@ -5,17 +5,39 @@ Each worker returns a validated Polars dataframe of extractions.
 """
 
 from pathlib import Path
+from typing import Any, Callable
 
 import polars as pl
 from prefect import task
 from prefect.cache_policies import INPUTS
+from prefect.futures import as_completed
+from prefect.runtime import task_run
 
-from causal_agent.utils.aggregations import aggregate_worker_measurements
+from causal_agent.utils.aggregations import aggregate_worker_measurements, compute_bucket_coverage
+from causal_agent.utils.budget import BudgetedDispatcher, DeadlineExceededError, RunBudget, chunk_stratum
+from causal_agent.utils.config import get_config
 from causal_agent.utils.data import (
+    load_lines,
     load_text_chunks as load_text_chunks_util,
     get_worker_chunk_size,
 )
-from causal_agent.workers.agents import process_chunk, WorkerResult
+from causal_agent.utils.llm import get_generate_config
+from causal_agent.utils.measurements import MeasurementSet
+from causal_agent.utils.partition import (
+    AdaptiveScheduler,
+    ChunkPartition,
+    get_partition_path,
+)
+from causal_agent.utils.ratelimit import CircuitOpenError
+from causal_agent.utils.runs import DEAD_LETTERS_FILE, SHARDS_DIR, append_extractions, write_extraction_shards
+from causal_agent.workers.agents import process_chunk, TruncatedOutputError, WorkerError, WorkerResult
+from causal_agent.workers.batch import BATCH_DIR, get_batch_executor, run_worker_batch
+from causal_agent.workers.dead_letter import DeadLetter, DeadLetterStore
+
+
+# Called with (position in file order, result) as each chunk finishes, e.g. to
+# fold it into an OnlineAggregator
+ResultCallback = Callable[[Any, WorkerResult], None]
 
 
 @task(cache_policy=INPUTS)
@@ -24,43 +46,452 @@ def load_worker_chunks(input_path: Path) -> list[str]:
     return load_text_chunks_util(input_path, chunk_size=get_worker_chunk_size())
 
 
+def _retry_unless_deadline(task, task_run, state) -> bool:
+    """Prefect retry condition: a call cancelled at the run deadline is not retried."""
+    return not isinstance(state.result(raise_on_failure=False), DeadlineExceededError)
+
+
 @task(
     retries=2,
     retry_delay_seconds=10,
+    retry_condition_fn=_retry_unless_deadline,
 )
-def populate_dimensions(chunk: str, question: str, schema: dict) -> WorkerResult:
+def populate_dimensions(
+    chunk: str,
+    question: str,
+    schema: dict,
+    model_name: str | None = None,
+    deadline: float | None = None,
+) -> WorkerResult:
     """Worker extracts dimension values from a chunk.
 
+    A deadline (wall-clock time.time()) cancels the call when it passes, see
+    RunBudget.deadline_at.
+
     Returns:
         WorkerResult containing:
         - output: Validated WorkerOutput with extractions
         - dataframe: Polars DataFrame with columns (dimension, value, timestamp)
     """
-    return process_chunk(chunk, question, schema)
+    try:
+        return process_chunk(chunk, question, schema, model_name, deadline=deadline)
+    except WorkerError as e:
+        e.attempts = max(task_run.run_count, 1)  # 0 outside a task run
+        raise
+
+
+def _failed_tokens(error: BaseException) -> int | None:
+    """Tokens a failed chunk used over all its attempts, or None if unknown.
+
+    Each retry reruns the whole call, so earlier attempts are charged at the
+    usage of the last.
+    """
+    if isinstance(error, WorkerError) and error.stats is not None:
+        return error.stats.total_tokens * error.attempts
+    return None
+
+
+def _dead_letter_unparsed_tail(
+    chunk_id: str,
+    result: WorkerResult,
+    model_name: str,
+    dead_letters: list[DeadLetter],
+) -> None:
+    """Dead-letter the lines a salvaged (truncated) result did not reach, and log it."""
+    letter = DeadLetter.for_unparsed_tail(chunk_id, result, model_name)
+    if letter is not None:
+        print(
+            f"{chunk_id}: output truncated; kept {len(result.output.extractions)} extractions, "
+            f"dead-lettered {result.unparsed_lines} unparsed lines"
+        )
+        dead_letters.append(letter)
+
+
+def collect_worker_results(
+    futures: list,
+    chunks: list[str],
+    chunk_ids: list[str] | None = None,
+    model_name: str | None = None,
+    on_result: ResultCallback | None = None,
+) -> tuple[list[WorkerResult], list[DeadLetter]]:
+    """Wait for mapped worker futures, dead-lettering the ones that failed.
+
+    Must be called from within a flow, instead of passing the futures to a
+    downstream task (which would fail on the first failed chunk).
+
+    Args:
+        futures: Futures from populate_dimensions.map, in chunk order
+        chunks: The chunks the futures were mapped over
+        chunk_ids: Stable ids for the chunks (default: chunk_{index})
+        model_name: Worker model used (recorded on dead letters)
+        on_result: Called with (chunk index, result) as each chunk succeeds
+
+    Returns:
+        Tuple of (successful WorkerResults in chunk order, dead letters,
+        including the unparsed tails of truncated chunks)
+    """
+    chunk_ids = chunk_ids or [f"chunk_{i:05d}" for i in range(len(chunks))]
+    model_name = model_name or get_config().stage2_workers.model
+
+    results, dead_letters = [], []
+    for index, (future, chunk, chunk_id) in enumerate(zip(futures, chunks, chunk_ids)):
+        result = future.result(raise_on_failure=False)
+        if isinstance(result, BaseException):
+            dead_letters.append(DeadLetter.from_error(chunk_id, chunk, result, model_name))
+        else:
+            results.append(result)
+            _dead_letter_unparsed_tail(chunk_id, result, model_name, dead_letters)
+            if on_result is not None:
+                on_result(index, result)
+    return results, dead_letters
+
+
+class WorkerOutcomeWriter:
+    """Persists each worker result to the run directory as it finishes.
+
+    Use as (or inside) the on_result callback of the stage 2 runners: each
+    result's extractions are appended to the run log, and written as a
+    Parquet shard if `extraction_shards` is set, when the chunk finishes
+    rather than after all workers. When the aggregation reads the shards, the
+    rows are then released from the result, so stage 2 does not hold every
+    chunk's DataFrame.
+    """
+
+    def __init__(self, run_dir: Path, keep_rows: bool | None = None):
+        """
+        Args:
+            run_dir: Run directory
+            keep_rows: Keep each result's rows after persisting it, for
+                in-memory aggregation (default: unless writing shards)
+        """
+        self.run_dir = run_dir
+        self.shards = get_config().stage2_workers.extraction_shards
+        self.keep_rows = keep_rows if keep_rows is not None else not self.shards
+        self.n_rows = 0
+        self._next_shard = len(list((run_dir / SHARDS_DIR).glob("*.parquet"))) if self.shards else 0
+
+    def __call__(self, position: Any, result: WorkerResult) -> None:
+        self.n_rows += append_extractions(self.run_dir, [result.dataframe])
+        if self.shards and not result.dataframe.is_empty():
+            write_extraction_shards(self.run_dir, [result.dataframe], first_index=self._next_shard)
+            self._next_shard += 1
+        if not self.keep_rows:
+            result.release_rows()
+
+    def finish(self, dead_letters: list[DeadLetter]) -> None:
+        """Append the run's dead letters and report what was persisted."""
+        DeadLetterStore(self.run_dir / DEAD_LETTERS_FILE).append(dead_letters)
+        print(f"Persisted {self.n_rows} extractions, {len(dead_letters)} dead-lettered chunks")
+
+
+def _failure_reason(error: BaseException) -> str:
+    """Classify a failed chunk for the partition history."""
+    if isinstance(error, DeadlineExceededError):
+        return "deadline"
+    if isinstance(error, TimeoutError):
+        return "timeout"
+    if isinstance(error, TruncatedOutputError):
+        return "truncated"
+    if isinstance(error, WorkerError):
+        return "invalid"  # Output still unparseable or invalid after every task retry
+    if isinstance(error, CircuitOpenError):
+        return "circuit_open"
+    return "failed"
+
+
+def _next_completed(futures: list, budget: RunBudget | None):
+    """Wait for the next finished future, or None if the run deadline passes first."""
+    timeout = budget.seconds_left() if budget is not None else None
+    try:
+        return next(as_completed(futures, timeout=timeout))
+    except TimeoutError:
+        return None
+
+
+def populate_dimensions_budgeted(
+    chunks: list[str],
+    question: str,
+    schema: dict,
+    budget: RunBudget,
+    on_result: ResultCallback | None = None,
+) -> tuple[list[WorkerResult], list[DeadLetter]]:
+    """Run workers over chunks, consulting the run budget before each dispatch.
+
+    Must be called from within a flow. Chunks are dispatched in order until
+    the budget nears its limit, then subsampled evenly over time (see
+    utils/budget.py). Dispatch stops when the budget is spent; calls still
+    running at the deadline are cancelled. Skipped and cancelled chunks are
+    not dead-lettered - they did not fail - and show up as reduced coverage.
+    Failed chunks are dead-lettered and charged their tokens (see
+    RunBudget.record_failure) without counting towards the mean tokens per
+    chunk.
+
+    Args:
+        chunks: Worker chunks in file order
+        question: The causal research question
+        schema: DSEM schema dict
+        budget: Run budget (started at pipeline start)
+        on_result: Called with (chunk index, result) as each chunk succeeds
+
+    Returns:
+        Tuple of (WorkerResults in chunk order, dead letters)
+    """
+    worker_config = get_config().stage2_workers
+    stratify_by = get_config().budget.stratify_by
+    dispatcher = BudgetedDispatcher([chunk_stratum(chunk, stratify_by) for chunk in chunks], budget)
+    task_fn = populate_dimensions.with_options(timeout_seconds=worker_config.timeout_seconds)
+
+    results: dict[int, WorkerResult] = {}
+    dead_letters: list[DeadLetter] = []
+    in_flight = []  # (future, chunk index)
+    n_cancelled = 0
+    while in_flight or dispatcher.has_pending():
+        while len(in_flight) < worker_config.max_in_flight:
+            index = dispatcher.next_index(len(in_flight))
+            if index is None:
+                break
+            future = task_fn.submit(chunks[index], question, schema, deadline=budget.deadline_at())
+            in_flight.append((future, index))
+        if not in_flight:
+            break  # Budget spent
+
+        done = _next_completed([future for future, _ in in_flight], budget)
+        if done is None:
+            print(f"Deadline reached; {len(in_flight)} running chunks cancelled")
+            break
+        index = next(i for future, i in in_flight if future is done)
+        in_flight = [(future, i) for future, i in in_flight if future is not done]
+
+        result = done.result(raise_on_failure=False)
+        if isinstance(result, DeadlineExceededError):
+            n_cancelled += 1
+        elif isinstance(result, BaseException):
+            budget.record_failure(_failed_tokens(result))
+            dead_letters.append(
+                DeadLetter.from_error(f"chunk_{index:05d}", chunks[index], result, worker_config.model)
+            )
+        else:
+            budget.record(result.stats.total_tokens)
+            results[index] = result
+            _dead_letter_unparsed_tail(f"chunk_{index:05d}", result, worker_config.model, dead_letters)
+            if on_result is not None:
+                on_result(index, result)
+
+    n_skipped = len(dispatcher.skipped()) + len(in_flight) + n_cancelled
+    print(
+        f"Budgeted dispatch: {len(results)}/{len(chunks)} chunks finished, {n_skipped} skipped, "
+        f"{budget.tokens_used} tokens"
+    )
+    return [results[i] for i in sorted(results)], dead_letters
+
+
+def populate_dimensions_batch(
+    chunks: list[str],
+    question: str,
+    schema: dict,
+    run_dir: Path,
+) -> tuple[list[WorkerResult], list[DeadLetter]]:
+    """Run workers over all chunks as provider batches (see workers/batch.py).
+
+    Requests and responses are kept in the run's batch/ directory. Chunks
+    still failing after the last round are dead-lettered.
+
+    Args:
+        chunks: Worker chunks in file order
+        question: The causal research question
+        schema: DSEM schema dict
+        run_dir: Run directory
+
+    Returns:
+        Tuple of (WorkerResults in chunk order, dead letters)
+    """
+    worker_config = get_config().stage2_workers
+    batch_config = worker_config.batch
+    return run_worker_batch(
+        chunks,
+        question,
+        schema,
+        batch_dir=run_dir / BATCH_DIR,
+        executor=get_batch_executor(batch_config.executor),
+        model_name=worker_config.model,
+        config=get_generate_config("worker"),
+        enrich=worker_config.enrich_chunks,
+        poll_seconds=batch_config.poll_seconds,
+        max_rounds=batch_config.max_rounds,
+        timeout_seconds=batch_config.timeout_hours * 3600,
+    )
+
+
+def populate_dimensions_adaptive(
+    input_path: Path,
+    question: str,
+    schema: dict,
+    budget: RunBudget | None = None,
+    on_result: ResultCallback | None = None,
+) -> tuple[list[WorkerResult], list[DeadLetter]]:
+    """Run workers over an adaptive partition of the input file.
+
+    Must be called from within a flow. Starts from the learned partition for
+    this file if one exists, otherwise from fixed-size chunks. Chunks that
+    time out, truncate or still fail validation after the task's retries are
+    split in half and requeued (including truncated answers whose complete
+    extractions were salvaged); runs of chunks with
+    zero extractions are merged. The updated partition is saved for later
+    runs. Other errors (network, rate limits, an open circuit) are retried by
+    the task and then dead-lettered without changing the partition.
+
+    Args:
+        input_path: Processed input file
+        question: The causal research question
+        schema: DSEM schema dict
+        budget: Optional run budget; no new spans are dispatched once it is
+            spent, and calls still running at the deadline are cancelled
+        on_result: Called with ((start, end) line span, result) as each span succeeds
+
+    Returns:
+        Tuple of (WorkerResults in file order, dead letters for chunks that
+        still failed at the minimum chunk size)
+    """
+    worker_config = get_config().stage2_workers
+    lines = load_lines(input_path)
+    partition_path = get_partition_path(input_path, worker_config.chunk_size)
+    partition = ChunkPartition.load(partition_path, len(lines)) or ChunkPartition.fixed(
+        len(lines), worker_config.chunk_size
+    )
+    scheduler = AdaptiveScheduler(
+        partition,
+        min_size=worker_config.min_chunk_size,
+        max_size=worker_config.max_chunk_size,
+    )
+    task_fn = populate_dimensions.with_options(timeout_seconds=worker_config.timeout_seconds)
+
+    results: dict[tuple[int, int], WorkerResult] = {}
+    dead_letters: list[DeadLetter] = []
+    in_flight = []  # (future, span)
+    while scheduler.has_pending() or in_flight:
+        while scheduler.has_pending() and len(in_flight) < worker_config.max_in_flight:
+            if budget is not None and not budget.can_dispatch(len(in_flight)):
+                break
+            span = scheduler.next_span()
+            deadline = budget.deadline_at() if budget is not None else None
+            future = task_fn.submit(partition.chunk_text(lines, span), question, schema, deadline=deadline)
+            in_flight.append((future, span))
+        if not in_flight:
+            print("Budget spent; remaining spans skipped")
+            break
+
+        done = _next_completed([future for future, _ in in_flight], budget)
+        if done is None:
+            print(f"Deadline reached; {len(in_flight)} running chunks cancelled")
+            break
+        span = next(sp for future, sp in in_flight if future is done)
+        in_flight = [(future, sp) for future, sp in in_flight if future is not done]
+
+        result = done.result(raise_on_failure=False)
+        if isinstance(result, DeadlineExceededError):
+            continue  # Cancelled at the run deadline: neither split nor dead-lettered
+        if budget is not None:
+            if isinstance(result, BaseException):
+                budget.record_failure(_failed_tokens(result))
+            else:
+                budget.record(result.stats.total_tokens)
+        if isinstance(result, BaseException):
+            reason = _failure_reason(result)
+            # Only timeouts, truncation and invalid output split; transient errors are not about chunk size
+            if scheduler.report_failure(span, reason):
+                print(f"Split chunk lines {span[0]}-{span[1]} ({reason})")
+            else:
+                dead_letters.append(DeadLetter.from_error(
+                    f"lines_{span[0]}_{span[1]}",
+                    partition.chunk_text(lines, span),
+                    result,
+                    worker_config.model,
+                ))
+        elif result.salvaged and scheduler.report_failure(span, "truncated"):
+            # The answer stopped partway: rerun both halves rather than keep it
+            print(f"Split chunk lines {span[0]}-{span[1]} (truncated, {result.unparsed_lines} lines unparsed)")
+        else:
+            scheduler.report_success(span, len(result.output.extractions))
+            results[span] = result
+            _dead_letter_unparsed_tail(f"lines_{span[0]}_{span[1]}", result, worker_config.model, dead_letters)
+            if on_result is not None:
+                on_result(span, result)
+
+    scheduler.finish().save(partition_path)
+    print(f"Adaptive partition: {len(partition.spans)} chunks, {len(partition.events)} splits/merges")
+
+    return [results[span] for span in sorted(results)], dead_letters
 
 
 @task
-def aggregate_measurements(
+def report_coverage(
+    worker_chunks: list[str],
     worker_results: list[WorkerResult],
     schema: dict,
 ) -> dict[str, pl.DataFrame]:
+    """Per-bucket share of input lines backed by finished worker chunks.
+
+    Args:
+        worker_chunks: All chunks of the input file
+        worker_results: WorkerResults of the chunks that finished
+        schema: DSEM schema dict (its causal granularities are reported)
+
+    Returns:
+        Dict mapping granularity -> DataFrame (time_bucket, n_lines,
+        n_processed, coverage), see compute_bucket_coverage
+    """
+    granularities = sorted({
+        dim["causal_granularity"]
+        for dim in schema.get("dimensions", [])
+        if dim.get("causal_granularity") and dim.get("observability") != "latent"
+    })
+    all_lines = [line for chunk in worker_chunks for line in chunk.split("\n")]
+    # Lines past the cut of a truncated (salvaged) answer were not processed
+    processed_lines = [line for wr in worker_results for line in wr.processed_chunk.split("\n")]
+    coverage = compute_bucket_coverage(all_lines, processed_lines, granularities)
+    for granularity, df in coverage.items():
+        if df.is_empty():
+            continue
+        n_partial = df.filter(pl.col("coverage") < 1).height
+        print(
+            f"  {granularity} coverage: mean {df['coverage'].mean():.0%}, "
+            f"min {df['coverage'].min():.0%}, {n_partial}/{df.height} buckets partial"
+        )
+    return coverage
+
+
+@task
+def aggregate_measurements(
+    worker_results: list[WorkerResult],
+    schema: dict,
+    shard_dir: Path | None = None,
+    rollup_path: Path | None = None,
+) -> MeasurementSet:
     """Aggregate worker measurements into time-series DataFrames by granularity.
 
     Combines all worker extractions and aggregates to causal_granularity:
-    1. Concatenates worker DataFrames (dimension, value, timestamp)
+    1. Concatenates worker DataFrames (dimension, value, timestamp), or
+       scans the run's Parquet extraction shards
     2. Groups dimensions by their causal_granularity
     3. Parses timestamps and buckets to each granularity
     4. Applies dimension-specific aggregation (mean, sum, max, etc.)
-    5. Returns one DataFrame per granularity
+    5. Returns one DataFrame per granularity, in a MeasurementSet that also
+       holds each granularity as a contiguous float64 matrix for modeling
 
     Args:
         worker_results: List of WorkerResults from parallel workers
         schema: DSEM schema dict with dimension definitions
+        shard_dir: Directory of Parquet extraction shards to aggregate out of
+            core on the streaming engine instead of worker_results
+        rollup_path: Where to cache partial aggregates for rolling
+            dimensions up to coarser granularities (see utils/rollup.py)
 
     Returns:
-        Dict mapping granularity -> DataFrame. Each DataFrame has 'time_bucket'
-        column and dimension columns. Time-invariant dimensions are in
-        'time_invariant' key as a single-row DataFrame.
+        MeasurementSet mapping granularity -> DataFrame. Each DataFrame has
+        'time_bucket' column and dimension columns. Time-invariant dimensions
+        are in 'time_invariant' key as a single-row DataFrame.
     """
+    if shard_dir is not None:
+        return MeasurementSet(aggregate_worker_measurements(shard_dir, schema, rollup_path=rollup_path))
     dataframes = [wr.dataframe for wr in worker_results]
-    return aggregate_worker_measurements(dataframes, schema)
+    return MeasurementSet(aggregate_worker_measurements(dataframes, schema, rollup_path=rollup_path))
@@ -6,12 +6,21 @@ Fits PyMC model and runs interventions/counterfactuals.
 from typing import Any
 
 from prefect import task
+from prefect.cache_policies import NO_CACHE
 
+from causal_agent.utils.measurements import MeasurementSet
 
-@task(timeout_seconds=3600, retries=1)
-def fit_model(model_spec: dict, priors: dict, data: list[str]) -> Any:
+
+# NO_CACHE: hashing inputs for a cache key would serialize the measurements
+@task(timeout_seconds=3600, retries=1, cache_policy=NO_CACHE)
+def fit_model(model_spec: dict, priors: dict, measurements: MeasurementSet) -> Any:
     """Fit PyMC model.
 
+    The observed data are measurements.values(granularity), float64 views
+    of the aggregated frames (or of their memory-mapped Arrow IPC files),
+    masked where measurements.mask(granularity), with
+    coords=measurements.coords() and dims=measurements.dims(granularity).
+
     TODO: Implement PyMC model fitting.
     """
     pass
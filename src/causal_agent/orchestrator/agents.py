@@ -1,49 +1,135 @@
 """Orchestrator agents using Inspect AI with OpenRouter."""
 
+import asyncio
+import json
+from dataclasses import dataclass, field
 from pathlib import Path
+from types import SimpleNamespace
+from typing import Awaitable, Callable
 
 from dotenv import load_dotenv
 from inspect_ai.model import (
+    ChatMessageAssistant,
     ChatMessageSystem,
     ChatMessageUser,
     get_model,
 )
 
 from causal_agent.utils.config import get_config
-from causal_agent.utils.llm import multi_turn_generate, parse_json_response, validate_dsem_structure
+from causal_agent.utils.llm import (
+    get_generate_config,
+    multi_turn_generate,
+    parse_json_response,
+    validate_dsem_structure,
+)
 from .prompts import (
     STRUCTURE_PROPOSER_SYSTEM,
     STRUCTURE_PROPOSER_USER,
     STRUCTURE_REVIEW_REQUEST,
 )
-from .schemas import DSEMStructure
+from .schemas import DSEMStructure, validate_structure
+from .scoring import score_structure_proposal_normalized
 
 # Load environment variables from .env file (for API keys)
 load_dotenv(Path(__file__).parent.parent.parent.parent / ".env")
 
 
+@dataclass(frozen=True)
+class StructureDraft:
+    """A first-turn structure proposal, before self-review."""
+
+    model_name: str
+    completion: str
+    score: float  # score_structure_proposal_normalized; 0 if invalid
+    errors: list[str] = field(default_factory=list)  # validate_structure errors
+
+
+async def _draft_structure(messages: list, model_name: str) -> StructureDraft:
+    """Generate one structure proposal (with the validation tool) and score it."""
+    completion = await multi_turn_generate(
+        messages=messages,
+        model=get_model(model_name),
+        tools=[validate_dsem_structure()],
+        config=get_generate_config("orchestrator"),
+    )
+    data = parse_json_response(completion)
+    _, errors = validate_structure(data)
+    score = 0.0 if errors else score_structure_proposal_normalized(None, SimpleNamespace(structure=json.dumps(data)))
+    return StructureDraft(model_name=model_name, completion=completion, score=score, errors=errors)
+
+
+async def best_draft(
+    drafts: list[Callable[[], Awaitable[StructureDraft]]],
+    accept_score: float = 1.0,
+) -> StructureDraft:
+    """Run draft requests concurrently and return the highest-scoring one.
+
+    The first draft scoring at least `accept_score` wins at once and the
+    requests still running are cancelled. Drafts that fail (e.g. no
+    parseable JSON) are skipped.
+
+    Args:
+        drafts: Factories for the draft requests
+        accept_score: Score at which a draft is taken without waiting for the rest
+
+    Returns:
+        The best draft; ties go to the one that finished first
+
+    Raises:
+        The first draft's exception if every draft fails
+    """
+    tasks = [asyncio.ensure_future(draft()) for draft in drafts]
+    best: StructureDraft | None = None
+    try:
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None and (best is None or task.result().score > best.score):
+                    best = task.result()
+            if best is not None and best.score >= accept_score:
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+    if best is None:
+        raise tasks[0].exception()
+    return best
+
+
 async def propose_structure_async(
     question: str,
     data_sample: list[str],
     dataset_summary: str = "",
+    model_name: str | None = None,
+    n_proposals: int | None = None,
 ) -> dict:
     """
     Use the orchestrator LLM to propose a causal model structure.
 
     Two-stage process:
-    1. Initial proposal: Generate structure from question and data
-    2. Self-review: Double-check measurement_dtype, aggregation, and how_to_measure
+    1. Initial proposals: n_proposals concurrent drafts from question and
+       data, round-robin over the configured orchestrator models. Each is
+       checked with validate_structure and scored with
+       score_structure_proposal_normalized; a draft reaching
+       stage1_structure_proposal.accept_score cancels the rest.
+    2. Self-review of the best draft only: Double-check measurement_dtype,
+       aggregation, and how_to_measure
 
     Args:
         question: The causal research question (natural language)
         data_sample: Sample chunks from the dataset
         dataset_summary: Brief overview of the full dataset (size, timespan, etc.)
+        model_name: Orchestrator model for every draft and the review
+            (default: stage1_structure_proposal.model and .proposal_models from config)
+        n_proposals: Concurrent drafts (default: stage1_structure_proposal.n_proposals)
 
     Returns:
         DSEMStructure as a dictionary
     """
-    model_name = get_config().stage1_structure_proposal.model
-    model = get_model(model_name)
+    stage1 = get_config().stage1_structure_proposal
+    model_names = [model_name] if model_name else [stage1.model, *stage1.proposal_models]
+    n_proposals = n_proposals or stage1.n_proposals
 
     # Format the chunks for the prompt
     chunks_text = "\n".join(data_sample)
@@ -60,12 +146,24 @@ async def propose_structure_async(
         ),
     ]
 
-    # Run multi-turn: initial proposal + self-review, with validation tool available
+    draft = await best_draft(
+        [
+            lambda name=model_names[i % len(model_names)]: _draft_structure(messages, name)
+            for i in range(n_proposals)
+        ],
+        accept_score=stage1.accept_score,
+    )
+
+    # Self-review of the winning draft, with validation tool available
     completion = await multi_turn_generate(
-        messages=messages,
-        model=model,
-        follow_ups=[STRUCTURE_REVIEW_REQUEST],
+        messages=[
+            *messages,
+            ChatMessageAssistant(content=draft.completion),
+            ChatMessageUser(content=STRUCTURE_REVIEW_REQUEST),
+        ],
+        model=get_model(draft.model_name),
         tools=[validate_dsem_structure()],
+        config=get_generate_config("orchestrator"),
     )
 
     # Parse and validate final result
@@ -79,6 +177,7 @@ def propose_structure(
     question: str,
     data_sample: list[str],
     dataset_summary: str = "",
+    model_name: str | None = None,
 ) -> dict:
     """
     Synchronous wrapper for propose_structure_async.
@@ -87,10 +186,11 @@ def propose_structure(
         question: The causal research question
         data_sample: Sample chunks from the dataset
         dataset_summary: Brief overview of the full dataset (size, timespan, etc.)
+        model_name: Orchestrator model (default: stage1_structure_proposal.model from config)
 
     Returns:
         DSEMStructure as a dictionary
     """
     import asyncio
 
-    return asyncio.run(propose_structure_async(question, data_sample, dataset_summary))
+    return asyncio.run(propose_structure_async(question, data_sample, dataset_summary, model_name))
@@ -50,6 +50,8 @@ Set `is_outcome: true` for the primary outcome variable Y implied by the questio
 | **categorical** | Unordered categories | day_of_week, activity_type |
 | **continuous** | Real-valued measurements | temperature, mood_rating, hours_slept |
 
+For ordinal and categorical variables, list the labels in **categories** (ordinal: lowest to highest). Workers extract one of these labels, and aggregation works on the label's position in the list; without categories, only numeric values are kept.
+
 ## Autoregressive Structure
 
 All outcomes automatically receive AR(1) at their native timescale. Do NOT include explicit self-loops.
@@ -88,6 +90,7 @@ Choose based on meaning: mean (average level), sum (cumulative), max/min (extrem
       "causal_granularity": "hourly" | "daily" | "weekly" | "monthly" | "yearly" | null,
       "measurement_granularity": "finest" | "hourly" | "daily" | "weekly" | "monthly" | "yearly" | null,
       "measurement_dtype": "continuous" | "binary" | "count" | "ordinal" | "categorical",
+      "categories": ["label", ...] | null,
       "aggregation": "<aggregation_name>" | null
     }
   ],
@@ -136,7 +139,7 @@ For each **observed** dimension, verify that measurement_granularity, measuremen
 
 | aggregation | requires measurement_dtype | how_to_measure must specify |
 |-------------|---------------------------|----------------------------|
-| entropy, n_unique | categorical | the category set |
+| entropy, n_unique, mode, one_hot | categorical or ordinal | the category set (also listed in categories) |
 | sum, count | binary or count | what qualifies as 1 (binary) or what unit to count |
 | mean, median, p## | ordinal or continuous | the scale/levels (ordinal) or units (continuous) |
 | max, min | any | same as above for the dtype |
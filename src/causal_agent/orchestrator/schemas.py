@@ -1,8 +1,10 @@
+import json
 from enum import Enum
+from functools import lru_cache
 
 from pydantic import BaseModel, Field, field_validator, model_validator
 
-from causal_agent.utils.aggregations import AGGREGATION_REGISTRY
+from causal_agent.utils.aggregations import AGGREGATION_REGISTRY, CATEGORICAL_DTYPES
 
 
 class Role(str, Enum):
@@ -77,6 +79,13 @@ class Dimension(BaseModel):
     measurement_dtype: str = Field(
         description="'continuous', 'binary', 'count', 'ordinal', 'categorical'"
     )
+    categories: list[str] | None = Field(
+        default=None,
+        description=(
+            "Category labels of a 'categorical' or 'ordinal' variable (ordinal: lowest to highest). "
+            "Workers extract one of these labels; aggregation encodes each as its position in the list."
+        ),
+    )
     aggregation: str | None = Field(
         default=None,
         description=f"Aggregation function from registry. Available: {', '.join(sorted(AGGREGATION_REGISTRY.keys()))}",
@@ -154,6 +163,16 @@ class Dimension(BaseModel):
                         f"must be finer than or equal to causal_granularity '{self.causal_granularity}'"
                     )
 
+        if self.categories is not None:
+            if self.measurement_dtype not in CATEGORICAL_DTYPES:
+                raise ValueError(
+                    f"Variable '{self.name}' has categories but measurement_dtype '{self.measurement_dtype}' "
+                    f"(must be one of: {', '.join(sorted(CATEGORICAL_DTYPES))})"
+                )
+            labels = [category.strip().lower() for category in self.categories]
+            if not labels or len(set(labels)) != len(labels):
+                raise ValueError(f"Categories of '{self.name}' must be non-empty and distinct")
+
         # Outcomes must be endogenous
         if self.is_outcome and self.role != Role.ENDOGENOUS:
             raise ValueError(
@@ -271,11 +290,8 @@ class DSEMStructure(BaseModel):
         # Lagged edges can form cycles across time - that's the point of DSEMs
         contemporaneous_edges = [(e.cause, e.effect) for e in self.edges if not e.lagged]
         if contemporaneous_edges:
-            import networkx as nx
-
-            G = nx.DiGraph(contemporaneous_edges)
-            if not nx.is_directed_acyclic_graph(G):
-                cycles = list(nx.simple_cycles(G))
+            cycles = _contemporaneous_cycles(contemporaneous_edges)
+            if cycles:
                 raise ValueError(
                     f"Contemporaneous edges form cycle(s) within time slice: {cycles}. "
                     "DSEMs must be acyclic within time slice. Use lagged=true for feedback loops."
@@ -305,9 +321,95 @@ class DSEMStructure(BaseModel):
         return [(e.cause, e.effect) for e in self.edges]
 
 
+def _contemporaneous_cycles(edges: list[tuple[str, str]]) -> list[list[str]]:
+    """One cycle per strongly connected component of a graph, or [] if it is acyclic.
+
+    Linear in the size of the graph, where listing every simple cycle grows
+    exponentially on dense graphs.
+
+    Returns:
+        Cycles as node lists, e.g. [["a", "b"]] for a -> b -> a
+    """
+    import networkx as nx
+
+    G = nx.DiGraph(edges)
+    cycles = []
+    for component in nx.strongly_connected_components(G):
+        node = next(iter(component))
+        if len(component) == 1 and not G.has_edge(node, node):
+            continue
+        cycles.append([cause for cause, _ in nx.find_cycle(G.subgraph(component), source=node)])
+    return cycles
+
+
+def _content_key(data: dict) -> tuple | str | None:
+    """Hashable content of a dimension or edge dict: its sorted (key, type, value) items, or
+    canonical JSON if a value is not hashable (e.g. a categories list); None if it is not JSON either.
+
+    Value types are part of the key because equal values of different types
+    (True and 1, 1 and 1.0) hash alike but need not validate alike.
+    """
+    try:
+        items = tuple(sorted((key, type(value).__name__, value) for key, value in data.items()))
+        hash(items)
+        return items
+    except TypeError:
+        pass
+    try:
+        return json.dumps(data, sort_keys=True)
+    except (TypeError, ValueError):
+        return None
+
+
+def _from_content_key(content: tuple | str) -> dict:
+    return json.loads(content) if isinstance(content, str) else {key: value for key, _, value in content}
+
+
+@lru_cache(maxsize=4096)
+def _validate_dimension(content: tuple | str) -> Dimension | tuple[str, ...]:
+    """Validated dimension, or its error messages, memoized by content."""
+    try:
+        return Dimension.model_validate(_from_content_key(content))
+    except Exception as e:
+        # Extract error messages from Pydantic validation
+        error_msg = str(e)
+        # Clean up Pydantic error formatting
+        if "validation error" in error_msg.lower():
+            return tuple(
+                line.strip() for line in error_msg.split("\n")[1:]
+                if line.strip() and not line.strip().startswith("For further")
+            )
+        return (error_msg,)
+
+
+@lru_cache(maxsize=4096)
+def _validate_edge(content: tuple | str) -> CausalEdge | str:
+    """Validated edge, or its error message, memoized by content."""
+    try:
+        return CausalEdge.model_validate(_from_content_key(content))
+    except Exception as e:
+        return str(e)
+
+
+@lru_cache(maxsize=4096)
+def _edge_with_lag(content: tuple | str, cause_granularity: str | None, effect_granularity: str | None) -> CausalEdge:
+    """A valid edge with lag_hours set for its cause's and effect's granularities, memoized."""
+    edge = _validate_edge(content)
+    return edge.model_copy(
+        update={"lag_hours": compute_lag_hours(cause_granularity, effect_granularity, edge.lagged)}
+    )
+
+
 def validate_structure(data: dict) -> tuple[DSEMStructure | None, list[str]]:
     """Validate a structure dict, collecting ALL errors instead of failing on first.
 
+    The orchestrator calls this from its validation tool after every edit.
+    Dimensions and edges are validated once per distinct content (memoized
+    across calls), so a call re-checks only the ones that changed plus the
+    cross-references, and each cycle of contemporaneous edges is reported
+    once per strongly connected component. The returned structure holds
+    copies of the memoized models, so callers may modify it.
+
     Args:
         data: Dictionary to validate as DSEMStructure
 
@@ -346,20 +448,13 @@ def validate_structure(data: dict) -> tuple[DSEMStructure | None, list[str]]:
             errors.append(f"Duplicate dimension name: '{name}'")
         dim_names.add(name)
 
-        try:
-            dim = Dimension.model_validate(dim_data)
-            valid_dimensions.append(dim)
-        except Exception as e:
-            # Extract error messages from Pydantic validation
-            error_msg = str(e)
-            # Clean up Pydantic error formatting
-            if "validation error" in error_msg.lower():
-                for line in error_msg.split("\n")[1:]:
-                    line = line.strip()
-                    if line and not line.startswith("For further"):
-                        errors.append(f"dimensions[{i}] ({name}): {line}")
-            else:
-                errors.append(f"dimensions[{i}] ({name}): {error_msg}")
+        content = _content_key(dim_data)
+        result = _validate_dimension(content) if content is not None else ("must be JSON",)
+        if isinstance(result, Dimension):
+            # A copy: the memoized instance is shared by every call with this content
+            valid_dimensions.append(result.model_copy(deep=True))
+        else:
+            errors.extend(f"dimensions[{i}] ({name}): {line}" for line in result)
 
     # Build dim map for edge validation
     dim_map = {d.name: d for d in valid_dimensions}
@@ -376,10 +471,10 @@ def validate_structure(data: dict) -> tuple[DSEMStructure | None, list[str]]:
         edge_label = f"edges[{i}] ({cause} -> {effect})"
 
         # Check basic edge structure
-        try:
-            edge = CausalEdge.model_validate(edge_data)
-        except Exception as e:
-            errors.append(f"{edge_label}: {e}")
+        content = _content_key(edge_data)
+        edge = _validate_edge(content) if content is not None else "must be JSON"
+        if not isinstance(edge, CausalEdge):
+            errors.append(f"{edge_label}: {edge}")
             continue
 
         # Check references
@@ -410,8 +505,7 @@ def validate_structure(data: dict) -> tuple[DSEMStructure | None, list[str]]:
             continue
 
         # Compute lag_hours
-        edge.lag_hours = compute_lag_hours(cause_gran, effect_gran, edge.lagged)
-        valid_edges.append(edge)
+        valid_edges.append(_edge_with_lag(content, cause_gran, effect_gran).model_copy(deep=True))
 
     # Check outcome constraints
     outcomes = [d for d in valid_dimensions if d.is_outcome]
@@ -424,11 +518,8 @@ def validate_structure(data: dict) -> tuple[DSEMStructure | None, list[str]]:
     # Check acyclicity of contemporaneous edges
     contemporaneous_edges = [(e.cause, e.effect) for e in valid_edges if not e.lagged]
     if contemporaneous_edges:
-        import networkx as nx
-
-        G = nx.DiGraph(contemporaneous_edges)
-        if not nx.is_directed_acyclic_graph(G):
-            cycles = list(nx.simple_cycles(G))
+        cycles = _contemporaneous_cycles(contemporaneous_edges)
+        if cycles:
             errors.append(
                 f"Contemporaneous edges form cycle(s): {cycles}. "
                 "Use lagged=true for feedback loops."
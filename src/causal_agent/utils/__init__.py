@@ -5,6 +5,7 @@ from causal_agent.utils.aggregations import (
     apply_aggregation,
     get_aggregator,
     list_aggregations,
+    scan_extraction_shards,
 )
 
 __all__ = [
@@ -14,4 +15,5 @@ __all__ = [
     "apply_aggregation",
     "get_aggregator",
     "list_aggregations",
+    "scan_extraction_shards",
 ]
@@ -1,12 +1,19 @@
 """Aggregation registry for DSEM time-series aggregations using Polars."""
 
+import json
+from dataclasses import dataclass
+from pathlib import Path
 from typing import Callable
 
 import polars as pl
 
 # Type alias for aggregator functions
-# Takes column name, returns Polars expression
-Aggregator = Callable[[str], pl.Expr]
+# Takes column name, returns Polars expression. Order-dependent aggregators
+# also take an `order_by` column (see AggregationMetadata.ordered).
+Aggregator = Callable[..., pl.Expr]
+
+# Worker extractions: in-memory DataFrames, a LazyFrame, or a Parquet shard directory
+ExtractionSource = list[pl.DataFrame] | pl.LazyFrame | str | Path
 
 
 def agg_mean(col: str) -> pl.Expr:
@@ -23,16 +30,14 @@ def agg_entropy(col: str) -> pl.Expr:
     """Shannon entropy (normalized counts)."""
     # For continuous data, this computes entropy of binned values
     # For categorical, computes entropy directly
-    return (
-        pl.col(col)
-        .value_counts()
-        .struct.field("count")
-        .cast(pl.Float64)
-        .map_batches(
-            lambda s: pl.Series([-((p := s / s.sum()) * (p + 1e-10).log()).sum()])
-        )
-        .first()
-    )
+    counts = pl.col(col).unique_counts().cast(pl.Float64)  # Nulls count as one value
+    p = counts / counts.sum()
+    return -(p * (p + 1e-10).log()).sum()
+
+
+def agg_mode(col: str) -> pl.Expr:
+    """Most frequent non-null value (the smallest one on ties)."""
+    return pl.col(col).drop_nulls().mode().sort().first()
 
 
 def agg_range(col: str) -> pl.Expr:
@@ -50,6 +55,23 @@ def agg_iqr(col: str) -> pl.Expr:
     return pl.col(col).quantile(0.75) - pl.col(col).quantile(0.25)
 
 
+def _in_order(col: str, order_by: str | None) -> pl.Expr:
+    """Column values sorted by `order_by` (stable, nulls last), or as they come."""
+    if order_by is None:
+        return pl.col(col)
+    return pl.col(col).sort_by(order_by, maintain_order=True, nulls_last=True)
+
+
+def agg_instability(col: str, order_by: str | None = None) -> pl.Expr:
+    """Mean absolute change between consecutive values."""
+    return _in_order(col, order_by).diff().abs().mean()
+
+
+def agg_trend(col: str, order_by: str | None = None) -> pl.Expr:
+    """Average direction of change between consecutive values."""
+    return _in_order(col, order_by).diff().mean()
+
+
 # Main aggregation registry
 AGGREGATION_REGISTRY: dict[str, Aggregator] = {
     # --- Standard statistics ---
@@ -77,9 +99,47 @@ AGGREGATION_REGISTRY: dict[str, Aggregator] = {
     "cv": agg_cv,
     # --- Domain-specific ---
     "entropy": agg_entropy,
-    "instability": lambda c: pl.col(c).diff().abs().mean(),  # Mean absolute change
-    "trend": lambda c: pl.col(c).diff().mean(),  # Average direction of change
+    "instability": agg_instability,
+    "trend": agg_trend,
     "n_unique": lambda c: pl.col(c).n_unique(),
+    # --- Categorical ---
+    "mode": agg_mode,
+    # Bucket count per category: dimensions with categories are split into
+    # one "<name>=<category>" indicator dimension each (see one_hot_dimension)
+    "one_hot": lambda c: pl.col(c).count(),
+}
+
+
+@dataclass(frozen=True)
+class AggregationMetadata:
+    """How an aggregation behaves outside a single batch group_by."""
+
+    online_exact: bool  # Its mergeable online state (utils/online_aggregation.py) gives the batch result
+    ordered: bool = False  # Takes order_by; measurements are ordered by timestamp within each bucket
+    python_fallback: bool = False  # Runs a Python callback, serializing group_by execution on the GIL
+
+
+def _uses_python_callback(expr: pl.Expr) -> bool:
+    """Whether an expression contains a Python UDF (map_batches, map_elements, ...)."""
+    return "python_udf" in str(expr)
+
+
+_ORDERED_AGGREGATIONS = {"instability", "trend"}
+
+# Exact online states: moments (sum, count, mean, min, max, var/std, skew,
+# kurtosis, one_hot), ordered first/last, and value counts (entropy, mode).
+# Quantiles use a t-digest and n_unique a HyperLogLog, which are exact only
+# while a bucket holds few values; instability and trend keep a bounded
+# number of sorted runs, exact only while batches cover disjoint time ranges.
+AGGREGATION_METADATA: dict[str, AggregationMetadata] = {
+    name: AggregationMetadata(
+        online_exact=name not in {
+            "median", "p10", "p25", "p75", "p90", "p99", "iqr", "n_unique", "instability", "trend",
+        },
+        ordered=name in _ORDERED_AGGREGATIONS,
+        python_fallback=_uses_python_callback(aggregator("value")),
+    )
+    for name, aggregator in AGGREGATION_REGISTRY.items()
 }
 
 
@@ -126,6 +186,16 @@ def apply_aggregation(df: pl.DataFrame, col: str, agg_name: str, group_by: list[
     return df.select(expr)
 
 
+# Polars interval of one time bucket per granularity
+GRANULARITY_INTERVALS = {
+    "hourly": "1h",
+    "daily": "1d",
+    "weekly": "1w",
+    "monthly": "1mo",
+    "yearly": "1y",
+}
+
+
 def _truncate_to_granularity(ts: pl.Expr, granularity: str) -> pl.Expr:
     """Truncate a datetime expression to the specified granularity.
 
@@ -136,16 +206,9 @@ def _truncate_to_granularity(ts: pl.Expr, granularity: str) -> pl.Expr:
     Returns:
         Truncated datetime expression
     """
-    truncate_map = {
-        "hourly": "1h",
-        "daily": "1d",
-        "weekly": "1w",
-        "monthly": "1mo",
-        "yearly": "1y",
-    }
-    if granularity not in truncate_map:
-        raise ValueError(f"Unknown granularity '{granularity}'. Must be one of: {list(truncate_map.keys())}")
-    return ts.dt.truncate(truncate_map[granularity])
+    if granularity not in GRANULARITY_INTERVALS:
+        raise ValueError(f"Unknown granularity '{granularity}'. Must be one of: {list(GRANULARITY_INTERVALS.keys())}")
+    return ts.dt.truncate(GRANULARITY_INTERVALS[granularity])
 
 
 def _coerce_value_to_numeric(value) -> float | None:
@@ -164,25 +227,352 @@ def _coerce_value_to_numeric(value) -> float | None:
     return None
 
 
+def _coerce_to_numeric(values: pl.Series) -> pl.Series:
+    """Coerce a value Series to Float64, element-wise equal to _coerce_value_to_numeric.
+
+    Polars converts numbers, booleans and most numeric strings natively. Only
+    the values it leaves null that Python's float() may still parse (e.g.
+    " 3", "1_000") go through _coerce_value_to_numeric.
+    """
+    if values.dtype == pl.Object:
+        objects = values.to_list()
+        numeric = pl.Series(values.name, objects, dtype=pl.Float64, strict=False)
+    elif values.dtype == pl.String:
+        objects = None
+        numeric = values.cast(pl.Float64, strict=False)
+    elif values.dtype.is_numeric() or values.dtype == pl.Boolean:
+        return values.cast(pl.Float64)
+    else:
+        return pl.Series(values.name, [None] * len(values), dtype=pl.Float64)
+
+    missed = (numeric.is_null() & values.is_not_null()).arg_true()
+    if missed.is_empty():
+        return numeric
+    candidates = [objects[i] for i in missed] if objects is not None else values.gather(missed).to_list()
+    fixed = pl.Series([_coerce_value_to_numeric(v) for v in candidates], dtype=pl.Float64)
+    return numeric.scatter(missed, fixed)
+
+
+# measurement_dtypes whose values are category labels
+CATEGORICAL_DTYPES = {"categorical", "ordinal"}
+
+# Aggregations that return one of the bucket's values, so a category
+_CATEGORY_VALUED_AGGREGATIONS = {"mode", "first", "last", "min", "max"}
+
+
+def _value_text(value) -> str | None:
+    """Text form of an extracted value (strings as-is, everything else as JSON)."""
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+def _value_texts(values: pl.Series) -> pl.Series:
+    """A value Series as text, element-wise equal to _value_text."""
+    if values.dtype == pl.String:
+        return values
+    return pl.Series(values.name, [_value_text(v) for v in values.to_list()], dtype=pl.String)
+
+
+def _schema_categories(schema: dict) -> dict[str, list[str]]:
+    """Declared categories of the observed categorical and ordinal dimensions."""
+    return {
+        dim["name"]: list(dim["categories"])
+        for dim in schema.get("dimensions", [])
+        if dim.get("name")
+        and dim.get("observability") != "latent"
+        and dim.get("measurement_dtype") in CATEGORICAL_DTYPES
+        and dim.get("categories")
+    }
+
+
+def one_hot_dimension(name: str, category: str) -> str:
+    """Name of the indicator dimension of one category of a one_hot dimension."""
+    return f"{name}={category}"
+
+
+def _observed_dimensions(schema: dict) -> dict[str, dict]:
+    """Granularity and aggregation of each observed dimension.
+
+    one_hot dimensions with categories are replaced by one indicator
+    dimension per category (see _expand_one_hot), counted per bucket.
+    Dimensions without an aggregation use mode if they have categories and
+    mean otherwise.
+
+    Returns:
+        Dict mapping dimension name -> {"causal_granularity", "aggregation"}
+    """
+    categories = _schema_categories(schema)
+    dim_info = {}
+    for dim in schema.get("dimensions", []):
+        name = dim.get("name")
+        # Only observed dimensions (latent have no measurements)
+        if not name or dim.get("observability") == "latent":
+            continue
+        info = {
+            "causal_granularity": dim.get("causal_granularity"),
+            # Time-invariant dimensions have no aggregation: a category's values collapse to their mode
+            "aggregation": dim.get("aggregation") or ("mode" if name in categories else "mean"),
+        }
+        if info["aggregation"] == "one_hot" and name in categories:
+            for category in categories[name]:
+                dim_info[one_hot_dimension(name, category)] = info
+        else:
+            dim_info[name] = info
+    return dim_info
+
+
+def _category_codes(text: pl.Expr, categories: dict[str, list[str]]) -> pl.Expr:
+    """Position of each value among its dimension's categories as Float64, null if it is none of them.
+
+    Labels match case-insensitively and ignoring surrounding whitespace.
+    """
+    codes = {
+        f"{name}\x1f{category.strip().lower()}": float(code)
+        for name, labels in categories.items()
+        for code, category in enumerate(labels)
+    }
+    return pl.concat_str(
+        pl.col("dimension"), pl.lit("\x1f"), text.str.strip_chars().str.to_lowercase()
+    ).replace_strict(codes, default=None, return_dtype=pl.Float64)
+
+
+def _encode_categories(numeric_value: pl.Expr, text: pl.Expr, categories: dict[str, list[str]]) -> pl.Expr:
+    """numeric_value, with the values of dimensions with categories replaced by their category codes."""
+    if not categories:
+        return numeric_value
+    return (
+        pl.when(pl.col("dimension").is_in(list(categories)))
+        .then(_category_codes(text, categories))
+        .otherwise(numeric_value)
+    )
+
+
+def _expand_one_hot(rows: pl.LazyFrame, dim_info: dict[str, dict], categories: dict[str, list[str]]) -> pl.LazyFrame:
+    """Replace each row of a one_hot dimension by one indicator row per category.
+
+    The indicator of "<name>=<category>" is 1.0 where the row's code is the
+    category's and null elsewhere, so counting it counts the category.
+    """
+    one_hot = {
+        name: labels for name, labels in categories.items()
+        if one_hot_dimension(name, labels[0]) in dim_info
+    }
+    if not one_hot:
+        return rows
+    indicators = pl.LazyFrame({
+        "dimension": [name for name, labels in one_hot.items() for _ in labels],
+        "indicator": [one_hot_dimension(name, category) for name, labels in one_hot.items() for category in labels],
+        "code": [float(code) for labels in one_hot.values() for code in range(len(labels))],
+    })
+    expanded = rows.join(indicators, on="dimension").with_columns(
+        pl.col("indicator").alias("dimension"),
+        pl.when(pl.col("numeric_value") == pl.col("code")).then(1.0).alias("numeric_value"),
+    ).drop("indicator", "code")
+    return pl.concat([rows.filter(~pl.col("dimension").is_in(list(one_hot))), expanded])
+
+
+def _decode_categories(
+    df: pl.DataFrame,
+    dim_info: dict[str, dict],
+    categories: dict[str, list[str]],
+) -> pl.DataFrame:
+    """Cast category-valued aggregates (mode, first, last, min, max) of dimensions with categories to Enums."""
+    decoded = [
+        pl.col(name).cast(pl.UInt32).cast(pl.Enum(labels))
+        for name, labels in categories.items()
+        if name in df.columns and dim_info[name]["aggregation"] in _CATEGORY_VALUED_AGGREGATIONS
+    ]
+    return df.with_columns(decoded) if decoded else df
+
+
+def _aggregation_expr(name: str, col: str, order_by: str = "parsed_ts") -> pl.Expr:
+    """Expression aggregating `col` by name (mean for unknown names), ordered by `order_by` if it needs it."""
+    if name not in AGGREGATION_REGISTRY:
+        name = "mean"
+    if AGGREGATION_METADATA[name].ordered:
+        return AGGREGATION_REGISTRY[name](col, order_by=order_by)
+    return AGGREGATION_REGISTRY[name](col)
+
+
+def _aggregate_long(rows: pl.LazyFrame, keys: list[str], aggregation_of: dict[str, str]) -> list[pl.LazyFrame]:
+    """Aggregate numeric_value per group of `keys` (which include "dimension").
+
+    Rows are partitioned by aggregation function rather than by dimension, so
+    each function runs in one group_by over exactly the rows of the
+    dimensions that use it.
+
+    Returns:
+        One long plan (keys..., value) per aggregation function, each with
+        that function's own value dtype
+    """
+    dims_by_aggregation: dict[str, list[str]] = {}
+    for dim_name, agg_name in aggregation_of.items():
+        dims_by_aggregation.setdefault(agg_name, []).append(dim_name)
+
+    parts = []
+    for agg_name, dim_names in dims_by_aggregation.items():
+        subset = rows if len(dims_by_aggregation) == 1 else rows.filter(pl.col("dimension").is_in(dim_names))
+        parts.append(subset.group_by(keys).agg(_aggregation_expr(agg_name, "numeric_value").alias("value")))
+    return parts
+
+
+def _aggregate_single_pass(rows: pl.LazyFrame, keys: list[str], aggregation_of: dict[str, str]) -> pl.LazyFrame:
+    """Aggregate numeric_value per group of `keys` (which include "dimension") in one group_by.
+
+    Unlike _aggregate_long, the source is read once: every group computes
+    every aggregation function, each over a copy of numeric_value masked to
+    null outside the dimensions using that function. Since groups never mix
+    dimensions, each dimension's own function sees exactly its values, and
+    the others run on all-null input. Used for out-of-core sources, where a
+    re-scan per function would cost more than the wasted aggregations.
+
+    Returns:
+        Plan with the keys and one "__<aggregation>" column per function;
+        split it with _split_single_pass
+    """
+    dims_by_aggregation: dict[str, list[str]] = {}
+    for dim_name, agg_name in aggregation_of.items():
+        dims_by_aggregation.setdefault(agg_name, []).append(dim_name)
+
+    return rows.with_columns(
+        pl.when(pl.col("dimension").is_in(dim_names)).then(pl.col("numeric_value")).alias(f"__{agg_name}")
+        for agg_name, dim_names in dims_by_aggregation.items()
+    ).group_by(keys).agg(
+        _aggregation_expr(agg_name, f"__{agg_name}").alias(f"__{agg_name}")
+        for agg_name in dims_by_aggregation
+    )
+
+
+def _split_single_pass(wide: pl.DataFrame, keys: list[str], aggregation_of: dict[str, str]) -> list[pl.DataFrame]:
+    """Long (keys..., value) parts of a collected _aggregate_single_pass result, one per function."""
+    dims_by_aggregation: dict[str, list[str]] = {}
+    for dim_name, agg_name in aggregation_of.items():
+        dims_by_aggregation.setdefault(agg_name, []).append(dim_name)
+
+    return [
+        wide.filter(pl.col("dimension").is_in(dim_names)).select(*keys, pl.col(f"__{agg_name}").alias("value"))
+        for agg_name, dim_names in dims_by_aggregation.items()
+    ]
+
+
+def scan_extraction_shards(shard_dir: str | Path) -> pl.LazyFrame | None:
+    """Lazily scan a directory of Parquet extraction shards, or None if it has none.
+
+    Shards (see utils/runs.py write_extraction_shards) hold the columns
+    dimension, value (as text), numeric_value and timestamp. Files are read
+    in name order, so order-dependent aggregations (first, last,
+    instability) see rows in the order they were written.
+    """
+    shard_dir = Path(shard_dir)
+    if not any(shard_dir.glob("*.parquet")):
+        return None
+    return pl.scan_parquet(shard_dir / "*.parquet")
+
+
+def _measurement_rows(
+    source: ExtractionSource,
+    categories: dict[str, list[str]] | None = None,
+) -> tuple[pl.LazyFrame | None, bool]:
+    """Plan (dimension, parsed_ts, numeric_value) over extractions from any source.
+
+    Values of dimensions with declared categories are their category codes
+    (see _category_codes) rather than numbers.
+
+    Returns:
+        Tuple of (plan or None if there are no extractions, whether the
+        source is out of core and should run on the streaming engine)
+    """
+    categories = categories or {}
+    # time_zone="UTC" handles timestamps with timezone info (e.g., +00:00 or Z suffix)
+    parsed_ts = pl.col("timestamp").str.to_datetime(strict=False, time_zone="UTC").alias("parsed_ts")
+
+    if isinstance(source, list):
+        if not source:
+            return None, False
+        combined = pl.concat(source, how="vertical")
+        if combined.is_empty():
+            return None, False
+        # Coerce in memory: Object columns are not streamable
+        rows = combined.select(
+            pl.col("dimension"),
+            parsed_ts,
+            _coerce_to_numeric(combined["value"]).alias("numeric_value"),
+        )
+        if categories:
+            # Only the values of categorical dimensions are needed as text
+            selected = combined["dimension"].is_in(list(categories)).arg_true()
+            text = pl.Series([None] * combined.height, dtype=pl.String).scatter(
+                selected, _value_texts(combined["value"].gather(selected))
+            )
+            rows = rows.with_columns(
+                _encode_categories(pl.col("numeric_value"), pl.lit(text), categories).alias("numeric_value")
+            )
+        return rows.lazy(), False
+
+    lazy = source if isinstance(source, pl.LazyFrame) else scan_extraction_shards(source)
+    if lazy is None:
+        return None, True
+    schema = lazy.collect_schema()
+    if "numeric_value" in schema.names():
+        numeric_value = pl.col("numeric_value").cast(pl.Float64)  # Coerced when the shard was written
+    else:
+        numeric_value = pl.col("value").map_batches(_coerce_to_numeric, return_dtype=pl.Float64, is_elementwise=True)
+    if schema["value"] == pl.String:
+        text = pl.col("value")
+    else:
+        text = pl.col("value").map_batches(_value_texts, return_dtype=pl.String, is_elementwise=True)
+    return lazy.select(
+        pl.col("dimension"),
+        parsed_ts,
+        _encode_categories(numeric_value, text, categories).alias("numeric_value"),
+    ), True
+
+
 def aggregate_worker_measurements(
-    dataframes: list[pl.DataFrame],
+    dataframes: ExtractionSource,
     schema: dict,
+    rollup_path: Path | None = None,
 ) -> dict[str, pl.DataFrame]:
     """Aggregate worker measurements into time-series DataFrames by causal_granularity.
 
     Takes raw worker outputs (dimension, value, timestamp) and produces
     time-series DataFrames ready for causal modeling:
-    1. Concatenates all worker DataFrames
-    2. Parses timestamps
+    1. Concatenates all worker DataFrames (or scans a LazyFrame / shard directory)
+    2. Parses timestamps and coerces values to numeric, once for all rows
+       (values of dimensions with categories to their category codes)
     3. Groups dimensions by their causal_granularity
-    4. For each granularity, buckets timestamps and applies aggregation
-    5. Returns one DataFrame per granularity with dimensions as columns
+    4. For each granularity, buckets timestamps once and aggregates every
+       (time_bucket, dimension) group with the dimension's aggregation
+       (instability and trend see each group's values in timestamp order)
+    5. Evaluates the plans of all granularities together with collect_all
+    6. Pivots to one DataFrame per granularity with dimensions as columns
+
+    For time-varying dimensions, one group_by per granularity computes
+    partial aggregates (count, sum, min, max, first, last) of all its
+    dimensions. Decomposable aggregations (sum, count, mean, min, max, range,
+    first, last) are read off these partials rather than scanned again, and
+    the partials are what modeling stages roll up to coarser granularities
+    (see utils/rollup.py).
+
+    Category-valued aggregations (mode, first, last, min, max) of dimensions
+    with categories are returned as Enums of the categories, and one_hot
+    dimensions as one "<name>=<category>" count column per category.
+
+    A LazyFrame or a directory of Parquet extraction shards is aggregated
+    out of core on Polars' streaming engine, with one single-pass group_by
+    per granularity: only the aggregated (time_bucket, dimension) groups are
+    materialized, so peak memory is bounded by the number of time buckets
+    rather than of extractions.
 
     Args:
         dataframes: List of DataFrames from workers, each with columns
-                   (dimension, value, timestamp)
+                   (dimension, value, timestamp); or a LazyFrame with those
+                   columns; or a directory of Parquet extraction shards
         schema: DSEM schema dict containing dimension definitions with
                causal_granularity and aggregation functions
+        rollup_path: Where to save the partial aggregates of time-varying
+                    dimensions as a RollupCache
 
     Returns:
         Dict mapping granularity -> DataFrame. Each DataFrame has 'time_bucket'
@@ -190,125 +580,176 @@ def aggregate_worker_measurements(
         Time-invariant dimensions (causal_granularity=None) are in key 'time_invariant'
         as a single-row DataFrame.
     """
-    if not dataframes:
-        return {}
-
-    # Concatenate all worker dataframes
-    combined = pl.concat(dataframes, how="vertical")
+    from causal_agent.utils.rollup import PARTIAL_EXPRS, ROLLUP_AGGREGATIONS, RollupCache
 
-    if combined.is_empty():
+    categories = _schema_categories(schema)
+    rows, out_of_core = _measurement_rows(dataframes, categories)
+    if rows is None:
         return {}
 
     # Build dimension metadata from schema
-    dim_info = {}
-    for dim in schema.get("dimensions", []):
-        name = dim.get("name")
-        if not name:
-            continue
-        # Only process observed dimensions (latent have no measurements)
-        if dim.get("observability") == "latent":
-            continue
-        dim_info[name] = {
-            "causal_granularity": dim.get("causal_granularity"),
-            "aggregation": dim.get("aggregation", "mean"),
-        }
-
-    # Parse timestamps - try multiple formats
-    # time_zone="UTC" handles timestamps with timezone info (e.g., +00:00 or Z suffix)
-    combined = combined.with_columns(
-        pl.col("timestamp")
-        .str.to_datetime(strict=False, time_zone="UTC")
-        .alias("parsed_ts")
-    )
-
-    # Coerce values to numeric
-    combined = combined.with_columns(
-        pl.col("value")
-        .map_elements(_coerce_value_to_numeric, return_dtype=pl.Float64)
-        .alias("numeric_value")
-    )
+    dim_info = _observed_dimensions(schema)
+    rows = _expand_one_hot(rows, dim_info, categories)
 
     # Group dimensions by granularity
     dims_by_granularity: dict[str | None, list[str]] = {}
     for dim_name, info in dim_info.items():
-        gran = info["causal_granularity"]
-        if gran not in dims_by_granularity:
-            dims_by_granularity[gran] = []
-        dims_by_granularity[gran].append(dim_name)
-
-    results: dict[str, pl.DataFrame] = {}
+        dims_by_granularity.setdefault(info["causal_granularity"], []).append(dim_name)
 
+    # Plan every granularity's aggregation, then evaluate all plans together
+    plans: list[pl.LazyFrame] = []
+    plan_slices: dict[str | None, slice] = {}
+    partial_plans: dict[str, int] = {}
+    group_keys: dict[str | None, list[str]] = {}
     for granularity, dim_names in dims_by_granularity.items():
+        aggregation_of = {dim_name: dim_info[dim_name]["aggregation"] for dim_name in dim_names}
+        if granularity is not None:
+            # Partials of all the granularity's dimensions; decomposable ones need no other plan
+            partial_plans[granularity] = len(plans)
+            plans.append(
+                # Row positions order first/last when partials are rolled up
+                rows.with_row_index("row")
+                .filter(pl.col("parsed_ts").is_not_null() & pl.col("dimension").is_in(dim_names))
+                .with_columns(_truncate_to_granularity(pl.col("parsed_ts"), granularity).alias("time_bucket"))
+                .group_by("time_bucket", "dimension")
+                .agg(PARTIAL_EXPRS)
+            )
+            aggregation_of = {
+                dim_name: aggregation for dim_name, aggregation in aggregation_of.items()
+                if aggregation not in ROLLUP_AGGREGATIONS
+            }
+            dim_names = list(aggregation_of)
+            if not dim_names:
+                plan_slices[granularity] = slice(len(plans), len(plans))
+                continue
         if granularity is None:
             # Time-invariant dimensions - aggregate all values into single row
-            time_invariant_cols = {}
-            for dim_name in dim_names:
-                dim_data = combined.filter(pl.col("dimension") == dim_name)
-                if dim_data.is_empty():
-                    continue
-
-                agg_name = dim_info[dim_name]["aggregation"]
-                try:
-                    agg_fn = get_aggregator(agg_name)
-                except ValueError:
-                    agg_fn = get_aggregator("mean")
-
-                agg_value = dim_data.select(agg_fn("numeric_value")).item()
-                time_invariant_cols[dim_name] = [agg_value]
+            dim_rows = rows.filter(pl.col("dimension").is_in(dim_names))
+            group_keys[granularity] = ["dimension"]
+        else:
+            # Time-varying dimensions: rows with valid timestamps, bucketed once
+            dim_rows = rows.filter(
+                pl.col("parsed_ts").is_not_null() &
+                pl.col("dimension").is_in(dim_names)
+            ).select(
+                _truncate_to_granularity(pl.col("parsed_ts"), granularity).alias("time_bucket"),
+                "dimension",
+                "numeric_value",
+                "parsed_ts",  # Orders instability/trend within each bucket
+            )
+            group_keys[granularity] = ["time_bucket", "dimension"]
+        if out_of_core:
+            parts = [_aggregate_single_pass(dim_rows, group_keys[granularity], aggregation_of)]
+        else:
+            parts = _aggregate_long(dim_rows, group_keys[granularity], aggregation_of)
+        plan_slices[granularity] = slice(len(plans), len(plans) + len(parts))
+        plans.extend(parts)
+
+    collected = pl.collect_all(plans, engine="streaming" if out_of_core else "auto")
+
+    if rollup_path is not None and partial_plans:
+        RollupCache(
+            pl.concat([collected[index] for index in partial_plans.values()]),
+            {dim_name: info["causal_granularity"] for dim_name, info in dim_info.items() if info["causal_granularity"]},
+        ).save(rollup_path)
 
-            if time_invariant_cols:
-                results["time_invariant"] = pl.DataFrame(time_invariant_cols)
+    results: dict[str, pl.DataFrame] = {}
+    for granularity, dim_names in dims_by_granularity.items():
+        parts = collected[plan_slices[granularity]]
+        if out_of_core and parts:
+            aggregation_of = {
+                dim_name: dim_info[dim_name]["aggregation"] for dim_name in dim_names
+                if granularity is None or dim_info[dim_name]["aggregation"] not in ROLLUP_AGGREGATIONS
+            }
+            parts = _split_single_pass(parts[0], group_keys[granularity], aggregation_of)
+        if granularity is not None:
+            partials = collected[partial_plans[granularity]]
+            decomposable: dict[str, list[str]] = {}
+            for dim_name in dim_names:
+                if dim_info[dim_name]["aggregation"] in ROLLUP_AGGREGATIONS:
+                    decomposable.setdefault(dim_info[dim_name]["aggregation"], []).append(dim_name)
+            parts = [*parts, *(
+                partials.filter(pl.col("dimension").is_in(names)).select(
+                    "time_bucket", "dimension", ROLLUP_AGGREGATIONS[aggregation].alias("value")
+                )
+                for aggregation, names in decomposable.items()
+            )]
+        parts = [part for part in parts if not part.is_empty()]
+        if not parts:
             continue
 
-        # Time-varying dimensions at this granularity
-        # Filter to rows with valid timestamps
-        gran_data = combined.filter(
-            pl.col("parsed_ts").is_not_null() &
-            pl.col("dimension").is_in(dim_names)
-        )
-
-        if gran_data.is_empty():
+        if granularity is None:
+            values = {dim_name: value for part in parts for dim_name, value in part.iter_rows()}
+            results["time_invariant"] = _decode_categories(pl.DataFrame(
+                {dim_name: [values[dim_name]] for dim_name in dim_names if dim_name in values}
+            ), dim_info, categories)
             continue
 
-        # Process each dimension and collect for joining
-        dim_dfs = []
-        for dim_name in dim_names:
-            dim_data = gran_data.filter(pl.col("dimension") == dim_name)
-            if dim_data.is_empty():
-                continue
+        # One pivot for all dimensions; values share Float64 in the long frame
+        # and are cast back to their aggregation's dtype (e.g. count -> UInt32)
+        dtype_of = {
+            dim_name: part.schema["value"]
+            for part in parts
+            for dim_name in part["dimension"].unique()
+        }
+        wide = pl.concat(
+            [part.with_columns(pl.col("value").cast(pl.Float64)) for part in parts]
+        ).pivot(on="dimension", index="time_bucket", values="value")
+        present = [dim_name for dim_name in dim_names if dim_name in dtype_of]
+        results[granularity] = _decode_categories(wide.select(
+            "time_bucket",
+            *(pl.col(dim_name).cast(dtype_of[dim_name]) for dim_name in present),
+        ).sort("time_bucket"), dim_info, categories)
 
-            # Bucket timestamps to this granularity
-            dim_data = dim_data.with_columns(
-                _truncate_to_granularity(pl.col("parsed_ts"), granularity).alias("time_bucket")
-            )
+    return results
 
-            # Get aggregation function
-            agg_name = dim_info[dim_name]["aggregation"]
-            try:
-                agg_fn = get_aggregator(agg_name)
-            except ValueError:
-                agg_fn = get_aggregator("mean")
-
-            # Group by time bucket and aggregate
-            aggregated = (
-                dim_data
-                .group_by("time_bucket")
-                .agg(agg_fn("numeric_value").alias(dim_name))
-                .sort("time_bucket")
-            )
 
-            dim_dfs.append(aggregated)
+def _line_buckets(lines: list[str], granularity: str) -> pl.DataFrame:
+    """Bucket preprocessed lines by their leading "[YYYY-MM-DD HH:MM]" timestamp."""
+    return (
+        pl.DataFrame({"line": lines}, schema={"line": pl.Utf8})
+        .select(
+            pl.col("line")
+            .str.extract(r"^\[(\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2})")
+            .str.replace("T", " ")
+            .str.to_datetime("%Y-%m-%d %H:%M", strict=False)
+            .dt.replace_time_zone("UTC")
+            .alias("parsed_ts")
+        )
+        .drop_nulls()
+        .select(_truncate_to_granularity(pl.col("parsed_ts"), granularity).alias("time_bucket"))
+    )
 
-        if not dim_dfs:
-            continue
 
-        # Join all dimensions at this granularity on time_bucket
-        result = dim_dfs[0]
-        for df in dim_dfs[1:]:
-            result = result.join(df, on="time_bucket", how="full", coalesce=True)
+def compute_bucket_coverage(
+    all_lines: list[str],
+    processed_lines: list[str],
+    granularities: list[str],
+) -> dict[str, pl.DataFrame]:
+    """Share of input lines per time bucket that were processed by workers.
 
-        # Sort by time
-        result = result.sort("time_bucket")
-        results[granularity] = result
+    When stage 2 runs out of budget (see utils/budget.py) or chunks are
+    dead-lettered, aggregated measurements are based on only part of the
+    data. Coverage says how much of each bucket backs its estimate.
 
-    return results
+    Args:
+        all_lines: All preprocessed input lines
+        processed_lines: Lines of the chunks that finished successfully
+        granularities: Time granularities to report (e.g. ['daily', 'weekly'])
+
+    Returns:
+        Dict mapping granularity -> DataFrame with columns time_bucket,
+        n_lines, n_processed, coverage (0-1), sorted by time_bucket. Time
+        buckets match those of aggregate_worker_measurements.
+    """
+    coverage = {}
+    for granularity in granularities:
+        totals = _line_buckets(all_lines, granularity).group_by("time_bucket").len("n_lines")
+        processed = _line_buckets(processed_lines, granularity).group_by("time_bucket").len("n_processed")
+        coverage[granularity] = (
+            totals.join(processed, on="time_bucket", how="left")
+            .with_columns(pl.col("n_processed").fill_null(0))
+            .with_columns((pl.col("n_processed") / pl.col("n_lines")).alias("coverage"))
+            .sort("time_bucket")
+        )
+    return coverage
@@ -0,0 +1,242 @@
+"""Cross-timescale alignment of aggregated measurements into design matrices.
+
+aggregate_worker_measurements returns one DataFrame per causal_granularity.
+Modeling needs, for every endogenous variable, its series next to the
+series of its causes at the variable's own timescale. align_design_matrices
+builds one DesignMatrix per time-varying endogenous variable:
+
+- Rows are a regular grid of the variable's time buckets; buckets without
+  measurements are filled in (upsample) with missing values.
+- Causes at the same granularity are joined bucket by bucket.
+- Coarser causes (e.g. weekly -> daily) are broadcast to every finer bucket
+  within their period.
+- Finer causes (e.g. hourly -> daily) are aggregated to the variable's
+  granularity with the cause's own aggregation, rolled up exactly from the
+  run's RollupCache when the aggregation is decomposable. Without the cache,
+  only aggregations that compose (sum, count, one_hot, min, max, first, last) are
+  re-aggregated from the finer buckets; other finer causes are missing.
+- Lagged edges shift the cause by edge.lag_hours, in buckets of the coarser
+  of the two granularities, before it is aligned.
+- Time-invariant causes are constant columns.
+- one_hot dimensions are measured as one indicator count per category
+  ("<name>=<category>"): a one_hot cause gives one predictor per category,
+  and a one_hot variable one design matrix per category.
+- An AR(1) column holds the variable's own value one bucket earlier.
+
+Missing values are NaN and categories their codes, so the target and the
+predictors export to numpy without copies.
+"""
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import polars as pl
+
+from causal_agent.orchestrator.schemas import GRANULARITY_HOURS, DSEMStructure, Role
+from causal_agent.utils.aggregations import (
+    GRANULARITY_INTERVALS,
+    _aggregation_expr,
+    _truncate_to_granularity,
+    one_hot_dimension,
+)
+from causal_agent.utils.rollup import ROLLUP_AGGREGATIONS, RollupCache, can_roll_up
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Aggregation of already aggregated finer buckets that gives the cause's aggregation exactly,
+# used when there is no rollup (a mean of means or a median of medians would not)
+_REAGGREGATION = {
+    "sum": "sum",
+    "count": "sum",  # Counts add up
+    "one_hot": "sum",  # Per-category indicator counts
+    "min": "min",
+    "max": "max",
+    "first": "first",
+    "last": "last",
+}
+
+
+@dataclass(frozen=True)
+class DesignMatrix:
+    """An endogenous variable and its predictors on the variable's time grid."""
+
+    variable: str
+    granularity: str
+    columns: tuple[str, ...]  # Predictor names, in the order of the predictors array
+    frame: pl.DataFrame  # time_bucket, <variable> (Float64), predictors (Array of Float64)
+    missing_parents: tuple[str, ...] = ()  # Causes without (exactly alignable) measurements
+
+    def to_numpy(self) -> tuple["np.ndarray", "np.ndarray"]:
+        """Target vector (n,) and predictor matrix (n, k) as read-only views of the frame's buffers."""
+        return (
+            self.frame[self.variable].to_numpy(allow_copy=False),
+            self.frame["predictors"].to_numpy(allow_copy=False),
+        )
+
+    def to_frame(self) -> pl.DataFrame:
+        """The design matrix with one column per predictor."""
+        return self.frame.select(
+            "time_bucket",
+            self.variable,
+            *(pl.col("predictors").arr.get(i).alias(name) for i, name in enumerate(self.columns)),
+        )
+
+
+def _lag_name(name: str, lag_hours: int) -> str:
+    return f"{name}_lag{lag_hours}h" if lag_hours else name
+
+
+def _regular_grid(df: pl.DataFrame, granularity: str) -> pl.DataFrame:
+    """One row per time bucket from the first to the last, gaps filled with nulls."""
+    return df.sort("time_bucket").upsample("time_bucket", every=GRANULARITY_INTERVALS[granularity])
+
+
+def _finer_cause(
+    cause: str,
+    aggregation: str,
+    cause_granularity: str,
+    granularity: str,
+    measurements: Mapping[str, pl.DataFrame],
+    rollups: RollupCache | None,
+) -> pl.DataFrame | None:
+    """A finer cause aggregated to `granularity` buckets: (time_bucket, cause).
+
+    Returns:
+        The aggregated series, or None if it cannot be computed exactly
+        (no rollup and an aggregation that does not compose)
+    """
+    if (
+        rollups is not None
+        and aggregation in ROLLUP_AGGREGATIONS
+        and rollups.granularity_of.get(cause) == cause_granularity
+        and can_roll_up(cause_granularity, granularity)
+    ):
+        return rollups.roll_up(cause, aggregation, granularity)
+    if aggregation not in _REAGGREGATION:
+        return None
+    aggregation = _REAGGREGATION[aggregation]
+    return (
+        measurements[cause_granularity]
+        .select("time_bucket", cause)
+        .drop_nulls(cause)
+        .sort("time_bucket")
+        .group_by(_truncate_to_granularity(pl.col("time_bucket"), granularity), maintain_order=True)
+        .agg(_aggregation_expr(aggregation, cause, order_by="time_bucket"))
+    )
+
+
+def align_design_matrices(
+    measurements: Mapping[str, pl.DataFrame],
+    structure: DSEMStructure,
+    rollups: RollupCache | None = None,
+) -> dict[str, DesignMatrix]:
+    """Align each time-varying endogenous variable with its causes at its own timescale.
+
+    Args:
+        measurements: Output of aggregate_worker_measurements or a
+            MeasurementSet (granularity -> DataFrame, plus 'time_invariant')
+        structure: Validated DSEM structure; edges carry lag_hours
+        rollups: The run's partial aggregates, for exact finer -> coarser
+            aggregation of decomposable causes; without them, finer causes
+            whose aggregation does not compose are reported as missing
+
+    Returns:
+        Dict mapping variable name (category indicator name for one_hot
+        variables) -> DesignMatrix. Variables without measurements get no
+        design matrix.
+    """
+    dims = {dim.name: dim for dim in structure.dimensions}
+    grids = {
+        granularity: _regular_grid(df, granularity)
+        for granularity, df in measurements.items()
+        if granularity != "time_invariant" and not df.is_empty()
+    }
+    invariant = measurements.get("time_invariant", pl.DataFrame())
+
+    def measured_columns(name: str) -> list[str]:
+        """Measurement columns of a dimension: one per category if one_hot, else its own."""
+        dim = dims[name]
+        granularity = dim.causal_granularity
+        if granularity is None:
+            return [name] if name in invariant.columns else []
+        if dim.aggregation == "one_hot" and dim.categories:
+            names = [one_hot_dimension(name, category) for category in dim.categories]
+        else:
+            names = [name]
+        return [column for column in names if granularity in grids and column in grids[granularity].columns]
+
+    matrices: dict[str, DesignMatrix] = {}
+    for dim in structure.dimensions:
+        granularity = dim.causal_granularity
+        if dim.role != Role.ENDOGENOUS or granularity is None:
+            continue
+        hours = GRANULARITY_HOURS[granularity]
+        grid = grids.get(granularity)
+        # A one_hot variable gets one design matrix per category indicator
+        for target in measured_columns(dim.name):
+            columns = [pl.col(target).shift(1).alias(_lag_name(target, hours))]  # AR(1)
+            aligned = grid.select("time_bucket", target)
+            missing = []
+
+            for edge in structure.edges:
+                if edge.effect != dim.name or edge.cause == dim.name:
+                    continue
+                cause_columns = measured_columns(edge.cause)
+                if not cause_columns:
+                    missing.append(edge.cause)
+                    continue
+                cause = dims[edge.cause]
+                cause_granularity = cause.causal_granularity
+                if cause_granularity is None:
+                    # Categories become their codes, like every other predictor
+                    value = invariant[edge.cause].to_physical().cast(pl.Float64)[0]
+                    columns.append(pl.lit(value, dtype=pl.Float64).alias(edge.cause))
+                    continue
+
+                cause_hours = GRANULARITY_HOURS[cause_granularity]
+                for cause_column in cause_columns:
+                    name = _lag_name(cause_column, edge.lag_hours)
+                    if cause_hours > hours:
+                        # Coarser: lag in its own buckets, then broadcast over the finer buckets of each period
+                        period = grids[cause_granularity].select(
+                            pl.col("time_bucket").alias("period"),
+                            pl.col(cause_column).shift(edge.lag_hours // cause_hours).alias(name),
+                        )
+                        aligned = aligned.with_columns(
+                            _truncate_to_granularity(pl.col("time_bucket"), cause_granularity).alias("period")
+                        ).join(period, on="period", how="left", maintain_order="left").drop("period")
+                        columns.append(pl.col(name))
+                        continue
+
+                    if cause_hours < hours:
+                        series = _finer_cause(
+                            cause_column, cause.aggregation, cause_granularity, granularity, measurements, rollups
+                        )
+                        if series is None:
+                            missing.append(edge.cause)
+                            break
+                    else:
+                        series = grid.select("time_bucket", cause_column)
+                    aligned = aligned.join(
+                        series.rename({cause_column: f"__{name}"}), on="time_bucket", how="left",
+                        maintain_order="left",
+                    )
+                    columns.append(pl.col(f"__{name}").shift(edge.lag_hours // hours).alias(name))
+
+            frame = aligned.sort("time_bucket").select(
+                "time_bucket",
+                pl.col(target).to_physical().cast(pl.Float64).fill_null(float("nan")),
+                pl.concat_arr(
+                    [column.to_physical().cast(pl.Float64).fill_null(float("nan")) for column in columns]
+                ).alias("predictors"),
+            )
+            matrices[target] = DesignMatrix(
+                variable=target,
+                granularity=granularity,
+                columns=tuple(column.meta.output_name() for column in columns),
+                frame=frame.rechunk(),
+                missing_parents=tuple(missing),
+            )
+    return matrices
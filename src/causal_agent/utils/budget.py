@@ -0,0 +1,224 @@
+"""Run-level deadline and token budget for stage 2 dispatch.
+
+Stage 2 asks a `BudgetedDispatcher` for the next chunk before submitting it.
+While the budget is comfortable chunks go out in file order. Once the
+deadline or token budget is within `reserve_fraction` of running out, the
+dispatcher switches to subsampling: every further chunk is drawn from the
+time stratum (e.g. day) with the lowest share of its chunks dispatched, so
+whatever finishes stays spread over the whole time range rather than covering
+only its beginning. Dispatch stops once the budget cannot afford another
+chunk, and worker calls still running at the deadline cancel themselves
+(see DeadlineExceededError). Aggregation then runs on what finished, and
+per-bucket coverage (see `compute_bucket_coverage` in utils/aggregations.py)
+tells downstream stages how much data backs each estimate.
+"""
+
+import time
+from collections import deque
+from typing import Callable
+
+from causal_agent.utils.enrichment import parse_line_timestamp
+
+# strftime formats mapping a line timestamp to its stratum
+STRATUM_FORMATS = {
+    "hourly": "%Y-%m-%d %H",
+    "daily": "%Y-%m-%d",
+    "weekly": "%G-W%V",
+    "monthly": "%Y-%m",
+    "yearly": "%Y",
+}
+
+
+class DeadlineExceededError(Exception):
+    """A worker call was cancelled because the run deadline passed.
+
+    Not a TimeoutError: the chunk did not take too long, the run ran out of
+    time, so it is neither split nor dead-lettered.
+    """
+
+
+def chunk_stratum(chunk: str, stratify_by: str = "daily") -> str | None:
+    """Time stratum of a chunk, from its first timestamped line.
+
+    Args:
+        chunk: Chunk text (newline-separated preprocessed lines)
+        stratify_by: One of 'hourly', 'daily', 'weekly', 'monthly', 'yearly'
+
+    Returns:
+        Stratum key (e.g. "2024-03-15"), or None if no line has a timestamp
+    """
+    if stratify_by not in STRATUM_FORMATS:
+        raise ValueError(f"Unknown stratum '{stratify_by}'. Must be one of: {list(STRATUM_FORMATS)}")
+    for line in chunk.split("\n"):
+        ts = parse_line_timestamp(line)
+        if ts is not None:
+            return ts.strftime(STRATUM_FORMATS[stratify_by])
+    return None
+
+
+class RunBudget:
+    """Wall-clock deadline and worker token budget for one pipeline run."""
+
+    def __init__(
+        self,
+        deadline_seconds: float | None = None,
+        max_tokens: int | None = None,
+        reserve_fraction: float = 0.2,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            deadline_seconds: Wall-clock budget from construction (None = unlimited)
+            max_tokens: Worker token budget (None = unlimited)
+            reserve_fraction: Fraction of either budget left at which subsampling starts
+            clock: Monotonic clock in seconds (injectable for tests)
+        """
+        self.deadline_seconds = deadline_seconds
+        self.max_tokens = max_tokens
+        self.reserve_fraction = reserve_fraction
+        self._clock = clock
+        self._started_at = clock()
+        self.tokens_used = 0  # Finished and failed chunks
+        self.tokens_done = 0  # Finished chunks only, for the mean tokens per chunk
+        self.chunks_done = 0
+        self.chunks_failed = 0
+
+    @classmethod
+    def from_config(cls) -> "RunBudget":
+        """Budget from the `budget` block of config.yaml, starting now."""
+        from causal_agent.utils.config import get_config
+
+        budget_config = get_config().budget
+        deadline = budget_config.deadline_minutes
+        return cls(
+            deadline_seconds=deadline * 60 if deadline is not None else None,
+            max_tokens=budget_config.max_tokens,
+            reserve_fraction=budget_config.reserve_fraction,
+        )
+
+    @property
+    def limited(self) -> bool:
+        return self.deadline_seconds is not None or self.max_tokens is not None
+
+    def record(self, tokens: int) -> None:
+        """Record a finished chunk and the tokens it used."""
+        self.tokens_used += tokens
+        self.tokens_done += tokens
+        self.chunks_done += 1
+
+    def record_failure(self, tokens: int | None = None) -> None:
+        """Record a failed chunk and the tokens it used.
+
+        Failed calls spend tokens too, so they are charged to the budget:
+        their usage if known, else the mean tokens per finished chunk. They
+        are not counted as done, so they do not change that mean.
+
+        Args:
+            tokens: Tokens the chunk used over all its attempts (None = unknown)
+        """
+        self.tokens_used += tokens if tokens is not None else round(self.tokens_per_chunk())
+        self.chunks_failed += 1
+
+    def tokens_per_chunk(self) -> float:
+        """Mean tokens per finished chunk (0 before any chunk finished)."""
+        return self.tokens_done / self.chunks_done if self.chunks_done else 0.0
+
+    def seconds_left(self) -> float | None:
+        """Seconds until the deadline (never negative), or None if unlimited."""
+        if self.deadline_seconds is None:
+            return None
+        return max(0.0, self.deadline_seconds - (self._clock() - self._started_at))
+
+    def deadline_at(self) -> float | None:
+        """Wall-clock time (time.time()) of the deadline, or None if unlimited.
+
+        Passed to worker calls so they cancel themselves at the deadline.
+        """
+        seconds_left = self.seconds_left()
+        return time.time() + seconds_left if seconds_left is not None else None
+
+    def remaining_fraction(self) -> float:
+        """Smallest remaining fraction of the time and token budgets (1.0 if unlimited)."""
+        fractions = [1.0]
+        if self.deadline_seconds is not None:
+            fractions.append(self.seconds_left() / self.deadline_seconds if self.deadline_seconds else 0.0)
+        if self.max_tokens is not None:
+            fractions.append(max(0.0, 1 - self.tokens_used / self.max_tokens) if self.max_tokens else 0.0)
+        return min(fractions)
+
+    def near_limit(self) -> bool:
+        return self.remaining_fraction() <= self.reserve_fraction
+
+    def can_dispatch(self, in_flight: int) -> bool:
+        """Whether one more chunk fits, given the chunks already in flight.
+
+        In-flight chunks are charged at the mean tokens per finished chunk so
+        a wide fan-out cannot overshoot the token budget.
+        """
+        if self.remaining_fraction() <= 0:
+            return False
+        if self.max_tokens is None or self.chunks_done == 0:
+            return True
+        return self.tokens_used + self.tokens_per_chunk() * (in_flight + 1) <= self.max_tokens
+
+
+class BudgetedDispatcher:
+    """Chooses which chunk stage 2 dispatches next under a RunBudget."""
+
+    def __init__(self, strata: list[str | None], budget: RunBudget):
+        """
+        Args:
+            strata: Time stratum of each chunk (see chunk_stratum), in file order
+            budget: Budget consulted before every dispatch
+        """
+        self.budget = budget
+        self.subsampling = False
+        self._strata = list(strata)
+        self._in_order: deque[int] = deque(range(len(strata)))
+        self._by_stratum: dict[str | None, deque[int]] = {}
+        for index, stratum in enumerate(strata):
+            self._by_stratum.setdefault(stratum, deque()).append(index)
+        self._totals = {stratum: len(indices) for stratum, indices in self._by_stratum.items()}
+        self._dispatched: set[int] = set()
+
+    def has_pending(self) -> bool:
+        return bool(self._in_order)
+
+    def next_index(self, in_flight: int = 0) -> int | None:
+        """Index of the next chunk to dispatch, or None if the budget is spent.
+
+        Args:
+            in_flight: Chunks dispatched but not yet finished
+        """
+        if not self._in_order or not self.budget.can_dispatch(in_flight):
+            return None
+        if not self.subsampling and self.budget.near_limit():
+            self.subsampling = True
+            print(
+                f"Budget near limit after {len(self._dispatched)} chunks; "
+                "subsampling remaining chunks across time"
+            )
+
+        if self.subsampling:
+            index = self._pop_least_covered()
+            self._in_order.remove(index)
+        else:
+            index = self._in_order.popleft()
+            self._by_stratum[self._strata[index]].remove(index)
+        self._dispatched.add(index)
+        return index
+
+    def skipped(self) -> list[int]:
+        """Indices of chunks never dispatched."""
+        return sorted(self._in_order)
+
+    def _pop_least_covered(self) -> int:
+        """Pop the next chunk of the stratum with the lowest dispatched share."""
+
+        def dispatched_share(stratum: str | None) -> float:
+            pending = len(self._by_stratum[stratum])
+            return 1 - pending / self._totals[stratum]
+
+        candidates = [stratum for stratum, pending in self._by_stratum.items() if pending]
+        stratum = min(candidates, key=dispatched_share)
+        return self._by_stratum[stratum].popleft()
@@ -1,6 +1,6 @@
 """Configuration loader for the causal agent pipeline."""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from functools import lru_cache
 from pathlib import Path
 
@@ -14,6 +14,42 @@ class Stage1Config:
     model: str
     sample_chunks: int
     chunk_size: int
+    sampling: str = "question"  # Chunks shown: first, question (BM25 + coverage) or diverse (MinHash + LSH)
+    relevant_fraction: float = 0.5  # Share of a question sample picked by relevance
+    n_proposals: int = 1  # Concurrent first-turn proposals; the best one is self-reviewed
+    proposal_models: list[str] = field(default_factory=list)  # Other models the proposals rotate over
+    accept_score: float = 0.9  # Normalized score at which a proposal wins and the rest are cancelled
+
+
+@dataclass(frozen=True)
+class HedgingConfig:
+    """Stage 2 request hedging for tail latency."""
+
+    enabled: bool = False
+    percentile: float = 90.0  # Hedge calls slower than this live latency percentile
+    budget_fraction: float = 0.05  # Max hedged calls as a fraction of total calls
+    min_samples: int = 20  # Completed calls before hedging starts
+    fallback_model: str | None = None  # Model for the duplicate request (default: same model)
+
+
+@dataclass(frozen=True)
+class StreamingConfig:
+    """Stage 2 streaming of worker extractions into a live partial aggregation."""
+
+    enabled: bool = False
+    queue_size: int = 10000  # Bounded queue of streamed extractions (workers wait when full)
+    flush_seconds: float = 10.0  # How often partial time series are re-aggregated and written
+
+
+@dataclass(frozen=True)
+class BatchConfig:
+    """Stage 2 batch-API mode: all chunks submitted as provider batches (see workers/batch.py)."""
+
+    enabled: bool = False
+    executor: str = "local"  # local (in-process through Inspect models) or openai (/v1/batches)
+    poll_seconds: float = 60.0  # Interval between batch status checks
+    max_rounds: int = 2  # Batches per run; later rounds resend failed requests with their errors
+    timeout_hours: float = 24.0  # Stop waiting on a batch after this long
 
 
 @dataclass(frozen=True)
@@ -22,6 +58,18 @@ class Stage2Config:
 
     model: str
     chunk_size: int
+    enrich_chunks: bool = True  # Annotate chunks with weekday/date and per-hour counts
+    helper_tools: bool = False  # Offer parse_date/calculate tools to workers
+    timeout_seconds: int | None = None  # Per-chunk task timeout
+    adaptive_chunking: bool = False  # Split failing chunks, merge empty runs
+    min_chunk_size: int = 5  # Lines; failing chunks are not split below this
+    max_chunk_size: int = 160  # Lines; empty runs are not merged beyond this
+    max_in_flight: int = 64  # Concurrent chunk tasks in adaptive mode
+    extraction_shards: bool = False  # Persist extractions as Parquet shards, aggregate out of core
+    online_aggregation: bool = False  # Fold results into mergeable per-bucket states as they finish
+    hedging: HedgingConfig = field(default_factory=HedgingConfig)
+    streaming: StreamingConfig = field(default_factory=StreamingConfig)
+    batch: BatchConfig = field(default_factory=BatchConfig)
 
 
 @dataclass(frozen=True)
@@ -31,6 +79,94 @@ class Stage4Config:
     model: str
 
 
+@dataclass(frozen=True)
+class BudgetConfig:
+    """Run-level deadline and token budget (enforced by stage 2 dispatch)."""
+
+    deadline_minutes: float | None = None  # Wall-clock budget from pipeline start (None = unlimited)
+    max_tokens: int | None = None  # Worker token budget (None = unlimited)
+    reserve_fraction: float = 0.2  # Switch to stratified subsampling when this much budget remains
+    stratify_by: str = "daily"  # Time strata for subsampling: hourly, daily, weekly, monthly, yearly
+
+
+@dataclass(frozen=True)
+class MockModelConfig:
+    """Offline `causal-mock` model provider (utils/mock_model.py)."""
+
+    latency_median: float = 0.0  # Seconds per call; log-normally distributed around this
+    latency_sigma: float = 0.5  # Log-normal shape (spread of the latency tail)
+    tool_calls: int = 1  # Validation tool calls before each final answer
+    extraction_rate: float = 0.3  # Chance of an extraction per dimension per data line
+    rate_limit_rate: float = 0.0  # Fraction of calls failing with an injected 429
+    retry_after_seconds: float = 1.0  # Retry-After of injected 429s
+    timeout_rate: float = 0.0  # Fraction of calls hanging until an injected timeout
+    timeout_seconds: float = 30.0  # How long injected timeouts hang
+    max_connections: int = 100  # Concurrent calls allowed by Inspect
+    structure_path: str = "data/eval/example_dag2.json"  # Structure returned to stage 1 (from project root)
+    replay_path: str | None = None  # JSONL of recorded completions to replay (from project root)
+    record_path: str | None = None  # JSONL that live conversations' final completions are appended to
+    seed: int = 0
+
+
+@dataclass(frozen=True)
+class GenerationProfile:
+    """Named generation settings for one kind of model call (see get_generate_config)."""
+
+    max_tokens: int | None = 65536
+    reasoning_effort: str | None = "high"  # minimal, low, medium, high (None = provider default)
+    reasoning_tokens: int | None = 32768  # Reasoning budget (None = provider default)
+    reasoning_history: str | None = "all"  # Reasoning re-sent across turns: none, last, all, auto
+    latency_budget_seconds: float | None = None  # Per-call deadline, retries included (None = unlimited)
+
+
+@dataclass(frozen=True)
+class CompactionPolicy:
+    """How tool-loop history is compacted before each model call."""
+
+    enabled: bool = True  # Re-send only the latest tool-call draft and its results
+    reasoning_history: str = "none"  # Reasoning re-sent with it: none, last, all, auto
+
+
+@dataclass(frozen=True)
+class CompactionConfig:
+    """Per-provider history compaction for multi_turn_generate tool loops."""
+
+    default: CompactionPolicy = field(default_factory=CompactionPolicy)
+    providers: dict[str, CompactionPolicy] = field(default_factory=dict)  # Model-name prefix -> policy
+
+    def policy_for(self, model_name: str) -> CompactionPolicy:
+        """Policy of the longest provider prefix matching a model name (e.g. "openrouter/google/")."""
+        matches = [prefix for prefix in self.providers if model_name.startswith(prefix)]
+        return self.providers[max(matches, key=len)] if matches else self.default
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Request and token limits of one provider/model (None = unlimited)."""
+
+    requests_per_minute: float | None = None
+    tokens_per_minute: float | None = None  # Input + output tokens
+
+
+@dataclass(frozen=True)
+class RateLimitConfig:
+    """Process-wide rate limiting, circuit breaking and retries of model calls."""
+
+    enabled: bool = True
+    default: RateLimit = field(default_factory=RateLimit)
+    providers: dict[str, RateLimit] = field(default_factory=dict)  # Model-name prefix -> limits
+    max_retries: int = 6  # Retries of transient errors per call (GenerateConfig.max_retries overrides)
+    backoff_base_seconds: float = 2.0  # First retry waits up to this; doubles per retry
+    backoff_max_seconds: float = 120.0  # Cap on the backoff (a longer Retry-After is still honored)
+    breaker_failures: int = 5  # Consecutive transient failures that open the circuit
+    breaker_reset_seconds: float = 60.0  # Open circuit fails fast this long, then lets one probe through
+
+    def limits_for(self, model_name: str) -> RateLimit:
+        """Limits of the longest provider prefix matching a model name (e.g. "openrouter/google/")."""
+        matches = [prefix for prefix in self.providers if model_name.startswith(prefix)]
+        return self.providers[max(matches, key=len)] if matches else self.default
+
+
 @dataclass(frozen=True)
 class PipelineConfig:
     """Full pipeline configuration."""
@@ -38,6 +174,11 @@ class PipelineConfig:
     stage1_structure_proposal: Stage1Config
     stage2_workers: Stage2Config
     stage4_prior_elicitation: Stage4Config
+    budget: BudgetConfig = field(default_factory=BudgetConfig)
+    mock_model: MockModelConfig = field(default_factory=MockModelConfig)
+    compaction: CompactionConfig = field(default_factory=CompactionConfig)
+    generation_profiles: dict[str, GenerationProfile] = field(default_factory=dict)
+    rate_limits: RateLimitConfig = field(default_factory=RateLimitConfig)
 
 
 def _find_config_path() -> Path:
@@ -61,10 +202,44 @@ def load_config() -> PipelineConfig:
     with open(config_path) as f:
         raw = yaml.safe_load(f)
 
+    stage2_raw = dict(raw["stage2_workers"])
+    stage2_raw["hedging"] = HedgingConfig(**stage2_raw.get("hedging", {}))
+    stage2_raw["streaming"] = StreamingConfig(**stage2_raw.get("streaming", {}))
+    stage2_raw["batch"] = BatchConfig(**stage2_raw.get("batch", {}))
+
+    compaction_raw = raw.get("compaction") or {}
+    compaction = CompactionConfig(
+        default=CompactionPolicy(**(compaction_raw.get("default") or {})),
+        providers={
+            prefix: CompactionPolicy(**(policy or {}))
+            for prefix, policy in (compaction_raw.get("providers") or {}).items()
+        },
+    )
+
+    rate_limits_raw = dict(raw.get("rate_limits") or {})
+    rate_limits = RateLimitConfig(
+        **{
+            **rate_limits_raw,
+            "default": RateLimit(**(rate_limits_raw.get("default") or {})),
+            "providers": {
+                prefix: RateLimit(**(limits or {}))
+                for prefix, limits in (rate_limits_raw.get("providers") or {}).items()
+            },
+        }
+    )
+
     return PipelineConfig(
         stage1_structure_proposal=Stage1Config(**raw["stage1_structure_proposal"]),
-        stage2_workers=Stage2Config(**raw["stage2_workers"]),
+        stage2_workers=Stage2Config(**stage2_raw),
         stage4_prior_elicitation=Stage4Config(**raw["stage4_prior_elicitation"]),
+        budget=BudgetConfig(**(raw.get("budget") or {})),
+        mock_model=MockModelConfig(**(raw.get("mock_model") or {})),
+        compaction=compaction,
+        generation_profiles={
+            name: GenerationProfile(**(profile or {}))
+            for name, profile in (raw.get("generation_profiles") or {}).items()
+        },
+        rate_limits=rate_limits,
     )
 
 
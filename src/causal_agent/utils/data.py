@@ -35,6 +35,9 @@ def get_sample_chunks() -> int:
 CHUNK_SIZE = get_orchestrator_chunk_size()  # Used by existing code (stage 1)
 SAMPLE_CHUNKS = get_sample_chunks()
 
+# How sample_chunks picks chunks
+SAMPLE_METHODS = ("spaced", "diverse")
+
 
 def load_lines(path: Path) -> list[str]:
     """Load individual lines from a preprocessed file."""
@@ -71,22 +74,39 @@ def sample_chunks(
     n: int,
     seed: int | None = None,
     chunk_size: int | None = None,
+    method: str = "spaced",
 ) -> list[str]:
-    """Sample n chunks evenly spaced across the input file with jitter.
+    """Sample n chunks from the input file.
+
+    - spaced: evenly spaced across the file, with jitter
+    - diverse: one chunk per group of near-duplicate chunks, largest groups
+      first (see utils/diversity.py); deterministic, so seed is ignored
 
     Args:
         input_file: Path to preprocessed file
         n: Number of chunks to sample
         seed: Random seed for reproducibility
         chunk_size: Lines per chunk (default: from config)
+        method: Sampling method (one of SAMPLE_METHODS)
 
     Returns:
-        List of sampled chunks
+        List of sampled chunks, in file order
+
+    Raises:
+        ValueError: If the method is unknown
     """
     import random
 
+    if method not in SAMPLE_METHODS:
+        raise ValueError(f"Unknown sample method '{method}'. Available: {', '.join(SAMPLE_METHODS)}")
+
     chunks = load_text_chunks(input_file, chunk_size=chunk_size)
 
+    if method == "diverse":
+        from causal_agent.utils.diversity import diverse_sample
+
+        return [chunks[i] for i in diverse_sample(chunks, n)]
+
     if seed is not None:
         random.seed(seed)
 
@@ -0,0 +1,157 @@
+"""Near-duplicate-aware diverse sampling of chunks (MinHash + LSH).
+
+Search histories repeat the same queries, sites and routines every day, so
+chunks spaced evenly over a file are often nearly identical. diverse_sample
+groups near-duplicate chunks and shows one representative per group:
+
+1. Each chunk's shingles are its lines without the leading timestamp, so
+   the same routine on different days gives the same shingles.
+2. minhash_signatures computes N_HASHES MinHash values per chunk in one
+   Polars pass (one seeded hash per value, minimum per chunk).
+3. lsh_clusters splits the signatures into N_BANDS bands. Chunks sharing a
+   band are candidate near-duplicates; a candidate joins a cluster when its
+   estimated Jaccard similarity reaches the threshold.
+4. diverse_sample picks the representatives of the largest clusters first,
+   so each pick stands for as many chunks as possible.
+
+Signatures use Polars' hash, which is not stable across Polars versions;
+they are not persisted.
+"""
+
+import polars as pl
+
+from causal_agent.utils.search_index import coverage_sample
+
+N_HASHES = 64
+N_BANDS = 16  # 4 rows per band: chunks with Jaccard ~0.5 collide in some band about half the time
+SIMILARITY_THRESHOLD = 0.5  # Estimated Jaccard similarity of near-duplicate chunks
+
+# Leading "[YYYY-MM-DD HH:MM...]" of a processed line
+LINE_TIMESTAMP = r"^\[\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}[^\]]*\]\s*"
+
+
+def minhash_signatures(chunks: list[str], n_hashes: int = N_HASHES) -> pl.DataFrame:
+    """MinHash signature of each chunk's set of lines (timestamps stripped).
+
+    Returns:
+        DataFrame with a chunk column (UInt32) and one UInt64 column per hash
+        (h0, h1, ...); chunks without any line are left out
+    """
+    shingles = (
+        pl.DataFrame({"text": chunks}, schema={"text": pl.String})
+        .with_row_index("chunk")
+        .select("chunk", pl.col("text").str.split("\n").alias("shingle"))
+        .explode("shingle")
+        .with_columns(pl.col("shingle").str.replace(LINE_TIMESTAMP, "").str.strip_chars().str.to_lowercase())
+        .filter(pl.col("shingle") != "")
+        .select("chunk", pl.col("shingle").hash().alias("hash"))
+    )
+    return (
+        shingles.group_by("chunk")
+        .agg(pl.col("hash").hash(seed).min().alias(f"h{seed}") for seed in range(n_hashes))
+        .sort("chunk")
+    )
+
+
+def _similar_pairs(signatures: pl.DataFrame, n_bands: int, threshold: float) -> list[tuple[int, int]]:
+    """Pairs (chunk, bucket head) sharing an LSH band, with estimated similarity >= threshold."""
+    hashes = [column for column in signatures.columns if column != "chunk"]
+    rows = len(hashes) // n_bands
+    bands = pl.concat(
+        signatures.select(
+            "chunk",
+            pl.lit(band, dtype=pl.UInt32).alias("band"),
+            pl.struct(hashes[band * rows : (band + 1) * rows]).hash().alias("bucket"),
+        )
+        for band in range(n_bands)
+    )
+    # Link each chunk to the first chunk of its bucket rather than to every other member
+    candidates = (
+        bands.with_columns(pl.col("chunk").min().over("band", "bucket").alias("head"))
+        .filter(pl.col("chunk") != pl.col("head"))
+        .select("chunk", "head")
+        .unique()
+    )
+    head_signatures = signatures.rename({"chunk": "head", **{column: f"{column}_head" for column in hashes}})
+    return (
+        candidates.join(signatures, on="chunk")
+        .join(head_signatures, on="head")
+        .filter(
+            pl.sum_horizontal(pl.col(column) == pl.col(f"{column}_head") for column in hashes) / len(hashes)
+            >= threshold
+        )
+        .select("chunk", "head")
+        .rows()
+    )
+
+
+def lsh_clusters(
+    chunks: list[str],
+    n_hashes: int = N_HASHES,
+    n_bands: int = N_BANDS,
+    threshold: float = SIMILARITY_THRESHOLD,
+) -> list[list[int]]:
+    """Group near-duplicate chunks.
+
+    Args:
+        chunks: Text chunks (lines joined by newlines)
+        n_hashes: MinHash values per chunk; must be a multiple of n_bands
+        n_bands: LSH bands; more bands find less similar candidates
+        threshold: Estimated Jaccard similarity at which candidates are merged
+
+    Returns:
+        Clusters of chunk indices (each in file order), covering every chunk
+
+    Raises:
+        ValueError: If n_hashes is not a multiple of n_bands
+    """
+    if n_bands <= 0 or n_hashes % n_bands:
+        raise ValueError(f"n_hashes ({n_hashes}) must be a multiple of n_bands ({n_bands})")
+    parent = list(range(len(chunks)))
+
+    def find(chunk: int) -> int:
+        while parent[chunk] != chunk:
+            parent[chunk] = parent[parent[chunk]]
+            chunk = parent[chunk]
+        return chunk
+
+    signatures = minhash_signatures(chunks, n_hashes)
+    if len(signatures) > 1:
+        for chunk, head in _similar_pairs(signatures, n_bands, threshold):
+            parent[find(chunk)] = find(head)
+
+    clusters: dict[int, list[int]] = {}
+    for chunk in range(len(chunks)):
+        clusters.setdefault(find(chunk), []).append(chunk)
+    return list(clusters.values())
+
+
+def diverse_sample(chunks: list[str], n: int, threshold: float = SIMILARITY_THRESHOLD) -> list[int]:
+    """Indices of n chunks covering as many near-duplicate clusters as possible.
+
+    Each cluster is represented by its middle member in file order. The
+    largest clusters are picked first; among clusters of the size at the
+    cutoff, the picks are spread evenly over time. If n exceeds the number
+    of clusters, the rest of the sample is spread evenly over the other chunks.
+
+    Args:
+        chunks: Text chunks (lines joined by newlines)
+        n: Number of chunks to pick
+        threshold: Estimated Jaccard similarity of near-duplicate chunks
+
+    Returns:
+        Chunk indices in file order
+    """
+    n = min(n, len(chunks))
+    if n <= 0:
+        return []
+    clusters = sorted(lsh_clusters(chunks, threshold=threshold), key=lambda cluster: (-len(cluster), cluster[0]))
+    representatives = [cluster[len(cluster) // 2] for cluster in clusters]
+    if n >= len(clusters):
+        return sorted(representatives + coverage_sample(len(chunks), n - len(clusters), exclude=set(representatives)))
+
+    cutoff = len(clusters[n - 1])
+    picked = [rep for rep, cluster in zip(representatives, clusters) if len(cluster) > cutoff]
+    tied = sorted(rep for rep, cluster in zip(representatives, clusters) if len(cluster) == cutoff)
+    picked += [tied[i] for i in coverage_sample(len(tied), n - len(picked))]
+    return sorted(picked)
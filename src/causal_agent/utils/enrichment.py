@@ -0,0 +1,86 @@
+"""Local chunk enrichment for worker prompts.
+
+Annotates data chunks with context that workers would otherwise have to
+compute through tool calls (`parse_date`, `calculate`): the weekday of each
+day in the chunk and per-hour line counts. Each annotation saves the model
+a full generate-loop turn.
+"""
+
+import re
+from collections import Counter
+from datetime import datetime
+
+# Preprocessed lines start with "[YYYY-MM-DD HH:MM]" (see preprocess_google_takeout.py)
+LINE_TIMESTAMP_PATTERN = re.compile(r"^\[(\d{4}-\d{2}-\d{2})[ T](\d{2}):(\d{2})")
+
+# Prefix marking annotation lines so workers can tell them apart from data
+ANNOTATION_PREFIX = "###"
+
+
+def parse_line_timestamp(line: str) -> datetime | None:
+    """Parse the leading timestamp of a preprocessed line.
+
+    Args:
+        line: A single line, e.g. "[2024-03-15 10:30] [Search] sleep tips"
+
+    Returns:
+        Parsed datetime, or None if the line has no recognizable timestamp
+    """
+    match = LINE_TIMESTAMP_PATTERN.match(line)
+    if not match:
+        return None
+    date_str, hour, minute = match.groups()
+    try:
+        return datetime.strptime(f"{date_str} {hour}:{minute}", "%Y-%m-%d %H:%M")
+    except ValueError:
+        return None
+
+
+def _format_day_header(day: datetime, hours: Counter) -> str:
+    """Format the annotation line for one day of a chunk."""
+    n_lines = sum(hours.values())
+    hour_counts = " ".join(f"{h:02d}h:{n}" for h, n in sorted(hours.items()))
+    return (
+        f"{ANNOTATION_PREFIX} {day.strftime('%A, %B %d, %Y')} ({day.strftime('%Y-%m-%d')}) "
+        f"| {n_lines} lines | per hour: {hour_counts}"
+    )
+
+
+def enrich_chunk(chunk: str) -> str:
+    """Annotate a chunk with weekday/date headers and per-hour line counts.
+
+    A header is inserted before each run of lines belonging to the same day.
+    Lines without a timestamp are kept under the current day. Chunks without
+    any timestamps are returned unchanged.
+
+    Args:
+        chunk: Newline-joined preprocessed lines
+
+    Returns:
+        The chunk with annotation lines (prefixed with ANNOTATION_PREFIX) inserted
+    """
+    lines = chunk.split("\n")
+    timestamps = [parse_line_timestamp(line) for line in lines]
+    if not any(timestamps):
+        return chunk
+
+    # Group consecutive lines into day runs: (day, hour counts, lines)
+    runs: list[tuple[datetime | None, Counter, list[str]]] = []
+    for line, ts in zip(lines, timestamps):
+        day = ts.replace(hour=0, minute=0) if ts else None
+        if not runs or (day is not None and runs[-1][0] not in (None, day)):
+            runs.append((day, Counter(), []))
+        current_day, hours, run_lines = runs[-1]
+        if current_day is None and day is not None:
+            # Leading untimestamped lines adopt the first day seen
+            runs[-1] = (day, hours, run_lines)
+        if ts is not None:
+            hours[ts.hour] += 1
+        run_lines.append(line)
+
+    parts = []
+    for day, hours, run_lines in runs:
+        if day is not None:
+            parts.append(_format_day_header(day, hours))
+        parts.extend(run_lines)
+    return "\n".join(parts)
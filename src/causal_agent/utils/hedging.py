@@ -0,0 +1,155 @@
+"""Request hedging to cut tail latency of worker calls.
+
+When a call runs longer than a latency percentile measured live in this
+process, a duplicate request is issued (optionally to a fallback model) and
+whichever finishes first wins; the loser is cancelled. Hedges are capped at a
+fraction of total calls so stragglers cannot double the spend.
+
+Prefect runs mapped tasks in worker threads, each with its own event loop, so
+the shared state here is guarded with a threading lock rather than asyncio
+primitives.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class HedgePolicy:
+    """Live latency statistics and hedge budget shared by all calls in a process."""
+
+    def __init__(
+        self,
+        percentile: float = 90.0,
+        budget_fraction: float = 0.05,
+        min_samples: int = 20,
+        window: int = 1000,
+    ):
+        """
+        Args:
+            percentile: Latency percentile (0-100) after which a call is hedged
+            budget_fraction: Maximum hedges as a fraction of total calls
+            min_samples: Completed calls needed before hedging starts
+            window: Number of recent latencies kept for the percentile
+        """
+        self.percentile = percentile
+        self.budget_fraction = budget_fraction
+        self.min_samples = min_samples
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def record_latency(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def hedge_delay(self) -> float | None:
+        """Latency threshold after which to hedge, or None if too few samples."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        idx = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return ordered[idx]
+
+    def start_call(self) -> None:
+        with self._lock:
+            self.calls += 1
+
+    def try_acquire_hedge(self) -> bool:
+        """Reserve a hedge if the budget allows."""
+        with self._lock:
+            if self.hedges + 1 > self.budget_fraction * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+    def record_hedge_win(self) -> None:
+        with self._lock:
+            self.hedge_wins += 1
+
+
+async def hedged_call(
+    primary: Callable[[], Awaitable[T]],
+    hedge: Callable[[], Awaitable[T]],
+    policy: HedgePolicy,
+) -> T:
+    """Run primary(), hedging with hedge() if it exceeds the policy's latency threshold.
+
+    Args:
+        primary: Factory for the primary request
+        hedge: Factory for the duplicate request (e.g. to a fallback model)
+        policy: Shared latency statistics and hedge budget
+
+    Returns:
+        Result of whichever request succeeds first
+
+    Raises:
+        The primary's exception if every started request fails
+    """
+    policy.start_call()
+    start = time.monotonic()
+    primary_task = asyncio.ensure_future(primary())
+
+    delay = policy.hedge_delay()
+    if delay is not None:
+        done, _ = await asyncio.wait({primary_task}, timeout=max(0.0, delay - (time.monotonic() - start)))
+        if not done and policy.try_acquire_hedge():
+            hedge_task = asyncio.ensure_future(hedge())
+            return await _first_success(primary_task, hedge_task, policy, start)
+
+    result = await primary_task
+    policy.record_latency(time.monotonic() - start)
+    return result
+
+
+async def _first_success(
+    primary_task: asyncio.Future,
+    hedge_task: asyncio.Future,
+    policy: HedgePolicy,
+    start: float,
+):
+    """Return the first successful result of two racing requests, cancelling the loser."""
+    pending = {primary_task, hedge_task}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    policy.record_latency(time.monotonic() - start)
+                    if task is hedge_task:
+                        policy.record_hedge_win()
+                    return task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+    # Both failed: surface the primary's error
+    raise primary_task.exception()
+
+
+_policies: dict[tuple, HedgePolicy] = {}
+_policies_lock = threading.Lock()
+
+
+def get_hedge_policy(
+    key: str,
+    percentile: float,
+    budget_fraction: float,
+    min_samples: int,
+) -> HedgePolicy:
+    """Get the process-wide policy for a call site, creating it on first use."""
+    policy_key = (key, percentile, budget_fraction, min_samples)
+    with _policies_lock:
+        if policy_key not in _policies:
+            _policies[policy_key] = HedgePolicy(
+                percentile=percentile,
+                budget_fraction=budget_fraction,
+                min_samples=min_samples,
+            )
+        return _policies[policy_key]
@@ -0,0 +1,193 @@
+"""Single-pass JSON extraction from model completions.
+
+Scans a completion once with a brace-matching parser (string- and
+escape-aware), so prose, code fences and example snippets around the JSON
+object cost no extra `json.loads` attempts. Candidate objects that fail to
+parse get local repairs for common model defects:
+
+- trailing commas before `}` or `]`
+- stray code-fence lines inside the object
+- Python literals `None`, `True`, `False` outside strings
+
+A completion cut off mid-object (e.g. by max_tokens) can be salvaged: with
+`salvage_key="extractions"`, every complete element of the `extractions`
+array is kept and the open containers are closed.
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any
+
+_FENCE_LINE = re.compile(r"^[ \t]*```[\w-]*[ \t]*$\n?", re.MULTILINE)
+_PYTHON_LITERALS = {"None": "null", "True": "true", "False": "false"}
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+@dataclass
+class JsonExtraction:
+    """A JSON object found in a completion."""
+
+    data: Any
+    repairs: list[str] = field(default_factory=list)  # Repairs applied, e.g. ["trailing_comma"]
+    salvaged: bool = False  # Recovered from a cut-off object (see salvage_key)
+
+
+def _repair(candidate: str) -> tuple[str, list[str]]:
+    """Apply local repairs outside string literals."""
+    repairs = []
+    unfenced = _FENCE_LINE.sub("", candidate)
+    if unfenced != candidate:
+        repairs.append("stray_fence")
+
+    out: list[str] = []
+    in_string = escape = False
+    i, n = 0, len(unfenced)
+    while i < n:
+        ch = unfenced[i]
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            i += 1
+            continue
+        if ch == '"':
+            in_string = True
+            out.append(ch)
+            i += 1
+        elif ch == ",":
+            j = i + 1
+            while j < n and unfenced[j] in " \t\r\n":
+                j += 1
+            if j < n and unfenced[j] in "}]":
+                repairs.append("trailing_comma")
+            else:
+                out.append(ch)
+            i += 1
+        elif ch.isalpha():
+            j = i
+            while j < n and (unfenced[j].isalnum() or unfenced[j] == "_"):
+                j += 1
+            word = unfenced[i:j]
+            if word in _PYTHON_LITERALS:
+                repairs.append("python_literal")
+                word = _PYTHON_LITERALS[word]
+            out.append(word)
+            i = j
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out), sorted(set(repairs))
+
+
+def loads_repaired(candidate: str) -> JsonExtraction | None:
+    """Parse a candidate, repairing it if plain parsing fails."""
+    try:
+        return JsonExtraction(json.loads(candidate))
+    except json.JSONDecodeError:
+        pass
+    repaired, repairs = _repair(candidate)
+    try:
+        return JsonExtraction(json.loads(repaired), repairs=repairs)
+    except json.JSONDecodeError:
+        return None
+
+
+def extract_json(text: str, salvage_key: str | None = None) -> JsonExtraction | None:
+    """Find the first JSON object in a completion.
+
+    Args:
+        text: Model completion (may contain prose and code fences)
+        salvage_key: If set and the text ends inside an unterminated object,
+            keep the complete elements of the array under this key (at any
+            depth) and close the object. Nothing is salvaged if the text
+            ends before the first element is complete.
+
+    Returns:
+        JsonExtraction, or None if no (repairable) JSON object is found
+    """
+    n = len(text)
+    start = text.find("{")
+    while start != -1:
+        stack: list[str] = []  # Open brackets
+        salvage_depth: int | None = None  # Depth of the salvage array while inside it
+        boundary: tuple[int, str] | None = None  # (cut position, closers) after the last complete element
+        last_string: str | None = None
+        pending_key: str | None = None
+        in_string = escape = False
+        string_start = 0
+        end = None
+        truncated = False
+
+        for i in range(start, n):
+            ch = text[i]
+            if in_string:
+                if escape:
+                    escape = False
+                elif ch == "\\":
+                    escape = True
+                elif ch == '"':
+                    in_string = False
+                    last_string = text[string_start + 1:i]
+                continue
+            if ch == '"':
+                in_string = True
+                string_start = i
+            elif ch == ":":
+                pending_key = last_string
+            elif ch in "{[":
+                is_salvage_array = (
+                    ch == "[" and salvage_depth is None and salvage_key is not None
+                    and stack[-1:] == ["{"] and pending_key == salvage_key
+                )
+                stack.append(ch)
+                pending_key = None
+                if is_salvage_array:
+                    salvage_depth = len(stack)
+            elif ch in "}]":
+                if not stack or _CLOSERS[stack[-1]] != ch:
+                    break  # Mismatched bracket: not a JSON object
+                closes_salvage_array = salvage_depth == len(stack)
+                stack.pop()
+                if not stack:
+                    end = i + 1
+                    break
+                if closes_salvage_array:
+                    salvage_depth = None
+                if closes_salvage_array or salvage_depth == len(stack):
+                    boundary = (i + 1, _closing(stack))
+            elif ch == ",":
+                pending_key = None
+                if salvage_depth == len(stack):
+                    boundary = (i, _closing(stack))
+        else:
+            truncated = True
+
+        if end is not None:
+            result = loads_repaired(text[start:end])
+            if result is not None:
+                return result
+            start = text.find("{", end)
+            continue
+        if truncated and boundary is not None:
+            # Ran off the end of the text: keep the complete array elements
+            cut, closers = boundary
+            result = loads_repaired(text[start:cut] + closers)
+            if result is not None:
+                result.salvaged = True
+                return result
+        if truncated:
+            # Any later brace is nested in this one, so rescanning would only
+            # return a fragment of the cut-off object
+            return None
+        start = text.find("{", start + 1)  # Mismatched bracket, e.g. a brace in prose
+    return None
+
+
+def _closing(stack: list[str]) -> str:
+    """Brackets closing every open container, innermost first."""
+    return "".join(_CLOSERS[bracket] for bracket in reversed(stack))
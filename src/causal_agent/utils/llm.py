@@ -1,49 +1,130 @@
 """Shared LLM utilities for multi-turn generation."""
 
 import json
+import math
+import time
+from dataclasses import dataclass
 from typing import TYPE_CHECKING
 
 from inspect_ai.model import (
     ChatMessageAssistant,
+    ChatMessageTool,
     ChatMessageUser,
     GenerateConfig,
     Model,
+    ModelOutput,
+    execute_tools,
 )
-from inspect_ai.tool import Tool, tool
+from inspect_ai.tool import Tool, ToolCall, tool
+
+from causal_agent.utils.config import CompactionPolicy, GenerationProfile, get_config
+from causal_agent.utils.json_extract import extract_json
+from causal_agent.utils.ratelimit import limited_generate
 
 if TYPE_CHECKING:
     from inspect_ai.model import ChatMessage
 
 
-def get_generate_config() -> GenerateConfig:
-    """Get standard GenerateConfig for all model calls.
+@dataclass
+class GenerationStats:
+    """Counters collected by multi_turn_generate for one conversation."""
+
+    turns: int = 0  # Model generate calls (assistant messages)
+    tool_calls: int = 0  # Tool calls made by the model across all turns
+    stop_reason: str | None = None  # Stop reason of the final turn (e.g. "max_tokens")
+    input_tokens: int = 0  # Prompt tokens summed over all turns
+    output_tokens: int = 0  # Completion tokens summed over all turns
+    elapsed_seconds: float = 0.0  # Wall-clock time of the whole conversation
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    def record(self, messages: list["ChatMessage"]) -> None:
+        """Count assistant turns and tool calls in newly generated messages."""
+        for message in messages:
+            if isinstance(message, ChatMessageAssistant):
+                self.turns += 1
+                self.tool_calls += len(message.tool_calls or [])
+
+    def record_usage(self, output: ModelOutput) -> None:
+        """Add the token usage reported for one generate call."""
+        if output.usage is not None:
+            self.input_tokens += output.usage.input_tokens
+            self.output_tokens += output.usage.output_tokens
+
+
+def get_generate_config(profile: str = "default") -> GenerateConfig:
+    """Get the GenerateConfig of a named generation profile.
 
-    Uses high reasoning effort to maximize model thinking.
+    Profiles (orchestrator, worker, judge, prior_elicitation, default) are
+    defined under `generation_profiles` in config.yaml. A profile's latency
+    budget becomes `timeout`, which limited_generate enforces as a deadline
+    on the whole call, retries included.
+
+    Args:
+        profile: Profile name
+
+    Returns:
+        GenerateConfig with the profile's token, reasoning and timeout settings
+
+    Raises:
+        ValueError: If the profile is not defined
     """
+    profiles = get_config().generation_profiles
+    if profile not in profiles:
+        if profile != "default":
+            raise ValueError(f"Unknown generation profile '{profile}'. Available: {sorted(profiles)}")
+        return profile_generate_config(GenerationProfile())
+    return profile_generate_config(profiles[profile])
+
+
+def profile_generate_config(profile: GenerationProfile) -> GenerateConfig:
+    """Convert a GenerationProfile to an Inspect GenerateConfig."""
+    budget = profile.latency_budget_seconds
     return GenerateConfig(
-        max_tokens=65536,
-        reasoning_effort="high",
-        reasoning_tokens=32768,
-        reasoning_history="all",  # Preserve reasoning across tool calls (required by Gemini)
+        max_tokens=profile.max_tokens,
+        reasoning_effort=profile.reasoning_effort,
+        reasoning_tokens=profile.reasoning_tokens,
+        reasoning_history=profile.reasoning_history,
+        timeout=math.ceil(budget) if budget is not None else None,
     )
 
 
-def parse_json_response(content: str) -> dict:
-    """Parse JSON from model response, handling markdown code blocks."""
-    if "```json" in content:
-        content = content.split("```json")[1].split("```")[0]
-    elif "```" in content:
-        content = content.split("```")[1].split("```")[0]
+def parse_json_response(content: str, salvage_key: str | None = None) -> dict:
+    """Parse the JSON object in a model response.
 
-    content = content.strip()
+    Surrounding prose and code fences are skipped, and common defects
+    (trailing commas, stray fences, Python literals) are repaired; see
+    utils/json_extract.py.
 
-    try:
-        return json.loads(content)
-    except json.JSONDecodeError as e:
-        print(f"JSON parsing error: {e}")
+    Args:
+        content: Model completion
+        salvage_key: Array key whose complete elements to keep if the
+            response was cut off mid-object (e.g. "extractions")
+
+    Returns:
+        Parsed JSON object
+
+    Raises:
+        ValueError: If no (repairable) JSON object is found
+    """
+    extraction = extract_json(content, salvage_key=salvage_key)
+    if extraction is None:
+        print("JSON parsing error: no parseable JSON object found")
         print(f"Content length: {len(content)}")
         print(f"Content preview: {content[:500]}...")
-        raise ValueError(f"Failed to parse model response as JSON: {e}") from e
+        raise ValueError("Failed to parse model response as JSON: no parseable JSON object found")
+    return extraction.data
+
+
+def _json_error(text: str) -> str:
+    """Tool message for JSON that could not be parsed or repaired."""
+    try:
+        json.loads(text)
+    except json.JSONDecodeError as e:
+        return f"JSON parse error: {e}"
+    return "JSON parse error: expected a JSON object"
 
 
 @tool
@@ -62,11 +143,11 @@ def validate_dsem_structure():
         """
         from causal_agent.orchestrator.schemas import validate_structure
 
-        # Parse JSON first
-        try:
-            data = json.loads(structure_json)
-        except json.JSONDecodeError as e:
-            return f"JSON parse error: {e}"
+        # Parse JSON first (repairing trivial defects rather than spending a turn on them)
+        extraction = extract_json(structure_json)
+        if extraction is None:
+            return _json_error(structure_json)
+        data = extraction.data
 
         # Validate and collect all errors
         structure, errors = validate_structure(data)
@@ -79,7 +160,7 @@ def validate_dsem_structure():
     return execute
 
 
-def make_worker_tools(schema: dict) -> list[Tool]:
+def make_worker_tools(schema: dict, include_helpers: bool | None = None) -> list[Tool]:
     """Create the standard toolset for worker agents.
 
     This is the single source of truth for worker tools.
@@ -87,15 +168,22 @@ def make_worker_tools(schema: dict) -> list[Tool]:
 
     Args:
         schema: The DSEM schema dict to validate extractions against
+        include_helpers: Whether to add the parse_date/calculate helper tools.
+            Defaults to stage2_workers.helper_tools from config. Helpers are
+            unnecessary when chunks are enriched (see utils/enrichment.py).
 
     Returns:
-        List of tools: [validate_extractions, parse_date, calculate]
+        List of tools: [validate_extractions] plus [parse_date, calculate] if helpers enabled
     """
-    return [
-        make_validate_worker_output_tool(schema),
-        parse_date(),
-        calculate(),
-    ]
+    if include_helpers is None:
+        from causal_agent.utils.config import get_config
+
+        include_helpers = get_config().stage2_workers.helper_tools
+
+    tools = [make_validate_worker_output_tool(schema)]
+    if include_helpers:
+        tools.extend([parse_date(), calculate()])
+    return tools
 
 
 def make_validate_worker_output_tool(schema: dict) -> Tool:
@@ -124,11 +212,11 @@ def make_validate_worker_output_tool(schema: dict) -> Tool:
             """
             from causal_agent.workers.schemas import validate_worker_output
 
-            # Parse JSON first
-            try:
-                data = json.loads(output_json)
-            except json.JSONDecodeError as e:
-                return f"JSON parse error: {e}"
+            # Parse JSON first (repairing trivial defects rather than spending a turn on them)
+            extraction = extract_json(output_json)
+            if extraction is None:
+                return _json_error(output_json)
+            data = extraction.data
 
             # Validate and collect all errors
             output, errors = validate_worker_output(data, schema)
@@ -214,57 +302,157 @@ def parse_date():
     return execute
 
 
+def compact_tool_history(messages: list["ChatMessage"]) -> list["ChatMessage"]:
+    """Drop superseded validation drafts from a conversation.
+
+    Each `validate_*` tool call is a draft of the answer. Keeps every message
+    except validation calls (and their tool results) older than the latest
+    one, so the model sees only its latest draft and that draft's errors.
+    Other tool calls (parse_date, calculate) and their results are kept;
+    an assistant message left without tool calls is dropped.
+
+    Args:
+        messages: Full conversation history
+
+    Returns:
+        Compacted copy of the history
+    """
+    rounds = [
+        i for i, m in enumerate(messages)
+        if isinstance(m, ChatMessageAssistant) and any(_is_draft(call) for call in m.tool_calls or [])
+    ]
+    if len(rounds) < 2:
+        return list(messages)
+    superseded_ids = {call.id for i in rounds[:-1] for call in messages[i].tool_calls if _is_draft(call)}
+    compacted = []
+    for m in messages:
+        if isinstance(m, ChatMessageTool) and m.tool_call_id in superseded_ids:
+            continue
+        if isinstance(m, ChatMessageAssistant) and m.tool_calls:
+            kept = [call for call in m.tool_calls if call.id not in superseded_ids]
+            if not kept:
+                continue
+            if len(kept) < len(m.tool_calls):
+                m = m.model_copy(update={"tool_calls": kept})
+        compacted.append(m)
+    return compacted
+
+
+def _is_draft(call: ToolCall) -> bool:
+    """Whether a tool call submits a draft for validation (validate_extractions, validate_dsem_structure)."""
+    return call.function.startswith("validate_")
+
+
+async def _generate_with_tools(
+    messages: list["ChatMessage"],
+    model: Model,
+    tools: list[Tool],
+    config: GenerateConfig,
+    stats: GenerationStats,
+    compaction: CompactionPolicy | None = None,
+) -> ModelOutput:
+    """Generate until the model stops calling tools, appending to messages in place.
+
+    Equivalent to Model.generate_loop, but keeps the full history in
+    `messages` and records token usage of every call in `stats`. Each call
+    is sent the history compacted per `compaction` (default: the model's
+    policy from config), under the provider's shared rate limits.
+    """
+    policy = compaction or get_config().compaction.policy_for(str(model))
+    if policy.enabled:
+        config = config.merge(GenerateConfig(reasoning_history=policy.reasoning_history))
+    while True:
+        history = compact_tool_history(messages) if policy.enabled else messages
+        output = await limited_generate(model, history, tools=tools, config=config)
+        stats.record_usage(output)
+        messages.append(output.message)
+        stats.record([output.message])
+
+        if not output.message.tool_calls:
+            return output
+        tool_messages, _ = await execute_tools(messages, tools, config.max_tool_output)
+        messages.extend(tool_messages)
+
+
 async def multi_turn_generate(
     messages: list["ChatMessage"],
     model: Model,
     follow_ups: list[str] | None = None,
     tools: list[Tool] | None = None,
     config: GenerateConfig | None = None,
+    stats: GenerationStats | None = None,
+    compaction: CompactionPolicy | None = None,
 ) -> str:
     """
     Run a multi-turn conversation with optional tool use.
 
+    Every model call goes through the process-wide rate limiter and circuit
+    breaker of its provider/model (see utils/ratelimit.py), which also
+    retries transient errors. With mock_model.record_path set, the final
+    completion is recorded for offline replay (see utils/mock_model.py).
+
     Args:
         messages: Initial messages (typically system + user prompt)
         model: The model to use for generation
         follow_ups: List of follow-up user prompts to send after each response (default: none)
-        tools: Optional list of tools the model can use (enables generate_loop)
+        tools: Optional list of tools the model can use (resolved in a generate loop)
         config: Optional generation config
+        stats: Optional GenerationStats to accumulate turn, tool-call, and token counts into
+        compaction: History compaction for tool loops (default: the model's
+            policy from the config's compaction block)
 
     Returns:
         The final completion string
     """
     messages = list(messages)  # Don't mutate original
     follow_ups = follow_ups or []
+    config = config or GenerateConfig()
+    stats = stats if stats is not None else GenerationStats()
+    start = time.perf_counter()
+    try:
+        completion = await _run_conversation(messages, model, follow_ups, tools, config, stats, compaction)
+    finally:
+        stats.elapsed_seconds += time.perf_counter() - start
 
+    from causal_agent.utils.mock_model import record_live_completion
+
+    record_live_completion(str(model), messages, completion)
+    return completion
+
+
+async def _run_conversation(
+    messages: list["ChatMessage"],
+    model: Model,
+    follow_ups: list[str],
+    tools: list[Tool] | None,
+    config: GenerateConfig,
+    stats: GenerationStats,
+    compaction: CompactionPolicy | None,
+) -> str:
+    """Body of multi_turn_generate (messages are appended to in place)."""
     if tools:
-        # Use generate_loop for tool-enabled generation
-        final_messages, output = await model.generate_loop(
-            messages,
-            tools=tools,
-            config=config,
-        )
-        messages = list(final_messages)
+        output = await _generate_with_tools(messages, model, tools, config, stats, compaction)
 
         # Follow-up turns with tools
         for prompt in follow_ups:
             messages.append(ChatMessageUser(content=prompt))
-            final_messages, output = await model.generate_loop(
-                messages,
-                tools=tools,
-                config=config,
-            )
-            messages = list(final_messages)
+            output = await _generate_with_tools(messages, model, tools, config, stats, compaction)
 
+        stats.stop_reason = output.stop_reason
         return output.completion
     else:
         # Simple generation without tools
-        response = await model.generate(messages, config=config)
+        response = await limited_generate(model, messages, config=config)
+        stats.record_usage(response)
         messages.append(ChatMessageAssistant(content=response.completion))
+        stats.turns += 1
 
         for prompt in follow_ups:
             messages.append(ChatMessageUser(content=prompt))
-            response = await model.generate(messages, config=config)
+            response = await limited_generate(model, messages, config=config)
+            stats.record_usage(response)
             messages.append(ChatMessageAssistant(content=response.completion))
+            stats.turns += 1
 
+        stats.stop_reason = response.stop_reason
         return response.completion
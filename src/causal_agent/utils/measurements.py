@@ -0,0 +1,124 @@
+"""Typed container handing aggregated measurements to the modeling stages.
+
+A MeasurementSet is what aggregate_measurements returns: the per-granularity
+DataFrames of aggregate_worker_measurements (it is a read-only mapping of
+granularity -> DataFrame), plus each granularity's dimensions packed into
+one contiguous float64 matrix, with missing values as NaN and categories as
+their codes. From it the modeling stages get, without copying the data:
+
+- values(granularity): a read-only (time, dimension) numpy view of the matrix
+- mask(granularity): where values are missing
+- coords() / dims(granularity): PyMC coords and dims for the matrices
+- arrow_stream(granularity): the DataFrame through the Arrow C stream interface
+
+save writes one uncompressed Arrow IPC file per granularity and load
+memory-maps them, so later stages and reruns read the matrices straight
+from the page cache.
+"""
+
+from collections.abc import Iterator, Mapping
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import polars as pl
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Packed Array(Float64) column of all dimensions, stored next to them
+VALUES_COLUMN = "__values"
+MEASUREMENTS_FILE = "{granularity}.arrow"
+
+
+def _pack(df: pl.DataFrame) -> pl.DataFrame:
+    """Add the dimensions as one Array(Float64) column (null -> NaN), in a single chunk."""
+    dimensions = [col for col in df.columns if col != "time_bucket"]
+    return df.with_columns(
+        pl.concat_arr(
+            # Category (Enum) columns pack as their codes
+            [pl.col(dim).to_physical().cast(pl.Float64).fill_null(float("nan")) for dim in dimensions]
+        ).alias(VALUES_COLUMN)
+    ).rechunk()
+
+
+class MeasurementSet(Mapping[str, pl.DataFrame]):
+    """Aggregated measurements by granularity, with contiguous float64 matrices for modeling."""
+
+    def __init__(self, frames: dict[str, pl.DataFrame]):
+        """
+        Args:
+            frames: Output of aggregate_worker_measurements (granularity ->
+                DataFrame, plus 'time_invariant')
+        """
+        self._frames = {
+            granularity: df if VALUES_COLUMN in df.columns else _pack(df)
+            for granularity, df in frames.items()
+            if any(col != "time_bucket" for col in df.columns)
+        }
+
+    def __getitem__(self, granularity: str) -> pl.DataFrame:
+        return self._frames[granularity].drop(VALUES_COLUMN)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._frames)
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def dimensions(self, granularity: str) -> list[str]:
+        """Dimension names of a granularity, in matrix column order."""
+        return [col for col in self._frames[granularity].columns if col not in ("time_bucket", VALUES_COLUMN)]
+
+    def values(self, granularity: str) -> "np.ndarray":
+        """Read-only float64 view of a granularity's measurements, NaN where missing.
+
+        Returns:
+            Array of shape (time, dimension), or (dimension,) for 'time_invariant'
+        """
+        values = self._frames[granularity][VALUES_COLUMN].to_numpy(allow_copy=False)
+        return values[0] if granularity == "time_invariant" else values
+
+    def mask(self, granularity: str) -> "np.ndarray":
+        """Boolean array shaped like values(granularity), True where a measurement is missing."""
+        import numpy as np
+
+        return np.isnan(self.values(granularity))
+
+    def time_index(self, granularity: str) -> "np.ndarray":
+        """Time bucket starts of a time-varying granularity (UTC datetime64)."""
+        return self._frames[granularity]["time_bucket"].to_numpy()
+
+    def dims(self, granularity: str) -> tuple[str, ...]:
+        """PyMC dims of values(granularity), named in coords()."""
+        if granularity == "time_invariant":
+            return ("time_invariant_dimension",)
+        return (f"{granularity}_time", f"{granularity}_dimension")
+
+    def coords(self) -> dict[str, "np.ndarray | list[str]"]:
+        """PyMC coords for the dims of every granularity."""
+        coords: dict[str, np.ndarray | list[str]] = {}
+        for granularity in self._frames:
+            if granularity != "time_invariant":
+                coords[f"{granularity}_time"] = self.time_index(granularity)
+            coords[f"{granularity}_dimension"] = self.dimensions(granularity)
+        return coords
+
+    def arrow_stream(self, granularity: str) -> object:
+        """A granularity's DataFrame as an Arrow C stream PyCapsule (e.g. for pyarrow or nanoarrow)."""
+        return self[granularity].__arrow_c_stream__()
+
+    def save(self, directory: Path) -> None:
+        """Write one uncompressed Arrow IPC file per granularity (memory-mappable by load)."""
+        directory.mkdir(parents=True, exist_ok=True)
+        for granularity, df in self._frames.items():
+            df.write_ipc(directory / MEASUREMENTS_FILE.format(granularity=granularity))
+
+    @classmethod
+    def load(cls, directory: Path) -> "MeasurementSet | None":
+        """Memory-map a set written by save, or None if there is none."""
+        if not directory.exists():
+            return None
+        return cls({
+            path.stem: pl.read_ipc(path, memory_map=True, rechunk=False)
+            for path in sorted(directory.glob("*.arrow"))
+        })
@@ -0,0 +1,289 @@
+"""Offline model provider for reproducible end-to-end and throughput testing.
+
+Registered with Inspect as `causal-mock` (see causal_agent/_registry.py), so
+any stage can run without network access by pointing its model at e.g.
+`causal-mock/worker` in config.yaml:
+
+- Worker prompts get schema-valid extractions synthesized from the prompt's
+  Dimensions and Data Chunk sections (one chance per dimension per
+  timestamped line), deterministic per chunk and seed.
+- Structure proposal prompts get a fixed DSEM structure read from
+  `structure_path`.
+- Completions recorded with `append_recording` are replayed verbatim for
+  prompts with the same first user message. Setting `record_path` records
+  the final completion of every live multi_turn_generate conversation.
+- Inside `stream_content(sink)` final answers are also sent to the sink in
+  small deltas, like a streaming provider.
+
+Latency (log-normal), the number of validation tool calls before each final
+answer, and injected 429 and timeout errors are configured in the
+`mock_model` block of config.yaml and can be overridden per model through
+`get_model("causal-mock/...", **model_args)`.
+"""
+
+import asyncio
+import dataclasses
+import hashlib
+import json
+import random
+import re
+import threading
+import uuid
+from pathlib import Path
+
+from inspect_ai.model import (
+    ChatMessage,
+    ChatMessageTool,
+    ChatMessageUser,
+    GenerateConfig,
+    ModelAPI,
+    ModelOutput,
+    ModelUsage,
+    modelapi,
+)
+from inspect_ai.tool import ToolChoice, ToolInfo
+
+from causal_agent.utils.config import MockModelConfig, get_config
+from causal_agent.utils.enrichment import parse_line_timestamp
+from causal_agent.utils.streaming import ContentSink, start_content_turn
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
+
+# Dimension lines as formatted by workers.agents._format_dimensions
+DIMENSION_LINE_PATTERN = re.compile(r"^- (\S+) \((\w*)(?:, @\w+)?\):", re.MULTILINE)
+
+# Activity type of a preprocessed line, e.g. "[2024-03-15 10:30] @ 1.0,2.0 [Search] ..."
+ACTIVITY_PATTERN = re.compile(r"\] (?:@ \S+ )?\[([^\]]+)\]")
+
+WORKER_TOOL = "validate_extractions"
+STRUCTURE_TOOL = "validate_dsem_structure"
+DRAFT_ID_PATTERN = re.compile(r"call_draft(\d+)_")
+
+# Size of the content deltas sent to a content sink (utils/streaming.py)
+STREAM_DELTA_CHARS = 64
+
+# Concurrent worker threads append to the same recording file
+_recording_lock = threading.Lock()
+
+
+def draft_call_id(draft: int) -> str:
+    """Tool-call id numbering a validation draft, so counting survives history compaction."""
+    return f"call_draft{draft}_{uuid.uuid4().hex[:16]}"
+
+
+def draft_number(tool_call_id: str | None) -> int:
+    """Draft number encoded by draft_call_id (-1 for other ids)."""
+    match = DRAFT_ID_PATTERN.match(tool_call_id or "")
+    return int(match.group(1)) if match else -1
+
+
+class MockRateLimitError(Exception):
+    """Injected HTTP 429 from the mock provider."""
+
+    status_code = 429
+
+    def __init__(self, retry_after: float = 1.0):
+        super().__init__(f"Rate limit exceeded (429), retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def recording_key(messages: list[ChatMessage]) -> str:
+    """Key identifying a conversation for replay: hash of its first user message."""
+    first_user = next((m for m in messages if isinstance(m, ChatMessageUser)), None)
+    text = first_user.text if first_user is not None else ""
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def append_recording(path: Path, messages: list[ChatMessage], completion: str) -> None:
+    """Record the final completion of a conversation for later replay."""
+    record = json.dumps({"key": recording_key(messages), "completion": completion}) + "\n"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with _recording_lock, open(path, "a") as f:
+        f.write(record)
+
+
+def record_live_completion(model_name: str, messages: list[ChatMessage], completion: str) -> None:
+    """Append a live conversation's final completion to mock_model.record_path, if set.
+
+    Called by multi_turn_generate. Conversations with causal-mock models are
+    not recorded.
+    """
+    record_path = get_config().mock_model.record_path
+    if record_path and not model_name.startswith("causal-mock/"):
+        append_recording(PROJECT_ROOT / record_path, messages, completion)
+
+
+def _load_recordings(path: Path) -> dict[str, str]:
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return {record["key"]: record["completion"] for record in records}
+
+
+def _section(text: str, heading: str) -> str:
+    """Body of a '## heading' section of a prompt (up to the next '## ')."""
+    match = re.search(rf"^## {re.escape(heading)}\n(.*?)(?=^## |\Z)", text, re.MULTILINE | re.DOTALL)
+    return match.group(1) if match else ""
+
+
+def _synthesize_value(dtype: str, line: str, rng: random.Random):
+    if dtype == "binary":
+        return rng.random() < 0.5
+    if dtype == "count":
+        return rng.randint(0, 5)
+    if dtype == "ordinal":
+        return rng.randint(1, 5)
+    if dtype == "categorical":
+        match = ACTIVITY_PATTERN.search(line)
+        return match.group(1) if match else "other"
+    return round(rng.gauss(5.0, 2.0), 2)
+
+
+def synthesize_extractions(prompt: str, extraction_rate: float, seed: int = 0) -> dict:
+    """Schema-valid worker output for a worker user prompt.
+
+    Args:
+        prompt: Worker user prompt (WORKER_USER with Dimensions and Data Chunk)
+        extraction_rate: Probability of an extraction per dimension per data line
+        seed: Seed combined with the prompt, so a chunk always gets the same output
+
+    Returns:
+        WorkerOutput-shaped dict
+    """
+    rng = random.Random(f"{seed}:{prompt}")
+    dimensions = DIMENSION_LINE_PATTERN.findall(_section(prompt, "Dimensions"))
+    extractions = []
+    for line in _section(prompt, "Data Chunk").split("\n"):
+        ts = parse_line_timestamp(line)
+        if ts is None:
+            continue  # Annotations and untimestamped lines
+        for name, dtype in dimensions:
+            if rng.random() < extraction_rate:
+                extractions.append({
+                    "dimension": name,
+                    "value": _synthesize_value(dtype, line, rng),
+                    "timestamp": ts.isoformat(),
+                })
+    return {"extractions": extractions}
+
+
+class CausalMockAPI(ModelAPI):
+    """Inspect ModelAPI that answers pipeline prompts without network calls."""
+
+    def __init__(
+        self,
+        model_name: str,
+        base_url: str | None = None,
+        api_key: str | None = None,
+        config: GenerateConfig = GenerateConfig(),
+        **model_args,
+    ) -> None:
+        super().__init__(model_name, base_url, api_key, [], config)
+        self.mock_config: MockModelConfig = dataclasses.replace(get_config().mock_model, **model_args)
+        self._rng = random.Random(self.mock_config.seed)
+        replay_path = self.mock_config.replay_path
+        self._recordings = _load_recordings(PROJECT_ROOT / replay_path) if replay_path else {}
+
+    async def generate(
+        self,
+        input: list[ChatMessage],
+        tools: list[ToolInfo],
+        tool_choice: ToolChoice,
+        config: GenerateConfig,
+    ) -> ModelOutput:
+        mock = self.mock_config
+        sink = start_content_turn()  # Every call is a new assistant turn, streamed or not
+        if mock.latency_median > 0:
+            await asyncio.sleep(mock.latency_median * self._rng.lognormvariate(0, mock.latency_sigma))
+        roll = self._rng.random()
+        if roll < mock.rate_limit_rate:
+            raise MockRateLimitError(retry_after=mock.retry_after_seconds)
+        if roll < mock.rate_limit_rate + mock.timeout_rate:
+            await asyncio.sleep(mock.timeout_seconds)
+            raise TimeoutError(f"Mock request timed out after {mock.timeout_seconds}s")
+
+        key = recording_key(input)
+        if key in self._recordings:
+            return await self._streamed_output(input, self._recordings[key], sink)
+
+        payload = self._answer(input, tools)
+        tool = self._validation_tool(tools)
+        drafts = self._tool_calls_since_user(input)
+        if tool is not None and drafts < mock.tool_calls:
+            argument = next(iter(tool.parameters.properties), "input")
+            output = ModelOutput.for_tool_call(
+                self.model_name,
+                tool.name,
+                {argument: json.dumps(payload)},
+                tool_call_id=draft_call_id(drafts),
+            )
+            output.usage = self._usage(input, json.dumps(payload))
+            return output
+        return await self._streamed_output(input, f"```json\n{json.dumps(payload, indent=2)}\n```", sink)
+
+    def _answer(self, input: list[ChatMessage], tools: list[ToolInfo]) -> dict:
+        """Structure for structure-proposal prompts, extractions otherwise."""
+        tool_names = {tool.name for tool in tools}
+        if STRUCTURE_TOOL in tool_names:
+            return json.loads((PROJECT_ROOT / self.mock_config.structure_path).read_text())
+        first_user = next((m for m in input if isinstance(m, ChatMessageUser)), None)
+        prompt = first_user.text if first_user is not None else ""
+        return synthesize_extractions(prompt, self.mock_config.extraction_rate, self.mock_config.seed)
+
+    @staticmethod
+    def _validation_tool(tools: list[ToolInfo]) -> ToolInfo | None:
+        return next((tool for tool in tools if tool.name in (WORKER_TOOL, STRUCTURE_TOOL)), None)
+
+    @staticmethod
+    def _tool_calls_since_user(input: list[ChatMessage]) -> int:
+        drafts = []
+        for message in reversed(input):
+            if isinstance(message, ChatMessageUser):
+                break
+            if isinstance(message, ChatMessageTool):
+                drafts.append(draft_number(message.tool_call_id))
+        # Compacted histories hold only the latest draft; its id carries the count
+        return max(len(drafts), max(drafts, default=-1) + 1)
+
+    async def _streamed_output(
+        self, input: list[ChatMessage], completion: str, sink: ContentSink | None
+    ) -> ModelOutput:
+        """Final answer, sent in deltas to the content sink if one is installed."""
+        if sink is not None:
+            for start in range(0, len(completion), STREAM_DELTA_CHARS):
+                await sink(completion[start:start + STREAM_DELTA_CHARS])
+                await asyncio.sleep(0)  # Let consumers run between deltas, as with a real stream
+        return self._output(input, completion)
+
+    def _output(self, input: list[ChatMessage], completion: str) -> ModelOutput:
+        output = ModelOutput.from_content(self.model_name, completion)
+        output.usage = self._usage(input, completion)
+        return output
+
+    @staticmethod
+    def _usage(input: list[ChatMessage], completion: str) -> ModelUsage:
+        # Rough 4-characters-per-token estimate, enough for budget accounting
+        # Tool-call arguments (e.g. earlier drafts) are part of the prompt too
+        input_chars = sum(
+            len(m.text) + sum(len(json.dumps(call.arguments)) for call in getattr(m, "tool_calls", None) or [])
+            for m in input
+        )
+        input_tokens = input_chars // 4
+        output_tokens = len(completion) // 4
+        return ModelUsage(
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=input_tokens + output_tokens,
+        )
+
+    def max_connections(self) -> int:
+        return self.mock_config.max_connections
+
+    def should_retry(self, ex: Exception) -> bool:
+        return isinstance(ex, (MockRateLimitError, TimeoutError))
+
+
+@modelapi(name="causal-mock")
+def causal_mock() -> type[ModelAPI]:
+    return CausalMockAPI
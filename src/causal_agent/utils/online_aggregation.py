@@ -0,0 +1,470 @@
+"""Online, mergeable aggregation of worker extractions.
+
+`OnlineAggregator` folds worker extraction DataFrames in as they arrive and
+keeps one small state per (granularity, time_bucket, dimension) instead of
+the raw rows, so memory scales with the number of buckets rather than of
+extractions. Its result has the same shape as aggregate_worker_measurements.
+
+Each aggregation in AGGREGATION_REGISTRY maps to a mergeable state:
+
+- `_Moments` (sum, count, mean, min, max, var, std, range, cv, skew,
+  kurtosis): count, mean and central moments, merged with the pairwise
+  update formulas of Chan et al. / Pébay. Exact.
+- `_Sequence` (first, last): the first and last value by extraction order.
+  Exact as long as folds say where their rows belong in that order (see `fold`).
+- `_Runs` (instability, trend): one run per fold, sorted by timestamp, with
+  its first and last value and sums of consecutive differences; at most
+  RUN_LIMIT runs per bucket. Exact while the folds of a bucket cover
+  non-overlapping time ranges (contiguous chunks) and no more than
+  RUN_LIMIT of them are waiting for a batch that belongs between them.
+- `_ValueCounts` (entropy, mode): counts per distinct value. Exact.
+- `TDigest` (median, percentiles, iqr) and `HyperLogLog` (n_unique): exact
+  while a bucket holds few values, approximate beyond.
+
+AGGREGATION_METADATA records which aggregations are exact online.
+`rollup_cache` turns the count/sum/extreme and first/last states into the
+partials of a RollupCache, as aggregate_worker_measurements writes them.
+"""
+
+import bisect
+import copy
+import math
+from collections import Counter
+from typing import Any, Callable
+
+import polars as pl
+
+from causal_agent.utils.aggregations import (
+    AGGREGATION_METADATA,
+    _decode_categories,
+    _expand_one_hot,
+    _measurement_rows,
+    _observed_dimensions,
+    _schema_categories,
+    _truncate_to_granularity,
+)
+from causal_agent.utils.rollup import RollupCache
+from causal_agent.utils.sketches import HyperLogLog, TDigest
+
+RUN_LIMIT = 64  # Runs kept per instability/trend state (see _Runs)
+
+
+class _Moments:
+    """Count, sum, extremes and central moments (M2-M4) of the non-null values."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = self.m3 = self.m4 = 0.0
+        self.total = 0.0
+        self.minimum: float | None = None
+        self.maximum: float | None = None
+
+    def add(self, values: list[float | None], order: Any = None) -> None:
+        values = [value for value in values if value is not None]
+        if not values:
+            return
+        batch = _Moments()
+        batch.n = len(values)
+        batch.total = math.fsum(values)
+        batch.mean = batch.total / batch.n
+        deviations = [value - batch.mean for value in values]
+        batch.m2 = math.fsum(d * d for d in deviations)
+        batch.m3 = math.fsum(d ** 3 for d in deviations)
+        batch.m4 = math.fsum(d ** 4 for d in deviations)
+        batch.minimum, batch.maximum = min(values), max(values)
+        self.merge(batch)
+
+    def merge(self, other: "_Moments") -> None:
+        if other.n == 0:
+            return
+        if self.n == 0:
+            self.__dict__.update(other.__dict__)
+            return
+        na, nb = self.n, other.n
+        n = na + nb
+        delta = other.mean - self.mean
+        m2 = self.m2 + other.m2 + delta ** 2 * na * nb / n
+        m3 = (
+            self.m3 + other.m3
+            + delta ** 3 * na * nb * (na - nb) / n ** 2
+            + 3 * delta * (na * other.m2 - nb * self.m2) / n
+        )
+        m4 = (
+            self.m4 + other.m4
+            + delta ** 4 * na * nb * (na * na - na * nb + nb * nb) / n ** 3
+            + 6 * delta ** 2 * (na * na * other.m2 + nb * nb * self.m2) / n ** 2
+            + 4 * delta * (na * other.m3 - nb * self.m3) / n
+        )
+        self.n, self.mean, self.m2, self.m3, self.m4 = n, self.mean + delta * nb / n, m2, m3, m4
+        self.total += other.total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    def variance(self) -> float | None:
+        return self.m2 / (self.n - 1) if self.n > 1 else None
+
+    def std(self) -> float | None:
+        variance = self.variance()
+        return math.sqrt(variance) if variance is not None else None
+
+    def skew(self) -> float | None:
+        if self.n == 0:
+            return None
+        return (self.m3 / self.n) / (self.m2 / self.n) ** 1.5 if self.m2 > 0 else math.nan
+
+    def kurtosis(self) -> float | None:
+        if self.n == 0:
+            return None
+        return (self.m4 / self.n) / (self.m2 / self.n) ** 2 - 3 if self.m2 > 0 else math.nan
+
+
+class _Segment:
+    """First/last value and consecutive differences of a contiguous run of rows."""
+
+    __slots__ = ("first", "last", "sum_diff", "sum_abs_diff", "n_diffs")
+
+    def __init__(self, values: list[float | None]):
+        self.first, self.last = values[0], values[-1]
+        diffs = [b - a for a, b in zip(values, values[1:]) if a is not None and b is not None]
+        self.sum_diff = math.fsum(diffs)
+        self.sum_abs_diff = math.fsum(abs(d) for d in diffs)
+        self.n_diffs = len(diffs)
+
+    def extend(self, other: "_Segment") -> None:
+        """Append a segment that directly follows this one."""
+        if self.last is not None and other.first is not None:
+            diff = other.first - self.last
+            self.sum_diff += diff
+            self.sum_abs_diff += abs(diff)
+            self.n_diffs += 1
+        self.sum_diff += other.sum_diff
+        self.sum_abs_diff += other.sum_abs_diff
+        self.n_diffs += other.n_diffs
+        self.last = other.last
+
+
+class _Sequence:
+    """First and last value of a group's rows, by position in extraction order."""
+
+    def __init__(self):
+        self.first_key: Any = None
+        self.last_key: Any = None
+        self.first: float | None = None
+        self.last: float | None = None
+
+    def add(self, values: list[float | None], order: Any = None) -> None:
+        if not values:
+            return
+        if order is None:
+            # Unordered folds follow everything folded so far
+            order = self.last_key if self.last_key is not None else 0
+        self._add(order, values[0], order, values[-1])
+
+    def _add(self, first_key: Any, first: float | None, last_key: Any, last: float | None) -> None:
+        if self.first_key is None or first_key < self.first_key:
+            self.first_key, self.first = first_key, first
+        if self.last_key is None or last_key >= self.last_key:
+            self.last_key, self.last = last_key, last
+
+    def merge(self, other: "_Sequence") -> None:
+        if other.first_key is not None:
+            self._add(other.first_key, other.first, other.last_key, other.last)
+
+
+class _Runs:
+    """Sorted runs of a group's rows, each spanning a range of sort keys.
+
+    A fold adds its rows as one run. Runs are kept apart so that batches
+    arriving out of order still slot in between them; past RUN_LIMIT runs,
+    the earliest two are joined, so a state holds at most RUN_LIMIT runs.
+    Joined runs are exact as long as no later run falls between them, and
+    runs whose key ranges overlap are joined in order of their first keys.
+    """
+
+    def __init__(self):
+        self.runs: list[tuple[Any, Any, _Segment]] = []  # (first key, last key, segment) by first key
+
+    def add(self, values: list[float | None], first_key: Any, last_key: Any) -> None:
+        if values:
+            self._insert(first_key, last_key, _Segment(values))
+
+    def _insert(self, first_key: Any, last_key: Any, segment: _Segment) -> None:
+        index = bisect.bisect_right(self.runs, first_key, key=lambda run: run[0])
+        self.runs.insert(index, (first_key, last_key, segment))
+        if len(self.runs) > RUN_LIMIT:
+            (first_key, last_key, joined), (_, next_last_key, following) = self.runs[0], self.runs.pop(1)
+            joined.extend(following)
+            self.runs[0] = (first_key, max(last_key, next_last_key), joined)
+
+    def merge(self, other: "_Runs") -> None:
+        for first_key, last_key, segment in other.runs:
+            self._insert(first_key, last_key, copy.copy(segment))
+
+    def combined(self) -> _Segment:
+        """All runs joined in order."""
+        result = copy.copy(self.runs[0][2])
+        for _, _, segment in self.runs[1:]:
+            result.extend(segment)
+        return result
+
+
+class _ValueCounts:
+    """Counts per distinct value (including None)."""
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+
+    def add(self, values: list[float | None], order: Any = None) -> None:
+        self.counts.update(values)
+
+    def merge(self, other: "_ValueCounts") -> None:
+        self.counts.update(other.counts)
+
+    def entropy(self) -> float:
+        total = sum(self.counts.values())
+        return -math.fsum((p := count / total) * math.log(p + 1e-10) for count in self.counts.values())
+
+    def mode(self) -> float | None:
+        counts = {value: count for value, count in self.counts.items() if value is not None}
+        if not counts:
+            return None
+        return min(counts, key=lambda value: (-counts[value], value))
+
+
+class _Quantiles(TDigest):
+    def add(self, values: list[float | None], order: Any = None) -> None:
+        super().add(values)
+
+
+class _Distinct(HyperLogLog):
+    def add(self, values: list[float | None], order: Any = None) -> None:
+        super().add(values)
+
+
+def _iqr(state: _Quantiles) -> float | None:
+    if state.count == 0:
+        return None
+    return state.quantile(0.75) - state.quantile(0.25)
+
+
+def _value_range(state: _Moments) -> float | None:
+    return state.maximum - state.minimum if state.n else None
+
+
+def _cv(state: _Moments) -> float | None:
+    std = state.std()
+    return std / (state.mean + 1e-10) if std is not None else None
+
+
+def _mean_difference(field: str) -> Callable[[_Runs], float | None]:
+    def finalize(state: _Runs) -> float | None:
+        segment = state.combined()
+        return getattr(segment, field) / segment.n_diffs if segment.n_diffs else None
+
+    return finalize
+
+
+# Aggregation name -> (state factory, finalizer, result dtype in time-varying frames)
+ONLINE_AGGREGATIONS: dict[str, tuple[Callable[[], Any], Callable[[Any], Any], pl.DataType]] = {
+    "mean": (_Moments, lambda s: s.mean if s.n else None, pl.Float64),
+    "sum": (_Moments, lambda s: s.total, pl.Float64),
+    "min": (_Moments, lambda s: s.minimum, pl.Float64),
+    "max": (_Moments, lambda s: s.maximum, pl.Float64),
+    "std": (_Moments, _Moments.std, pl.Float64),
+    "var": (_Moments, _Moments.variance, pl.Float64),
+    "last": (_Sequence, lambda s: s.last, pl.Float64),
+    "first": (_Sequence, lambda s: s.first, pl.Float64),
+    "count": (_Moments, lambda s: s.n, pl.UInt32),
+    "median": (_Quantiles, lambda s: s.quantile(0.5, interpolation="linear"), pl.Float64),
+    "p10": (_Quantiles, lambda s: s.quantile(0.1), pl.Float64),
+    "p25": (_Quantiles, lambda s: s.quantile(0.25), pl.Float64),
+    "p75": (_Quantiles, lambda s: s.quantile(0.75), pl.Float64),
+    "p90": (_Quantiles, lambda s: s.quantile(0.9), pl.Float64),
+    "p99": (_Quantiles, lambda s: s.quantile(0.99), pl.Float64),
+    "skew": (_Moments, _Moments.skew, pl.Float64),
+    "kurtosis": (_Moments, _Moments.kurtosis, pl.Float64),
+    "iqr": (_Quantiles, _iqr, pl.Float64),
+    "range": (_Moments, _value_range, pl.Float64),
+    "cv": (_Moments, _cv, pl.Float64),
+    "entropy": (_ValueCounts, _ValueCounts.entropy, pl.Float64),
+    "instability": (_Runs, _mean_difference("sum_abs_diff"), pl.Float64),
+    "trend": (_Runs, _mean_difference("sum_diff"), pl.Float64),
+    "n_unique": (_Distinct, lambda s: s.cardinality(), pl.UInt32),
+    "mode": (_ValueCounts, _ValueCounts.mode, pl.Float64),
+    "one_hot": (_Moments, lambda s: s.n, pl.UInt32),
+}
+
+
+class OnlineAggregator:
+    """Folds worker extractions into per-bucket mergeable states as they arrive."""
+
+    def __init__(self, schema: dict):
+        """
+        Args:
+            schema: DSEM schema dict containing dimension definitions with
+                causal_granularity and aggregation functions
+        """
+        self.categories = _schema_categories(schema)
+        self.dim_info = _observed_dimensions(schema)
+        self.aggregation_of: dict[str, str] = {}
+        self.dims_by_granularity: dict[str | None, list[str]] = {}
+        for name, info in self.dim_info.items():
+            aggregation = info["aggregation"]
+            # Unknown aggregations fall back to mean, as in aggregate_worker_measurements
+            self.aggregation_of[name] = aggregation if aggregation in ONLINE_AGGREGATIONS else "mean"
+            self.dims_by_granularity.setdefault(info["causal_granularity"], []).append(name)
+        # granularity -> (time_bucket or None, dimension) -> state
+        self.states: dict[str | None, dict[tuple, Any]] = {g: {} for g in self.dims_by_granularity}
+        self.bucket_dtype: pl.DataType | None = None
+        self.n_rows = 0
+
+    @property
+    def n_states(self) -> int:
+        """Number of (granularity, bucket, dimension) states held."""
+        return sum(len(states) for states in self.states.values())
+
+    def fold(self, dataframe: pl.DataFrame, order: Any = None) -> None:
+        """Fold one batch of extractions (dimension, value, timestamp) into the states.
+
+        The rows are not kept. first, last, instability and trend depend on
+        row order: pass the batch's position in extraction order (e.g. its
+        chunk index) to get the same result as aggregating all batches
+        concatenated in that order, whatever order they arrive in. Batches
+        folded without an order are treated as following everything folded
+        so far.
+
+        Args:
+            dataframe: Worker extractions with columns (dimension, value, timestamp)
+            order: Sortable position of the batch in extraction order
+        """
+        if dataframe.is_empty():
+            return
+        self.n_rows += dataframe.height
+        rows, _ = _measurement_rows([dataframe], self.categories)
+        rows = _expand_one_hot(rows, self.dim_info, self.categories).collect()
+        self.bucket_dtype = rows.schema["parsed_ts"]
+
+        for granularity, dim_names in self.dims_by_granularity.items():
+            if granularity is None:
+                dim_rows = rows.filter(pl.col("dimension").is_in(dim_names)).select(
+                    pl.lit(None).alias("time_bucket"), "dimension", "numeric_value", "parsed_ts"
+                )
+            else:
+                dim_rows = rows.filter(
+                    pl.col("parsed_ts").is_not_null() & pl.col("dimension").is_in(dim_names)
+                ).select(
+                    _truncate_to_granularity(pl.col("parsed_ts"), granularity).alias("time_bucket"),
+                    "dimension",
+                    "numeric_value",
+                    "parsed_ts",
+                )
+            groups = dim_rows.group_by("time_bucket", "dimension", maintain_order=True).agg(
+                "numeric_value", "parsed_ts"
+            )
+            states = self.states[granularity]
+            for time_bucket, dim_name, values, timestamps in groups.iter_rows():
+                aggregation = self.aggregation_of[dim_name]
+                state = states.get((time_bucket, dim_name))
+                if state is None:
+                    state = states[(time_bucket, dim_name)] = ONLINE_AGGREGATIONS[aggregation][0]()
+                if not AGGREGATION_METADATA[aggregation].ordered:
+                    state.add(values, order)
+                    continue
+                # One run sorted by timestamp and one of the rows without timestamps, which
+                # follow every timestamp; ties between batches are in extraction order
+                suffix = (order,) if order is not None else ()
+                timed = sorted(
+                    ((timestamp, value) for timestamp, value in zip(timestamps, values) if timestamp is not None),
+                    key=lambda pair: pair[0],
+                )
+                if timed:
+                    state.add([value for _, value in timed], (0, timed[0][0], *suffix), (0, timed[-1][0], *suffix))
+                state.add([value for timestamp, value in zip(timestamps, values) if timestamp is None],
+                          (1, *suffix), (1, *suffix))
+
+    def merge(self, other: "OnlineAggregator") -> None:
+        """Fold in the states of another aggregator over the same schema."""
+        for granularity, other_states in other.states.items():
+            states = self.states[granularity]
+            for key, other_state in other_states.items():
+                if key in states:
+                    states[key].merge(other_state)
+                else:
+                    states[key] = other_state
+        self.n_rows += other.n_rows
+        self.bucket_dtype = self.bucket_dtype or other.bucket_dtype
+
+    def result(self) -> dict[str, pl.DataFrame]:
+        """Aggregate the folded extractions.
+
+        Returns:
+            Same as aggregate_worker_measurements: granularity -> DataFrame
+            with 'time_bucket' and one column per dimension, and
+            'time_invariant' -> single-row DataFrame
+        """
+        results: dict[str, pl.DataFrame] = {}
+        for granularity, dim_names in self.dims_by_granularity.items():
+            values: dict[str, dict] = {}
+            for (time_bucket, dim_name), state in self.states[granularity].items():
+                finalize = ONLINE_AGGREGATIONS[self.aggregation_of[dim_name]][1]
+                values.setdefault(dim_name, {})[time_bucket] = finalize(state)
+            present = [dim_name for dim_name in dim_names if dim_name in values]
+            if not present:
+                continue
+
+            if granularity is None:
+                results["time_invariant"] = _decode_categories(
+                    pl.DataFrame({dim_name: [values[dim_name][None]] for dim_name in present}),
+                    self.dim_info,
+                    self.categories,
+                )
+                continue
+
+            buckets = sorted({bucket for dim_name in present for bucket in values[dim_name]})
+            results[granularity] = pl.DataFrame(
+                {"time_bucket": buckets} | {
+                    dim_name: [values[dim_name].get(bucket) for bucket in buckets] for dim_name in present
+                },
+                schema={"time_bucket": self.bucket_dtype} | {
+                    dim_name: ONLINE_AGGREGATIONS[self.aggregation_of[dim_name]][2] for dim_name in present
+                },
+            )
+            results[granularity] = _decode_categories(results[granularity], self.dim_info, self.categories)
+        return results
+
+    def rollup_cache(self) -> RollupCache:
+        """Rollup partials of the time-varying dimensions, from their states.
+
+        Count, sum, min and max come from the states of moment-based
+        aggregations, and first and last from those of ordered ones. The
+        other partial columns are null, so each dimension rolls up with the
+        decomposable aggregations its own state supports (see
+        RollupCache.roll_up). Rows are positioned by bucket, so first and
+        last of a coarser bucket come from its earliest and latest buckets.
+        """
+        rows = []
+        for granularity, states in self.states.items():
+            if granularity is None:
+                continue
+            positions = {bucket: i for i, bucket in enumerate(sorted({bucket for bucket, _ in states}))}
+            for (time_bucket, dim_name), state in states.items():
+                row = {"time_bucket": time_bucket, "dimension": dim_name, "first_row": positions[time_bucket],
+                       "last_row": positions[time_bucket]}
+                if isinstance(state, _Moments):
+                    row |= {"n": state.n, "sum": state.total, "min": state.minimum, "max": state.maximum}
+                elif isinstance(state, _Sequence):
+                    row |= {"first": state.first, "last": state.last}
+                else:
+                    continue
+                rows.append(row)
+        partials = pl.DataFrame(rows, schema={
+            "time_bucket": self.bucket_dtype or pl.Datetime, "dimension": pl.Utf8, "n": pl.UInt32,
+            "sum": pl.Float64, "min": pl.Float64, "max": pl.Float64, "first_row": pl.UInt32,
+            "first": pl.Float64, "last_row": pl.UInt32, "last": pl.Float64,
+        })
+        granularity_of = {
+            dim_name: info["causal_granularity"] for dim_name, info in self.dim_info.items()
+            if info["causal_granularity"]
+        }
+        return RollupCache(partials, granularity_of)
@@ -0,0 +1,37 @@
+"""OpenRouter provider that streams content deltas to the active content sink.
+
+Registered as `openrouter-stream` (see utils/streaming.py). Behaves exactly
+like Inspect's `openrouter` provider, except that calls made inside
+`stream_content(sink)` use `stream=True` and pass each content delta to the
+sink as it arrives; the chunks are accumulated into the same ChatCompletion
+the non-streaming path returns.
+"""
+
+from typing import Any
+
+from inspect_ai.model import GenerateConfig
+from inspect_ai.model._providers.openrouter import OpenRouterAPI
+from openai.lib.streaming.chat import ChatCompletionStreamState
+from openai.types.chat import ChatCompletion
+
+from causal_agent.utils.streaming import start_content_turn
+
+
+class StreamingOpenRouterAPI(OpenRouterAPI):
+    """OpenRouter chat completions, streamed when a content sink is installed."""
+
+    async def _generate_completion(self, request: dict[str, Any], config: GenerateConfig) -> ChatCompletion:
+        sink = start_content_turn()
+        if sink is None:
+            return await super()._generate_completion(request, config)
+
+        state = ChatCompletionStreamState()
+        stream = await self.client.chat.completions.create(
+            **request, stream=True, stream_options={"include_usage": True}
+        )
+        async for chunk in stream:
+            state.handle_chunk(chunk)
+            for choice in chunk.choices:
+                if choice.delta.content:
+                    await sink(choice.delta.content)
+        return state.get_final_completion()
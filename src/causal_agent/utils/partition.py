@@ -0,0 +1,196 @@
+"""Adaptive chunk partitions for stage 2 workers.
+
+A partition is an ordered list of [start, end) line ranges over a processed
+file. It starts out fixed-size (stage2_workers.chunk_size) and adapts to
+worker outcomes: chunks that time out, truncate or keep failing validation
+are split in half, and runs of adjacent chunks that yield no extractions are
+merged. Every split and merge is recorded so later runs on the same dataset
+start from the learned partition.
+"""
+
+import json
+from bisect import bisect_left
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from causal_agent.utils.data import DATA_DIR
+
+PARTITIONS_DIR = DATA_DIR / "partitions"
+
+# A [start, end) range of line indices
+Span = tuple[int, int]
+
+# Failures that mean a chunk is too large: it timed out, truncated, or its
+# output still failed validation after every retry ("invalid"). Other errors
+# (network, rate limits, provider outages) say nothing about its size and
+# leave the partition alone.
+SPLIT_REASONS = ("timeout", "truncated", "invalid")
+
+
+@dataclass
+class ChunkPartition:
+    """Ordered, contiguous line ranges covering a processed file."""
+
+    n_lines: int
+    spans: list[Span]
+    events: list[dict] = field(default_factory=list)
+
+    @classmethod
+    def fixed(cls, n_lines: int, chunk_size: int) -> "ChunkPartition":
+        """Create a fixed-size partition (same chunks as load_text_chunks)."""
+        spans = [(i, min(i + chunk_size, n_lines)) for i in range(0, n_lines, chunk_size)]
+        return cls(n_lines=n_lines, spans=spans)
+
+    def chunk_text(self, lines: list[str], span: Span) -> str:
+        """Join the lines of a span into a chunk."""
+        return "\n".join(lines[span[0] : span[1]])
+
+    def split(self, span: Span, reason: str) -> tuple[Span, Span]:
+        """Split a span in half, replacing it in the partition."""
+        start, end = span
+        mid = (start + end) // 2
+        halves = ((start, mid), (mid, end))
+        idx = self._index(span)
+        self.spans[idx : idx + 1] = list(halves)
+        self.events.append({"op": "split", "span": list(span), "into": [list(h) for h in halves], "reason": reason})
+        return halves
+
+    def merge(self, spans: list[Span], reason: str) -> Span:
+        """Merge adjacent spans into one, replacing them in the partition."""
+        merged = (spans[0][0], spans[-1][1])
+        idx = self._index(spans[0])
+        self.spans[idx : idx + len(spans)] = [merged]
+        self.events.append({"op": "merge", "spans": [list(s) for s in spans], "into": list(merged), "reason": reason})
+        return merged
+
+    def _index(self, span: Span) -> int:
+        idx = bisect_left(self.spans, span)
+        if idx == len(self.spans) or self.spans[idx] != span:
+            raise ValueError(f"Span {span} not in partition")
+        return idx
+
+    def save(self, path: Path) -> None:
+        """Persist the partition and its split/merge history as JSON."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({
+            "n_lines": self.n_lines,
+            "spans": [list(s) for s in self.spans],
+            "events": self.events,
+        }))
+
+    @classmethod
+    def load(cls, path: Path, n_lines: int) -> "ChunkPartition | None":
+        """Load a saved partition, or None if missing or the file changed length."""
+        if not path.exists():
+            return None
+        data = json.loads(path.read_text())
+        if data.get("n_lines") != n_lines:
+            return None
+        return cls(
+            n_lines=n_lines,
+            spans=[tuple(s) for s in data["spans"]],
+            events=data.get("events", []),
+        )
+
+
+def get_partition_path(input_path: Path, chunk_size: int) -> Path:
+    """Path of the learned partition for a processed file and base chunk size."""
+    return PARTITIONS_DIR / f"{input_path.stem}.chunk{chunk_size}.json"
+
+
+class AdaptiveScheduler:
+    """Hands out partition spans to workers and adapts them to outcomes.
+
+    - Spans that time out, truncate or keep failing validation (SPLIT_REASONS)
+      are split in half and requeued at the front, down to min_size lines.
+    - A pending span that directly follows merge_after completed empty spans
+      is merged with its pending successors up to max_size lines.
+    - On finish(), remaining runs of adjacent empty spans are merged so the
+      next run starts from the coarser partition.
+
+    Spans produced by a failure split are never merged back together.
+    """
+
+    def __init__(
+        self,
+        partition: ChunkPartition,
+        min_size: int,
+        max_size: int,
+        merge_after: int = 2,
+    ):
+        self.partition = partition
+        self.min_size = min_size
+        self.max_size = max_size
+        self.merge_after = merge_after
+        self.pending: deque[Span] = deque(partition.spans)
+        self._empty_by_end: dict[int, Span] = {}
+        self._split: set[Span] = set()
+
+    def has_pending(self) -> bool:
+        return bool(self.pending)
+
+    def next_span(self) -> Span:
+        """Pop the next span to dispatch, merging it if it sits in a sparse region."""
+        span = self.pending.popleft()
+        if span in self._split or not self._follows_empty_run(span):
+            return span
+
+        run = [span]
+        while (
+            self.pending
+            and self.pending[0] not in self._split
+            and self.pending[0][0] == run[-1][1]
+            and self.pending[0][1] - run[0][0] <= self.max_size
+        ):
+            run.append(self.pending.popleft())
+        if len(run) == 1:
+            return span
+        return self.partition.merge(run, reason="sparse")
+
+    def _follows_empty_run(self, span: Span) -> bool:
+        count, boundary = 0, span[0]
+        while boundary in self._empty_by_end and count < self.merge_after:
+            count += 1
+            boundary = self._empty_by_end[boundary][0]
+        return count >= self.merge_after
+
+    def report_success(self, span: Span, n_extractions: int) -> None:
+        """Record a completed span."""
+        if n_extractions == 0:
+            self._empty_by_end[span[1]] = span
+
+    def report_failure(self, span: Span, reason: str) -> bool:
+        """Record a failed span, splitting and requeueing it if possible.
+
+        Returns:
+            True if the span was split and requeued, False if the failure is
+            not a SPLIT_REASONS one or the span is too small
+        """
+        if reason not in SPLIT_REASONS or span[1] - span[0] < 2 * self.min_size:
+            return False
+        left, right = self.partition.split(span, reason=reason)
+        self._split.update((left, right))
+        self.pending.appendleft(right)
+        self.pending.appendleft(left)
+        return True
+
+    def finish(self) -> ChunkPartition:
+        """Merge runs of adjacent empty spans and return the learned partition."""
+        empty = set(self._empty_by_end.values()) - self._split
+        spans = list(self.partition.spans)
+        run: list[Span] = []
+        for span in spans + [None]:
+            extends = (
+                span in empty
+                and run
+                and run[-1][1] == span[0]
+                and span[1] - run[0][0] <= self.max_size
+            )
+            if extends:
+                run.append(span)
+                continue
+            if len(run) > 1:
+                self.partition.merge(run, reason="empty")
+            run = [span] if span in empty else []
+        return self.partition
@@ -0,0 +1,329 @@
+"""Process-wide rate limiting, circuit breaking and retries for model calls.
+
+Every model call made through multi_turn_generate goes through
+`limited_generate`, which shares one `ProviderLimiter` per provider/model
+across the process (orchestrator, workers, eval judges, prior elicitation):
+
+- Token buckets cap requests and tokens per minute. A call reserves one
+  request and its estimated prompt tokens before it is sent, and is charged
+  the rest of its reported usage afterwards.
+- A circuit breaker opens after consecutive transient failures. While it is
+  open, calls fail fast with CircuitOpenError. After `breaker_reset_seconds`
+  one probe call is let through, and its outcome closes or re-opens the
+  circuit.
+- Transient errors (those the provider's `should_retry` accepts: 429s, 5xx,
+  timeouts) are retried here rather than by Inspect, with full-jitter
+  exponential backoff. A Retry-After sent by the provider is honored and
+  pauses every call to that provider, not just the one that received it.
+- A call with a latency budget (`config.timeout`, from its generation
+  profile) is cancelled once the budget is spent, retries included, and
+  fails with LatencyBudgetExceededError.
+
+Limits come from the `rate_limits` block in config.yaml. Prefect runs tasks in
+threads, each with its own event loop, so the shared state here is guarded
+with threading locks and waiting is done with plain asyncio sleeps.
+"""
+
+import asyncio
+import email.utils
+import random
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from inspect_ai.model import GenerateConfig, Model, ModelOutput
+from inspect_ai.tool import Tool
+from tenacity import RetryError
+
+from causal_agent.utils.config import RateLimit, get_config
+
+if TYPE_CHECKING:
+    from inspect_ai.model import ChatMessage
+
+
+class LatencyBudgetExceededError(TimeoutError):
+    """Raised when a call, retries included, overruns its latency budget."""
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit is open."""
+
+    def __init__(self, key: str, retry_in: float):
+        super().__init__(f"Circuit open for {key}: failing fast, next probe in {retry_in:.0f}s")
+        self.key = key
+        self.retry_in = retry_in
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilling at a fixed rate.
+
+    Reservations may overdraw the bucket; the caller then waits until the
+    deficit has refilled, so concurrent callers are spaced out in the order
+    they reserved.
+    """
+
+    def __init__(self, per_minute: float, capacity: float | None = None):
+        """
+        Args:
+            per_minute: Refill rate
+            capacity: Burst size (default: one minute's worth)
+        """
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self._level = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take an amount from the bucket and return the seconds to wait before using it."""
+        with self._lock:
+            self._refill()
+            self._level -= amount
+            return max(0.0, -self._level / self.rate)
+
+    def adjust(self, amount: float) -> None:
+        """Charge (or refund, if negative) an amount after the fact, without waiting."""
+        with self._lock:
+            self._refill()
+            self._level = min(self.capacity, self._level - amount)
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker: closed -> open -> half-open -> closed."""
+
+    def __init__(self, failures: int = 5, reset_seconds: float = 60.0):
+        """
+        Args:
+            failures: Consecutive transient failures that open the circuit
+            reset_seconds: How long the circuit stays open before a probe is let through
+        """
+        self.failure_threshold = failures
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> float | None:
+        """None if a call may proceed, else the seconds until the next probe."""
+        with self._lock:
+            if self.state == "closed":
+                return None
+            retry_in = self._opened_at + self.reset_seconds - time.monotonic()
+            if self.state == "open" and retry_in <= 0:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return None
+            return max(0.0, retry_in)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == "half_open" or (
+                self.state == "closed" and self.consecutive_failures >= self.failure_threshold
+            ):
+                self.state = "open"
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self) -> None:
+        """Forget a call that ended without an outcome (e.g. a cancelled hedge)."""
+        with self._lock:
+            self._probing = False
+
+
+class ProviderLimiter:
+    """Rate limits, circuit breaker and Retry-After pause of one provider/model."""
+
+    def __init__(self, key: str, limits: RateLimit, breaker: CircuitBreaker):
+        self.key = key
+        self.requests = TokenBucket(limits.requests_per_minute) if limits.requests_per_minute else None
+        self.tokens = TokenBucket(limits.tokens_per_minute) if limits.tokens_per_minute else None
+        self.breaker = breaker
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        """Wait until one request of about `estimated_tokens` prompt tokens may be sent.
+
+        Raises:
+            CircuitOpenError: If the provider's circuit is open
+        """
+        retry_in = self.breaker.before_call()
+        if retry_in is not None:
+            raise CircuitOpenError(self.key, retry_in)
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.reserve(estimated_tokens))
+        with self._lock:
+            wait = max(wait, self._paused_until - time.monotonic())
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Hold off every call to this provider for a while (e.g. on Retry-After)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def record_usage(self, tokens: int) -> None:
+        """Charge tokens used beyond (or refund tokens short of) the reserved estimate."""
+        if self.tokens is not None:
+            self.tokens.adjust(tokens)
+
+
+_limiters: dict[str, ProviderLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(model_name: str) -> ProviderLimiter:
+    """Get the process-wide limiter of a provider/model, creating it on first use."""
+    with _limiters_lock:
+        if model_name not in _limiters:
+            config = get_config().rate_limits
+            _limiters[model_name] = ProviderLimiter(
+                model_name,
+                config.limits_for(model_name),
+                CircuitBreaker(config.breaker_failures, config.breaker_reset_seconds),
+            )
+        return _limiters[model_name]
+
+
+def retry_after_seconds(error: BaseException) -> float | None:
+    """Retry-After carried by a provider error, in seconds, if any."""
+    retry_after = getattr(error, "retry_after", None)
+    if isinstance(retry_after, (int, float)):
+        return float(retry_after)
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value) * scale)
+        except ValueError:
+            pass
+        try:
+            date = email.utils.parsedate_to_datetime(value)  # HTTP-date form
+        except (TypeError, ValueError):
+            continue
+        return max(0.0, date.timestamp() - time.time())
+    return None
+
+
+def backoff_delay(attempt: int, base: float, maximum: float, retry_after: float | None = None) -> float:
+    """Full-jitter exponential backoff before retry `attempt` (0-based), at least `retry_after`."""
+    delay = random.uniform(0.0, min(maximum, base * 2**attempt))
+    return max(delay, retry_after) if retry_after is not None else delay
+
+
+def estimate_tokens(messages: list["ChatMessage"]) -> int:
+    """Rough prompt size in tokens (about 4 characters per token)."""
+    return sum(len(message.text) for message in messages) // 4
+
+
+async def _within_budget(coroutine, deadline: float | None, budget: float | None):
+    """Await a model call, cancelling it at a monotonic deadline."""
+    if deadline is None:
+        return await coroutine
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        coroutine.close()
+        raise LatencyBudgetExceededError(f"Latency budget of {budget}s spent before the call")
+    try:
+        return await asyncio.wait_for(coroutine, remaining)
+    except TimeoutError as e:
+        if time.monotonic() < deadline:
+            raise  # The provider's own timeout
+        raise LatencyBudgetExceededError(f"Call cancelled after its latency budget of {budget}s") from e
+
+async def limited_generate(
+    model: Model,
+    messages: list["ChatMessage"],
+    tools: list[Tool] | None = None,
+    config: GenerateConfig | None = None,
+) -> ModelOutput:
+    """Call model.generate under the provider's shared limits, retrying transient errors.
+
+    Retries stop after `config.max_retries` (default: `rate_limits.max_retries`)
+    or when the next backoff would overrun `config.timeout` (the generation
+    profile's latency budget). An attempt still running when the budget is
+    spent is cancelled.
+
+    Args:
+        model: The model to call
+        messages: Conversation to send
+        tools: Tools available to the model
+        config: Generation config
+
+    Returns:
+        The model output
+
+    Raises:
+        CircuitOpenError: If the provider's circuit is open
+        LatencyBudgetExceededError: If the call overruns `config.timeout`
+        Exception: The last transient error once retries are exhausted, or
+            any non-transient error immediately
+    """
+    config = config or GenerateConfig()
+    tools = tools or []
+    settings = get_config().rate_limits
+    deadline = time.monotonic() + config.timeout if config.timeout is not None else None
+    if not settings.enabled:
+        return await _within_budget(model.generate(messages, tools=tools, config=config), deadline, config.timeout)
+
+    limiter = get_limiter(str(model))
+    max_retries = config.max_retries if config.max_retries is not None else settings.max_retries
+    call_config = config.merge(GenerateConfig(max_retries=0))  # Retries happen here, not in Inspect
+    estimate = estimate_tokens(messages)
+    attempt = 0
+    while True:
+        await limiter.acquire(estimate)
+        try:
+            output = await _within_budget(
+                model.generate(messages, tools=tools, config=call_config), deadline, config.timeout
+            )
+        except LatencyBudgetExceededError:
+            limiter.breaker.release()  # Cancelled by the caller's budget, not failed by the provider
+            raise
+        except RetryError as e:
+            # Inspect gave up on an error its provider deems transient
+            error = e.last_attempt.exception()
+        except asyncio.CancelledError:
+            limiter.breaker.release()
+            raise
+        except Exception:
+            limiter.breaker.record_success()  # The provider is up; the request itself failed
+            raise
+        else:
+            limiter.breaker.record_success()
+            if output.usage is not None:
+                limiter.record_usage(output.usage.input_tokens + output.usage.output_tokens - estimate)
+            return output
+
+        limiter.breaker.record_failure()
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            limiter.pause(retry_after)
+        delay = backoff_delay(attempt, settings.backoff_base_seconds, settings.backoff_max_seconds, retry_after)
+        if attempt >= max_retries or (deadline is not None and time.monotonic() + delay > deadline):
+            raise error
+        attempt += 1
+        await asyncio.sleep(delay)
+
@@ -0,0 +1,137 @@
+"""Hierarchical rollups: derive coarser time buckets from finer partial aggregates.
+
+aggregate_worker_measurements computes partial aggregates of every
+time-varying dimension once, at its causal_granularity (the finest
+granularity it is requested at): per (time_bucket, dimension) the count,
+sum, min, max, and the first and last values with their row positions.
+Decomposable aggregations (ROLLUP_AGGREGATIONS) are read off these partials
+instead of scanning raw rows a second time; the others (quantiles, moments,
+entropy, n_unique, instability, trend) still scan raw rows.
+
+The partials of a run are cached as a `RollupCache` (data/runs/<run_id>/
+rollup.parquet). Modeling stages roll a dimension up to any coarser
+granularity from the cache, e.g. sum hourly steps per day for a
+cross-timescale edge, without the raw extractions. A coarser bucket can
+only be rolled up from finer buckets that each lie entirely within it, so
+weekly buckets do not roll up into months (see can_roll_up).
+"""
+
+import json
+from pathlib import Path
+
+import polars as pl
+
+from causal_agent.utils.aggregations import _truncate_to_granularity
+
+# Finest to coarsest
+GRANULARITY_ORDER = ["hourly", "daily", "weekly", "monthly", "yearly"]
+
+# Partial aggregates per (time_bucket, dimension), from raw rows with a "row" index
+PARTIAL_EXPRS = [
+    pl.col("numeric_value").count().alias("n"),
+    pl.col("numeric_value").sum().alias("sum"),
+    pl.col("numeric_value").min().alias("min"),
+    pl.col("numeric_value").max().alias("max"),
+    pl.col("row").first().alias("first_row"),
+    pl.col("numeric_value").first().alias("first"),
+    pl.col("row").last().alias("last_row"),
+    pl.col("numeric_value").last().alias("last"),
+]
+
+# Partials of coarser buckets, from finer partials
+MERGE_EXPRS = [
+    pl.col("n").sum(),
+    pl.col("sum").sum(),
+    pl.col("min").min(),
+    pl.col("max").max(),
+    pl.col("first_row").min(),
+    pl.col("first").get(pl.col("first_row").arg_min()),
+    pl.col("last_row").max(),
+    pl.col("last").get(pl.col("last_row").arg_max()),
+]
+
+# Decomposable aggregation -> final value from (merged) partials
+ROLLUP_AGGREGATIONS: dict[str, pl.Expr] = {
+    "sum": pl.col("sum"),
+    "count": pl.col("n").cast(pl.UInt32),
+    "one_hot": pl.col("n").cast(pl.UInt32),  # Count of a category's indicator
+    "mean": pl.when(pl.col("n") > 0).then(pl.col("sum") / pl.col("n")),
+    "min": pl.col("min"),
+    "max": pl.col("max"),
+    "range": pl.col("max") - pl.col("min"),
+    "first": pl.col("first"),
+    "last": pl.col("last"),
+}
+
+
+def can_roll_up(finer: str, coarser: str) -> bool:
+    """Whether every `finer` bucket lies within a single `coarser` bucket."""
+    if finer == coarser:
+        return True
+    if GRANULARITY_ORDER.index(finer) > GRANULARITY_ORDER.index(coarser):
+        return False
+    # Weeks straddle month and year boundaries
+    return finer != "weekly"
+
+
+def roll_up_partials(partials: pl.DataFrame, granularity: str) -> pl.DataFrame:
+    """Merge (time_bucket, dimension) partials into coarser `granularity` buckets."""
+    return (
+        partials.with_columns(_truncate_to_granularity(pl.col("time_bucket"), granularity))
+        .group_by("time_bucket", "dimension")
+        .agg(MERGE_EXPRS)
+    )
+
+
+class RollupCache:
+    """Partial aggregates of a run's time-varying dimensions at their causal_granularity."""
+
+    def __init__(self, partials: pl.DataFrame, granularity_of: dict[str, str]):
+        """
+        Args:
+            partials: One row per (time_bucket, dimension) with the PARTIAL_EXPRS columns
+            granularity_of: Dimension name -> granularity of its time buckets
+        """
+        self.partials = partials
+        self.granularity_of = granularity_of
+
+    def roll_up(self, dimension: str, aggregation: str, granularity: str) -> pl.DataFrame:
+        """A dimension aggregated to a granularity at or above its cached one.
+
+        Args:
+            dimension: Dimension name
+            aggregation: A decomposable aggregation (key of ROLLUP_AGGREGATIONS)
+            granularity: Target granularity
+
+        Returns:
+            DataFrame (time_bucket, <dimension>) sorted by time_bucket
+
+        Raises:
+            ValueError: If the dimension is not cached, the aggregation is not
+                decomposable, or the target granularity cannot be rolled up
+                from the cached one
+        """
+        if dimension not in self.granularity_of:
+            raise ValueError(f"No rollups for dimension '{dimension}'")
+        if aggregation not in ROLLUP_AGGREGATIONS:
+            available = ", ".join(sorted(ROLLUP_AGGREGATIONS))
+            raise ValueError(f"Aggregation '{aggregation}' cannot be rolled up. Available: {available}")
+        cached = self.granularity_of[dimension]
+        if not can_roll_up(cached, granularity):
+            raise ValueError(f"Cannot roll {cached} buckets of '{dimension}' up to {granularity}")
+        partials = self.partials.filter(pl.col("dimension") == dimension)
+        if granularity != cached:
+            partials = roll_up_partials(partials, granularity)
+        return partials.select("time_bucket", ROLLUP_AGGREGATIONS[aggregation].alias(dimension)).sort("time_bucket")
+
+    def save(self, path: Path) -> None:
+        """Write the partials to a Parquet file (granularities kept in its metadata)."""
+        self.partials.write_parquet(path, metadata={"granularity_of": json.dumps(self.granularity_of)})
+
+    @classmethod
+    def load(cls, path: Path) -> "RollupCache | None":
+        """Read a cache written by save, or None if there is none."""
+        if not path.exists():
+            return None
+        granularity_of = json.loads(pl.read_parquet_metadata(path)["granularity_of"])
+        return cls(pl.read_parquet(path), granularity_of)
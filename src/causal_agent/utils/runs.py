@@ -0,0 +1,157 @@
+"""Per-run artifact directories.
+
+Each pipeline run gets a directory under data/runs/<run_id>/ holding the
+inputs needed to resume or re-drive stage 2 (question, schema) and its
+outputs (raw extractions and optional Parquet shards of them, dead-lettered chunks, per-bucket coverage,
+partial time series streamed while workers run, the rollup cache of partial aggregates, and the
+aggregated measurements as memory-mappable Arrow IPC files).
+"""
+
+import json
+from datetime import datetime
+from pathlib import Path
+
+import polars as pl
+
+from causal_agent.utils.aggregations import _coerce_to_numeric, _value_text
+from causal_agent.utils.data import DATA_DIR
+from causal_agent.utils.measurements import MeasurementSet
+from causal_agent.utils.rollup import RollupCache
+
+RUNS_DIR = DATA_DIR / "runs"
+
+QUESTION_FILE = "question.txt"
+SCHEMA_FILE = "schema.json"
+EXTRACTIONS_FILE = "extractions.jsonl"
+SHARDS_DIR = "extractions"
+SHARD_FILE = "shard_{index:06d}.parquet"
+DEAD_LETTERS_FILE = "dead_letters.jsonl"
+COVERAGE_FILE = "coverage_{granularity}.csv"
+PARTIAL_FILE = "partial_{granularity}.csv"
+ROLLUP_FILE = "rollup.parquet"
+MEASUREMENTS_DIR = "measurements"
+
+# Same schema as WorkerOutput.to_dataframe()
+EXTRACTION_SCHEMA = {"dimension": pl.Utf8, "value": pl.Object, "timestamp": pl.Utf8}
+# Parquet cannot hold Object columns: shards keep the value as text next to its numeric coercion
+SHARD_SCHEMA = {"dimension": pl.Utf8, "value": pl.Utf8, "numeric_value": pl.Float64, "timestamp": pl.Utf8}
+
+
+def new_run_id() -> str:
+    """Generate a timestamp-based run id."""
+    return datetime.now().strftime("%Y%m%d_%H%M%S")
+
+
+def get_run_dir(run_id: str) -> Path:
+    """Directory for a run's artifacts (not created)."""
+    return RUNS_DIR / run_id
+
+
+def init_run_dir(run_id: str, question: str, schema: dict) -> Path:
+    """Create a run directory and save the question and schema."""
+    run_dir = get_run_dir(run_id)
+    run_dir.mkdir(parents=True, exist_ok=True)
+    (run_dir / QUESTION_FILE).write_text(question)
+    (run_dir / SCHEMA_FILE).write_text(json.dumps(schema, indent=2))
+    return run_dir
+
+
+def load_run_inputs(run_dir: Path) -> tuple[str, dict]:
+    """Load the question and schema saved for a run.
+
+    Raises:
+        FileNotFoundError: If the run directory was not initialized
+    """
+    question_path = run_dir / QUESTION_FILE
+    if not question_path.exists():
+        raise FileNotFoundError(f"Run not found: {run_dir}")
+    schema = json.loads((run_dir / SCHEMA_FILE).read_text())
+    return question_path.read_text(), schema
+
+
+def append_extractions(run_dir: Path, dataframes: list[pl.DataFrame]) -> int:
+    """Append worker extraction rows (dimension, value, timestamp) to the run log.
+
+    Returns:
+        Number of rows written
+    """
+    n_rows = 0
+    with open(run_dir / EXTRACTIONS_FILE, "a") as f:
+        for df in dataframes:
+            for row in df.iter_rows(named=True):
+                f.write(json.dumps(row) + "\n")
+                n_rows += 1
+    return n_rows
+
+
+def load_extractions(run_dir: Path) -> pl.DataFrame:
+    """Load all logged extractions of a run as one DataFrame."""
+    path = run_dir / EXTRACTIONS_FILE
+    if not path.exists():
+        return pl.DataFrame(schema=EXTRACTION_SCHEMA)
+    with open(path) as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    if not rows:
+        return pl.DataFrame(schema=EXTRACTION_SCHEMA)
+    return pl.DataFrame(rows, schema=EXTRACTION_SCHEMA)
+
+
+def write_extraction_shards(run_dir: Path, dataframes: list[pl.DataFrame], first_index: int | None = None) -> int:
+    """Write each worker's extractions as one Parquet shard under the run's shard directory.
+
+    Shards are numbered on from the ones already there, so re-driven chunks
+    append to earlier results. Aggregate them out of core with
+    aggregate_worker_measurements(run_dir / SHARDS_DIR, schema).
+
+    Args:
+        run_dir: Run directory
+        dataframes: Worker extraction DataFrames; empty ones get no shard
+        first_index: Number of the first shard (default: count of existing
+            shards), for callers writing one shard at a time
+
+    Returns:
+        Number of rows written
+    """
+    shard_dir = run_dir / SHARDS_DIR
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    index = first_index if first_index is not None else len(list(shard_dir.glob("*.parquet")))
+    n_rows = 0
+    for df in dataframes:
+        if df.is_empty():
+            continue
+        pl.DataFrame({
+            "dimension": df["dimension"],
+            "value": [_value_text(value) for value in df["value"].to_list()],
+            "numeric_value": _coerce_to_numeric(df["value"]),
+            "timestamp": df["timestamp"],
+        }, schema=SHARD_SCHEMA).write_parquet(shard_dir / SHARD_FILE.format(index=index))
+        index += 1
+        n_rows += df.height
+    return n_rows
+
+
+def save_coverage(run_dir: Path, coverage: dict[str, pl.DataFrame]) -> None:
+    """Write per-bucket coverage tables (one CSV per granularity)."""
+    for granularity, df in coverage.items():
+        df.write_csv(run_dir / COVERAGE_FILE.format(granularity=granularity))
+
+
+def save_partial_measurements(run_dir: Path, measurements: dict[str, pl.DataFrame]) -> None:
+    """Write partial time series aggregated from streamed extractions (one CSV per granularity)."""
+    for granularity, df in measurements.items():
+        df.write_csv(run_dir / PARTIAL_FILE.format(granularity=granularity))
+
+
+def load_rollup_cache(run_dir: Path) -> RollupCache | None:
+    """Partial aggregates saved when the run's measurements were aggregated, if any."""
+    return RollupCache.load(run_dir / ROLLUP_FILE)
+
+
+def save_measurements(run_dir: Path, measurements: MeasurementSet) -> None:
+    """Write aggregated measurements as Arrow IPC files (one per granularity)."""
+    measurements.save(run_dir / MEASUREMENTS_DIR)
+
+
+def load_measurements(run_dir: Path) -> MeasurementSet | None:
+    """Memory-map the run's aggregated measurements, if they were saved."""
+    return MeasurementSet.load(run_dir / MEASUREMENTS_DIR)
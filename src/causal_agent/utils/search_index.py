@@ -0,0 +1,170 @@
+"""Local BM25 index over processed lines, for question-aware stage 1 samples.
+
+Stage 1 shows the orchestrator a few chunks of the dataset. The first chunks
+are its oldest records and often unrelated to the question. A LineIndex is
+an inverted index (term -> lines with term frequencies) over a processed
+file, built once with Polars and saved to data/indexes/ with a hash of the
+lines it indexes. question_aware_sample scores every chunk against the
+question with BM25 and mixes the most relevant chunks with chunks spread
+evenly over the file, so the sample is on topic and still covers the whole
+time range.
+"""
+
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+
+import polars as pl
+
+from causal_agent.utils.data import DATA_DIR, load_lines
+
+INDEXES_DIR = DATA_DIR / "indexes"
+
+# Lowercase alphanumeric runs; timestamps tokenize into numbers common to many lines (low idf)
+TOKEN_PATTERN = r"[a-z0-9]+"
+STOPWORDS = frozenset(
+    "a an and are as at be by did do does for from how i in is it my of on or that the this to was what "
+    "when where which who why will with".split()
+)
+
+# BM25 parameters (the usual defaults)
+K1 = 1.5
+B = 0.75
+
+
+def lines_fingerprint(lines: list[str]) -> str:
+    """Content hash of a file's lines, saved with its index to detect a reprocessed file."""
+    return hashlib.sha256("\n".join(lines).encode()).hexdigest()
+
+
+def tokenize(text: str) -> list[str]:
+    """Terms of a query, as the index tokenizes lines."""
+    terms = pl.Series([text]).str.to_lowercase().str.extract_all(TOKEN_PATTERN)[0].to_list()
+    return [term for term in terms if term not in STOPWORDS]
+
+
+@dataclass(frozen=True)
+class LineIndex:
+    """BM25 inverted index over the lines of a processed file."""
+
+    n_lines: int
+    postings: pl.DataFrame  # term, line (UInt32), tf (UInt32)
+    fingerprint: str = ""  # lines_fingerprint of the indexed lines
+
+    @classmethod
+    def build(cls, lines: list[str]) -> "LineIndex":
+        """Index lines (line numbers are positions in the list)."""
+        terms = (
+            pl.DataFrame({"text": lines}, schema={"text": pl.String})
+            .with_row_index("line")
+            .select("line", pl.col("text").str.to_lowercase().str.extract_all(TOKEN_PATTERN).alias("term"))
+            .explode("term")
+            .filter(pl.col("term").is_not_null() & ~pl.col("term").is_in(list(STOPWORDS)))
+        )
+        postings = terms.group_by("term", "line").agg(pl.len().cast(pl.UInt32).alias("tf")).sort("term", "line")
+        return cls(n_lines=len(lines), postings=postings, fingerprint=lines_fingerprint(lines))
+
+    def score_lines(self, query: str) -> pl.DataFrame:
+        """BM25 score of every line matching a query term.
+
+        Returns:
+            DataFrame (line, score) of the lines with a score above zero
+        """
+        terms = sorted(set(tokenize(query)))
+        if not terms or self.n_lines == 0:
+            return pl.DataFrame(schema={"line": pl.UInt32, "score": pl.Float64})
+        # Line lengths in terms are the sums of their term frequencies
+        lengths = self.postings.group_by("line").agg(pl.col("tf").sum().alias("length"))
+        average_length = self.postings["tf"].sum() / self.n_lines
+        return (
+            self.postings.filter(pl.col("term").is_in(terms))
+            .with_columns(pl.len().over("term").alias("df"))
+            .join(lengths, on="line")
+            .with_columns(
+                (
+                    ((self.n_lines - pl.col("df") + 0.5) / (pl.col("df") + 0.5) + 1).log()
+                    * pl.col("tf") * (K1 + 1)
+                    / (pl.col("tf") + K1 * (1 - B + B * pl.col("length") / average_length))
+                ).alias("score")
+            )
+            .group_by("line")
+            .agg(pl.col("score").sum())
+            .sort("line")
+        )
+
+    def score_chunks(self, query: str, chunk_size: int) -> list[float]:
+        """Summed BM25 score of each chunk of chunk_size lines (as load_text_chunks splits them)."""
+        n_chunks = -(-self.n_lines // chunk_size)
+        by_chunk = dict(
+            self.score_lines(query)
+            .group_by((pl.col("line") // chunk_size).alias("chunk"))
+            .agg(pl.col("score").sum())
+            .iter_rows()
+        )
+        return [by_chunk.get(chunk, 0.0) for chunk in range(n_chunks)]
+
+    def save(self, path: Path) -> None:
+        """Write the postings to a Parquet file (line count and fingerprint kept in its metadata)."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.postings.write_parquet(path, metadata={"n_lines": str(self.n_lines), "fingerprint": self.fingerprint})
+
+    @classmethod
+    def load(cls, path: Path, lines: list[str]) -> "LineIndex | None":
+        """Read the index of lines written by save, or None if missing or the file changed."""
+        if not path.exists():
+            return None
+        metadata = pl.read_parquet_metadata(path)
+        # Same name and length is not enough: a reprocessed file must not reuse stale postings
+        if int(metadata["n_lines"]) != len(lines):
+            return None
+        fingerprint = lines_fingerprint(lines)
+        if metadata.get("fingerprint") != fingerprint:
+            return None
+        return cls(n_lines=len(lines), postings=pl.read_parquet(path), fingerprint=fingerprint)
+
+
+def get_index_path(input_path: Path) -> Path:
+    """Path of the saved index of a processed file."""
+    return INDEXES_DIR / f"{input_path.stem}.bm25.parquet"
+
+
+def load_or_build_index(input_path: Path, lines: list[str] | None = None) -> LineIndex:
+    """The saved index of a processed file, built and saved on first use."""
+    lines = lines if lines is not None else load_lines(input_path)
+    path = get_index_path(input_path)
+    index = LineIndex.load(path, lines)
+    if index is None:
+        index = LineIndex.build(lines)
+        index.save(path)
+    return index
+
+
+def coverage_sample(n_chunks: int, n: int, exclude: set[int] | frozenset[int] = frozenset()) -> list[int]:
+    """Up to n chunk indices spread evenly over time, skipping excluded chunks.
+
+    The free (non-excluded) chunks are cut into n equal segments and the
+    middle chunk of each is picked, so exactly min(n, free chunks) are returned.
+    """
+    free = [chunk for chunk in range(n_chunks) if chunk not in exclude]
+    n = min(n, len(free))
+    return [free[(i * len(free) // n + (i + 1) * len(free) // n) // 2] for i in range(n)]
+
+
+def question_aware_sample(scores: list[float], n: int, relevant_fraction: float = 0.5) -> list[int]:
+    """Indices of n chunks: the most relevant to the question plus time-stratified coverage.
+
+    Args:
+        scores: Relevance of each chunk (e.g. LineIndex.score_chunks)
+        n: Number of chunks to pick
+        relevant_fraction: Share of the sample picked by relevance; chunks
+            without any match are never picked by relevance
+
+    Returns:
+        Chunk indices in file order
+    """
+    n = min(n, len(scores))
+    n_relevant = round(n * relevant_fraction)
+    ranked = sorted((chunk for chunk, score in enumerate(scores) if score > 0), key=lambda chunk: -scores[chunk])
+    relevant = set(ranked[:n_relevant])
+    coverage = coverage_sample(len(scores), n - len(relevant), exclude=relevant)
+    return sorted(relevant | set(coverage))
@@ -0,0 +1,195 @@
+"""Mergeable sketches for online aggregation (see utils/online_aggregation.py).
+
+- `TDigest` estimates quantiles (median, percentiles, IQR) in memory bounded
+  by its compression.
+- `HyperLogLog` estimates the number of distinct values in a fixed number of
+  registers.
+
+Both stay exact while they hold few values (the digest keeps raw values, the
+HyperLogLog a set of hashes) and switch to the sketch once they outgrow that,
+so sparse time buckets are reported exactly. Both can be merged with another
+instance of the same parameters, e.g. partial states built in different
+threads or processes.
+"""
+
+import math
+import struct
+
+import polars as pl
+
+
+class TDigest:
+    """Merging t-digest (Dunning & Ertl) over floats; nulls are ignored."""
+
+    def __init__(self, compression: float = 100.0):
+        """
+        Args:
+            compression: Size parameter; about `compression` centroids are kept
+                and the rank error shrinks as it grows
+        """
+        self.compression = compression
+        self.buffer: list[float] = []
+        self.means: list[float] = []
+        self.weights: list[float] = []
+        self.count = 0
+
+    @property
+    def exact(self) -> bool:
+        """Whether no values have been merged into centroids yet."""
+        return not self.means
+
+    def add(self, values: list[float | None]) -> None:
+        """Add values (None and NaN are skipped)."""
+        for value in values:
+            if value is not None and value == value:
+                self.buffer.append(value)
+                self.count += 1
+        if len(self.buffer) > 5 * self.compression:
+            self._compress()
+
+    def merge(self, other: "TDigest") -> None:
+        """Fold another digest into this one."""
+        self.buffer.extend(other.buffer)
+        self.count += other.count
+        if other.means:
+            self._compress(list(zip(other.means, other.weights)))
+        elif len(self.buffer) > 5 * self.compression:
+            self._compress()
+
+    def _compress(self, extra: list[tuple[float, float]] | None = None) -> None:
+        points = sorted(
+            list(zip(self.means, self.weights)) + (extra or []) + [(value, 1.0) for value in self.buffer]
+        )
+        self.buffer = []
+        total = sum(weight for _, weight in points)
+        means, weights = [], []
+        cumulative = 0.0
+        limit = self._weight_limit(0.0, total)
+        for mean, weight in points:
+            if means and cumulative + weight <= limit:
+                # Merge into the current centroid
+                weights[-1] += weight
+                means[-1] += (mean - means[-1]) * weight / weights[-1]
+            else:
+                if means:
+                    limit = self._weight_limit(cumulative, total)
+                means.append(mean)
+                weights.append(weight)
+            cumulative += weight
+        self.means, self.weights = means, weights
+
+    def _weight_limit(self, cumulative: float, total: float) -> float:
+        """Cumulative weight at which the centroid starting at `cumulative` must close (k1 scale)."""
+        q = cumulative / total
+        k = self.compression / (2 * math.pi) * math.asin(2 * q - 1) + self.compression / 4
+        if k + 1 >= self.compression / 2:
+            return total
+        q_next = (math.sin(2 * math.pi * (k + 1) / self.compression - math.pi / 2) + 1) / 2
+        return max(q_next, q) * total
+
+    def quantile(self, q: float, interpolation: str = "nearest") -> float | None:
+        """Estimate the q-quantile (0-1), or None if no values were added.
+
+        While the digest is exact this is Polars' quantile with the given
+        interpolation; afterwards it interpolates between centroids.
+        """
+        if self.count == 0:
+            return None
+        if self.exact:
+            return pl.Series(self.buffer, dtype=pl.Float64).quantile(q, interpolation=interpolation)
+        if self.buffer:
+            self._compress()
+        if len(self.means) == 1:
+            return self.means[0]
+        target = q * self.count
+        cumulative = 0.0
+        for i, weight in enumerate(self.weights):
+            center = cumulative + weight / 2
+            if target < center:
+                if i == 0:
+                    return self.means[0]
+                previous_center = cumulative - self.weights[i - 1] / 2
+                t = (target - previous_center) / (center - previous_center)
+                return self.means[i - 1] + t * (self.means[i] - self.means[i - 1])
+            cumulative += weight
+        return self.means[-1]
+
+
+def _hash64(value: float | None) -> int:
+    """Well-mixed 64-bit hash of a float (or None), stable across processes."""
+    if value is None:
+        x = 0x9E3779B97F4A7C15
+    else:
+        x = struct.unpack("<Q", struct.pack("<d", value + 0.0))[0]  # + 0.0 folds -0.0 into 0.0
+    # splitmix64 finalizer
+    x = (x + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return x ^ (x >> 31)
+
+
+class HyperLogLog:
+    """HyperLogLog distinct count over floats; None counts as one value, like n_unique."""
+
+    def __init__(self, precision: int = 12):
+        """
+        Args:
+            precision: log2 of the number of registers (standard error about
+                1.04 / sqrt(2 ** precision))
+        """
+        self.precision = precision
+        self.n_registers = 1 << precision
+        self.hashes: set[int] | None = set()  # Exact until it outgrows the registers' memory
+        self.registers: bytearray | None = None
+
+    @property
+    def exact(self) -> bool:
+        """Whether the count is still exact."""
+        return self.hashes is not None
+
+    def add(self, values: list[float | None]) -> None:
+        """Add values."""
+        self._add_hashes({_hash64(value) for value in values})
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """Fold another HyperLogLog (of the same precision) into this one."""
+        if other.hashes is not None:
+            self._add_hashes(other.hashes)
+            return
+        if self.hashes is not None:
+            self._to_registers()
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def _add_hashes(self, hashes: set[int]) -> None:
+        if self.hashes is not None:
+            self.hashes |= hashes
+            if len(self.hashes) > self.n_registers // 8:
+                self._to_registers()
+        else:
+            for h in hashes:
+                self._add_hash(h)
+
+    def _to_registers(self) -> None:
+        hashes, self.hashes = self.hashes, None
+        self.registers = bytearray(self.n_registers)
+        for h in hashes:
+            self._add_hash(h)
+
+    def _add_hash(self, h: int) -> None:
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def cardinality(self) -> int:
+        """Estimated number of distinct values."""
+        if self.hashes is not None:
+            return len(self.hashes)
+        m = self.n_registers
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # Linear counting for small ranges
+        return round(estimate)
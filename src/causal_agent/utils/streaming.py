@@ -0,0 +1,373 @@
+"""Streaming worker extractions into a live partial aggregation.
+
+With `stage2_workers.streaming.enabled`, the pipeline starts a
+`PartialAggregator` for the run. Workers install an `ExtractionSink` as the
+content sink for their calls; streaming-capable providers (`causal-mock`,
+`openrouter-stream`) push each content delta to it as tokens arrive. The sink
+parses `extractions` array elements incrementally, validates each against the
+schema, and puts it on the aggregator's bounded queue. Every `flush_seconds`
+the aggregator thread writes partial time series to the run directory while
+workers are still running.
+
+Each model call is one assistant turn. Providers open a turn with
+`start_content_turn`, which resets the sink's parser and supersedes the rows
+streamed by the call's earlier turns, so only the last turn counts. Rows stay
+pending per call until its WorkerResult is committed (`commit`, called as each
+result finishes): the pending rows of the final turn are folded into the
+aggregator's OnlineAggregator, which becomes the final aggregation of the run.
+If they differ from the parsed result (a hedge won, or final validation
+dropped rows), the result's own rows are folded instead. Failed, retried and
+split calls are never committed, so nothing is counted twice.
+
+Prefect runs worker tasks in threads, each with its own event loop, so the
+queue is a thread-safe `queue.Queue` rather than an asyncio queue.
+"""
+
+import asyncio
+import copy
+import itertools
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Iterator
+
+import polars as pl
+from inspect_ai.model import ModelAPI, modelapi
+
+from causal_agent.utils.json_extract import loads_repaired
+from causal_agent.utils.online_aggregation import OnlineAggregator
+from causal_agent.utils.runs import EXTRACTION_SCHEMA, save_partial_measurements
+
+ContentSink = Callable[[str], Awaitable[None]]
+
+_content_sink: ContextVar[ContentSink | None] = ContextVar("content_sink", default=None)
+_CLOSERS = {"{": "}", "[": "]"}
+_stream_ids = itertools.count()
+
+
+def content_sink() -> ContentSink | None:
+    """Sink for streamed content deltas of the current call, if any."""
+    return _content_sink.get()
+
+
+def start_content_turn() -> ContentSink | None:
+    """Sink for the content deltas of a new model call (assistant turn), if any.
+
+    Providers call this once per call before streaming, so sinks with
+    per-turn state (see ExtractionSink.start_turn) start the turn afresh.
+    """
+    sink = _content_sink.get()
+    start_turn = getattr(sink, "start_turn", None)
+    if start_turn is not None:
+        start_turn()
+    return sink
+
+
+@contextmanager
+def stream_content(sink: ContentSink | None) -> Iterator[None]:
+    """Send content deltas of model calls made in this context to a sink."""
+    token = _content_sink.set(sink)
+    try:
+        yield
+    finally:
+        _content_sink.reset(token)
+
+
+class ExtractionStreamParser:
+    """Incremental parser emitting elements of a JSON array as they complete.
+
+    Text is fed in arbitrary pieces. Prose and code fences before the JSON
+    object are skipped, and only object/array elements of the array under
+    `key` are emitted. Consumed text is dropped, so memory stays bounded by
+    the largest element rather than the whole completion.
+    """
+
+    def __init__(self, key: str = "extractions"):
+        self.key = key
+        self._buffer = ""
+        self._pos = 0  # Next index of _buffer to scan
+        self._stack: list[str] = []
+        self._array_depth: int | None = None  # Stack depth inside the array
+        self._element_start: int | None = None
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: str | None = None
+        self._pending_key: str | None = None
+        self.done = False  # Array (or the whole object) closed, or malformed
+
+    def feed(self, text: str) -> list[Any]:
+        """Add text and return the array elements completed by it."""
+        if self.done:
+            return []
+        self._buffer += text
+        elements = []
+        buffer, stack = self._buffer, self._stack
+        i = self._pos
+        while i < len(buffer) and not self.done:
+            ch = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._last_string = buffer[self._string_start + 1:i]
+            elif not stack and ch != "{":
+                pass  # Prose or fences before the object
+            elif ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch == ":":
+                self._pending_key = self._last_string
+            elif ch in "{[":
+                if self._array_depth == len(stack) and self._element_start is None:
+                    self._element_start = i
+                is_array = (
+                    ch == "[" and self._array_depth is None
+                    and stack[-1:] == ["{"] and self._pending_key == self.key
+                )
+                stack.append(ch)
+                self._pending_key = None
+                if is_array:
+                    self._array_depth = len(stack)
+            elif ch in "}]":
+                if self._array_depth == len(stack):
+                    self.done = True  # The array closed
+                    break
+                if _CLOSERS[stack[-1]] != ch:
+                    if self._array_depth is not None:
+                        self.done = True  # Malformed inside the array
+                        break
+                    stack.clear()  # Not JSON (e.g. a brace in prose); look for the next object
+                    i += 1
+                    continue
+                stack.pop()
+                if not stack:
+                    # An object without the array (e.g. prose braces) is skipped
+                    self.done = self._array_depth is not None
+                elif self._array_depth == len(stack) and self._element_start is not None:
+                    parsed = loads_repaired(buffer[self._element_start:i + 1])
+                    if parsed is not None:
+                        elements.append(parsed.data)
+                    self._element_start = None
+            elif ch == ",":
+                self._pending_key = None
+            i += 1
+
+        # Drop text that no later element or key can refer to
+        keep = min(
+            i,
+            self._element_start if self._element_start is not None else i,
+            self._string_start if self._in_string else i,
+        )
+        self._buffer = buffer[keep:]
+        self._pos = i - keep
+        if self._element_start is not None:
+            self._element_start -= keep
+        self._string_start -= keep
+        return elements
+
+
+@dataclass(frozen=True)
+class _StreamedRow:
+    stream_id: int
+    turn: int
+    row: dict
+
+
+@dataclass(frozen=True)
+class _Commit:
+    stream_id: int | None
+    order: int
+    parsed: list[tuple]  # (dimension, value, timestamp) of the result's extractions
+    dataframe: pl.DataFrame
+
+
+@dataclass(frozen=True)
+class _Discard:
+    stream_id: int
+
+
+class ExtractionSink:
+    """Content sink validating streamed extractions onto a bounded queue."""
+
+    def __init__(self, schema: dict, out: queue.Queue):
+        self.schema = schema
+        self.out = out
+        self.stream_id = next(_stream_ids)
+        self.turn = 0
+        self.parser = ExtractionStreamParser("extractions")
+        self.n_streamed = 0
+        self.n_invalid = 0
+
+    def start_turn(self) -> None:
+        """Start a new assistant turn: its rows supersede the previous turn's."""
+        self.turn += 1
+        self.parser = ExtractionStreamParser("extractions")
+
+    def discard(self) -> None:
+        """Drop this call's pending rows (the call failed or was cancelled)."""
+        # The consumer thread drains the queue continuously, so a blocking put is brief
+        self.out.put(_Discard(self.stream_id))
+
+    async def __call__(self, delta: str) -> None:
+        from causal_agent.workers.schemas import validate_worker_output
+
+        for element in self.parser.feed(delta):
+            output, errors = validate_worker_output({"extractions": [element]}, self.schema)
+            if errors or output is None or not output.extractions:
+                self.n_invalid += 1
+                continue
+            extraction = output.extractions[0]
+            item = _StreamedRow(self.stream_id, self.turn, {
+                "dimension": extraction.dimension,
+                "value": extraction.value,
+                "timestamp": extraction.timestamp,
+            })
+            try:
+                self.out.put_nowait(item)
+            except queue.Full:
+                # Backpressure: wait off the event loop so other calls keep running
+                await asyncio.to_thread(self.out.put, item)
+            self.n_streamed += 1
+
+
+_STOP = object()
+_active: "PartialAggregator | None" = None
+_active_lock = threading.Lock()
+
+
+class PartialAggregator:
+    """Consumes streamed extractions into the run's aggregation, writing partial time series."""
+
+    def __init__(self, run_dir: Path, schema: dict, queue_size: int = 10000, flush_seconds: float = 10.0):
+        """
+        Args:
+            run_dir: Run directory the partial_<granularity>.csv files go to
+            schema: DSEM schema dict (dimensions, aggregations, granularities)
+            queue_size: Capacity of the queue workers put extractions on
+            flush_seconds: Interval between partial re-aggregations
+        """
+        self.run_dir = run_dir
+        self.schema = schema
+        self.flush_seconds = flush_seconds
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.pending: dict[int, tuple[int, list[dict]]] = {}  # Stream id -> (turn, rows of that turn)
+        self.online = OnlineAggregator(schema)  # Committed results: the final aggregation
+        self.n_committed = 0
+        self.n_reparsed = 0  # Committed from the parsed result because the streamed rows differed
+        self._dirty = False
+        self._thread = threading.Thread(target=self._run, name="partial-aggregator", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        next_flush = time.monotonic() + self.flush_seconds
+        while True:
+            try:
+                item = self.queue.get(timeout=max(0.0, next_flush - time.monotonic()))
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                break
+            if item is not None:
+                self._handle(item)
+            if time.monotonic() >= next_flush:
+                self.flush()
+                next_flush = time.monotonic() + self.flush_seconds
+        self.pending.clear()  # Streams never committed (failed or split) are not part of the run
+        self.flush()
+
+    def _handle(self, item: "_StreamedRow | _Commit | _Discard") -> None:
+        self._dirty = True
+        if isinstance(item, _StreamedRow):
+            turn, rows = self.pending.get(item.stream_id, (item.turn, []))
+            if item.turn > turn:
+                rows = []  # A later turn supersedes the call's earlier answer
+            rows.append(item.row)
+            self.pending[item.stream_id] = (item.turn, rows)
+        elif isinstance(item, _Commit):
+            _, rows = self.pending.pop(item.stream_id, (0, []))
+            if [tuple(row.values()) for row in rows] == item.parsed:
+                self.online.fold(pl.DataFrame(rows, schema=EXTRACTION_SCHEMA), item.order)
+            else:
+                self.online.fold(item.dataframe, item.order)
+                self.n_reparsed += bool(rows)
+            self.n_committed += 1
+        else:
+            self.pending.pop(item.stream_id, None)
+
+    def commit(self, order: int, result: Any) -> None:
+        """Fold a finished WorkerResult into the aggregation, preferring its streamed rows.
+
+        Args:
+            order: Position of the result's chunk in the file (see OnlineAggregator.fold)
+            result: The WorkerResult; its stream_id names the call's streamed rows
+        """
+        # Taken now: the caller may release the result's rows once it is persisted
+        parsed = [(e.dimension, e.value, e.timestamp) for e in result.output.extractions]
+        self.queue.put(_Commit(result.stream_id, order, parsed, result.dataframe))
+
+    @property
+    def n_flushed(self) -> int:
+        """Committed extractions aggregated so far."""
+        return self.online.n_rows
+
+    def snapshot(self) -> dict[str, pl.DataFrame]:
+        """Aggregate the committed results plus the rows still streaming."""
+        rows = [row for _, stream_rows in self.pending.values() for row in stream_rows]
+        if not rows:
+            return self.online.result()
+        preview = copy.deepcopy(self.online)
+        preview.fold(pl.DataFrame(rows, schema=EXTRACTION_SCHEMA))
+        return preview.result()
+
+    def result(self) -> dict[str, pl.DataFrame]:
+        """Final aggregation of the committed results (call after close)."""
+        return self.online.result()
+
+    def flush(self) -> None:
+        """Write partial time series if new extractions arrived."""
+        if not self._dirty:
+            return
+        self._dirty = False
+        save_partial_measurements(self.run_dir, self.snapshot())
+        print(f"Streaming: {self.n_flushed} extractions aggregated so far")
+
+    def close(self) -> None:
+        """Drain the queue, write the last partial time series, and stop."""
+        global _active
+        self.queue.put(_STOP)
+        self._thread.join()
+        with _active_lock:
+            if _active is self:
+                _active = None
+
+
+def start_partial_aggregation(run_dir: Path, schema: dict) -> PartialAggregator:
+    """Start the run's partial aggregator and make it the target of worker streams."""
+    global _active
+    from causal_agent.utils.config import get_config
+
+    streaming = get_config().stage2_workers.streaming
+    aggregator = PartialAggregator(run_dir, schema, streaming.queue_size, streaming.flush_seconds)
+    with _active_lock:
+        _active = aggregator
+    return aggregator
+
+
+def active_partial_aggregator() -> PartialAggregator | None:
+    """The partial aggregator workers should stream to, if one is running."""
+    return _active
+
+
+@modelapi(name="openrouter-stream")
+def openrouter_stream() -> type[ModelAPI]:
+    from causal_agent.utils.openrouter_stream import StreamingOpenRouterAPI
+
+    return StreamingOpenRouterAPI
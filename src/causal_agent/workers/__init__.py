@@ -1,4 +1,6 @@
-from .agents import process_chunk, process_chunks, WorkerResult
+from .agents import process_chunk, process_chunks, TruncatedOutputError, WorkerError, WorkerResult
+from .batch import BatchExecutor, LocalBatchExecutor, get_batch_executor, run_worker_batch
+from .dead_letter import DeadLetter, DeadLetterStore
 from .schemas import (
     Extraction,
     ProposedDimension,
@@ -8,6 +10,14 @@ from .schemas import (
 __all__ = [
     "process_chunk",
     "process_chunks",
+    "TruncatedOutputError",
+    "WorkerError",
+    "DeadLetter",
+    "DeadLetterStore",
+    "BatchExecutor",
+    "LocalBatchExecutor",
+    "get_batch_executor",
+    "run_worker_batch",
     "WorkerResult",
     "Extraction",
     "ProposedDimension",
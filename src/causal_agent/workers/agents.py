@@ -1,7 +1,9 @@
 """Worker agents using Inspect AI with OpenRouter."""
 
 import asyncio
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
 from pathlib import Path
 
 import polars as pl
@@ -9,24 +11,95 @@ from dotenv import load_dotenv
 from inspect_ai.model import (
     ChatMessageSystem,
     ChatMessageUser,
+    GenerateConfig,
     get_model,
 )
+from pydantic import ValidationError
 
+from causal_agent.utils.budget import DeadlineExceededError
 from causal_agent.utils.config import get_config
-from causal_agent.utils.llm import make_worker_tools, multi_turn_generate, parse_json_response
-from .prompts import WORKER_WO_PROPOSALS_SYSTEM, WORKER_USER
+from causal_agent.utils.enrichment import enrich_chunk, parse_line_timestamp
+from causal_agent.utils.hedging import get_hedge_policy, hedged_call
+from causal_agent.utils.json_extract import extract_json
+from causal_agent.utils.llm import (
+    GenerationStats,
+    get_generate_config,
+    make_worker_tools,
+    multi_turn_generate,
+)
+from causal_agent.utils.streaming import ExtractionSink, active_partial_aggregator, stream_content
+from .prompts import WORKER_ANNOTATIONS_NOTE, WORKER_WO_PROPOSALS_SYSTEM, WORKER_USER
 from .schemas import WorkerOutput, validate_worker_output
 
 # Load environment variables from .env file (for API keys)
 load_dotenv(Path(__file__).parent.parent.parent.parent / ".env")
 
 
+# Stop reasons indicating the completion was cut off by a token limit
+TRUNCATION_STOP_REASONS = {"max_tokens", "model_length"}
+
+
+class WorkerError(ValueError):
+    """Worker completion could not be turned into a valid WorkerOutput.
+
+    Carries the raw completion and validation errors so failed chunks can be
+    dead-lettered with enough context to debug or re-drive them, and the
+    generation stats of the call so its tokens are charged to the run budget.
+    `attempts` is the number of task attempts that ended in this error (set
+    by populate_dimensions).
+    """
+
+    def __init__(
+        self,
+        message: str,
+        completion: str | None = None,
+        validation_errors: list[str] | None = None,
+        stats: GenerationStats | None = None,
+        attempts: int = 1,
+    ):
+        super().__init__(message)
+        self.completion = completion
+        self.validation_errors = validation_errors or []
+        self.stats = stats
+        self.attempts = attempts
+
+    def __reduce__(self):
+        return (type(self), (str(self), self.completion, self.validation_errors, self.stats, self.attempts))
+
+
+class TruncatedOutputError(WorkerError):
+    """Worker completion was cut off by a token limit and could not be parsed."""
+
+
 @dataclass
 class WorkerResult:
     """Result from a worker including both raw output and parsed dataframe."""
 
     output: WorkerOutput
     dataframe: pl.DataFrame
+    stats: GenerationStats = field(default_factory=GenerationStats)
+    chunk: str = ""  # Input chunk (before enrichment), for coverage reporting
+    salvaged: bool = False  # Output was cut off; only its complete extractions were kept
+    unparsed_lines: int = 0  # Trailing chunk lines past the last salvaged extraction
+    stream_id: int | None = None  # ExtractionSink the call streamed to (see PartialAggregator.commit)
+
+    def release_rows(self) -> None:
+        """Drop the extraction rows once persisted (chunk, stats and proposals are kept)."""
+        self.dataframe = self.dataframe.clear()
+        self.output = self.output.model_copy(update={"extractions": []})
+
+    @property
+    def processed_chunk(self) -> str:
+        """The lines of the chunk the output covers (all of them unless salvaged)."""
+        lines = self.chunk.split("\n")
+        return "\n".join(lines[: len(lines) - self.unparsed_lines])
+
+    @property
+    def unparsed_chunk(self) -> str:
+        """The trailing lines a salvaged output did not reach."""
+        if not self.unparsed_lines:
+            return ""
+        return "\n".join(self.chunk.split("\n")[-self.unparsed_lines :])
 
 
 def _format_dimensions(schema: dict) -> str:
@@ -35,7 +108,8 @@ def _format_dimensions(schema: dict) -> str:
     Only includes observed dimensions - latent variables are excluded
     since workers shouldn't try to measure them directly.
 
-    Shows: name, dtype, measurement_granularity, how_to_measure
+    Shows: name, dtype, measurement_granularity, how_to_measure, and
+    categories if any
     """
     dimensions = schema.get("dimensions", [])
     lines = []
@@ -54,7 +128,10 @@ def _format_dimensions(schema: dict) -> str:
             info_parts.append(f"@{measurement_granularity}")
         info = ", ".join(info_parts)
 
-        lines.append(f"- {name} ({info}): {how_to_measure}")
+        line = f"- {name} ({info}): {how_to_measure}"
+        if dim.get("categories"):
+            line += f" One of: {', '.join(dim['categories'])}"
+        lines.append(line)
     return "\n".join(lines)
 
 
@@ -77,10 +154,32 @@ def _get_outcome_description(schema: dict) -> str:
     return "Not specified"
 
 
+def _build_worker_messages(chunk: str, question: str, schema: dict, annotated: bool = False) -> list:
+    """Build the system + user messages for a worker call.
+
+    The system prompt explains the `###` annotation lines only if the chunk
+    has them (annotated, see enrich_chunk).
+    """
+    system = WORKER_WO_PROPOSALS_SYSTEM + (WORKER_ANNOTATIONS_NOTE if annotated else "")
+    return [
+        ChatMessageSystem(content=system),
+        ChatMessageUser(
+            content=WORKER_USER.format(
+                question=question,
+                outcome_description=_get_outcome_description(schema),
+                dimensions=_format_dimensions(schema),
+                chunk=chunk,
+            )
+        ),
+    ]
+
+
 async def process_chunk_async(
     chunk: str,
     question: str,
     schema: dict,
+    model_name: str | None = None,
+    config: GenerateConfig | None = None,
 ) -> WorkerResult:
     """
     Process a single data chunk against the candidate schema.
@@ -89,51 +188,179 @@ async def process_chunk_async(
         chunk: The data chunk to process
         question: The causal research question
         schema: The candidate schema from the orchestrator (DSEMStructure as dict)
+        model_name: Worker model (default: stage2_workers.model from config)
+        config: Optional generation settings, applied over the worker generation profile
 
     Returns:
         WorkerResult with validated output and Polars dataframe
+
+    Raises:
+        WorkerError: If the completion cannot be parsed or validated
+    """
+    worker_config = get_config().stage2_workers
+    model = get_model(model_name or worker_config.model)
+    # Worker generation profile; explicit settings (e.g. max_connections) take precedence
+    profile_config = get_generate_config("worker")
+    config = profile_config.merge(config) if config is not None else profile_config
+
+    # Annotate the chunk locally so the model needn't call parse_date/calculate
+    prompt_chunk = enrich_chunk(chunk) if worker_config.enrich_chunks else chunk
+
+    messages = _build_worker_messages(prompt_chunk, question, schema, annotated=prompt_chunk != chunk)
+    tools = make_worker_tools(schema)
+
+    # Stream extractions into the run's aggregation as they are generated (committed with the result)
+    aggregator = active_partial_aggregator() if worker_config.streaming.enabled else None
+    sink = ExtractionSink(schema, aggregator.queue) if aggregator is not None else None
+
+    async def generate(generate_model, sink: ExtractionSink | None = None) -> tuple[str, GenerationStats]:
+        # Generate with tools available
+        stats = GenerationStats()
+        with stream_content(sink):
+            completion = await multi_turn_generate(
+                messages=messages,
+                model=generate_model,
+                tools=tools,
+                config=config,
+                stats=stats,
+            )
+        return completion, stats
+
+    hedging = worker_config.hedging
+    try:
+        if hedging.enabled:
+            # Duplicate stragglers (optionally to a fallback model); first to finish wins
+            hedge_model = get_model(hedging.fallback_model) if hedging.fallback_model else model
+            policy = get_hedge_policy(
+                "stage2_workers",
+                percentile=hedging.percentile,
+                budget_fraction=hedging.budget_fraction,
+                min_samples=hedging.min_samples,
+            )
+            # Only the primary call streams; if the hedge wins, its parsed rows are committed instead
+            completion, stats = await hedged_call(
+                lambda: generate(model, sink),
+                lambda: generate(hedge_model),
+                policy,
+            )
+        else:
+            completion, stats = await generate(model, sink)
+        result = parse_worker_completion(completion, stats, chunk, schema)
+    except BaseException:
+        if sink is not None:
+            sink.discard()
+        raise
+    if sink is not None:
+        result.stream_id = sink.stream_id
+    return result
+
+
+def _extraction_time(timestamp: str | None) -> datetime | None:
+    """Latest moment an extraction timestamp can refer to (end of day for a bare date)."""
+    try:
+        parsed = datetime.fromisoformat((timestamp or "").strip())
+    except ValueError:
+        return None
+    if len(timestamp.strip()) == 10:
+        parsed += timedelta(days=1, microseconds=-1)
+    return parsed.replace(tzinfo=None)
+
+
+def unparsed_line_count(chunk: str, output: WorkerOutput) -> int:
+    """Trailing lines of a chunk after the latest timestamp a salvaged output reached.
+
+    A truncated completion stops partway through the chunk. Lines timestamped
+    at or before its latest extraction count as processed; the rest are
+    unparsed (all lines, if no extraction has a timestamp).
     """
-    model_name = get_config().stage2_workers.model
-    model = get_model(model_name)
+    lines = chunk.split("\n")
+    reached = max(filter(None, (_extraction_time(e.timestamp) for e in output.extractions)), default=None)
+    if reached is None:
+        return len(lines)
+    last = max(
+        (i for i, line in enumerate(lines) if (ts := parse_line_timestamp(line)) is not None and ts <= reached),
+        default=-1,
+    )
+    return len(lines) - (last + 1)
 
-    # Format inputs for the prompt
-    dimensions_text = _format_dimensions(schema)
-    outcome_description = _get_outcome_description(schema)
 
-    messages = [
-        ChatMessageSystem(content=WORKER_WO_PROPOSALS_SYSTEM),
-        ChatMessageUser(
-            content=WORKER_USER.format(
-                question=question,
-                outcome_description=outcome_description,
-                dimensions=dimensions_text,
-                chunk=chunk,
-            )
-        ),
-    ]
+def parse_worker_completion(
+    completion: str,
+    stats: GenerationStats,
+    chunk: str,
+    schema: dict,
+) -> WorkerResult:
+    """
+    Parse and validate a worker's final completion into a WorkerResult.
 
-    # Generate with tools available
-    completion = await multi_turn_generate(
-        messages=messages,
-        model=model,
-        tools=make_worker_tools(schema),
-    )
-    data = parse_json_response(completion)
+    Args:
+        completion: The worker's final answer
+        stats: Generation counters of the call (stop_reason decides truncation salvage)
+        chunk: The input chunk (before enrichment)
+        schema: The candidate schema the extractions are validated against
+
+    Returns:
+        WorkerResult with validated output and Polars dataframe
+
+    Raises:
+        TruncatedOutputError: If the completion was cut off before any complete extraction
+        WorkerError: If the completion cannot be parsed or validated
+    """
+    # A completion cut off at the token limit keeps its complete extractions
+    truncated = stats.stop_reason in TRUNCATION_STOP_REASONS
+    extraction = extract_json(completion, salvage_key="extractions" if truncated else None)
+    if extraction is None:
+        if truncated:
+            raise TruncatedOutputError(
+                f"Worker output truncated ({stats.stop_reason}) before any complete extraction",
+                completion=completion,
+                stats=stats,
+            )
+        raise WorkerError("Failed to parse model response as JSON", completion=completion, stats=stats)
+    data = extraction.data
 
     # Final validation (should pass if LLM used the tool correctly)
     output, errors = validate_worker_output(data, schema)
     if errors:
         # Fallback to Pydantic validation for error message
-        output = WorkerOutput.model_validate(data)
+        try:
+            output = WorkerOutput.model_validate(data)
+        except ValidationError as e:
+            raise WorkerError(
+                f"Worker output failed validation: {e}", completion=completion, validation_errors=errors, stats=stats
+            ) from e
     dataframe = output.to_dataframe()
 
-    return WorkerResult(output=output, dataframe=dataframe)
+    return WorkerResult(
+        output=output,
+        dataframe=dataframe,
+        stats=stats,
+        chunk=chunk,
+        salvaged=extraction.salvaged,
+        unparsed_lines=unparsed_line_count(chunk, output) if extraction.salvaged else 0,
+    )
+
+
+async def _until_deadline(coroutine, deadline: float):
+    """Await a coroutine, cancelling it at a wall-clock deadline (time.time())."""
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        coroutine.close()
+        raise DeadlineExceededError("Run deadline passed before the worker call started")
+    try:
+        return await asyncio.wait_for(coroutine, remaining)
+    except TimeoutError as e:
+        if time.time() < deadline:
+            raise  # A timeout of the call itself
+        raise DeadlineExceededError("Run deadline passed; worker call cancelled") from e
 
 
 def process_chunk(
     chunk: str,
     question: str,
     schema: dict,
+    model_name: str | None = None,
+    deadline: float | None = None,
 ) -> WorkerResult:
     """
     Synchronous wrapper for process_chunk_async.
@@ -142,17 +369,29 @@ def process_chunk(
         chunk: The data chunk to process
         question: The causal research question
         schema: The candidate schema from the orchestrator
+        model_name: Worker model (default: stage2_workers.model from config)
+        deadline: Wall-clock time (time.time()) at which the call is cancelled,
+            e.g. the run deadline (see RunBudget.deadline_at)
 
     Returns:
         WorkerResult with validated output and Polars dataframe
+
+    Raises:
+        DeadlineExceededError: If the deadline passes before the call finishes
     """
-    return asyncio.run(process_chunk_async(chunk, question, schema))
+    coroutine = process_chunk_async(chunk, question, schema, model_name)
+    if deadline is None:
+        return asyncio.run(coroutine)
+    return asyncio.run(_until_deadline(coroutine, deadline))
 
 
 async def process_chunks_async(
     chunks: list[str],
     question: str,
     schema: dict,
+    model_name: str | None = None,
+    max_concurrency: int | None = None,
+    return_exceptions: bool = False,
 ) -> list[WorkerResult]:
     """
     Process multiple chunks in parallel.
@@ -161,22 +400,30 @@ async def process_chunks_async(
         chunks: List of data chunks to process
         question: The causal research question
         schema: The candidate schema from the orchestrator
+        model_name: Worker model (default: stage2_workers.model from config)
+        max_concurrency: Maximum chunks (and model connections) in flight
+            (default: all chunks at once, connections capped by the provider)
+        return_exceptions: Return exceptions of failed chunks in place of
+            their results instead of raising the first one
 
     Returns:
-        List of WorkerResults
+        List of WorkerResults (or exceptions, with return_exceptions), in chunk order
     """
-    tasks = [
-        process_chunk_async(chunk, question, schema)
-        for chunk in chunks
-    ]
+    config = GenerateConfig(max_connections=max_concurrency) if max_concurrency else None
+    semaphore = asyncio.Semaphore(max_concurrency or len(chunks) or 1)
+
+    async def process(chunk: str) -> WorkerResult:
+        async with semaphore:
+            return await process_chunk_async(chunk, question, schema, model_name, config)
 
-    return await asyncio.gather(*tasks)
+    return await asyncio.gather(*(process(chunk) for chunk in chunks), return_exceptions=return_exceptions)
 
 
 def process_chunks(
     chunks: list[str],
     question: str,
     schema: dict,
+    model_name: str | None = None,
 ) -> list[WorkerResult]:
     """
     Synchronous wrapper for process_chunks_async.
@@ -185,8 +432,9 @@ def process_chunks(
         chunks: List of data chunks to process
         question: The causal research question
         schema: The candidate schema from the orchestrator
+        model_name: Worker model (default: stage2_workers.model from config)
 
     Returns:
         List of WorkerResults
     """
-    return asyncio.run(process_chunks_async(chunks, question, schema))
+    return asyncio.run(process_chunks_async(chunks, question, schema, model_name))
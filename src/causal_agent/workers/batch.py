@@ -0,0 +1,486 @@
+"""Offline batch-API mode for stage 2 workers.
+
+For backfills that need no interactive latency, every chunk's worker request
+is written to one JSONL batch file in the OpenAI batch format (one
+chat-completion request per line, keyed by `custom_id`) and handed to a
+`BatchExecutor`. The executor submits the file, is polled until the batch
+finishes, and returns a JSONL file of responses. Each response goes through
+the same `parse_worker_completion` path (JSON extraction, truncation salvage,
+`validate_worker_output`) as an interactive worker call.
+
+Batch requests cannot run the validation tool loop. Instead, requests whose
+answer fails validation (or whose request failed) are resent in a further
+round, with the validation errors appended as a user turn, up to
+`max_rounds`. Chunks still failing after the last round are dead-lettered and
+can be re-driven interactively.
+
+Executors:
+- `local`: runs the requests in-process through Inspect models in a
+  background thread (e.g. `causal-mock/<name>` for tests without a network).
+- `openai`: uploads the file to an OpenAI-compatible `/v1/batches` endpoint
+  (openai/ worker models only).
+"""
+
+import asyncio
+import json
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from inspect_ai.model import (
+    ChatMessage,
+    ChatMessageAssistant,
+    ChatMessageSystem,
+    ChatMessageUser,
+    GenerateConfig,
+    get_model,
+)
+
+from causal_agent.utils.enrichment import enrich_chunk
+from causal_agent.utils.llm import GenerationStats
+from causal_agent.utils.ratelimit import limited_generate
+from .agents import WorkerError, WorkerResult, _build_worker_messages, parse_worker_completion
+from .dead_letter import DeadLetter
+from .prompts import WORKER_BATCH_NOTE, WORKER_BATCH_REPAIR
+
+BATCH_DIR = "batch"
+BATCH_INPUT_FILE = "round{round}_input.jsonl"
+BATCH_OUTPUT_FILE = "round{round}_output.jsonl"
+CHAT_COMPLETIONS_URL = "/v1/chat/completions"
+
+# Inspect stop reasons <-> OpenAI finish reasons
+_FINISH_REASONS = {"stop": "stop", "max_tokens": "length", "model_length": "length", "content_filter": "content_filter"}
+_STOP_REASONS = {"stop": "stop", "length": "max_tokens", "content_filter": "content_filter"}
+
+
+@dataclass
+class BatchStatus:
+    """Progress of a submitted batch."""
+
+    state: str  # in_progress, completed, failed
+    n_total: int = 0
+    n_completed: int = 0
+    n_failed: int = 0
+    error: str | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.state != "in_progress"
+
+
+class BatchExecutor(ABC):
+    """Runs a JSONL file of chat-completion requests as one batch."""
+
+    def model_id(self, model_name: str) -> str:
+        """Model name to put in request bodies for an Inspect model name.
+
+        Raises:
+            ValueError: If the executor cannot run the model
+        """
+        return model_name
+
+    @abstractmethod
+    def submit(self, input_path: Path) -> str:
+        """Submit a batch input file and return the batch id."""
+
+    @abstractmethod
+    def poll(self, batch_id: str) -> BatchStatus:
+        """Current status of a submitted batch."""
+
+    @abstractmethod
+    def fetch(self, batch_id: str, output_path: Path) -> None:
+        """Write the responses of a finished batch to a JSONL file."""
+
+    def cancel(self, batch_id: str) -> None:
+        """Stop a batch that is still running, e.g. after its timeout.
+
+        Executors that cannot cancel leave the batch running.
+        """
+
+
+def _to_messages(messages: list[dict]) -> list[ChatMessage]:
+    roles = {"system": ChatMessageSystem, "user": ChatMessageUser, "assistant": ChatMessageAssistant}
+    return [roles[message["role"]](content=message["content"]) for message in messages]
+
+
+class LocalBatchExecutor(BatchExecutor):
+    """Runs batch files in-process through Inspect models, in a background thread.
+
+    Request bodies name Inspect models (e.g. `causal-mock/batch`), so batch
+    mode can be exercised end to end without a network.
+    """
+
+    def __init__(self, max_concurrency: int = 64):
+        """
+        Args:
+            max_concurrency: Requests of one batch in flight at once
+        """
+        self.max_concurrency = max_concurrency
+        self._batches: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, input_path: Path) -> str:
+        requests = [json.loads(line) for line in input_path.read_text().splitlines() if line.strip()]
+        batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+        batch = {"n_total": len(requests), "responses": [], "done": False, "cancelled": False, "task": None}
+        with self._lock:
+            self._batches[batch_id] = batch
+        threading.Thread(
+            target=lambda: asyncio.run(self._run(batch, requests)), name=f"local-{batch_id}", daemon=True
+        ).start()
+        return batch_id
+
+    async def _run(self, batch: dict, requests: list[dict]) -> None:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run_one(request: dict) -> None:
+            async with semaphore:
+                response = await self._complete(request)
+            with self._lock:
+                batch["responses"].append(response)
+
+        with self._lock:
+            batch["task"] = (asyncio.get_running_loop(), asyncio.current_task())
+            cancelled = batch["cancelled"]
+        try:
+            if not cancelled:
+                await asyncio.gather(*(run_one(request) for request in requests))
+        except asyncio.CancelledError:
+            pass  # Cancelled with cancel(); the responses so far are kept
+        finally:
+            with self._lock:
+                batch["done"] = True
+
+    async def _complete(self, request: dict) -> dict:
+        body = request["body"]
+        line = {
+            "id": f"req_{uuid.uuid4().hex[:12]}",
+            "custom_id": request["custom_id"],
+            "response": None,
+            "error": None,
+        }
+        try:
+            config = GenerateConfig(max_tokens=body.get("max_tokens"), reasoning_effort=body.get("reasoning_effort"))
+            output = await limited_generate(get_model(body["model"]), _to_messages(body["messages"]), config=config)
+        except Exception as e:
+            line["error"] = {"code": type(e).__name__, "message": str(e)}
+            return line
+        usage = output.usage
+        line["response"] = {
+            "status_code": 200,
+            "body": {
+                "model": body["model"],
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": output.completion},
+                    "finish_reason": _FINISH_REASONS.get(output.stop_reason, "stop"),
+                }],
+                "usage": {
+                    "prompt_tokens": usage.input_tokens if usage else 0,
+                    "completion_tokens": usage.output_tokens if usage else 0,
+                    "total_tokens": usage.total_tokens if usage else 0,
+                },
+            },
+        }
+        return line
+
+    def poll(self, batch_id: str) -> BatchStatus:
+        with self._lock:
+            batch = self._batches[batch_id]
+            responses = list(batch["responses"])
+            done = batch["done"]
+        n_failed = sum(1 for response in responses if response["error"] is not None)
+        if batch["cancelled"]:
+            state = "failed"
+        else:
+            state = "completed" if done else "in_progress"
+        return BatchStatus(
+            state=state,
+            n_total=batch["n_total"],
+            n_completed=len(responses) - n_failed,
+            n_failed=n_failed,
+            error="Batch cancelled" if batch["cancelled"] else None,
+        )
+
+    def fetch(self, batch_id: str, output_path: Path) -> None:
+        with self._lock:
+            responses = list(self._batches[batch_id]["responses"])
+        output_path.write_text("".join(json.dumps(response) + "\n" for response in responses))
+
+    def cancel(self, batch_id: str) -> None:
+        # Under the lock, so the batch's loop cannot finish and close in between
+        with self._lock:
+            batch = self._batches[batch_id]
+            if batch["done"]:
+                return
+            batch["cancelled"] = True
+            if batch["task"] is not None:  # Not started yet: the thread sees the flag instead
+                loop, task = batch["task"]
+                loop.call_soon_threadsafe(task.cancel)
+
+
+class OpenAIBatchExecutor(BatchExecutor):
+    """Submits batch files to an OpenAI-compatible `/v1/batches` endpoint.
+
+    Uses the OpenAI client's environment (OPENAI_API_KEY, OPENAI_BASE_URL)
+    unless a base URL or key is given.
+    """
+
+    def __init__(self, base_url: str | None = None, api_key: str | None = None):
+        from openai import OpenAI
+
+        self.client = OpenAI(base_url=base_url, api_key=api_key)
+
+    def model_id(self, model_name: str) -> str:
+        # Other providers' names and parameters (e.g. openrouter/..., Gemini reasoning) do not map onto /v1/batches
+        if not model_name.startswith("openai/"):
+            raise ValueError(
+                f"The openai batch executor needs an openai/ model, got '{model_name}'. "
+                "Set stage2_workers.model to an openai/ model or use the local executor."
+            )
+        return model_name.removeprefix("openai/")
+
+    def submit(self, input_path: Path) -> str:
+        with open(input_path, "rb") as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=CHAT_COMPLETIONS_URL,
+            completion_window="24h",
+        )
+        return batch.id
+
+    def poll(self, batch_id: str) -> BatchStatus:
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.status == "completed":
+            state = "completed"
+        elif batch.status in ("failed", "expired", "cancelled"):
+            state = "failed"
+        else:
+            state = "in_progress"
+        counts = batch.request_counts
+        errors = batch.errors.data if batch.errors and batch.errors.data else []
+        return BatchStatus(
+            state=state,
+            n_total=counts.total if counts else 0,
+            n_completed=counts.completed if counts else 0,
+            n_failed=counts.failed if counts else 0,
+            error="; ".join(error.message or "" for error in errors) or None,
+        )
+
+    def fetch(self, batch_id: str, output_path: Path) -> None:
+        batch = self.client.batches.retrieve(batch_id)
+        # Successful responses and per-request errors come in separate files
+        parts = [
+            self.client.files.content(file_id).text
+            for file_id in (batch.output_file_id, batch.error_file_id)
+            if file_id
+        ]
+        output_path.write_text("".join(part.rstrip("\n") + "\n" for part in parts if part))
+
+    def cancel(self, batch_id: str) -> None:
+        self.client.batches.cancel(batch_id)
+
+
+BATCH_EXECUTORS: dict[str, type[BatchExecutor]] = {
+    "local": LocalBatchExecutor,
+    "openai": OpenAIBatchExecutor,
+}
+
+
+def get_batch_executor(name: str) -> BatchExecutor:
+    """Create a batch executor by name.
+
+    Raises:
+        ValueError: If the executor is not in BATCH_EXECUTORS
+    """
+    if name not in BATCH_EXECUTORS:
+        available = ", ".join(sorted(BATCH_EXECUTORS))
+        raise ValueError(f"Unknown batch executor '{name}'. Available: {available}")
+    return BATCH_EXECUTORS[name]()
+
+
+def build_batch_request(custom_id: str, messages: list[dict], model: str, config: GenerateConfig) -> dict:
+    """One chat-completion request line of a batch input file."""
+    body = {"model": model, "messages": messages}
+    if config.max_tokens is not None:
+        body["max_tokens"] = config.max_tokens
+    if config.reasoning_effort is not None:
+        body["reasoning_effort"] = config.reasoning_effort
+    return {"custom_id": custom_id, "method": "POST", "url": CHAT_COMPLETIONS_URL, "body": body}
+
+
+def wait_for_batch(
+    executor: BatchExecutor,
+    batch_id: str,
+    poll_seconds: float,
+    timeout_seconds: float | None = None,
+) -> BatchStatus:
+    """Poll a batch until it finishes or the timeout passes.
+
+    Returns:
+        The last status (still in_progress if the timeout passed)
+    """
+    deadline = time.monotonic() + timeout_seconds if timeout_seconds is not None else None
+    while True:
+        status = executor.poll(batch_id)
+        if status.finished:
+            return status
+        if deadline is not None and time.monotonic() + poll_seconds > deadline:
+            return status
+        print(f"Batch {batch_id}: {status.n_completed + status.n_failed}/{status.n_total} requests done")
+        time.sleep(poll_seconds)
+
+
+@dataclass
+class _BatchChunk:
+    """Conversation and outcome of one chunk across batch rounds."""
+
+    chunk: str
+    messages: list[dict]
+    stats: GenerationStats = field(default_factory=GenerationStats)
+    error: BaseException | None = None
+
+
+def _worker_messages(chunk: str, question: str, schema: dict, enrich: bool) -> list[dict]:
+    """Worker system + user messages as batch message dicts, without the tool loop."""
+    prompt_chunk = enrich_chunk(chunk) if enrich else chunk
+    system, user = _build_worker_messages(prompt_chunk, question, schema, annotated=prompt_chunk != chunk)
+    return [
+        {"role": "system", "content": system.text},
+        {"role": "user", "content": user.text + WORKER_BATCH_NOTE},
+    ]
+
+
+def _apply_response(state: _BatchChunk, line: dict | None, schema: dict) -> WorkerResult | None:
+    """Record one batch response on a chunk; return its result if it validated."""
+    if line is None:
+        state.error = WorkerError("No response in batch output")
+        return None
+    response = line.get("response") or {}
+    if line.get("error") or response.get("status_code") != 200:
+        error = line.get("error") or response.get("body", {}).get("error") or {}
+        state.error = WorkerError(f"Batch request failed: {error.get('message') or error}")
+        return None
+
+    body = response["body"]
+    choice = body["choices"][0]
+    completion = choice["message"].get("content") or ""
+    usage = body.get("usage") or {}
+    state.stats.turns += 1
+    state.stats.input_tokens += usage.get("prompt_tokens", 0)
+    state.stats.output_tokens += usage.get("completion_tokens", 0)
+    state.stats.stop_reason = _STOP_REASONS.get(choice.get("finish_reason"), "unknown")
+    try:
+        return parse_worker_completion(completion, state.stats, state.chunk, schema)
+    except WorkerError as e:
+        state.error = e
+        errors = e.validation_errors or [str(e)]
+        state.messages = state.messages + [
+            {"role": "assistant", "content": completion},
+            {"role": "user", "content": WORKER_BATCH_REPAIR.format(errors="\n".join(f"- {err}" for err in errors))},
+        ]
+        return None
+
+
+def run_worker_batch(
+    chunks: list[str],
+    question: str,
+    schema: dict,
+    batch_dir: Path,
+    executor: BatchExecutor,
+    model_name: str,
+    config: GenerateConfig | None = None,
+    enrich: bool = True,
+    poll_seconds: float = 60.0,
+    max_rounds: int = 2,
+    timeout_seconds: float | None = None,
+    chunk_ids: list[str] | None = None,
+) -> tuple[list[WorkerResult], list[DeadLetter]]:
+    """Run workers over chunks as provider batches.
+
+    Each round writes the pending requests to `batch_dir/round<n>_input.jsonl`,
+    submits them, waits for the batch, and saves its responses to
+    `batch_dir/round<n>_output.jsonl`. Chunks whose request failed or whose
+    answer failed validation are resent in the next round.
+
+    Args:
+        chunks: Worker chunks in file order
+        question: The causal research question
+        schema: DSEM schema dict
+        batch_dir: Directory for the batch input/output files
+        executor: Executor that submits and runs the batches
+        model_name: Worker model (Inspect model name; see BatchExecutor.model_id)
+        config: Generation settings put in the requests (max_tokens, reasoning_effort)
+        enrich: Annotate chunks as interactive workers do
+        poll_seconds: Interval between batch status checks
+        max_rounds: Number of batches at most
+        timeout_seconds: Stop waiting on a batch after this long and cancel it
+            (None = no limit)
+        chunk_ids: Stable ids for the chunks (default: chunk_{index})
+
+    Returns:
+        Tuple of (WorkerResults in chunk order, dead letters)
+
+    Raises:
+        ValueError: If the executor cannot run the model
+    """
+    config = config or GenerateConfig()
+    model_id = executor.model_id(model_name)  # Fails before anything is submitted if unsupported
+    chunk_ids = chunk_ids or [f"chunk_{i:05d}" for i in range(len(chunks))]
+    batch_dir.mkdir(parents=True, exist_ok=True)
+    states = {
+        chunk_id: _BatchChunk(chunk, _worker_messages(chunk, question, schema, enrich))
+        for chunk_id, chunk in zip(chunk_ids, chunks)
+    }
+    results: dict[str, WorkerResult] = {}
+    pending = list(chunk_ids)
+
+    for round_number in range(1, max_rounds + 1):
+        if not pending:
+            break
+        input_path = batch_dir / BATCH_INPUT_FILE.format(round=round_number)
+        with open(input_path, "w") as f:
+            for chunk_id in pending:
+                request = build_batch_request(chunk_id, states[chunk_id].messages, model_id, config)
+                f.write(json.dumps(request) + "\n")
+
+        batch_id = executor.submit(input_path)
+        print(f"Batch round {round_number}: submitted {len(pending)} requests as {batch_id}")
+        status = wait_for_batch(executor, batch_id, poll_seconds, timeout_seconds)
+        if not status.finished:
+            # Stop it running (and billing) for chunks that are dead-lettered and may be re-driven
+            try:
+                executor.cancel(batch_id)
+            except Exception as e:
+                print(f"Batch {batch_id}: could not cancel after timeout ({type(e).__name__}: {e})")
+            for chunk_id in pending:
+                states[chunk_id].error = TimeoutError(f"Batch {batch_id} did not finish in time")
+            break
+
+        output_path = batch_dir / BATCH_OUTPUT_FILE.format(round=round_number)
+        executor.fetch(batch_id, output_path)
+        lines = {}
+        for text in output_path.read_text().splitlines():
+            if text.strip():
+                line = json.loads(text)
+                lines[line["custom_id"]] = line
+
+        for chunk_id in pending:
+            result = _apply_response(states[chunk_id], lines.get(chunk_id), schema)
+            if result is not None:
+                results[chunk_id] = result
+        pending = [chunk_id for chunk_id in pending if chunk_id not in results]
+        print(f"Batch round {round_number}: {len(results)}/{len(chunks)} chunks valid, {len(pending)} pending")
+
+    dead_letters = [
+        DeadLetter.from_error(chunk_id, states[chunk_id].chunk, states[chunk_id].error, model_name)
+        for chunk_id in pending
+    ]
+    # Lines past the cut of truncated (salvaged) answers
+    tails = (DeadLetter.for_unparsed_tail(chunk_id, result, model_name) for chunk_id, result in results.items())
+    dead_letters += [letter for letter in tails if letter is not None]
+    return [results[chunk_id] for chunk_id in chunk_ids if chunk_id in results], dead_letters
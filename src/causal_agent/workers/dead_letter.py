@@ -0,0 +1,88 @@
+"""Dead-letter store for worker chunks that exhausted their retries.
+
+Failed chunks are recorded with their error class, the last raw completion,
+and validation errors so the flow can continue on the successful chunks and
+the failures can be re-driven later (see flows/redrive.py).
+"""
+
+import json
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .agents import TruncatedOutputError, WorkerError, WorkerResult
+
+
+@dataclass
+class DeadLetter:
+    """A worker chunk that failed after all retries."""
+
+    chunk_id: str
+    chunk: str
+    error_class: str
+    error: str
+    model: str
+    completion: str | None = None
+    validation_errors: list[str] = field(default_factory=list)
+    failed_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+
+    @classmethod
+    def from_error(cls, chunk_id: str, chunk: str, error: BaseException, model: str) -> "DeadLetter":
+        """Build a dead letter from the exception a worker task failed with."""
+        completion = None
+        validation_errors: list[str] = []
+        if isinstance(error, WorkerError):
+            completion = error.completion
+            validation_errors = list(error.validation_errors)
+        return cls(
+            chunk_id=chunk_id,
+            chunk=chunk,
+            error_class=type(error).__name__,
+            error=str(error),
+            model=model,
+            completion=completion,
+            validation_errors=validation_errors,
+        )
+
+    @classmethod
+    def for_unparsed_tail(cls, chunk_id: str, result: WorkerResult, model: str) -> "DeadLetter | None":
+        """Dead letter for the lines a salvaged (truncated) result did not reach, if any.
+
+        Its chunk is just those lines, so a re-drive processes only them.
+        """
+        if not result.unparsed_lines:
+            return None
+        error = TruncatedOutputError(
+            f"Worker output truncated after {len(result.output.extractions)} extractions; "
+            f"{result.unparsed_lines} trailing lines unparsed",
+            completion=None,
+        )
+        return cls.from_error(f"{chunk_id}_tail", result.unparsed_chunk, error, model)
+
+
+class DeadLetterStore:
+    """JSONL-backed store of dead-lettered chunks."""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def append(self, letters: list[DeadLetter]) -> None:
+        if not letters:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a") as f:
+            for letter in letters:
+                f.write(json.dumps(asdict(letter)) + "\n")
+
+    def load(self) -> list[DeadLetter]:
+        if not self.path.exists():
+            return []
+        with open(self.path) as f:
+            return [DeadLetter(**json.loads(line)) for line in f if line.strip()]
+
+    def replace(self, letters: list[DeadLetter]) -> None:
+        """Overwrite the store with the given letters (e.g. after a re-drive)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w") as f:
+            for letter in letters:
+                f.write(json.dumps(asdict(letter)) + "\n")
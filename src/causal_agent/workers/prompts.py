@@ -111,3 +111,26 @@ WORKER_USER = """\
 
 {chunk}
 """
+
+# Appended to the system prompt when the chunk is annotated (stage2_workers.enrich_chunks)
+WORKER_ANNOTATIONS_NOTE = """\
+
+## Chunk Annotations
+
+Lines starting with `###` are annotations, not data entries. Each one precedes the entries of a single day and gives its weekday and date plus the number of entries per hour. Use them for weekday and count information instead of computing it yourself, and never extract values from the annotation lines themselves.
+"""
+
+WORKER_BATCH_NOTE = """\
+
+## Batch Mode
+
+The `validate_extractions` tool is not available for this request. Check your JSON against the dimensions above yourself and output the final JSON directly.
+"""
+
+WORKER_BATCH_REPAIR = """\
+Your JSON failed validation:
+
+{errors}
+
+Fix these errors and output the complete corrected JSON.
+"""
@@ -1,15 +1,22 @@
 """Tests for aggregation registry."""
 
+import math
+
 import pytest
 import polars as pl
 
 from causal_agent.utils.aggregations import (
+    AGGREGATION_METADATA,
     AGGREGATION_REGISTRY,
+    _coerce_to_numeric,
+    _coerce_value_to_numeric,
     aggregate_worker_measurements,
     apply_aggregation,
     get_aggregator,
     list_aggregations,
+    scan_extraction_shards,
 )
+from causal_agent.utils.runs import SHARDS_DIR, write_extraction_shards
 
 
 class TestAggregationRegistry:
@@ -105,6 +112,34 @@ class TestAggregatorFunctions:
         assert result.item() == 2
 
 
+class TestNativeAggregators:
+    """Test that aggregators are pure Polars expressions."""
+
+    def test_no_python_fallbacks(self):
+        assert not any(meta.python_fallback for meta in AGGREGATION_METADATA.values())
+        assert AGGREGATION_METADATA["instability"].ordered and AGGREGATION_METADATA["trend"].ordered
+
+    def test_entropy_matches_value_counts(self):
+        df = pl.DataFrame({"g": [1, 1, 1, 2, 2, 2, 2], "x": [1.0, None, 1.0, 2.0, 3.0, None, None]})
+        result = df.group_by("g", maintain_order=True).agg(get_aggregator("entropy")("x"))
+
+        def entropy(counts):
+            total = sum(counts)
+            return -sum(c / total * math.log(c / total + 1e-10) for c in counts)
+
+        assert result["x"].to_list() == pytest.approx([entropy([2, 1]), entropy([1, 1, 2])])
+
+    def test_ordered_aggregators_sort_within_group(self):
+        df = pl.DataFrame({"g": [1, 1, 1, 1], "x": [4.0, 1.0, 2.0, 8.0], "t": [3, 1, 2, None]})
+        result = df.group_by("g").agg(
+            instability=get_aggregator("instability")("x", order_by="t"),
+            trend=get_aggregator("trend")("x", order_by="t"),
+            unordered=get_aggregator("trend")("x"),
+        )
+        # Ordered by t (nulls last): 1, 2, 4, 8
+        assert result.row(0) == (1, pytest.approx(7 / 3), pytest.approx(7 / 3), pytest.approx(4 / 3))
+
+
 class TestApplyAggregation:
     """Test the apply_aggregation helper."""
 
@@ -451,3 +486,128 @@ class TestAggregateWorkerMeasurements:
         assert jan2["dim_a"][0] == pytest.approx(20.0)
         assert jan2["dim_b"][0] is None
 
+
+    def test_mixed_aggregations_keep_dtypes_and_order(self):
+        """One granularity with several aggregations keeps schema order and per-aggregation dtypes."""
+        schema = {
+            "dimensions": [
+                {"name": name, "aggregation": agg, "observability": "observed", "causal_granularity": "daily"}
+                for name, agg in [("steps", "sum"), ("events", "count"), ("mood", "mean"), ("last_seen", "last")]
+            ]
+        }
+
+        df = pl.DataFrame({
+            "dimension": ["mood", "events", "steps", "events", "last_seen", "last_seen", "steps"],
+            "value": [4, "x", 100, 1, 1, 2, "250"],
+            "timestamp": ["2024-01-01 08:00"] * 5 + ["2024-01-01 20:00", "2024-01-02 09:00"],
+        }, schema={"dimension": pl.Utf8, "value": pl.Object, "timestamp": pl.Utf8})
+
+        daily_df = aggregate_worker_measurements([df], schema)["daily"]
+
+        assert daily_df.columns == ["time_bucket", "steps", "events", "mood", "last_seen"]
+        assert daily_df.schema["events"] == pl.UInt32
+        assert daily_df["steps"].to_list() == [100.0, 250.0]
+        assert daily_df["events"].to_list() == [1, None]  # "x" is not numeric
+        assert daily_df["last_seen"].to_list() == [2.0, None]
+
+
+    def test_instability_in_timestamp_order(self):
+        """Instability follows timestamps within a bucket, not extraction order."""
+        schema = {
+            "dimensions": [
+                {"name": "mood", "aggregation": "instability", "observability": "observed",
+                 "causal_granularity": "daily"},
+            ]
+        }
+        late = pl.DataFrame({
+            "dimension": ["mood", "mood"], "value": [5, 1], "timestamp": ["2024-01-01 20:00", "2024-01-01 08:00"],
+        }, schema={"dimension": pl.Utf8, "value": pl.Object, "timestamp": pl.Utf8})
+        early = pl.DataFrame({
+            "dimension": ["mood"], "value": [3], "timestamp": ["2024-01-01 12:00"],
+        }, schema={"dimension": pl.Utf8, "value": pl.Object, "timestamp": pl.Utf8})
+
+        result = aggregate_worker_measurements([late, early], schema)
+
+        # 1 (08:00) -> 3 (12:00) -> 5 (20:00)
+        assert result["daily"]["mood"][0] == pytest.approx(2.0)
+
+class TestCoerceToNumeric:
+    """Test vectorized value coercion against the per-value fallback."""
+
+    VALUES = [3, 2.5, "4", " 3 ", "1_0", "nan", "1e3", "abc", "", True, False, None, [1]]
+
+    def test_object_matches_per_value(self):
+        series = pl.Series("value", self.VALUES, dtype=pl.Object)
+        expected = [_coerce_value_to_numeric(v) for v in self.VALUES]
+        result = _coerce_to_numeric(series).to_list()
+        assert result[:5] == expected[:5] and result[6:] == expected[6:]
+        assert result[5] != result[5]  # "nan" parses to NaN, not null
+
+    def test_string_matches_per_value(self):
+        strings = ["4", " 3 ", "1_0", "abc", "", None, "-2.5"]
+        result = _coerce_to_numeric(pl.Series("value", strings, dtype=pl.String))
+        assert result.to_list() == [_coerce_value_to_numeric(v) for v in strings]
+
+    def test_numeric_and_boolean_cast(self):
+        assert _coerce_to_numeric(pl.Series([1, None, 3])).to_list() == [1.0, None, 3.0]
+        assert _coerce_to_numeric(pl.Series([True, False])).to_list() == [1.0, 0.0]
+
+
+class TestOutOfCoreAggregation:
+    """Test LazyFrame and Parquet shard sources against in-memory aggregation."""
+
+    @pytest.fixture
+    def schema(self):
+        return {
+            "dimensions": [
+                {"name": name, "aggregation": agg, "observability": "observed", "causal_granularity": gran}
+                for name, agg, gran in [
+                    ("mood", "mean", "daily"),
+                    ("last_mood", "last", "daily"),
+                    ("swings", "instability", "daily"),
+                    ("events", "count", "weekly"),
+                    ("baseline", "first", None),
+                ]
+            ]
+        }
+
+    @pytest.fixture
+    def worker_dataframes(self):
+        names = ["mood", "last_mood", "swings", "events", "baseline"]
+        values = [3, "4", True, 2.5, " 7 ", None, "high", 1, 0, 5]
+        return [
+            pl.DataFrame({
+                "dimension": [names[(w + i) % len(names)] for i in range(10)],
+                "value": values[w % 3:] + values[:w % 3],
+                "timestamp": [f"2024-01-{1 + (w + i) % 20:02d} {i:02d}:00" for i in range(9)] + ["unknown"],
+            }, schema={"dimension": pl.Utf8, "value": pl.Object, "timestamp": pl.Utf8})
+            for w in range(12)
+        ]
+
+    def _assert_same(self, result, expected):
+        assert result.keys() == expected.keys()
+        for key in expected:
+            assert result[key].equals(expected[key]), key
+
+    def test_parquet_shards_match_in_memory(self, tmp_path, schema, worker_dataframes):
+        assert write_extraction_shards(tmp_path, worker_dataframes) == 120
+        expected = aggregate_worker_measurements(worker_dataframes, schema)
+        self._assert_same(aggregate_worker_measurements(tmp_path / SHARDS_DIR, schema), expected)
+
+    def test_shards_append_across_writes(self, tmp_path, schema, worker_dataframes):
+        write_extraction_shards(tmp_path, worker_dataframes[:5])
+        write_extraction_shards(tmp_path, worker_dataframes[5:])
+        expected = aggregate_worker_measurements(worker_dataframes, schema)
+        self._assert_same(aggregate_worker_measurements(tmp_path / SHARDS_DIR, schema), expected)
+
+    def test_lazyframe_with_raw_values(self, schema, worker_dataframes):
+        strings = [
+            df.with_columns(pl.Series("value", [None if v is None else str(v) for v in df["value"]]))
+            for df in worker_dataframes
+        ]
+        expected = aggregate_worker_measurements(strings, schema)
+        self._assert_same(aggregate_worker_measurements(pl.concat(strings).lazy(), schema), expected)
+
+    def test_empty_shard_directory(self, tmp_path, schema):
+        assert scan_extraction_shards(tmp_path) is None
+        assert aggregate_worker_measurements(tmp_path, schema) == {}
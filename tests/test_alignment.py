@@ -0,0 +1,172 @@
+"""Tests for cross-timescale alignment into design matrices."""
+
+import math
+
+import polars as pl
+import pytest
+
+from causal_agent.orchestrator.schemas import DSEMStructure
+from causal_agent.utils.aggregations import aggregate_worker_measurements
+from causal_agent.utils.alignment import align_design_matrices
+from causal_agent.utils.rollup import RollupCache
+
+EXTRACTION_SCHEMA = {"dimension": pl.Utf8, "value": pl.Object, "timestamp": pl.Utf8}
+
+
+def _dim(name: str, granularity: str | None, aggregation: str = "mean", role: str = "exogenous", **fields) -> dict:
+    dim = {
+        "name": name, "description": name, "role": role, "observability": "observed",
+        "how_to_measure": name, "measurement_dtype": "continuous",
+    }
+    if granularity is None:
+        return {**dim, "temporal_status": "time_invariant", **fields}
+    return {
+        **dim, "temporal_status": "time_varying", "causal_granularity": granularity,
+        "measurement_granularity": "finest", "aggregation": aggregation, **fields,
+    }
+
+
+STRUCTURE = DSEMStructure.model_validate({
+    "dimensions": [
+        _dim("mood", "daily", role="endogenous", is_outcome=True),
+        _dim("steps", "hourly", "sum"),
+        _dim("heart_rate", "hourly", "mean"),
+        _dim("stress", "weekly"),
+        _dim("sleep", "daily"),
+        _dim("age", None),
+        _dim("energy", "daily", observability="latent", how_to_measure=None, measurement_granularity=None),
+    ],
+    "edges": [
+        {"cause": cause, "effect": "mood", "description": "", "lagged": lagged}
+        for cause, lagged in [
+            ("steps", True), ("heart_rate", True), ("stress", True), ("sleep", False), ("age", True), ("energy", True),
+        ]
+    ],
+})
+
+
+def _extractions() -> pl.DataFrame:
+    """Two weeks from Monday 2024-01-01, with no mood on January 5."""
+    rows = [("age", 40, "unknown")]
+    for day in range(1, 15):
+        if day != 5:
+            rows.append(("mood", day, f"2024-01-{day:02d} 20:00"))
+        rows.append(("sleep", day * 10, f"2024-01-{day:02d} 08:00"))
+        rows.append(("stress", day, f"2024-01-{day:02d} 12:00"))
+        rows.append(("steps", day * 100, f"2024-01-{day:02d} 09:00"))
+        rows.append(("steps", 1, f"2024-01-{day:02d} 10:00"))
+        # Three readings in one hour and one in another: mean of hourly means != daily mean
+        rows.extend(("heart_rate", value, f"2024-01-{day:02d} 09:00") for value in (60, 60, 60))
+        rows.append(("heart_rate", 100, f"2024-01-{day:02d} 10:00"))
+    dimension, value, timestamp = zip(*rows)
+    return pl.DataFrame({"dimension": dimension, "value": value, "timestamp": timestamp}, schema=EXTRACTION_SCHEMA)
+
+
+@pytest.fixture
+def matrices(tmp_path):
+    path = tmp_path / "rollup.parquet"
+    measurements = aggregate_worker_measurements([_extractions()], STRUCTURE.model_dump(), rollup_path=path)
+    return measurements, align_design_matrices(measurements, STRUCTURE, RollupCache.load(path))
+
+
+class TestAlignDesignMatrices:
+    """Test gap filling, broadcasting, aggregation and lags."""
+
+    def test_one_matrix_per_endogenous_variable(self, matrices):
+        _, aligned = matrices
+        assert list(aligned) == ["mood"]
+        design = aligned["mood"]
+        assert design.granularity == "daily"
+        assert design.columns == (
+            "mood_lag24h", "steps_lag24h", "heart_rate_lag24h", "stress_lag168h", "sleep", "age",
+        )
+        assert design.missing_parents == ("energy",)
+
+    def test_columns_are_aligned_on_a_regular_grid(self, matrices):
+        frame = matrices[1]["mood"].to_frame()
+        assert frame.height == 14  # January 5 filled in
+        day = {row["time_bucket"].day: row for row in frame.iter_rows(named=True)}
+
+        assert math.isnan(day[5]["mood"])
+        assert math.isnan(day[6]["mood_lag24h"])  # Yesterday's mood is the missing one
+        assert day[3]["mood_lag24h"] == 2.0
+        assert day[3]["sleep"] == 30.0  # Contemporaneous
+        assert day[3]["steps_lag24h"] == 201.0  # Hourly steps of the day before, summed
+        assert day[3]["age"] == 40.0
+        # Weekly stress lags a week and is broadcast to each day of the next week
+        assert all(math.isnan(day[d]["stress_lag168h"]) for d in range(1, 8))
+        assert all(day[d]["stress_lag168h"] == 4.0 for d in range(8, 15))
+
+    def test_finer_cause_rolls_up_exactly_from_cache(self, matrices):
+        measurements, aligned = matrices
+        frame = aligned["mood"].to_frame()
+        assert frame["heart_rate_lag24h"][1] == 70.0  # Mean of the day's four readings
+
+        # Without the cache, sums compose but a mean of hourly means would be wrong (80), so it is missing
+        without_cache = align_design_matrices(measurements, STRUCTURE)["mood"]
+        assert without_cache.to_frame()["steps_lag24h"][1] == 101.0
+        assert "heart_rate_lag24h" not in without_cache.columns
+        assert without_cache.missing_parents == ("heart_rate", "energy")
+
+    def test_numpy_export_is_zero_copy(self, matrices):
+        design = matrices[1]["mood"]
+        y, X = design.to_numpy()
+        assert y.shape == (14,)
+        assert X.shape == (14, len(design.columns))
+        assert not y.flags.owndata and not X.flags.owndata
+        assert X[2, 1] == 201.0
+
+
+CATEGORICAL_STRUCTURE = DSEMStructure.model_validate({
+    "dimensions": [
+        _dim("mood", "daily", role="endogenous", is_outcome=True),
+        _dim("activity", "hourly", "one_hot", measurement_dtype="categorical", categories=["run", "walk"]),
+        _dim("sex", None, measurement_dtype="categorical", categories=["f", "m"]),
+        _dim("plan", "daily", "one_hot", role="endogenous", measurement_dtype="categorical",
+             categories=["gym", "rest"]),
+    ],
+    "edges": [
+        {"cause": cause, "effect": effect, "description": "", "lagged": lagged}
+        for cause, effect, lagged in [("activity", "mood", True), ("sex", "mood", True), ("mood", "plan", False)]
+    ],
+})
+
+
+def _categorical_extractions() -> pl.DataFrame:
+    rows = [("sex", "m", "unknown")]
+    for day in range(1, 4):
+        rows.append(("mood", day, f"2024-01-0{day} 20:00"))
+        rows.append(("plan", "gym" if day % 2 else "rest", f"2024-01-0{day} 07:00"))
+        rows.extend(("activity", activity, f"2024-01-0{day} {hour}:00")
+                    for activity, hour in [("run", 8), ("walk", 9), ("walk", 10)])
+    dimension, value, timestamp = zip(*rows)
+    return pl.DataFrame({"dimension": dimension, "value": value, "timestamp": timestamp}, schema=EXTRACTION_SCHEMA)
+
+
+class TestCategoricalAlignment:
+    """Test categorical time-invariant causes and one_hot indicators."""
+
+    @pytest.mark.parametrize("with_cache", [True, False])
+    def test_one_hot_cause_and_categorical_invariant(self, tmp_path, with_cache):
+        path = tmp_path / "rollup.parquet"
+        measurements = aggregate_worker_measurements(
+            [_categorical_extractions()], CATEGORICAL_STRUCTURE.model_dump(), rollup_path=path
+        )
+        rollups = RollupCache.load(path) if with_cache else None
+        design = align_design_matrices(measurements, CATEGORICAL_STRUCTURE, rollups)["mood"]
+
+        assert design.columns == ("mood_lag24h", "activity=run_lag24h", "activity=walk_lag24h", "sex")
+        assert design.missing_parents == ()
+        frame = design.to_frame()
+        # Hourly indicators counted per day, then lagged a day
+        assert frame["activity=run_lag24h"].to_list()[1:] == [1.0, 1.0]
+        assert frame["activity=walk_lag24h"].to_list()[1:] == [2.0, 2.0]
+        assert frame["sex"].to_list() == [1.0, 1.0, 1.0]  # Code of "m"
+
+    def test_one_hot_variable_gets_matrix_per_category(self):
+        measurements = aggregate_worker_measurements([_categorical_extractions()], CATEGORICAL_STRUCTURE.model_dump())
+        aligned = align_design_matrices(measurements, CATEGORICAL_STRUCTURE)
+        assert set(aligned) == {"mood", "plan=gym", "plan=rest"}
+        gym = aligned["plan=gym"]
+        assert gym.columns == ("plan=gym_lag24h", "mood")
+        assert gym.to_frame()["plan=gym"].to_list() == [1.0, 0.0, 1.0]
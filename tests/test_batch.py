@@ -0,0 +1,166 @@
+"""Tests for the stage 2 batch-API mode."""
+
+import asyncio
+import json
+
+import pytest
+from inspect_ai.model import GenerateConfig
+
+from causal_agent.workers.batch import (
+    BATCH_INPUT_FILE,
+    BATCH_OUTPUT_FILE,
+    BatchExecutor,
+    BatchStatus,
+    LocalBatchExecutor,
+    OpenAIBatchExecutor,
+    build_batch_request,
+    get_batch_executor,
+    run_worker_batch,
+    wait_for_batch,
+)
+
+SCHEMA = {
+    "dimensions": [
+        {"name": "mood", "observability": "observed", "measurement_dtype": "continuous",
+         "causal_granularity": "daily", "aggregation": "mean", "how_to_measure": "m"},
+    ],
+}
+CHUNKS = [
+    "\n".join(f"[2024-03-{day} 1{h}:00] [Search] query {h}" for h in range(5))
+    for day in (15, 16, 17)
+]
+VALID = json.dumps({"extractions": [{"dimension": "mood", "value": 3, "timestamp": "2024-03-15"}]})
+INVALID = "Sorry, here are the extractions: {extractions: [mood = 3]}"
+
+
+class ScriptedExecutor(BatchExecutor):
+    """Answers each round's requests from a list of per-round reply functions."""
+
+    def __init__(self, replies):
+        self.replies = replies
+        self.requests: list[list[dict]] = []
+
+    def submit(self, input_path):
+        self.requests.append([json.loads(line) for line in input_path.read_text().splitlines()])
+        return f"round{len(self.requests)}"
+
+    def poll(self, batch_id):
+        return BatchStatus(state="completed")
+
+    def fetch(self, batch_id, output_path):
+        reply = self.replies[len(self.requests) - 1]
+        lines = []
+        for request in self.requests[-1]:
+            content = reply(request["custom_id"])
+            line = {"custom_id": request["custom_id"], "response": None, "error": None}
+            if content is None:
+                line["error"] = {"code": "server_error", "message": "boom"}
+            else:
+                line["response"] = {"status_code": 200, "body": {
+                    "choices": [{"message": {"content": content}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 10, "completion_tokens": 5},
+                }}
+            lines.append(json.dumps(line))
+        output_path.write_text("\n".join(lines) + "\n")
+
+
+class TestBatchRequests:
+    """Test request lines and executor lookup."""
+
+    def test_request_line(self):
+        request = build_batch_request("chunk_00000", [{"role": "user", "content": "hi"}], "gpt-4o",
+                                      GenerateConfig(max_tokens=100))
+        assert request["url"] == "/v1/chat/completions"
+        assert request["body"] == {"model": "gpt-4o", "messages": [{"role": "user", "content": "hi"}],
+                                   "max_tokens": 100}
+
+    def test_unknown_executor(self):
+        assert isinstance(get_batch_executor("local"), LocalBatchExecutor)
+        with pytest.raises(ValueError, match="Unknown batch executor"):
+            get_batch_executor("carrier-pigeon")
+
+    def test_executor_is_abstract(self):
+        with pytest.raises(TypeError):
+            BatchExecutor()
+
+    def test_openai_executor_rejects_other_providers(self):
+        executor = OpenAIBatchExecutor(api_key="test")
+        assert executor.model_id("openai/gpt-4o-mini") == "gpt-4o-mini"
+        with pytest.raises(ValueError, match="needs an openai/ model"):
+            executor.model_id("openrouter/google/gemini-2.5-flash")
+
+
+class StalledExecutor(ScriptedExecutor):
+    """Never finishes a batch; records the batches it is asked to cancel."""
+
+    def __init__(self):
+        super().__init__([])
+        self.cancelled: list[str] = []
+
+    def poll(self, batch_id):
+        return BatchStatus(state="in_progress", n_total=len(CHUNKS))
+
+    def cancel(self, batch_id):
+        self.cancelled.append(batch_id)
+
+
+class TestRunWorkerBatch:
+    """Test batch rounds, repair and dead-lettering."""
+
+    def test_local_executor_end_to_end(self, tmp_path):
+        results, dead_letters = run_worker_batch(
+            CHUNKS, "Why?", SCHEMA, tmp_path, LocalBatchExecutor(), "causal-mock/test-batch", poll_seconds=0.01
+        )
+        assert len(results) == len(CHUNKS) and not dead_letters
+        assert [result.chunk for result in results] == CHUNKS
+        lines = (tmp_path / BATCH_OUTPUT_FILE.format(round=1)).read_text().splitlines()
+        assert len(lines) == len(CHUNKS)
+
+    def test_invalid_answer_repaired_in_next_round(self, tmp_path):
+        executor = ScriptedExecutor([
+            lambda cid: INVALID if cid == "chunk_00001" else VALID,
+            lambda cid: VALID,
+        ])
+        results, dead_letters = run_worker_batch(CHUNKS, "Why?", SCHEMA, tmp_path, executor, "m", poll_seconds=0)
+
+        assert len(results) == 3 and not dead_letters
+        (resent,) = executor.requests[1]
+        assert resent["custom_id"] == "chunk_00001"
+        messages = resent["body"]["messages"]
+        assert [m["role"] for m in messages] == ["system", "user", "assistant", "user"]
+        assert "failed validation" in messages[-1]["content"]
+        assert results[1].stats.turns == 2
+        assert (tmp_path / BATCH_INPUT_FILE.format(round=2)).exists()
+
+    def test_failures_dead_lettered_after_last_round(self, tmp_path):
+        executor = ScriptedExecutor([lambda cid: None if cid == "chunk_00002" else VALID] * 2)
+        results, dead_letters = run_worker_batch(CHUNKS, "Why?", SCHEMA, tmp_path, executor, "m", poll_seconds=0)
+
+        assert len(results) == 2
+        assert [dl.chunk_id for dl in dead_letters] == ["chunk_00002"]
+        assert "boom" in dead_letters[0].error
+
+    def test_timed_out_batch_cancelled(self, tmp_path):
+        executor = StalledExecutor()
+        results, dead_letters = run_worker_batch(
+            CHUNKS, "Why?", SCHEMA, tmp_path, executor, "m", poll_seconds=0.01, timeout_seconds=0
+        )
+        assert not results and len(dead_letters) == len(CHUNKS)
+        assert executor.cancelled == ["round1"]
+        assert "did not finish in time" in dead_letters[0].error
+
+    def test_local_executor_cancel(self, tmp_path):
+        class HangingExecutor(LocalBatchExecutor):
+            async def _complete(self, request):
+                await asyncio.sleep(60)
+
+        input_path = tmp_path / "input.jsonl"
+        messages = [{"role": "user", "content": "hi"}]
+        request = build_batch_request("chunk_00000", messages, "causal-mock/test", GenerateConfig())
+        input_path.write_text(json.dumps(request) + "\n")
+        executor = HangingExecutor()
+        batch_id = executor.submit(input_path)
+        executor.cancel(batch_id)
+        status = wait_for_batch(executor, batch_id, poll_seconds=0.01, timeout_seconds=5)
+        assert status.finished
+        assert status.state == "failed" and status.error == "Batch cancelled"
@@ -0,0 +1,206 @@
+"""Tests for the run budget, budgeted dispatch, and bucket coverage."""
+
+import asyncio
+import pickle
+import time
+from datetime import datetime, timezone
+
+import pytest
+from inspect_ai.model import ChatMessageUser, ModelOutput, ModelUsage, get_model
+from prefect.states import Failed
+
+from causal_agent.flows.stages.stage2_workers import _failed_tokens, _retry_unless_deadline
+from causal_agent.utils.aggregations import compute_bucket_coverage
+from causal_agent.utils.budget import BudgetedDispatcher, DeadlineExceededError, RunBudget, chunk_stratum
+from causal_agent.utils.llm import GenerationStats, calculate, multi_turn_generate
+from causal_agent.workers.agents import WorkerError, _until_deadline, process_chunk
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestRunBudget:
+    """Test deadline and token accounting."""
+
+    def test_unlimited_budget(self):
+        budget = RunBudget()
+        assert not budget.limited
+        assert budget.remaining_fraction() == 1.0
+        assert budget.can_dispatch(in_flight=1000)
+
+    def test_deadline(self):
+        clock = FakeClock()
+        budget = RunBudget(deadline_seconds=100, reserve_fraction=0.2, clock=clock)
+        clock.now = 50
+        assert budget.seconds_left() == 50
+        assert not budget.near_limit()
+        clock.now = 85
+        assert budget.near_limit()
+        clock.now = 120
+        assert budget.seconds_left() == 0
+        assert not budget.can_dispatch(in_flight=0)
+
+    def test_in_flight_chunks_charged_at_mean_tokens(self):
+        budget = RunBudget(max_tokens=1000)
+        budget.record(100)
+        budget.record(100)
+        # 200 used + 100 per chunk: 7 more chunks fit, an 8th would overshoot
+        assert budget.can_dispatch(in_flight=7)
+        assert not budget.can_dispatch(in_flight=8)
+
+    def test_failures_do_not_lower_mean_tokens(self):
+        budget = RunBudget(max_tokens=2000)
+        budget.record(100)
+        budget.record(100)
+        for _ in range(5):
+            budget.record_failure(0)
+        assert budget.chunks_done == 2 and budget.chunks_failed == 5
+        assert budget.tokens_per_chunk() == 100
+        assert not budget.can_dispatch(in_flight=18)
+
+    def test_failures_charge_their_tokens(self):
+        budget = RunBudget(max_tokens=1000)
+        budget.record(100)
+        budget.record_failure(300)  # Known usage, e.g. from WorkerError.stats
+        budget.record_failure()  # Unknown usage: charged at the mean
+        assert budget.tokens_used == 500 and budget.tokens_per_chunk() == 100
+        assert budget.can_dispatch(in_flight=4)
+        assert not budget.can_dispatch(in_flight=5)
+
+    def test_failed_worker_tokens_over_all_attempts(self):
+        stats = GenerationStats(input_tokens=900, output_tokens=100)
+        error = WorkerError("bad output", stats=stats, attempts=3)
+        assert _failed_tokens(error) == 3000
+        assert _failed_tokens(pickle.loads(pickle.dumps(error))) == 3000
+        assert _failed_tokens(TimeoutError()) is None
+
+    def test_deadline_at(self):
+        clock = FakeClock()
+        budget = RunBudget(deadline_seconds=100, clock=clock)
+        clock.now = 40
+        assert budget.deadline_at() == pytest.approx(time.time() + 60, abs=1)
+        assert RunBudget().deadline_at() is None
+
+
+class TestWorkerDeadline:
+    """Test worker calls cancelling themselves at the run deadline."""
+
+    def test_running_call_cancelled_at_deadline(self):
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceededError):
+            asyncio.run(_until_deadline(asyncio.sleep(10), time.time() + 0.05))
+        assert time.monotonic() - started < 1
+
+    def test_call_timeout_before_deadline_is_a_timeout(self):
+        async def times_out():
+            raise TimeoutError("provider timeout")
+
+        with pytest.raises(TimeoutError) as info:
+            asyncio.run(_until_deadline(times_out(), time.time() + 60))
+        assert not isinstance(info.value, DeadlineExceededError)
+
+    def test_deadline_not_retried(self):
+        assert not _retry_unless_deadline(None, None, Failed(data=DeadlineExceededError("cancelled")))
+        assert _retry_unless_deadline(None, None, Failed(data=TimeoutError("provider timeout")))
+
+    def test_no_call_after_deadline(self):
+        with pytest.raises(DeadlineExceededError, match="before the worker call started"):
+            process_chunk("[2024-01-01 10:00] a", "question", {"dimensions": []}, deadline=time.time() - 1)
+
+
+class TestChunkStratum:
+    """Test time strata of chunks."""
+
+    def test_first_timestamped_line(self):
+        chunk = "no timestamp\n[2024-03-15 10:30] a\n[2024-03-16 09:00] b"
+        assert chunk_stratum(chunk, "daily") == "2024-03-15"
+        assert chunk_stratum(chunk, "monthly") == "2024-03"
+        assert chunk_stratum(chunk, "weekly") == "2024-W11"
+
+    def test_no_timestamp(self):
+        assert chunk_stratum("plain text", "daily") is None
+
+    def test_unknown_stratum(self):
+        with pytest.raises(ValueError, match="Unknown stratum"):
+            chunk_stratum("[2024-03-15 10:30] a", "fortnightly")
+
+
+class TestBudgetedDispatcher:
+    """Test in-order dispatch and stratified subsampling."""
+
+    def test_in_order_when_unlimited(self):
+        dispatcher = BudgetedDispatcher(["d1", "d1", "d2"], RunBudget())
+        assert [dispatcher.next_index() for _ in range(3)] == [0, 1, 2]
+        assert dispatcher.next_index() is None
+        assert not dispatcher.has_pending()
+
+    def test_subsamples_across_strata_near_limit(self):
+        clock = FakeClock()
+        budget = RunBudget(deadline_seconds=100, reserve_fraction=0.5, clock=clock)
+        # Three days, three chunks each
+        strata = ["d1"] * 3 + ["d2"] * 3 + ["d3"] * 3
+        dispatcher = BudgetedDispatcher(strata, budget)
+
+        assert dispatcher.next_index() == 0
+        clock.now = 60  # Near the limit
+        picks = [dispatcher.next_index() for _ in range(2)]
+
+        assert dispatcher.subsampling
+        # One chunk from each day not yet covered, rather than the next chunks of d1
+        assert sorted(strata[i] for i in picks) == ["d2", "d3"]
+
+    def test_stops_when_budget_spent(self):
+        budget = RunBudget(max_tokens=100)
+        dispatcher = BudgetedDispatcher(["d1", "d2", "d3"], budget)
+        assert dispatcher.next_index() == 0
+        budget.record(100)
+        assert dispatcher.next_index() is None
+        assert dispatcher.skipped() == [1, 2]
+
+
+class TestBucketCoverage:
+    """Test per-bucket coverage of processed lines."""
+
+    def test_coverage_by_day(self):
+        all_lines = [
+            "[2024-03-15 10:00] a",
+            "[2024-03-15 11:00] b",
+            "[2024-03-16 10:00] c",
+            "no timestamp",
+        ]
+        coverage = compute_bucket_coverage(all_lines, all_lines[:1], ["daily"])["daily"]
+
+        assert coverage["time_bucket"].to_list() == [
+            datetime(2024, 3, 15, tzinfo=timezone.utc),
+            datetime(2024, 3, 16, tzinfo=timezone.utc),
+        ]
+        assert coverage["n_lines"].to_list() == [2, 1]
+        assert coverage["n_processed"].to_list() == [1, 0]
+        assert coverage["coverage"].to_list() == [0.5, 0.0]
+
+
+class TestGenerationTokenUsage:
+    """Test token accounting in multi_turn_generate."""
+
+    def test_tool_loop_sums_usage_over_turns(self):
+        outputs = [
+            ModelOutput.for_tool_call("mockllm/model", "calculate", {"expression": "1 + 1"}),
+            ModelOutput.from_content("mockllm/model", "done"),
+        ]
+        for output in outputs:
+            output.usage = ModelUsage(input_tokens=10, output_tokens=5, total_tokens=15)
+        model = get_model("mockllm/model", custom_outputs=outputs)
+
+        stats = GenerationStats()
+        completion = asyncio.run(multi_turn_generate(
+            [ChatMessageUser(content="hi")], model, tools=[calculate()], stats=stats
+        ))
+
+        assert completion == "done"
+        assert (stats.turns, stats.tool_calls) == (2, 1)
+        assert stats.total_tokens == 30
@@ -0,0 +1,121 @@
+"""Tests for categorical and ordinal aggregation with declared categories."""
+
+import polars as pl
+import pytest
+from pydantic import ValidationError
+
+from causal_agent.orchestrator.schemas import Dimension
+from causal_agent.utils.aggregations import aggregate_worker_measurements
+from causal_agent.utils.measurements import MeasurementSet
+from causal_agent.utils.online_aggregation import OnlineAggregator
+from causal_agent.utils.runs import SHARDS_DIR, write_extraction_shards
+
+EXTRACTION_SCHEMA = {"dimension": pl.Utf8, "value": pl.Object, "timestamp": pl.Utf8}
+ACTIVITIES = ["walk", "run", "rest"]
+SCHEMA = {
+    "dimensions": [
+        {"name": "activity", "measurement_dtype": "categorical", "categories": ACTIVITIES,
+         "aggregation": "mode", "observability": "observed", "causal_granularity": "daily"},
+        {"name": "activity_mix", "measurement_dtype": "categorical", "categories": ACTIVITIES,
+         "aggregation": "one_hot", "observability": "observed", "causal_granularity": "daily"},
+        {"name": "activity_entropy", "measurement_dtype": "categorical", "categories": ACTIVITIES,
+         "aggregation": "entropy", "observability": "observed", "causal_granularity": "daily"},
+        {"name": "stress", "measurement_dtype": "ordinal", "categories": ["low", "medium", "high"],
+         "aggregation": "max", "observability": "observed", "causal_granularity": "daily"},
+        {"name": "diet", "measurement_dtype": "categorical", "categories": ["vegan", "omnivore"],
+         "observability": "observed", "causal_granularity": None},
+        {"name": "weather", "measurement_dtype": "categorical",
+         "aggregation": "mode", "observability": "observed", "causal_granularity": "daily"},
+    ]
+}
+
+
+def _extractions() -> pl.DataFrame:
+    rows = [
+        ("activity", "Walk", "2024-01-01 08:00"),
+        ("activity", " run ", "2024-01-01 09:00"),
+        ("activity", "run", "2024-01-01 10:00"),
+        ("activity", "swim", "2024-01-02 08:00"),  # Not a category
+        ("activity", "rest", "2024-01-02 09:00"),
+        ("activity_mix", "walk", "2024-01-01 08:00"),
+        ("activity_mix", "walk", "2024-01-01 09:00"),
+        ("activity_mix", "rest", "2024-01-01 10:00"),
+        ("activity_mix", "swim", "2024-01-02 10:00"),
+        ("activity_entropy", "walk", "2024-01-01 08:00"),
+        ("activity_entropy", "run", "2024-01-01 09:00"),
+        ("stress", "medium", "2024-01-01 08:00"),
+        ("stress", "HIGH", "2024-01-01 09:00"),
+        ("stress", "low", "2024-01-02 09:00"),
+        ("diet", "vegan", "unknown"),
+        ("weather", 3, "2024-01-01 08:00"),
+        ("weather", "sunny", "2024-01-01 09:00"),
+    ]
+    dimension, value, timestamp = zip(*rows)
+    return pl.DataFrame({"dimension": dimension, "value": value, "timestamp": timestamp}, schema=EXTRACTION_SCHEMA)
+
+
+@pytest.fixture
+def results() -> dict[str, pl.DataFrame]:
+    return aggregate_worker_measurements([_extractions()], SCHEMA)
+
+
+class TestCategoricalAggregation:
+    """Test category codes, category-valued results and one-hot counts."""
+
+    def test_category_valued_aggregations_decode_to_enums(self, results):
+        daily = results["daily"]
+        assert daily["activity"].dtype == pl.Enum(ACTIVITIES)
+        assert daily["activity"].to_list() == ["run", "rest"]  # "swim" is dropped, not counted
+        assert daily["stress"].dtype == pl.Enum(["low", "medium", "high"])
+        assert daily["stress"].to_list() == ["high", "low"]  # Ordinal max follows the category order
+        assert results["time_invariant"]["diet"].to_list() == ["vegan"]
+
+    def test_one_hot_counts_per_category(self, results):
+        daily = results["daily"]
+        assert [daily[f"activity_mix={category}"].to_list() for category in ACTIVITIES] == [[2, 0], [0, 0], [1, 0]]
+        assert daily["activity_mix=walk"].dtype == pl.UInt32
+        assert "activity_mix" not in daily.columns
+
+    def test_non_category_aggregations_stay_numeric(self, results):
+        daily = results["daily"]
+        assert daily["activity_entropy"].dtype == pl.Float64
+        assert daily["activity_entropy"][0] == pytest.approx(0.6931, abs=1e-3)
+        # Without declared categories, only numeric values are kept
+        assert daily["weather"].to_list()[0] == 3.0
+
+    def test_shards_and_online_match_in_memory(self, results, tmp_path):
+        write_extraction_shards(tmp_path, [_extractions()])
+        from_shards = aggregate_worker_measurements(tmp_path / SHARDS_DIR, SCHEMA)
+        online = OnlineAggregator(SCHEMA)
+        online.fold(_extractions())
+        for other in (from_shards, online.result()):
+            for granularity, df in results.items():
+                assert other[granularity].select(df.columns).equals(df)
+
+    def test_measurement_set_packs_codes(self, results):
+        measurements = MeasurementSet(results)
+        column = measurements.dimensions("daily").index("stress")
+        assert measurements.values("daily")[:, column].tolist() == [2.0, 0.0]
+
+
+class TestDimensionCategories:
+    """Test validation of declared categories."""
+
+    def _dimension(self, **fields) -> dict:
+        return {
+            "name": "activity", "description": "activity", "role": "exogenous", "observability": "observed",
+            "how_to_measure": "activity", "temporal_status": "time_invariant",
+            "measurement_dtype": "categorical", **fields,
+        }
+
+    def test_accepts_categories(self):
+        assert Dimension.model_validate(self._dimension(categories=ACTIVITIES)).categories == ACTIVITIES
+
+    def test_rejects_categories_of_non_categorical_dtype(self):
+        with pytest.raises(ValidationError, match="has categories"):
+            Dimension.model_validate(self._dimension(measurement_dtype="continuous", categories=ACTIVITIES))
+
+    def test_rejects_empty_or_duplicate_categories(self):
+        for categories in ([], ["walk", "Walk "]):
+            with pytest.raises(ValidationError, match="non-empty and distinct"):
+                Dimension.model_validate(self._dimension(categories=categories))
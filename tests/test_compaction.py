@@ -0,0 +1,118 @@
+"""Tests for tool-loop history compaction in multi_turn_generate."""
+
+import asyncio
+
+from inspect_ai.model import (
+    ChatMessageAssistant,
+    ChatMessageSystem,
+    ChatMessageTool,
+    ChatMessageUser,
+    get_model,
+)
+from inspect_ai.tool import ToolCall
+
+from causal_agent.utils.config import CompactionConfig, CompactionPolicy, get_config
+from causal_agent.utils.llm import GenerationStats, compact_tool_history, make_worker_tools, multi_turn_generate
+from causal_agent.workers.agents import _build_worker_messages
+
+SCHEMA = {
+    "dimensions": [
+        {"name": "mood", "observability": "observed", "measurement_dtype": "continuous",
+         "causal_granularity": "daily", "aggregation": "mean", "how_to_measure": "m"},
+    ],
+}
+CHUNK = "\n".join(f"[2024-03-15 1{h}:00] [Search] query {h}" for h in range(5))
+
+
+def _round(call_id: str, draft: str) -> list:
+    call = ToolCall(id=call_id, function="validate_extractions", arguments={"output_json": draft})
+    return [
+        ChatMessageAssistant(content="", tool_calls=[call]),
+        ChatMessageTool(content=f"errors in {draft}", tool_call_id=call_id, function="validate_extractions"),
+    ]
+
+
+class TestCompactToolHistory:
+    """Test which messages survive compaction."""
+
+    def test_keeps_latest_draft_and_its_result(self):
+        prefix = [ChatMessageSystem(content="sys"), ChatMessageUser(content="chunk")]
+        messages = prefix + _round("a", "draft1") + _round("b", "draft2") + _round("c", "draft3")
+
+        compacted = compact_tool_history(messages)
+
+        assert compacted[:2] == prefix
+        assert [m.text for m in compacted[2:]] == ["", "errors in draft3"]
+        assert compacted[2].tool_calls[0].id == "c"
+        assert len(messages) == 8  # Original untouched
+
+    def test_single_round_unchanged(self):
+        messages = [ChatMessageUser(content="chunk")] + _round("a", "draft1")
+        assert compact_tool_history(messages) == messages
+
+    def test_final_answers_kept(self):
+        messages = (
+            [ChatMessageUser(content="q1")] + _round("a", "d1") + [ChatMessageAssistant(content="answer 1")]
+            + [ChatMessageUser(content="q2")] + _round("b", "d2")
+        )
+        texts = [m.text for m in compact_tool_history(messages)]
+        assert texts == ["q1", "answer 1", "q2", "", "errors in d2"]
+
+
+    def test_helper_calls_kept(self):
+        helper = ToolCall(id="h", function="parse_date", arguments={"date_string": "yesterday"})
+        mixed = ToolCall(id="m", function="calculate", arguments={"expression": "1+1"})
+        messages = (
+            [ChatMessageUser(content="chunk"), ChatMessageAssistant(content="", tool_calls=[helper])]
+            + [ChatMessageTool(content="2024-03-14", tool_call_id="h", function="parse_date")]
+            + _round("a", "d1") + _round("b", "d2")
+        )
+        messages[3].tool_calls.append(mixed)  # A draft sent together with a helper call
+        messages.insert(5, ChatMessageTool(content="2", tool_call_id="m", function="calculate"))
+
+        compacted = compact_tool_history(messages)
+
+        assert [m.text for m in compacted] == ["chunk", "", "2024-03-14", "", "2", "", "errors in d2"]
+        assert [call.id for call in compacted[3].tool_calls] == ["m"]
+        assert [call.id for call in messages[3].tool_calls] == ["a", "m"]  # Original untouched
+
+
+class TestCompactionConfig:
+    """Test per-provider policy resolution."""
+
+    def test_longest_prefix_wins(self):
+        config = CompactionConfig(
+            default=CompactionPolicy(reasoning_history="none"),
+            providers={
+                "openrouter/": CompactionPolicy(enabled=False),
+                "openrouter/google/": CompactionPolicy(reasoning_history="last"),
+            },
+        )
+        assert config.policy_for("openrouter/google/gemini-2.0-flash-001").reasoning_history == "last"
+        assert not config.policy_for("openrouter/openai/gpt-5").enabled
+        assert config.policy_for("anthropic/claude").reasoning_history == "none"
+
+    def test_loaded_from_config_yaml(self):
+        compaction = get_config().compaction
+        assert compaction.policy_for("openrouter/google/gemini-2.0-flash-001").reasoning_history == "last"
+
+
+class TestWorkerConversation:
+    """Test compaction on a real worker conversation (causal-mock provider)."""
+
+    def _run(self, policy: CompactionPolicy) -> GenerationStats:
+        model = get_model("causal-mock/test-compaction", tool_calls=3)
+        stats = GenerationStats()
+        asyncio.run(multi_turn_generate(
+            _build_worker_messages(CHUNK, "Why?", SCHEMA), model,
+            tools=make_worker_tools(SCHEMA), stats=stats, compaction=policy,
+        ))
+        return stats
+
+    def test_fewer_input_tokens_same_turns(self):
+        full = self._run(CompactionPolicy(enabled=False))
+        compacted = self._run(CompactionPolicy())
+
+        assert full.turns == compacted.turns == 4
+        assert compacted.input_tokens < full.input_tokens
+        assert compacted.output_tokens == full.output_tokens
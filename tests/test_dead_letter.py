@@ -0,0 +1,132 @@
+"""Tests for the worker dead-letter store and run extraction log."""
+
+import dataclasses
+import json
+
+import polars as pl
+
+import causal_agent.flows.stages.stage2_workers as stage2
+from causal_agent.flows.stages.stage2_workers import WorkerOutcomeWriter
+from causal_agent.utils.config import get_config
+from causal_agent.utils.llm import GenerationStats
+from causal_agent.utils.runs import (
+    SHARDS_DIR,
+    append_extractions,
+    init_run_dir,
+    load_extractions,
+    load_run_inputs,
+)
+import causal_agent.utils.runs as runs
+from causal_agent.workers.agents import TruncatedOutputError, WorkerError, parse_worker_completion
+from causal_agent.workers.dead_letter import DeadLetter, DeadLetterStore
+
+
+class TestDeadLetter:
+    """Test building dead letters from worker errors."""
+
+    def test_from_worker_error_keeps_completion_and_errors(self):
+        error = WorkerError("bad output", completion='{"extractions": [', validation_errors=["e1", "e2"])
+        letter = DeadLetter.from_error("chunk_00001", "chunk text", error, model="m")
+
+        assert letter.error_class == "WorkerError"
+        assert letter.completion == '{"extractions": ['
+        assert letter.validation_errors == ["e1", "e2"]
+        assert letter.chunk == "chunk text"
+
+    def test_from_subclass_records_subclass_name(self):
+        error = TruncatedOutputError("cut off", completion="{")
+        letter = DeadLetter.from_error("chunk_00001", "c", error, model="m")
+        assert letter.error_class == "TruncatedOutputError"
+
+    def test_from_generic_error(self):
+        letter = DeadLetter.from_error("chunk_00001", "c", TimeoutError("slow"), model="m")
+        assert letter.error_class == "TimeoutError"
+        assert letter.completion is None
+        assert letter.validation_errors == []
+
+
+class TestDeadLetterStore:
+    """Test JSONL persistence of dead letters."""
+
+    def test_append_and_load(self, tmp_path):
+        store = DeadLetterStore(tmp_path / "dead_letters.jsonl")
+        letters = [
+            DeadLetter(chunk_id=f"chunk_{i}", chunk="c", error_class="E", error="e", model="m")
+            for i in range(3)
+        ]
+        store.append(letters[:2])
+        store.append(letters[2:])
+
+        loaded = store.load()
+        assert [letter.chunk_id for letter in loaded] == ["chunk_0", "chunk_1", "chunk_2"]
+
+    def test_replace(self, tmp_path):
+        store = DeadLetterStore(tmp_path / "dead_letters.jsonl")
+        store.append([DeadLetter(chunk_id="a", chunk="c", error_class="E", error="e", model="m")])
+        store.replace([])
+        assert store.load() == []
+
+    def test_load_missing_store(self, tmp_path):
+        assert DeadLetterStore(tmp_path / "missing.jsonl").load() == []
+
+
+class TestRunExtractionLog:
+    """Test the per-run extraction log used for re-aggregation."""
+
+    def test_roundtrip_preserves_mixed_values(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(runs, "RUNS_DIR", tmp_path)
+        run_dir = init_run_dir("run1", "question?", {"dimensions": []})
+
+        df = pl.DataFrame(
+            {"dimension": ["a", "b", "c"], "value": [1, 2.5, True], "timestamp": ["t1", None, "t3"]},
+            schema={"dimension": pl.Utf8, "value": pl.Object, "timestamp": pl.Utf8},
+        )
+        assert append_extractions(run_dir, [df]) == 3
+
+        loaded = load_extractions(run_dir)
+        assert loaded["value"].to_list() == [1, 2.5, True]
+        assert loaded["timestamp"].to_list() == ["t1", None, "t3"]
+        assert load_run_inputs(run_dir) == ("question?", {"dimensions": []})
+
+    def test_empty_log(self, tmp_path):
+        assert load_extractions(tmp_path).is_empty()
+
+
+class TestWorkerOutcomeWriter:
+    """Test persisting worker results as they finish."""
+
+    SCHEMA = {"dimensions": [{"name": "mood", "observability": "observed", "measurement_dtype": "continuous",
+                              "causal_granularity": "daily", "aggregation": "mean", "how_to_measure": "m"}]}
+
+    def _result(self, n: int):
+        extractions = [{"dimension": "mood", "value": i, "timestamp": f"2024-03-{15 + i}"} for i in range(n)]
+        completion = json.dumps({"extractions": extractions})
+        return parse_worker_completion(completion, GenerationStats(), "chunk", self.SCHEMA)
+
+    def test_shard_per_result_and_rows_released(self, tmp_path, monkeypatch):
+        config = get_config()
+        sharded = dataclasses.replace(config, stage2_workers=dataclasses.replace(
+            config.stage2_workers, extraction_shards=True))
+        monkeypatch.setattr(stage2, "get_config", lambda: sharded)
+        writer = WorkerOutcomeWriter(tmp_path)
+        results = [self._result(2), self._result(0), self._result(3)]
+
+        writer(0, results[0])
+        assert len(list((tmp_path / SHARDS_DIR).glob("*.parquet"))) == 1  # Written when the chunk finished
+        writer(1, results[1])
+        writer(2, results[2])
+        writer.finish([DeadLetter.from_error("chunk_00003", "c", TimeoutError("slow"), model="m")])
+
+        assert sorted(path.name for path in (tmp_path / SHARDS_DIR).glob("*.parquet")) == [
+            "shard_000000.parquet", "shard_000001.parquet"
+        ]
+        assert writer.n_rows == load_extractions(tmp_path).height == 5
+        assert all(result.dataframe.is_empty() and not result.output.extractions for result in results)
+        assert results[0].chunk == "chunk"  # Kept for coverage
+        assert len(DeadLetterStore(tmp_path / "dead_letters.jsonl").load()) == 1
+
+    def test_rows_kept_for_in_memory_aggregation(self, tmp_path):
+        writer = WorkerOutcomeWriter(tmp_path, keep_rows=True)
+        result = self._result(2)
+        writer(0, result)
+        assert result.dataframe.height == 2
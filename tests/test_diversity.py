@@ -0,0 +1,65 @@
+"""Tests for near-duplicate-aware diverse sampling."""
+
+import pytest
+
+from causal_agent.utils.data import sample_chunks
+from causal_agent.utils.diversity import diverse_sample, lsh_clusters, minhash_signatures
+
+
+def _chunk(day: int, queries: list[str]) -> str:
+    return "\n".join(f"[2024-01-{day:02d} {h:02d}:00] [Search] {query}" for h, query in enumerate(queries))
+
+
+ROUTINE = [f"routine query {i}" for i in range(20)]
+
+
+def _chunks() -> list[str]:
+    """Ten days of the same routine (one line changed per day), then five distinct days."""
+    routine_days = [_chunk(day, ROUTINE[:-1] + [f"extra {day}"]) for day in range(1, 11)]
+    distinct_days = [_chunk(day, [f"topic {day} query {i}" for i in range(20)]) for day in range(11, 16)]
+    return routine_days + distinct_days
+
+
+class TestMinHash:
+    """Test MinHash signatures and LSH clustering."""
+
+    def test_signatures_ignore_timestamps(self):
+        signatures = minhash_signatures([_chunk(1, ROUTINE), _chunk(2, ROUTINE), ""], n_hashes=8)
+        assert signatures["chunk"].to_list() == [0, 1]  # The empty chunk has no lines
+        assert signatures.row(0)[1:] == signatures.row(1)[1:]
+
+    def test_clusters_near_duplicates(self):
+        clusters = sorted(lsh_clusters(_chunks()))
+        assert clusters == [list(range(10))] + [[i] for i in range(10, 15)]
+
+    def test_rejects_uneven_bands(self):
+        with pytest.raises(ValueError, match="multiple of n_bands"):
+            lsh_clusters(_chunks(), n_hashes=10, n_bands=4)
+
+
+class TestDiverseSample:
+    """Test picking cluster representatives."""
+
+    def test_covers_every_cluster(self):
+        # One routine day stands for all ten, so every distinct day fits
+        assert diverse_sample(_chunks(), 6) == [5, 10, 11, 12, 13, 14]
+
+    def test_largest_clusters_first(self):
+        picked = diverse_sample(_chunks(), 3)
+        assert len(picked) == 3 and 5 in picked
+        assert diverse_sample(_chunks(), 1) == [5]
+
+    def test_fills_beyond_clusters(self):
+        picked = diverse_sample(_chunks(), 8)
+        assert len(set(picked)) == 8
+        assert {5, 10, 11, 12, 13, 14} <= set(picked)
+        assert diverse_sample(_chunks(), 100) == list(range(15))
+        assert diverse_sample([], 3) == []
+
+    def test_sample_chunks_method(self, tmp_path):
+        path = tmp_path / "lines.txt"
+        path.write_text("\n".join(_chunks()) + "\n")
+        sampled = sample_chunks(path, 6, chunk_size=20, method="diverse")
+        assert sampled == [_chunks()[i] for i in [5, 10, 11, 12, 13, 14]]
+        with pytest.raises(ValueError, match="Unknown sample method"):
+            sample_chunks(path, 6, chunk_size=20, method="random")
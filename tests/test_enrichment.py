@@ -0,0 +1,100 @@
+"""Tests for local chunk enrichment."""
+
+from datetime import datetime
+
+from causal_agent.utils.enrichment import (
+    ANNOTATION_PREFIX,
+    enrich_chunk,
+    parse_line_timestamp,
+)
+from causal_agent.utils.llm import make_worker_tools
+from causal_agent.workers.batch import _worker_messages
+
+
+class TestParseLineTimestamp:
+    """Test timestamp parsing of preprocessed lines."""
+
+    def test_parses_leading_timestamp(self):
+        ts = parse_line_timestamp("[2024-03-15 10:30] [Search] sleep tips")
+        assert ts == datetime(2024, 3, 15, 10, 30)
+
+    def test_parses_location_lines(self):
+        ts = parse_line_timestamp("[2024-03-15 23:05] @ 45.1,7.6 [Maps] directions")
+        assert ts == datetime(2024, 3, 15, 23, 5)
+
+    def test_returns_none_without_timestamp(self):
+        assert parse_line_timestamp("no timestamp here") is None
+
+    def test_returns_none_for_invalid_date(self):
+        assert parse_line_timestamp("[2024-13-45 10:30] bad") is None
+
+
+class TestEnrichChunk:
+    """Test chunk annotation with weekday headers and hourly counts."""
+
+    def test_inserts_one_header_per_day(self):
+        chunk = "\n".join([
+            "[2024-03-15 10:30] [Search] a",
+            "[2024-03-15 10:45] [Search] b",
+            "[2024-03-15 14:00] [Search] c",
+            "[2024-03-16 09:00] [Search] d",
+        ])
+        enriched = enrich_chunk(chunk).split("\n")
+        headers = [line for line in enriched if line.startswith(ANNOTATION_PREFIX)]
+
+        assert len(headers) == 2
+        assert "Friday, March 15, 2024" in headers[0]
+        assert "3 lines" in headers[0]
+        assert "10h:2 14h:1" in headers[0]
+        assert "Saturday, March 16, 2024" in headers[1]
+        assert "1 lines" in headers[1]
+
+    def test_preserves_all_data_lines_in_order(self):
+        chunk = "\n".join([
+            "[2024-03-15 10:30] [Search] a",
+            "[2024-03-16 09:00] [Search] b",
+        ])
+        enriched = enrich_chunk(chunk).split("\n")
+        data_lines = [line for line in enriched if not line.startswith(ANNOTATION_PREFIX)]
+        assert data_lines == chunk.split("\n")
+
+    def test_untimestamped_lines_stay_under_current_day(self):
+        chunk = "\n".join([
+            "[2024-03-15 10:30] [Search] a",
+            "continuation line",
+            "[2024-03-15 11:00] [Search] b",
+        ])
+        enriched = enrich_chunk(chunk).split("\n")
+        assert sum(line.startswith(ANNOTATION_PREFIX) for line in enriched) == 1
+        assert "2 lines" in enriched[0]
+
+    def test_chunk_without_timestamps_unchanged(self):
+        chunk = "plain text\nmore text"
+        assert enrich_chunk(chunk) == chunk
+
+
+class TestWorkerPrompt:
+    """Test that the system prompt explains annotations only when the chunk has them."""
+
+    def test_annotation_section_follows_enrichment(self):
+        chunk = "[2024-03-15 10:30] [Search] sleep tips"
+        schema = {"dimensions": []}
+
+        def system_prompt(chunk: str, enrich: bool) -> str:
+            return _worker_messages(chunk, "Why?", schema, enrich=enrich)[0]["content"]
+
+        assert "## Chunk Annotations" in system_prompt(chunk, enrich=True)
+        assert "## Chunk Annotations" not in system_prompt(chunk, enrich=False)
+        assert "## Chunk Annotations" not in system_prompt("no timestamps", enrich=True)
+
+
+class TestWorkerTools:
+    """Test optional helper tools in the worker toolset."""
+
+    def test_helpers_included_on_request(self):
+        tools = make_worker_tools({"dimensions": []}, include_helpers=True)
+        assert len(tools) == 3
+
+    def test_helpers_excluded_on_request(self):
+        tools = make_worker_tools({"dimensions": []}, include_helpers=False)
+        assert len(tools) == 1
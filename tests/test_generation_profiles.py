@@ -0,0 +1,57 @@
+"""Tests for per-stage generation profiles."""
+
+import pytest
+from inspect_ai.model import GenerateConfig
+
+from causal_agent.utils.config import GenerationProfile, get_config
+from causal_agent.utils.llm import get_generate_config, profile_generate_config
+
+from evals.scripts.calibrate_profiles import pareto_front
+
+
+class TestGetGenerateConfig:
+    """Test profile lookup and conversion."""
+
+    def test_stage_profiles_loaded(self):
+        profiles = get_config().generation_profiles
+        assert {"orchestrator", "worker", "judge", "prior_elicitation"} <= set(profiles)
+
+    def test_latency_budget_becomes_timeout(self):
+        budget = get_config().generation_profiles["worker"].latency_budget_seconds
+        assert get_generate_config("worker").timeout == budget
+
+    def test_worker_and_orchestrator_use_provider_defaults(self):
+        for profile in ("worker", "orchestrator"):
+            config = get_generate_config(profile)
+            assert (config.max_tokens, config.reasoning_effort, config.reasoning_tokens) == (None, None, None)
+
+    def test_fractional_budget_rounds_up(self):
+        config = profile_generate_config(GenerationProfile(latency_budget_seconds=2.5, reasoning_effort="low"))
+        assert config.timeout == 3
+        assert config.reasoning_effort == "low"
+
+    def test_no_budget_no_timeout(self):
+        assert profile_generate_config(GenerationProfile()).timeout is None
+
+    def test_unknown_profile_raises(self):
+        with pytest.raises(ValueError, match="Unknown generation profile"):
+            get_generate_config("nonexistent")
+
+    def test_explicit_settings_override_profile(self):
+        merged = get_generate_config("worker").merge(GenerateConfig(reasoning_effort="low", max_connections=5))
+        assert merged.reasoning_effort == "low"
+        assert merged.max_connections == 5
+        assert merged.timeout == get_generate_config("worker").timeout
+
+
+class TestParetoFront:
+    """Test the calibration script's Pareto front."""
+
+    def test_dominated_and_failed_rows_excluded(self):
+        rows = [
+            {"status": "success", "score": 10.0, "p50": 5.0},
+            {"status": "success", "score": 8.0, "p50": 6.0},  # Dominated by row 0
+            {"status": "success", "score": 6.0, "p50": 2.0},
+            {"status": "error", "score": 20.0, "p50": 1.0},
+        ]
+        assert pareto_front(rows) == {0, 2}
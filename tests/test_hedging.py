@@ -0,0 +1,114 @@
+"""Tests for request hedging."""
+
+import asyncio
+
+import pytest
+
+from causal_agent.utils.hedging import HedgePolicy, hedged_call
+
+
+def _warm_policy(latency: float, n: int = 20, **kwargs) -> HedgePolicy:
+    """Policy with n recorded latencies and n prior calls."""
+    policy = HedgePolicy(min_samples=n, **kwargs)
+    for _ in range(n):
+        policy.record_latency(latency)
+        policy.start_call()
+    return policy
+
+
+async def _respond(value, delay: float, log: list | None = None):
+    try:
+        await asyncio.sleep(delay)
+    except asyncio.CancelledError:
+        if log is not None:
+            log.append(f"{value} cancelled")
+        raise
+    return value
+
+
+class TestHedgePolicy:
+    """Test latency percentile and hedge budget accounting."""
+
+    def test_no_delay_before_min_samples(self):
+        policy = HedgePolicy(min_samples=5)
+        for _ in range(4):
+            policy.record_latency(1.0)
+        assert policy.hedge_delay() is None
+
+    def test_delay_is_percentile(self):
+        policy = HedgePolicy(percentile=90, min_samples=10)
+        for i in range(1, 11):
+            policy.record_latency(float(i))
+        assert policy.hedge_delay() == 10.0
+
+    def test_budget_caps_hedges(self):
+        policy = HedgePolicy(budget_fraction=0.1)
+        for _ in range(20):
+            policy.start_call()
+        assert policy.try_acquire_hedge()
+        assert policy.try_acquire_hedge()
+        assert not policy.try_acquire_hedge()
+
+
+class TestHedgedCall:
+    """Test racing of primary and hedge requests."""
+
+    def test_fast_primary_not_hedged(self):
+        policy = _warm_policy(0.5, budget_fraction=1.0)
+        result = asyncio.run(hedged_call(
+            lambda: _respond("primary", 0.01),
+            lambda: _respond("hedge", 0.01),
+            policy,
+        ))
+        assert result == "primary"
+        assert policy.hedges == 0
+
+    def test_straggler_hedged_and_loser_cancelled(self):
+        policy = _warm_policy(0.01, budget_fraction=1.0)
+        log = []
+        result = asyncio.run(hedged_call(
+            lambda: _respond("primary", 1.0, log),
+            lambda: _respond("hedge", 0.01, log),
+            policy,
+        ))
+        assert result == "hedge"
+        assert policy.hedges == 1
+        assert policy.hedge_wins == 1
+        assert log == ["primary cancelled"]
+
+    def test_no_hedge_when_budget_exhausted(self):
+        policy = _warm_policy(0.01, budget_fraction=0.0)
+        result = asyncio.run(hedged_call(
+            lambda: _respond("primary", 0.05),
+            lambda: _respond("hedge", 0.0),
+            policy,
+        ))
+        assert result == "primary"
+        assert policy.hedges == 0
+
+    def test_failed_hedge_falls_back_to_primary(self):
+        policy = _warm_policy(0.01, budget_fraction=1.0)
+
+        async def failing():
+            raise RuntimeError("hedge failed")
+
+        result = asyncio.run(hedged_call(
+            lambda: _respond("primary", 0.05),
+            failing,
+            policy,
+        ))
+        assert result == "primary"
+
+    def test_both_failing_raises_primary_error(self):
+        policy = _warm_policy(0.01, budget_fraction=1.0)
+
+        async def failing(message: str, delay: float):
+            await asyncio.sleep(delay)
+            raise RuntimeError(message)
+
+        with pytest.raises(RuntimeError, match="primary failed"):
+            asyncio.run(hedged_call(
+                lambda: failing("primary failed", 0.05),
+                lambda: failing("hedge failed", 0.0),
+                policy,
+            ))
@@ -0,0 +1,132 @@
+"""Tests for single-pass JSON extraction, repair, and truncation salvage."""
+
+import json
+
+import pytest
+
+from causal_agent.flows.stages.stage2_workers import report_coverage
+from causal_agent.utils.json_extract import extract_json
+from causal_agent.utils.llm import GenerationStats, parse_json_response
+from causal_agent.workers.agents import parse_worker_completion
+from causal_agent.workers.dead_letter import DeadLetter
+from evals.common import extract_json_from_response
+
+EXTRACTIONS = [
+    {"dimension": "mood", "value": 3, "timestamp": "2024-03-15T10:00:00"},
+    {"dimension": "mood", "value": 4, "timestamp": "2024-03-15T11:00:00"},
+]
+
+
+class TestExtractJson:
+    """Test locating and repairing JSON objects in completions."""
+
+    def test_plain_and_fenced(self):
+        assert extract_json('{"a": 1}').data == {"a": 1}
+        result = extract_json('Here you go:\n```json\n{"a": {"b": [1, 2]}}\n```\nDone.')
+        assert result.data == {"a": {"b": [1, 2]}}
+        assert result.repairs == []
+
+    def test_braces_inside_strings(self):
+        text = '{"note": "a } and a { and an escaped \\" quote", "n": 1}'
+        assert extract_json(text).data == json.loads(text)
+
+    def test_skips_invalid_candidates(self):
+        text = 'Use {placeholders} here.\n{"a": 1}'
+        assert extract_json(text).data == {"a": 1}
+
+    @pytest.mark.parametrize(
+        "text, repair",
+        [
+            ('{"a": [1, 2,], "b": 1,}', "trailing_comma"),
+            ('{"a": None, "b": True, "c": False}', "python_literal"),
+            ('{"a": 1,\n```\n"b": 2}', "stray_fence"),
+        ],
+    )
+    def test_repairs(self, text, repair):
+        result = extract_json(text)
+        assert result is not None
+        assert repair in result.repairs
+
+    def test_repairs_leave_strings_alone(self):
+        result = extract_json('{"a": "None, True,]", "b": None,}')
+        assert result.data == {"a": "None, True,]", "b": None}
+
+    def test_no_json(self):
+        assert extract_json("no json here") is None
+        assert extract_json("{not json}") is None
+
+
+class TestSalvage:
+    """Test keeping complete extractions from cut-off completions."""
+
+    def _truncated(self) -> str:
+        full = json.dumps({"extractions": EXTRACTIONS + [{"dimension": "mood", "value": 5}]})
+        return full[: full.rindex('"value"') + 4]  # Cut inside the last element
+
+    def test_keeps_complete_elements(self):
+        result = extract_json(self._truncated(), salvage_key="extractions")
+        assert result.salvaged
+        assert result.data == {"extractions": EXTRACTIONS}
+
+    def test_scalar_elements_and_nesting(self):
+        text = '```json\n{"meta": {"k": 1}, "outer": {"extractions": [1, 2, 3'
+        result = extract_json(text, salvage_key="extractions")
+        assert result.data == {"meta": {"k": 1}, "outer": {"extractions": [1, 2]}}
+
+    def test_requires_salvage_key(self):
+        assert extract_json(self._truncated()) is None
+
+    def test_nothing_complete(self):
+        assert extract_json('{"extractions": [{"dimension": "mo', salvage_key="extractions") is None
+
+    def test_complete_object_not_marked_salvaged(self):
+        result = extract_json(json.dumps({"extractions": EXTRACTIONS}), salvage_key="extractions")
+        assert not result.salvaged
+
+
+class TestWorkerSalvage:
+    """Test that the lines past a truncated answer are not counted as processed."""
+
+    SCHEMA = {"dimensions": [{"name": "mood", "observability": "observed", "measurement_dtype": "continuous",
+                              "causal_granularity": "hourly"}]}
+    CHUNK = "\n".join(f"[2024-03-15 {h:02d}:00] [Search] query {h}" for h in range(9, 14))
+
+    def _result(self):
+        full = json.dumps({"extractions": EXTRACTIONS + [{"dimension": "mood", "value": 5}]})
+        completion = full[: full.rindex('"value"') + 4]
+        return parse_worker_completion(completion, GenerationStats(stop_reason="max_tokens"), self.CHUNK, self.SCHEMA)
+
+    def test_unparsed_lines_after_last_extraction(self):
+        result = self._result()
+        assert result.salvaged
+        assert result.unparsed_lines == 2  # 12:00 and 13:00 come after the 11:00 extraction
+        assert result.processed_chunk == "\n".join(self.CHUNK.split("\n")[:3])
+        assert result.unparsed_chunk.startswith("[2024-03-15 12:00]")
+
+    def test_unparsed_tail_dead_lettered(self):
+        letter = DeadLetter.for_unparsed_tail("chunk_00003", self._result(), "model")
+        assert letter.chunk_id == "chunk_00003_tail"
+        assert letter.error_class == "TruncatedOutputError"
+        assert letter.chunk.split("\n")[0] == "[2024-03-15 12:00] [Search] query 12"
+
+        complete = json.dumps({"extractions": EXTRACTIONS})
+        result = parse_worker_completion(complete, GenerationStats(stop_reason="stop"), self.CHUNK, self.SCHEMA)
+        assert result.unparsed_lines == 0
+        assert DeadLetter.for_unparsed_tail("chunk_00003", result, "model") is None
+
+    def test_coverage_excludes_unparsed_lines(self):
+        coverage = report_coverage.fn([self.CHUNK], [self._result()], self.SCHEMA)["hourly"]
+        assert coverage["n_processed"].to_list() == [1, 1, 1, 0, 0]
+
+
+class TestCallers:
+    """Test the production and eval entry points share the extractor."""
+
+    def test_parse_json_response(self):
+        assert parse_json_response('```json\n{"a": [1,],}\n```') == {"a": [1]}
+        with pytest.raises(ValueError, match="Failed to parse"):
+            parse_json_response("no json")
+
+    def test_eval_extractor_returns_json_string(self):
+        assert json.loads(extract_json_from_response('prefix {"a": True,} suffix')) == {"a": True}
+        assert extract_json_from_response("nothing") is None
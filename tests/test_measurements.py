@@ -0,0 +1,71 @@
+"""Tests for the MeasurementSet handed to modeling stages."""
+
+import math
+
+import polars as pl
+import pytest
+
+from causal_agent.utils.aggregations import aggregate_worker_measurements
+from causal_agent.utils.measurements import MeasurementSet
+from causal_agent.utils.runs import load_measurements, save_measurements
+
+EXTRACTION_SCHEMA = {"dimension": pl.Utf8, "value": pl.Object, "timestamp": pl.Utf8}
+SCHEMA = {
+    "dimensions": [
+        {"name": "mood", "aggregation": "mean", "observability": "observed", "causal_granularity": "daily"},
+        {"name": "meals", "aggregation": "count", "observability": "observed", "causal_granularity": "daily"},
+        {"name": "age", "observability": "observed", "causal_granularity": None},
+    ]
+}
+
+
+@pytest.fixture
+def measurements() -> MeasurementSet:
+    df = pl.DataFrame({
+        "dimension": ["mood", "mood", "meals", "meals", "age"],
+        "value": [4, 6, 1, 1, 40],
+        "timestamp": ["2024-01-01 08:00", "2024-01-01 20:00", "2024-01-02 12:00", "2024-01-02 19:00", "unknown"],
+    }, schema=EXTRACTION_SCHEMA)
+    return MeasurementSet(aggregate_worker_measurements([df], SCHEMA))
+
+
+class TestMeasurementSet:
+    """Test the mapping, matrix views, coords and Arrow IPC round trip."""
+
+    def test_mapping_matches_aggregation(self, measurements):
+        assert list(measurements) == ["daily", "time_invariant"]
+        assert measurements["daily"].columns == ["time_bucket", "mood", "meals"]
+        assert measurements["daily"]["meals"].dtype == pl.UInt32
+
+    def test_values_are_zero_copy_float64_with_mask(self, measurements):
+        values = measurements.values("daily")
+        assert values.dtype == "float64" and values.shape == (2, 2)
+        assert values.flags.c_contiguous and not values.flags.owndata and not values.flags.writeable
+        assert values[0, 0] == 5.0 and values[1, 1] == 2.0 and math.isnan(values[1, 0])
+        assert measurements.mask("daily").tolist() == [[False, True], [True, False]]
+        assert measurements.values("time_invariant").tolist() == [40.0]
+
+    def test_coords_and_dims(self, measurements):
+        coords = measurements.coords()
+        assert measurements.dims("daily") == ("daily_time", "daily_dimension")
+        assert coords["daily_dimension"] == ["mood", "meals"]
+        assert len(coords["daily_time"]) == 2
+        assert measurements.dims("time_invariant") == ("time_invariant_dimension",)
+        assert coords["time_invariant_dimension"] == ["age"]
+
+    def test_arrow_ipc_round_trip_is_memory_mapped(self, measurements, tmp_path):
+        save_measurements(tmp_path, measurements)
+        loaded = load_measurements(tmp_path)
+
+        assert list(loaded) == sorted(measurements)
+        for granularity in measurements:
+            assert loaded[granularity].equals(measurements[granularity])
+            assert loaded.mask(granularity).tolist() == measurements.mask(granularity).tolist()
+            present = ~loaded.mask(granularity)
+            assert loaded.values(granularity)[present].tolist() == measurements.values(granularity)[present].tolist()
+        assert not loaded.values("daily").flags.owndata
+        assert load_measurements(tmp_path / "missing") is None
+
+    def test_arrow_stream(self, measurements):
+        capsule = measurements.arrow_stream("daily")
+        assert type(capsule).__name__ == "PyCapsule"
@@ -0,0 +1,118 @@
+"""Tests for the offline causal-mock model provider."""
+
+import asyncio
+import dataclasses
+import json
+
+import pytest
+from inspect_ai.model import ChatMessageUser, GenerateConfig, get_model
+
+from causal_agent.orchestrator.agents import propose_structure_async
+from causal_agent.utils import mock_model
+from causal_agent.utils.config import get_config
+from causal_agent.utils.llm import multi_turn_generate
+from causal_agent.utils.mock_model import (
+    CausalMockAPI,
+    MockRateLimitError,
+    append_recording,
+    synthesize_extractions,
+)
+from causal_agent.workers.agents import _build_worker_messages, process_chunk_async, process_chunks_async
+from causal_agent.workers.schemas import validate_worker_output
+
+SCHEMA = {
+    "dimensions": [
+        {"name": "mood", "observability": "observed", "measurement_dtype": "continuous",
+         "measurement_granularity": "finest", "how_to_measure": "m"},
+        {"name": "searches", "observability": "observed", "measurement_dtype": "count",
+         "how_to_measure": "c"},
+        {"name": "activity", "observability": "observed", "measurement_dtype": "categorical",
+         "how_to_measure": "a"},
+        {"name": "stress", "observability": "latent", "measurement_dtype": "continuous"},
+    ],
+}
+CHUNK = "\n".join(f"[2024-03-15 1{h}:00] [Search] query {h}" for h in range(5))
+
+
+def _worker_prompt() -> str:
+    return _build_worker_messages(CHUNK, "Why?", SCHEMA)[1].text
+
+
+class TestSynthesizeExtractions:
+    """Test schema-valid extraction synthesis from worker prompts."""
+
+    def test_valid_for_schema(self):
+        data = synthesize_extractions(_worker_prompt(), extraction_rate=1.0)
+        output, errors = validate_worker_output(data, SCHEMA)
+
+        assert errors == []
+        # One extraction per observed dimension per line; latent dimensions skipped
+        assert len(output.extractions) == 15
+        assert {e.dimension for e in output.extractions} == {"mood", "searches", "activity"}
+        assert {e.value for e in output.extractions if e.dimension == "activity"} == {"Search"}
+        assert output.extractions[0].timestamp == "2024-03-15T10:00:00"
+
+    def test_deterministic_per_prompt_and_seed(self):
+        prompt = _worker_prompt()
+        assert synthesize_extractions(prompt, 0.5, seed=1) == synthesize_extractions(prompt, 0.5, seed=1)
+        assert synthesize_extractions(prompt, 0.5, seed=1) != synthesize_extractions(prompt, 0.5, seed=2)
+
+
+class TestCausalMockProvider:
+    """Test the provider through get_model and the real worker/orchestrator code."""
+
+    def test_worker_end_to_end(self):
+        result = asyncio.run(process_chunk_async(CHUNK, "Why?", SCHEMA, model_name="causal-mock/test-worker"))
+
+        assert result.dataframe.height > 0
+        # Default pattern: one validation tool call, then the final answer
+        assert (result.stats.turns, result.stats.tool_calls) == (2, 1)
+        assert result.stats.total_tokens > 0
+
+    def test_bounded_concurrency(self):
+        results = asyncio.run(process_chunks_async(
+            [CHUNK, CHUNK, CHUNK],
+            "Why?",
+            SCHEMA,
+            model_name="causal-mock/test-workers",
+            max_concurrency=2,
+            return_exceptions=True,
+        ))
+        assert len(results) == 3
+        assert all(result.dataframe.height > 0 for result in results)
+
+    def test_structure_proposal(self):
+        structure = asyncio.run(propose_structure_async("Why?", [CHUNK], model_name="causal-mock/test-orchestrator"))
+        assert structure["dimensions"]
+
+    def test_injected_rate_limit(self):
+        api = CausalMockAPI("test", rate_limit_rate=1.0)
+        with pytest.raises(MockRateLimitError) as exc_info:
+            asyncio.run(api.generate([ChatMessageUser(content="hi")], [], "auto", GenerateConfig()))
+        assert exc_info.value.status_code == 429
+        assert api.should_retry(exc_info.value)
+
+    def test_replay(self, tmp_path):
+        messages = [ChatMessageUser(content="recorded prompt")]
+        recordings = tmp_path / "recordings.jsonl"
+        append_recording(recordings, messages, '{"extractions": []}')
+
+        model = get_model("causal-mock/test-replay", replay_path=str(recordings))
+        output = asyncio.run(model.generate(messages))
+        assert json.loads(output.completion) == {"extractions": []}
+
+    def test_records_live_conversations(self, tmp_path, monkeypatch):
+        recordings = tmp_path / "recordings.jsonl"
+        config = get_config()
+        config = dataclasses.replace(
+            config, mock_model=dataclasses.replace(config.mock_model, record_path=str(recordings))
+        )
+        monkeypatch.setattr(mock_model, "get_config", lambda: config)
+        messages = [ChatMessageUser(content="live prompt")]
+
+        completion = asyncio.run(multi_turn_generate(messages, get_model("mockllm/model")))
+        asyncio.run(multi_turn_generate(messages, get_model("causal-mock/test-record")))  # Not recorded
+        assert len(recordings.read_text().splitlines()) == 1
+
+        replayed = asyncio.run(get_model("causal-mock/test-record", replay_path=str(recordings)).generate(messages))
+        assert replayed.completion == completion
@@ -0,0 +1,215 @@
+"""Tests for online mergeable aggregation and its sketches."""
+
+import random
+
+import polars as pl
+import pytest
+
+from causal_agent.utils.aggregations import (
+    AGGREGATION_METADATA,
+    AGGREGATION_REGISTRY,
+    aggregate_worker_measurements,
+)
+from causal_agent.utils.online_aggregation import ONLINE_AGGREGATIONS, RUN_LIMIT, OnlineAggregator, _Runs
+from causal_agent.utils.rollup import ROLLUP_AGGREGATIONS, RollupCache
+from causal_agent.utils.sketches import HyperLogLog, TDigest
+
+EXTRACTION_SCHEMA = {"dimension": pl.Utf8, "value": pl.Object, "timestamp": pl.Utf8}
+SCHEMA = {
+    "dimensions": [
+        {"name": f"{agg}_{granularity or 'static'}", "aggregation": agg, "observability": "observed",
+         "causal_granularity": granularity}
+        for agg in sorted(AGGREGATION_REGISTRY)
+        for granularity in ("daily", None)
+    ]
+}
+
+
+def _worker_dataframes(n_workers: int = 60, seed: int = 0) -> list[pl.DataFrame]:
+    """Chronological worker outputs with mixed values, nulls and bad timestamps.
+
+    Each worker covers its own two hours (as contiguous chunks do), with rows
+    out of order and repeated timestamps within it.
+    """
+    rng = random.Random(seed)
+    names = [dim["name"] for dim in SCHEMA["dimensions"]]
+    dataframes = []
+    for worker in range(n_workers):
+        day, hour = 1 + worker // 10, 2 * (worker % 10)
+        dataframes.append(pl.DataFrame({
+            "dimension": [rng.choice(names) for _ in range(30)],
+            "value": [rng.choice([rng.randint(0, 5), rng.uniform(0, 10), None, "3", True]) for _ in range(30)],
+            "timestamp": [
+                rng.choice([f"2024-01-{day:02d} {hour + slot // 4:02d}:{slot % 4 * 15:02d}", "unknown"])
+                for slot in (rng.randrange(8) for _ in range(30))
+            ],
+        }, schema=EXTRACTION_SCHEMA))
+    return dataframes
+
+
+def _assert_frames_close(result: pl.DataFrame, expected: pl.DataFrame):
+    assert result.schema == expected.schema
+    for column in expected.columns:
+        for got, want in zip(result[column].to_list(), expected[column].to_list()):
+            if isinstance(want, float):
+                assert got == pytest.approx(want, rel=1e-9, abs=1e-12, nan_ok=True), column
+            else:
+                assert got == want, column
+
+
+class TestMetadata:
+    """Test that every aggregation is covered online."""
+
+    def test_every_aggregation_has_online_state_and_exactness(self):
+        assert ONLINE_AGGREGATIONS.keys() == AGGREGATION_REGISTRY.keys()
+        assert AGGREGATION_METADATA.keys() == AGGREGATION_REGISTRY.keys()
+        assert AGGREGATION_METADATA["mean"].online_exact
+        assert AGGREGATION_METADATA["first"].online_exact
+        assert not AGGREGATION_METADATA["instability"].online_exact
+        assert not AGGREGATION_METADATA["p90"].online_exact
+        assert not AGGREGATION_METADATA["n_unique"].online_exact
+
+
+class TestOnlineAggregator:
+    """Test online results against batch aggregation."""
+
+    def test_out_of_order_folds_match_batch(self):
+        dataframes = _worker_dataframes()
+        expected = aggregate_worker_measurements(dataframes, SCHEMA)
+
+        aggregator = OnlineAggregator(SCHEMA)
+        order = list(range(len(dataframes)))
+        random.Random(1).shuffle(order)
+        for position in order:
+            aggregator.fold(dataframes[position], position)
+        result = aggregator.result()
+
+        assert result.keys() == expected.keys()
+        for key in expected:
+            _assert_frames_close(result[key], expected[key])
+
+    def test_merged_aggregators_match_single(self):
+        dataframes = _worker_dataframes()
+        single, left, right = OnlineAggregator(SCHEMA), OnlineAggregator(SCHEMA), OnlineAggregator(SCHEMA)
+        for position, df in enumerate(dataframes):
+            single.fold(df, position)
+            (left if position % 2 else right).fold(df, position)
+        left.merge(right)
+
+        assert left.n_rows == single.n_rows
+        for key, expected in single.result().items():
+            _assert_frames_close(left.result()[key], expected)
+
+    def test_unordered_folds_append(self):
+        schema = {"dimensions": [{"name": "mood", "aggregation": "instability", "observability": "observed",
+                                  "causal_granularity": "daily"}]}
+        aggregator = OnlineAggregator(schema)
+        for values in ([1, 3], [2], [6]):
+            aggregator.fold(pl.DataFrame({
+                "dimension": ["mood"] * len(values), "value": values, "timestamp": ["2024-01-01"] * len(values),
+            }, schema=EXTRACTION_SCHEMA))
+        # |3-1| + |2-3| + |6-2| over 3 differences
+        assert aggregator.result()["daily"]["mood"][0] == pytest.approx(7 / 3)
+
+    def test_memory_scales_with_buckets(self):
+        aggregator = OnlineAggregator(SCHEMA)
+        for seed in range(5):
+            for position, df in enumerate(_worker_dataframes(seed=seed)):
+                aggregator.fold(df, (seed, position))
+        n_dims = len(SCHEMA["dimensions"])
+        assert aggregator.n_rows == 5 * 60 * 30
+        assert aggregator.n_states <= 6 * n_dims  # Six days (or time-invariant) per dimension
+        assert all(
+            len(state.runs) <= RUN_LIMIT for states in aggregator.states.values() for state in states.values()
+            if isinstance(state, _Runs)
+        )
+
+    def test_contiguous_folds_keep_one_run_each(self):
+        schema = {"dimensions": [{"name": "mood", "aggregation": "trend", "observability": "observed",
+                                  "causal_granularity": "weekly"}]}
+        chunks = [
+            pl.DataFrame({
+                "dimension": ["mood"] * 500,
+                "value": [float(chunk * 500 + row) for row in range(500)],
+                "timestamp": [f"2024-01-{1 + chunk // 4:02d} {chunk % 4 * 6 + row // 100:02d}:{row % 60:02d}"
+                              for row in range(500)],
+            }, schema=EXTRACTION_SCHEMA)
+            for chunk in range(20)
+        ]
+        aggregator = OnlineAggregator(schema)
+        for position in [*range(0, 20, 2), *range(1, 20, 2)]:
+            aggregator.fold(chunks[position], position)
+        (state,) = aggregator.states["weekly"].values()
+        assert len(state.runs) == 20  # One run per fold, not per timestamp
+        expected = aggregate_worker_measurements(chunks, schema)["weekly"]
+        _assert_frames_close(aggregator.result()["weekly"], expected)
+
+    def test_runs_are_bounded(self):
+        schema = {"dimensions": [{"name": "mood", "aggregation": "instability", "observability": "observed",
+                                  "causal_granularity": "weekly"}]}
+        aggregator = OnlineAggregator(schema)
+        for position in range(2 * RUN_LIMIT):
+            aggregator.fold(pl.DataFrame({
+                "dimension": ["mood"] * 2, "value": [position, 0], "timestamp": ["2024-01-01 00:00"] * 2,
+            }, schema=EXTRACTION_SCHEMA), position)
+        (state,) = aggregator.states["weekly"].values()
+        assert len(state.runs) == RUN_LIMIT
+        # In order, joined runs stay exact: |p - 0| within fold p and |p - 0| before it
+        assert aggregator.result()["weekly"]["mood"][0] == pytest.approx(
+            sum(2 * position for position in range(2 * RUN_LIMIT)) / (4 * RUN_LIMIT - 1)
+        )
+
+
+    def test_rollup_cache_matches_batch(self, tmp_path):
+        dataframes = _worker_dataframes()
+        aggregate_worker_measurements(dataframes, SCHEMA, rollup_path=tmp_path / "rollup.parquet")
+        expected = RollupCache.load(tmp_path / "rollup.parquet")
+        aggregator = OnlineAggregator(SCHEMA)
+        for position, df in enumerate(dataframes):
+            aggregator.fold(df, position)
+        cache = aggregator.rollup_cache()
+
+        for aggregation in ROLLUP_AGGREGATIONS:
+            if aggregation == "one_hot":
+                continue  # Needs categories (see test_categorical_aggregation)
+            for granularity in ("daily", "weekly", "monthly"):
+                _assert_frames_close(
+                    cache.roll_up(f"{aggregation}_daily", aggregation, granularity),
+                    expected.roll_up(f"{aggregation}_daily", aggregation, granularity),
+                )
+
+
+class TestSketches:
+    """Test t-digest and HyperLogLog accuracy and merging."""
+
+    def test_tdigest_exact_while_small(self):
+        digest = TDigest()
+        digest.add([5.0, None, 1.0, 3.0])
+        assert digest.exact
+        assert digest.quantile(0.5) == pl.Series([5.0, 1.0, 3.0]).quantile(0.5)
+
+    def test_tdigest_quantiles_and_merge(self):
+        rng = random.Random(0)
+        values = [rng.lognormvariate(0, 1) for _ in range(50_000)]
+        left, right = TDigest(), TDigest()
+        left.add(values[:25_000])
+        right.add(values[25_000:])
+        left.merge(right)
+
+        assert not left.exact and len(left.means) < 200
+        ordered = sorted(values)
+        for q in (0.1, 0.5, 0.9, 0.99):
+            rank = sum(1 for value in ordered if value <= left.quantile(q)) / len(values)
+            assert rank == pytest.approx(q, abs=0.01)
+
+    def test_hyperloglog(self):
+        small = HyperLogLog()
+        small.add([1.0, 1.0, None, 2.0])
+        assert small.exact and small.cardinality() == 3
+
+        left, right = HyperLogLog(), HyperLogLog()
+        left.add([float(i) for i in range(30_000)])
+        right.add([float(i) for i in range(20_000, 50_000)])
+        left.merge(right)
+        assert not left.exact
+        assert left.cardinality() == pytest.approx(50_000, rel=0.05)
@@ -0,0 +1,141 @@
+"""Tests for adaptive chunk partitions."""
+
+import pytest
+
+from causal_agent.flows.stages.stage2_workers import _failure_reason
+from causal_agent.utils.partition import AdaptiveScheduler, ChunkPartition
+from causal_agent.workers.agents import TruncatedOutputError, WorkerError
+
+
+class TestChunkPartition:
+    """Test partition construction, split/merge, and persistence."""
+
+    def test_fixed_matches_chunk_size(self):
+        partition = ChunkPartition.fixed(n_lines=45, chunk_size=20)
+        assert partition.spans == [(0, 20), (20, 40), (40, 45)]
+
+    def test_chunk_text(self):
+        lines = [f"line {i}" for i in range(5)]
+        partition = ChunkPartition.fixed(n_lines=5, chunk_size=2)
+        assert partition.chunk_text(lines, (2, 4)) == "line 2\nline 3"
+
+    def test_split_replaces_span_and_records_event(self):
+        partition = ChunkPartition.fixed(n_lines=40, chunk_size=20)
+        halves = partition.split((0, 20), reason="timeout")
+
+        assert halves == ((0, 10), (10, 20))
+        assert partition.spans == [(0, 10), (10, 20), (20, 40)]
+        assert partition.events[-1]["op"] == "split"
+        assert partition.events[-1]["reason"] == "timeout"
+
+    def test_merge_replaces_spans_and_records_event(self):
+        partition = ChunkPartition.fixed(n_lines=60, chunk_size=20)
+        merged = partition.merge([(0, 20), (20, 40)], reason="empty")
+
+        assert merged == (0, 40)
+        assert partition.spans == [(0, 40), (40, 60)]
+        assert partition.events[-1]["op"] == "merge"
+
+    def test_unknown_span_raises(self):
+        partition = ChunkPartition.fixed(n_lines=40, chunk_size=20)
+        with pytest.raises(ValueError, match="not in partition"):
+            partition.split((5, 15), reason="failed")
+
+    def test_save_and_load_roundtrip(self, tmp_path):
+        partition = ChunkPartition.fixed(n_lines=40, chunk_size=20)
+        partition.split((0, 20), reason="truncated")
+        path = tmp_path / "partition.json"
+        partition.save(path)
+
+        loaded = ChunkPartition.load(path, n_lines=40)
+        assert loaded.spans == partition.spans
+        assert loaded.events == partition.events
+
+    def test_load_rejects_changed_file(self, tmp_path):
+        path = tmp_path / "partition.json"
+        ChunkPartition.fixed(n_lines=40, chunk_size=20).save(path)
+        assert ChunkPartition.load(path, n_lines=41) is None
+        assert ChunkPartition.load(tmp_path / "missing.json", n_lines=40) is None
+
+
+class TestAdaptiveScheduler:
+    """Test splitting on failure and merging of sparse regions."""
+
+    def test_failure_splits_and_requeues_first(self):
+        partition = ChunkPartition.fixed(n_lines=40, chunk_size=20)
+        scheduler = AdaptiveScheduler(partition, min_size=5, max_size=100)
+
+        span = scheduler.next_span()
+        assert scheduler.report_failure(span, reason="timeout")
+        assert scheduler.next_span() == (0, 10)
+        assert scheduler.next_span() == (10, 20)
+        assert scheduler.next_span() == (20, 40)
+
+    def test_invalid_output_splits(self):
+        partition = ChunkPartition.fixed(n_lines=40, chunk_size=20)
+        scheduler = AdaptiveScheduler(partition, min_size=5, max_size=100)
+
+        assert scheduler.report_failure(scheduler.next_span(), reason="invalid")
+        assert partition.spans == [(0, 10), (10, 20), (20, 40)]
+        assert _failure_reason(WorkerError("Worker output failed validation")) == "invalid"
+        assert _failure_reason(TruncatedOutputError("cut off")) == "truncated"
+        assert _failure_reason(ConnectionError()) == "failed"
+
+    def test_transient_failure_not_split(self):
+        partition = ChunkPartition.fixed(n_lines=40, chunk_size=20)
+        scheduler = AdaptiveScheduler(partition, min_size=5, max_size=100)
+
+        for reason in ("failed", "circuit_open"):
+            assert not scheduler.report_failure((0, 20), reason=reason)
+        assert partition.spans == [(0, 20), (20, 40)]
+        assert partition.events == []
+
+    def test_failure_below_min_size_not_split(self):
+        partition = ChunkPartition.fixed(n_lines=8, chunk_size=8)
+        scheduler = AdaptiveScheduler(partition, min_size=5, max_size=100)
+
+        span = scheduler.next_span()
+        assert not scheduler.report_failure(span, reason="timeout")
+        assert not scheduler.has_pending()
+
+    def test_pending_spans_merged_after_empty_run(self):
+        partition = ChunkPartition.fixed(n_lines=100, chunk_size=10)
+        scheduler = AdaptiveScheduler(partition, min_size=5, max_size=30, merge_after=2)
+
+        for _ in range(2):
+            scheduler.report_success(scheduler.next_span(), n_extractions=0)
+
+        # Next span follows two empty spans: merged up to max_size
+        assert scheduler.next_span() == (20, 50)
+        assert partition.events[-1]["reason"] == "sparse"
+
+    def test_no_merge_after_non_empty_span(self):
+        partition = ChunkPartition.fixed(n_lines=100, chunk_size=10)
+        scheduler = AdaptiveScheduler(partition, min_size=5, max_size=30, merge_after=2)
+
+        scheduler.report_success(scheduler.next_span(), n_extractions=0)
+        scheduler.report_success(scheduler.next_span(), n_extractions=3)
+        assert scheduler.next_span() == (20, 30)
+
+    def test_finish_merges_adjacent_empty_spans(self):
+        partition = ChunkPartition.fixed(n_lines=50, chunk_size=10)
+        scheduler = AdaptiveScheduler(partition, min_size=5, max_size=100, merge_after=10)
+
+        outcomes = [0, 0, 4, 0, 0]
+        while scheduler.has_pending():
+            span = scheduler.next_span()
+            scheduler.report_success(span, n_extractions=outcomes[span[0] // 10])
+
+        learned = scheduler.finish()
+        assert learned.spans == [(0, 20), (20, 30), (30, 50)]
+
+    def test_split_spans_not_merged_back(self):
+        partition = ChunkPartition.fixed(n_lines=40, chunk_size=20)
+        scheduler = AdaptiveScheduler(partition, min_size=5, max_size=100, merge_after=10)
+
+        scheduler.report_failure(scheduler.next_span(), reason="truncated")
+        while scheduler.has_pending():
+            scheduler.report_success(scheduler.next_span(), n_extractions=0)
+
+        learned = scheduler.finish()
+        assert learned.spans == [(0, 10), (10, 20), (20, 40)]
@@ -0,0 +1,153 @@
+"""Tests for the process-wide rate limiter, circuit breaker and retries."""
+
+import asyncio
+import dataclasses
+
+import pytest
+from inspect_ai.model import ChatMessageUser, GenerateConfig, get_model
+
+from causal_agent.utils import ratelimit
+from causal_agent.utils.config import RateLimit, RateLimitConfig, get_config
+from causal_agent.utils.mock_model import MockRateLimitError
+from causal_agent.utils.ratelimit import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyBudgetExceededError,
+    TokenBucket,
+    backoff_delay,
+    limited_generate,
+    retry_after_seconds,
+)
+
+MESSAGES = [ChatMessageUser(content="hello")]
+
+
+@pytest.fixture
+def rate_limits(monkeypatch):
+    """Install rate limit settings with fast backoff and fresh limiters."""
+
+    def install(**overrides) -> RateLimitConfig:
+        settings = RateLimitConfig(backoff_base_seconds=0.001, backoff_max_seconds=0.01, **overrides)
+        config = dataclasses.replace(get_config(), rate_limits=settings)
+        monkeypatch.setattr(ratelimit, "get_config", lambda: config)
+        monkeypatch.setattr(ratelimit, "_limiters", {})
+        return settings
+
+    return install
+
+
+class TestTokenBucket:
+    """Test reservation waits."""
+
+    def test_burst_then_wait(self):
+        bucket = TokenBucket(per_minute=60, capacity=2)
+        assert bucket.reserve(1) == 0
+        assert bucket.reserve(1) == 0
+        assert bucket.reserve(1) == pytest.approx(1.0, abs=0.05)
+
+    def test_refund_shortens_wait(self):
+        bucket = TokenBucket(per_minute=60, capacity=1)
+        bucket.reserve(1)
+        bucket.adjust(-1)
+        assert bucket.reserve(1) == 0
+
+
+class TestCircuitBreaker:
+    """Test state transitions."""
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(failures=2, reset_seconds=60)
+        breaker.record_failure()
+        assert breaker.before_call() is None
+        breaker.record_failure()
+        assert breaker.state == "open"
+        assert breaker.before_call() == pytest.approx(60, abs=1)
+
+    def test_success_resets_count(self):
+        breaker = CircuitBreaker(failures=2)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == "closed"
+
+    def test_half_open_lets_one_probe_through(self):
+        breaker = CircuitBreaker(failures=1, reset_seconds=0)
+        breaker.record_failure()
+        assert breaker.before_call() is None  # The probe
+        assert breaker.before_call() is not None
+        breaker.record_success()
+        assert breaker.state == "closed"
+
+    def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker(failures=1, reset_seconds=0)
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+        assert breaker.state == "open"
+
+
+class TestRetryAfter:
+    """Test Retry-After parsing and backoff."""
+
+    class _Response:
+        def __init__(self, headers):
+            self.headers = headers
+
+    class _Error(Exception):
+        def __init__(self, headers):
+            self.response = TestRetryAfter._Response(headers)
+
+    def test_sources(self):
+        assert retry_after_seconds(MockRateLimitError(retry_after=3)) == 3
+        assert retry_after_seconds(self._Error({"retry-after": "7"})) == 7
+        assert retry_after_seconds(self._Error({"retry-after-ms": "250"})) == 0.25
+        assert retry_after_seconds(self._Error({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0
+        assert retry_after_seconds(self._Error({})) is None
+        assert retry_after_seconds(ValueError("no response")) is None
+
+    def test_backoff_bounds(self):
+        for attempt in range(6):
+            assert 0 <= backoff_delay(attempt, base=1, maximum=8) <= min(8, 2**attempt)
+        assert backoff_delay(10, base=1, maximum=8, retry_after=30) == 30
+
+
+class TestLimitedGenerate:
+    """Test retries and fail-fast on the causal-mock provider."""
+
+    def test_transient_errors_retried(self, rate_limits):
+        rate_limits(max_retries=50)
+        model = get_model("causal-mock/test-ratelimit-flaky", rate_limit_rate=0.5, retry_after_seconds=0.001)
+        output = asyncio.run(limited_generate(model, MESSAGES))
+        assert output.completion
+
+    def test_gives_up_after_max_retries(self, rate_limits):
+        rate_limits(max_retries=2, breaker_failures=100)
+        model = get_model("causal-mock/test-ratelimit-down", rate_limit_rate=1.0, retry_after_seconds=0.001)
+        with pytest.raises(MockRateLimitError):
+            asyncio.run(limited_generate(model, MESSAGES))
+        assert ratelimit.get_limiter(str(model)).breaker.consecutive_failures == 3
+
+    def test_open_circuit_fails_fast(self, rate_limits):
+        rate_limits(max_retries=10, breaker_failures=2, breaker_reset_seconds=60)
+        model = get_model("causal-mock/test-ratelimit-outage", rate_limit_rate=1.0, retry_after_seconds=0.001)
+        with pytest.raises(CircuitOpenError):  # Opened during the call's own retries
+            asyncio.run(limited_generate(model, MESSAGES))
+        limiter = ratelimit.get_limiter(str(model))
+        assert limiter.breaker.consecutive_failures == 2
+        with pytest.raises(CircuitOpenError):
+            asyncio.run(limited_generate(model, MESSAGES))
+        assert limiter.breaker.consecutive_failures == 2  # Failed fast without calling
+
+    def test_token_usage_charged(self, rate_limits):
+        rate_limits(providers={"causal-mock/": RateLimit(requests_per_minute=600, tokens_per_minute=1e6)})
+        model = get_model("causal-mock/test-ratelimit-usage")
+        output = asyncio.run(limited_generate(model, MESSAGES))
+        bucket = ratelimit.get_limiter(str(model)).tokens
+        assert bucket._level == pytest.approx(1e6 - output.usage.total_tokens, abs=100)
+
+    def test_latency_budget_cancels_call(self, rate_limits):
+        rate_limits()
+        model = get_model("causal-mock/test-ratelimit-slow", latency_median=30.0, latency_sigma=0.0)
+        with pytest.raises(LatencyBudgetExceededError):
+            asyncio.run(limited_generate(model, MESSAGES, config=GenerateConfig(timeout=1)))
+        assert ratelimit.get_limiter(str(model)).breaker.consecutive_failures == 0
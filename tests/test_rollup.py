@@ -0,0 +1,135 @@
+"""Tests for hierarchical rollups of partial aggregates."""
+
+import random
+
+import polars as pl
+import pytest
+
+from causal_agent.utils.aggregations import (
+    _aggregation_expr,
+    _coerce_to_numeric,
+    _truncate_to_granularity,
+    aggregate_worker_measurements,
+)
+from causal_agent.utils.rollup import ROLLUP_AGGREGATIONS, RollupCache, can_roll_up
+
+EXTRACTION_SCHEMA = {"dimension": pl.Utf8, "value": pl.Object, "timestamp": pl.Utf8}
+GRANULARITIES = ["hourly", "daily", "weekly", "monthly", "yearly"]
+SCHEMA = {
+    "dimensions": [
+        {"name": f"{agg}_{granularity}", "aggregation": agg, "observability": "observed",
+         "causal_granularity": granularity}
+        for agg in [*sorted(ROLLUP_AGGREGATIONS), "median"]
+        for granularity in GRANULARITIES
+    ]
+}
+
+
+def _worker_dataframes(n_workers: int = 40, seed: int = 0) -> list[pl.DataFrame]:
+    """Extractions over two years with nulls, bad values and bad timestamps."""
+    rng = random.Random(seed)
+    names = [dim["name"] for dim in SCHEMA["dimensions"]]
+    dataframes = []
+    for _ in range(n_workers):
+        timestamps = [
+            f"{rng.choice([2023, 2024])}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:00"
+            for _ in range(50)
+        ]
+        dataframes.append(pl.DataFrame({
+            "dimension": [rng.choice(names) for _ in range(50)],
+            "value": [rng.choice([rng.uniform(-5, 5), rng.randint(0, 9), None, "n/a"]) for _ in range(50)],
+            "timestamp": [rng.choice([ts, ts, ts, "unknown"]) for ts in timestamps],
+        }, schema=EXTRACTION_SCHEMA))
+    return dataframes
+
+
+def _raw_aggregate(dataframes: list[pl.DataFrame], dim: dict) -> pl.DataFrame:
+    """One dimension aggregated directly from raw rows."""
+    combined = pl.concat(dataframes)
+    return (
+        combined.with_columns(
+            pl.col("timestamp").str.to_datetime(strict=False, time_zone="UTC").alias("parsed_ts"),
+            _coerce_to_numeric(combined["value"]).alias("numeric_value"),
+        )
+        .filter((pl.col("dimension") == dim["name"]) & pl.col("parsed_ts").is_not_null())
+        .group_by(_truncate_to_granularity(pl.col("parsed_ts"), dim["causal_granularity"]).alias("time_bucket"))
+        .agg(_aggregation_expr(dim["aggregation"], "numeric_value").alias(dim["name"]))
+        .sort("time_bucket")
+    )
+
+
+def _assert_columns_close(got: pl.Series, want: pl.Series):
+    assert got.dtype == want.dtype, got.name
+    for left, right in zip(got.to_list(), want.to_list()):
+        if isinstance(right, float):
+            assert left == pytest.approx(right, rel=1e-9, abs=1e-12), got.name
+        else:
+            assert left == right, got.name
+
+
+class TestCanRollUp:
+    """Test which granularities nest in which."""
+
+    def test_nesting(self):
+        assert can_roll_up("hourly", "yearly")
+        assert can_roll_up("daily", "weekly")
+        assert can_roll_up("monthly", "yearly")
+        assert can_roll_up("weekly", "weekly")
+        assert not can_roll_up("weekly", "monthly")
+        assert not can_roll_up("daily", "hourly")
+
+
+class TestRolledUpAggregation:
+    """Test that rolled-up aggregations match aggregating raw rows."""
+
+    def test_matches_raw_aggregation(self):
+        dataframes = _worker_dataframes()
+        results = aggregate_worker_measurements(dataframes, SCHEMA)
+
+        for dim in SCHEMA["dimensions"]:
+            expected = _raw_aggregate(dataframes, dim)
+            got = results[dim["causal_granularity"]].join(expected.select("time_bucket"), on="time_bucket")
+            assert got["time_bucket"].to_list() == expected["time_bucket"].to_list()
+            _assert_columns_close(got[dim["name"]], expected[dim["name"]])
+
+    def test_cache_rolls_up_like_raw_aggregation(self, tmp_path):
+        dataframes = _worker_dataframes()
+        path = tmp_path / "rollup.parquet"
+        aggregate_worker_measurements(dataframes, SCHEMA, rollup_path=path)
+
+        cache = RollupCache.load(path)
+        assert cache.granularity_of["sum_hourly"] == "hourly"
+        for aggregation in sorted(ROLLUP_AGGREGATIONS):
+            for finer, coarser in [("hourly", "daily"), ("daily", "yearly"), ("weekly", "weekly")]:
+                name = f"{aggregation}_{finer}"
+                expected = _raw_aggregate(dataframes, {
+                    "name": name, "aggregation": aggregation, "causal_granularity": coarser,
+                })
+                rolled = cache.roll_up(name, aggregation, coarser)
+                assert rolled["time_bucket"].to_list() == expected["time_bucket"].to_list()
+                _assert_columns_close(rolled[name], expected[name])
+
+    def test_cache_rejects_what_cannot_roll_up(self, tmp_path):
+        schema = {"dimensions": [
+            {"name": "steps", "aggregation": "sum", "observability": "observed", "causal_granularity": "weekly"},
+            {"name": "sleep", "aggregation": "median", "observability": "observed", "causal_granularity": "daily"},
+        ]}
+        dataframes = [pl.DataFrame({
+            "dimension": ["steps", "sleep", "steps"],
+            "value": [1, 2, 3],
+            "timestamp": ["2024-01-31", "2024-01-31", "2024-02-01"],
+        }, schema=EXTRACTION_SCHEMA)]
+        path = tmp_path / "rollup.parquet"
+        aggregate_worker_measurements(dataframes, schema, rollup_path=path)
+        cache = RollupCache.load(path)
+
+        # January 31 and February 1 are in the same week
+        assert cache.roll_up("steps", "sum", "weekly")["steps"].to_list() == [4.0]
+        assert cache.roll_up("sleep", "max", "monthly")["sleep"].to_list() == [2.0]
+        with pytest.raises(ValueError, match="Cannot roll weekly"):
+            cache.roll_up("steps", "sum", "monthly")
+        with pytest.raises(ValueError, match="cannot be rolled up"):
+            cache.roll_up("sleep", "median", "monthly")
+        with pytest.raises(ValueError, match="No rollups"):
+            cache.roll_up("mood", "sum", "monthly")
+        assert RollupCache.load(tmp_path / "missing.parquet") is None
@@ -11,6 +11,7 @@ from causal_agent.orchestrator.schemas import (
     Role,
     TemporalStatus,
     compute_lag_hours,
+    validate_structure,
 )
 
 
@@ -469,3 +470,77 @@ class TestComputeLagHours:
         """Finer to coarser also returns coarser granularity."""
         assert compute_lag_hours("hourly", "daily", lagged=True) == 24
         assert compute_lag_hours("daily", "weekly", lagged=True) == 168
+
+
+def _dim_data(name: str, is_outcome: bool = False, **fields) -> dict:
+    return {
+        "name": name, "description": name, "role": "endogenous", "is_outcome": is_outcome,
+        "observability": "observed", "how_to_measure": name, "temporal_status": "time_varying",
+        "causal_granularity": "daily", "measurement_granularity": "finest",
+        "measurement_dtype": "continuous", "aggregation": "mean", **fields,
+    }
+
+
+class TestValidateStructure:
+    """Tests for validate_structure (the orchestrator's validation tool)."""
+
+    def test_reports_one_cycle_per_strongly_connected_component(self):
+        """A dense contemporaneous block is reported once, not as every simple cycle."""
+        names = [f"v{i}" for i in range(12)]
+        data = {
+            "dimensions": [_dim_data(name, is_outcome=name == "v0") for name in [*names, "a", "b"]],
+            "edges": [
+                {"cause": cause, "effect": effect, "description": "", "lagged": False}
+                for cause, effect in [
+                    *((c, e) for c in names for e in names if c != e),
+                    ("a", "b"), ("b", "a"),
+                ]
+            ],
+        }
+        structure, errors = validate_structure(data)
+        assert structure is None
+        assert len(errors) == 1 and "form cycle(s)" in errors[0]
+        assert "['a', 'b']" in errors[0] or "['b', 'a']" in errors[0]
+
+    def test_repeated_and_edited_calls(self):
+        """Memoized results match fresh ones, and edits are picked up."""
+        data = {
+            "dimensions": [
+                _dim_data("mood", is_outcome=True),
+                _dim_data("activity", measurement_dtype="categorical", categories=["walk", "rest"]),
+            ],
+            "edges": [{"cause": "activity", "effect": "mood", "description": "", "lagged": True}],
+        }
+        first, errors = validate_structure(data)
+        assert errors == []
+        second, _ = validate_structure(data)
+        assert second.model_dump() == first.model_dump()
+        assert second.edges[0].lag_hours == 24
+
+        data["dimensions"][1]["measurement_dtype"] = "continuous"
+        structure, errors = validate_structure(data)
+        assert structure is None
+        assert errors and errors[0].startswith("dimensions[1] (activity):")
+        assert "has categories" in errors[0]
+
+    def test_returned_structure_is_not_shared(self):
+        """Editing a returned structure does not leak into later calls."""
+        data = {
+            "dimensions": [_dim_data("mood", is_outcome=True), _dim_data("sleep")],
+            "edges": [{"cause": "sleep", "effect": "mood", "description": "", "lagged": True}],
+        }
+        first, _ = validate_structure(data)
+        first.dimensions[1].aggregation = "sum"
+        first.edges[0].lag_hours = 1
+        second, _ = validate_structure(data)
+        assert second.dimensions[1].aggregation == "mean"
+        assert second.edges[0].lag_hours == 24
+
+    def test_equal_values_of_different_types(self):
+        """True and 1 are validated (and reported) separately."""
+        as_int, as_bool = (
+            validate_structure({"dimensions": [_dim_data("mood", is_outcome=True, description=value)]})[1]
+            for value in (1, True)
+        )
+        assert any("input_type=int" in error for error in as_int)
+        assert any("input_type=bool" in error for error in as_bool)
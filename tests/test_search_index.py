@@ -0,0 +1,71 @@
+"""Tests for the BM25 line index and question-aware sampling."""
+
+import pytest
+
+from causal_agent.utils.search_index import LineIndex, coverage_sample, question_aware_sample, tokenize
+
+LINES = [
+    "[2024-01-01 08:00] [Search] weather tomorrow",
+    "[2024-01-01 09:00] [Search] how to sleep better",
+    "[2024-01-01 10:00] [Visited] sleep tracker review sleep",
+    "[2024-01-02 08:00] [Search] weather tomorrow",
+    "[2024-01-02 22:00] [Search] running shoes",
+    "",
+]
+
+
+class TestLineIndex:
+    """Test BM25 scoring and persistence."""
+
+    def test_tokenize_drops_stopwords(self):
+        assert tokenize("How does my SLEEP affect running?") == ["sleep", "affect", "running"]
+
+    def test_scores_matching_lines(self):
+        scores = dict(LineIndex.build(LINES).score_lines("Does exercise like running help sleep?").iter_rows())
+        assert set(scores) == {1, 2, 4}
+        assert scores[2] > scores[1]  # Two occurrences of "sleep"
+        assert scores[4] > scores[1]  # "running" is rarer than "sleep"
+
+    def test_score_chunks(self):
+        index = LineIndex.build(LINES)
+        scores = index.score_chunks("sleep", chunk_size=2)
+        assert len(scores) == 3
+        assert scores[0] > 0 and scores[1] > 0 and scores[2] == 0.0
+        assert index.score_chunks("", chunk_size=2) == [0.0, 0.0, 0.0]
+
+    def test_save_and_load(self, tmp_path):
+        index = LineIndex.build(LINES)
+        path = tmp_path / "lines.bm25.parquet"
+        index.save(path)
+
+        loaded = LineIndex.load(path, LINES)
+        assert loaded.postings.equals(index.postings)
+        assert loaded.score_lines("sleep").equals(index.score_lines("sleep"))
+        assert LineIndex.load(path, LINES + [""]) is None  # File changed length
+        # Reprocessed with the same name and line count
+        assert LineIndex.load(path, [line.replace("weather", "rain") for line in LINES]) is None
+        assert LineIndex.load(tmp_path / "missing.parquet", LINES) is None
+
+
+class TestQuestionAwareSample:
+    """Test mixing relevant chunks with time coverage."""
+
+    def test_coverage_is_spread_evenly(self):
+        assert coverage_sample(100, 4) == [12, 37, 62, 87]
+        assert coverage_sample(100, 4, exclude={12}) == [13, 37, 62, 87]
+        assert coverage_sample(3, 5) == [0, 1, 2]
+        assert coverage_sample(3, 2, exclude={0, 1, 2}) == []
+
+    def test_mixes_relevance_and_coverage(self):
+        scores = [0.0] * 100
+        scores[3], scores[5], scores[90] = 2.0, 5.0, 1.0
+        assert question_aware_sample(scores, 4) == [3, 5, 26, 75]
+        # Only three chunks match, so the fourth comes from coverage
+        assert question_aware_sample(scores, 4, relevant_fraction=1.0) == [3, 5, 50, 90]
+
+    @pytest.mark.parametrize("n", [0, 1, 10, 200])
+    def test_sample_size(self, n):
+        scores = [float(i % 7 == 0) for i in range(50)]
+        picked = question_aware_sample(scores, n)
+        assert len(picked) == min(n, 50)
+        assert picked == sorted(set(picked))
@@ -0,0 +1,157 @@
+"""Tests for streaming worker extractions into a partial aggregation."""
+
+import asyncio
+import dataclasses
+import json
+import queue
+
+import causal_agent.workers.agents as worker_agents
+from causal_agent.utils import streaming
+from causal_agent.utils.config import get_config
+from causal_agent.utils.llm import GenerationStats
+from causal_agent.utils.online_aggregation import OnlineAggregator
+from causal_agent.utils.runs import PARTIAL_FILE
+from causal_agent.utils.streaming import (
+    ExtractionSink,
+    ExtractionStreamParser,
+    PartialAggregator,
+    stream_content,
+)
+from causal_agent.workers.agents import WorkerResult, parse_worker_completion, process_chunk_async
+
+SCHEMA = {
+    "dimensions": [
+        {"name": "mood", "observability": "observed", "measurement_dtype": "continuous",
+         "causal_granularity": "daily", "aggregation": "mean", "how_to_measure": "m"},
+    ],
+}
+EXTRACTIONS = [
+    {"dimension": "mood", "value": i, "timestamp": f"2024-03-{15 + i}T10:00:00"} for i in range(3)
+]
+COMPLETION = "Here it is:\n```json\n" + json.dumps({"extractions": EXTRACTIONS}, indent=2) + "\n```"
+CHUNK = "\n".join(f"[2024-03-1{d} 10:00] [Search] query" for d in range(5, 8))
+
+
+def _result(extractions: list[dict], stream_id: int) -> WorkerResult:
+    result = parse_worker_completion(json.dumps({"extractions": extractions}), GenerationStats(), CHUNK, SCHEMA)
+    result.stream_id = stream_id
+    return result
+
+
+class TestExtractionStreamParser:
+    """Test incremental parsing of array elements."""
+
+    def test_char_by_char(self):
+        parser = ExtractionStreamParser()
+        elements = []
+        for ch in COMPLETION:
+            elements += parser.feed(ch)
+        assert elements == EXTRACTIONS
+        assert parser.done
+
+    def test_elements_emitted_before_completion_ends(self):
+        parser = ExtractionStreamParser()
+        cut = COMPLETION.index('"value": 2')
+        assert parser.feed(COMPLETION[:cut]) == EXTRACTIONS[:2]
+        assert parser.feed(COMPLETION[cut:]) == EXTRACTIONS[2:]
+
+    def test_skips_prose_braces_and_other_keys(self):
+        text = 'Fill {slots} in.\n{"notes": [{"x": 1}], "extractions": [{"a": "]}"}, {"b": [1, 2]}]}'
+        assert ExtractionStreamParser().feed(text) == [{"a": "]}"}, {"b": [1, 2]}]
+
+    def test_consumed_text_is_dropped(self):
+        parser = ExtractionStreamParser()
+        parser.feed(COMPLETION[: COMPLETION.index('"value": 2')])
+        assert len(parser._buffer) < 60
+
+
+class TestExtractionSink:
+    """Test validation and queueing of streamed elements."""
+
+    def test_valid_rows_queued(self):
+        out = queue.Queue(maxsize=10)
+        sink = ExtractionSink(SCHEMA, out)
+        bad = {"extractions": [EXTRACTIONS[0], {"dimension": "unknown", "value": 1}]}
+        asyncio.run(sink(json.dumps(bad)))
+        assert (sink.n_streamed, sink.n_invalid) == (1, 1)
+        assert out.get_nowait().row["dimension"] == "mood"
+
+    def test_parser_reset_per_turn(self):
+        out = queue.Queue()
+        sink = ExtractionSink(SCHEMA, out)
+        with stream_content(sink):
+            for turn_extractions in (EXTRACTIONS[:1], EXTRACTIONS):
+                assert streaming.start_content_turn() is sink
+                asyncio.run(sink(json.dumps({"extractions": turn_extractions})))
+        items = [out.get_nowait() for _ in range(out.qsize())]
+        # The first turn closed its array; the second turn still streams every row
+        assert [item.turn for item in items] == [1, 2, 2, 2]
+
+    def test_backpressure_waits_for_consumer(self):
+        out = queue.Queue(maxsize=1)
+
+        async def run():
+            sink = ExtractionSink(SCHEMA, out)
+            feed = asyncio.create_task(sink(COMPLETION))
+            received = []
+            while len(received) < len(EXTRACTIONS):
+                received.append(await asyncio.to_thread(out.get))
+            await feed
+            return received
+
+        assert [item.row["value"] for item in asyncio.run(run())] == [0, 1, 2]
+
+
+class TestPartialAggregation:
+    """Test workers streaming into a run's partial aggregator (causal-mock provider)."""
+
+    def test_worker_streams_to_aggregator(self, tmp_path, monkeypatch):
+        config = get_config()
+        worker_config = dataclasses.replace(
+            config.stage2_workers,
+            streaming=dataclasses.replace(config.stage2_workers.streaming, enabled=True),
+        )
+        monkeypatch.setattr(
+            worker_agents, "get_config", lambda: dataclasses.replace(config, stage2_workers=worker_config)
+        )
+        aggregator = PartialAggregator(tmp_path, SCHEMA, queue_size=4, flush_seconds=60)
+        monkeypatch.setattr(streaming, "_active", aggregator)
+
+        result = asyncio.run(process_chunk_async(CHUNK, "Why?", SCHEMA, model_name="causal-mock/test-stream"))
+        aggregator.commit(0, result)
+        aggregator.close()
+
+        # The streamed rows matched the parsed result, so they were committed as the final aggregation
+        assert result.stream_id is not None
+        assert aggregator.n_flushed == len(result.output.extractions) > 0
+        assert (aggregator.n_committed, aggregator.n_reparsed) == (1, 0)
+        assert not aggregator.pending  # Folded into per-bucket states, not kept
+        expected = OnlineAggregator(SCHEMA)
+        expected.fold(result.dataframe)
+        assert aggregator.result()["daily"].equals(expected.result()["daily"])
+        assert (tmp_path / PARTIAL_FILE.format(granularity="daily")).exists()
+
+    def test_later_turn_supersedes_and_uncommitted_dropped(self, tmp_path):
+        aggregator = PartialAggregator(tmp_path, SCHEMA, flush_seconds=60)
+        sink, failed = ExtractionSink(SCHEMA, aggregator.queue), ExtractionSink(SCHEMA, aggregator.queue)
+        for turn_extractions in (EXTRACTIONS[:1], EXTRACTIONS[1:]):
+            sink.start_turn()
+            asyncio.run(sink(json.dumps({"extractions": turn_extractions})))
+        asyncio.run(failed(json.dumps({"extractions": EXTRACTIONS})))
+        failed.discard()
+        aggregator.commit(0, _result(EXTRACTIONS[1:], sink.stream_id))
+        aggregator.close()
+        assert aggregator.n_flushed == 2
+        assert (aggregator.n_committed, aggregator.n_reparsed) == (1, 0)
+
+    def test_mismatched_stream_commits_parsed_rows(self, tmp_path):
+        aggregator = PartialAggregator(tmp_path, SCHEMA, flush_seconds=60)
+        sink = ExtractionSink(SCHEMA, aggregator.queue)
+        asyncio.run(sink(json.dumps({"extractions": EXTRACTIONS[:1]})))
+        aggregator.commit(0, _result(EXTRACTIONS, sink.stream_id))  # e.g. the hedge won
+        aggregator.close()
+        assert (aggregator.n_flushed, aggregator.n_reparsed) == (3, 1)
+
+    def test_no_sink_no_streaming(self):
+        with stream_content(None):
+            assert streaming.content_sink() is None
@@ -0,0 +1,56 @@
+"""Tests for best-of-N structure proposals."""
+
+import asyncio
+
+import pytest
+
+from causal_agent.orchestrator.agents import StructureDraft, best_draft, propose_structure_async
+
+CHUNK = "\n".join(f"[2024-03-15 1{h}:00] [Search] query {h}" for h in range(5))
+
+
+def _draft(score: float, delay: float = 0.0, log: list | None = None, error: Exception | None = None):
+    async def run() -> StructureDraft:
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            if log is not None:
+                log.append(f"cancelled {score}")
+            raise
+        if error is not None:
+            raise error
+        return StructureDraft(model_name=f"model-{score}", completion="{}", score=score)
+
+    return run
+
+
+class TestBestDraft:
+    """Test selection, early acceptance and failures."""
+
+    def test_waits_for_all_and_picks_highest_score(self):
+        draft = asyncio.run(best_draft([_draft(0.5), _draft(0.8, 0.01), _draft(0.0)], accept_score=0.9))
+        assert draft.score == 0.8
+
+    def test_accepted_draft_cancels_the_rest(self):
+        log = []
+        draft = asyncio.run(best_draft([_draft(0.95, 0.01), _draft(0.99, 10, log)], accept_score=0.9))
+        assert draft.score == 0.95
+        assert log == ["cancelled 0.99"]
+
+    def test_failed_drafts_are_skipped(self):
+        draft = asyncio.run(best_draft([_draft(0, error=ValueError("no JSON")), _draft(0.3, 0.01)]))
+        assert draft.score == 0.3
+
+    def test_raises_when_every_draft_fails(self):
+        with pytest.raises(ValueError, match="first"):
+            asyncio.run(best_draft([_draft(0, error=ValueError("first")), _draft(0, error=ValueError("second"))]))
+
+
+class TestProposeStructure:
+    """Test best-of-N proposals end to end on the offline mock model."""
+
+    def test_several_proposals(self):
+        structure = asyncio.run(propose_structure_async(
+            "Why?", [CHUNK], model_name="causal-mock/test-best-of-n", n_proposals=3,
+        ))
+        assert structure["dimensions"]
@@ -0,0 +1,387 @@
+"""Local OpenAI-compatible chat-completions server for load testing workers.
+
+Speaks enough of the OpenAI/OpenRouter chat-completions protocol (including
+tool calls) for Inspect's `openrouter/...` provider, so the real HTTP path -
+connection pooling, retries, rate limiting - can be exercised without an
+external service. Responses are schema-aware: worker prompts get extractions
+synthesized for the prompt's dimensions (see utils/mock_model.py), after a
+configurable number of `validate_extractions` tool calls.
+
+Latency (log-normal, plus optional per-token generation time), throughput
+caps (concurrent requests, requests per second) and injected 429/500 error
+rates are configurable. Requests over a cap get a 429 with Retry-After.
+Requests with `"stream": true` get server-sent chunks, paced at
+tokens_per_second after the initial latency.
+GET /stats returns request counters; POST /reset clears them.
+
+Point the pipeline at it with:
+    OPENROUTER_BASE_URL=http://127.0.0.1:8765/v1 OPENROUTER_API_KEY=mock
+
+Usage:
+    uv run python tools/mock_openai_server.py
+    uv run python tools/mock_openai_server.py --port 8765 --latency 0.5 --max-concurrent 200 --error-rate 0.02
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from causal_agent.utils.mock_model import (
+    STRUCTURE_TOOL,
+    WORKER_TOOL,
+    draft_call_id,
+    draft_number,
+    synthesize_extractions,
+)
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+@dataclass
+class ServerConfig:
+    """Behaviour of the mock server."""
+
+    latency_median: float = 0.2  # Seconds per request (log-normal around this median)
+    latency_sigma: float = 0.5  # Log-normal spread of request latency
+    tokens_per_second: float | None = None  # Extra generation time per output token
+    max_concurrent: int | None = None  # Requests in progress beyond this get a 429
+    max_rps: float | None = None  # Requests per second beyond this get a 429
+    rate_limit_rate: float = 0.0  # Fraction of requests failing with an injected 429
+    error_rate: float = 0.0  # Fraction of requests failing with an injected 500
+    retry_after: float = 1.0  # Retry-After seconds sent with 429s
+    tool_calls: int = 1  # Validation tool calls before each final answer
+    extraction_rate: float = 0.3  # Chance of an extraction per dimension per data line
+    structure_path: Path = PROJECT_ROOT / "data/eval/example_dag2.json"
+    seed: int = 0
+
+
+@dataclass
+class ServerStats:
+    """Request counters (reset with POST /reset)."""
+
+    requests: int = 0
+    completed: int = 0
+    throttled: int = 0  # 429s from the concurrency/rps caps
+    injected_429: int = 0
+    injected_500: int = 0
+    max_in_flight: int = 0
+    latencies: list[float] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        ordered = sorted(self.latencies)
+
+        def pct(q: float) -> float | None:
+            return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else None
+
+        return {
+            "requests": self.requests,
+            "completed": self.completed,
+            "throttled": self.throttled,
+            "injected_429": self.injected_429,
+            "injected_500": self.injected_500,
+            "max_in_flight": self.max_in_flight,
+            "latency_p50": pct(0.5),
+            "latency_p99": pct(0.99),
+        }
+
+
+class MockServerState:
+    """Admission control, error injection and response synthesis (thread-safe)."""
+
+    def __init__(self, config: ServerConfig):
+        self.config = config
+        self.stats = ServerStats()
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._bucket = config.max_rps or 0.0
+        self._bucket_at = time.monotonic()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stats = ServerStats()
+
+    def _admit(self) -> tuple[bool, float]:
+        """Admit a request under the caps. Returns (admitted, random roll)."""
+        with self._lock:
+            self.stats.requests += 1
+            roll = self._rng.random()
+            if self.config.max_rps:
+                now = time.monotonic()
+                self._bucket = min(
+                    self.config.max_rps, self._bucket + (now - self._bucket_at) * self.config.max_rps
+                )
+                self._bucket_at = now
+                if self._bucket < 1:
+                    self.stats.throttled += 1
+                    return False, roll
+                self._bucket -= 1
+            if self.config.max_concurrent and self._in_flight >= self.config.max_concurrent:
+                self.stats.throttled += 1
+                return False, roll
+            self._in_flight += 1
+            self.stats.max_in_flight = max(self.stats.max_in_flight, self._in_flight)
+            return True, roll
+
+    def handle(self, body: dict) -> tuple[int, dict, dict]:
+        """Handle a chat-completions request. Returns (status, payload, headers)."""
+        config = self.config
+        retry_headers = {"Retry-After": str(config.retry_after)}
+        admitted, roll = self._admit()
+        if not admitted:
+            return 429, _error("Rate limit exceeded", "rate_limit_exceeded"), retry_headers
+
+        start = time.monotonic()
+        try:
+            if roll < config.rate_limit_rate:
+                with self._lock:
+                    self.stats.injected_429 += 1
+                return 429, _error("Rate limit exceeded", "rate_limit_exceeded"), retry_headers
+            if roll < config.rate_limit_rate + config.error_rate:
+                with self._lock:
+                    self.stats.injected_500 += 1
+                return 500, _error("Internal server error", "server_error"), {}
+
+            response = self._respond(body)
+            delay = config.latency_median * self._rng.lognormvariate(0, config.latency_sigma)
+            if config.tokens_per_second and not body.get("stream"):
+                # Streamed responses are paced per delta by the handler instead
+                delay += response["usage"]["completion_tokens"] / config.tokens_per_second
+            time.sleep(delay)
+            with self._lock:
+                self.stats.completed += 1
+                self.stats.latencies.append(time.monotonic() - start)
+            return 200, response, {}
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _respond(self, body: dict) -> dict:
+        messages = body.get("messages", [])
+        tools = {t["function"]["name"]: t["function"] for t in body.get("tools") or []}
+        first_user = next((m for m in messages if m.get("role") == "user"), {})
+        prompt = _content_text(first_user.get("content"))
+
+        if STRUCTURE_TOOL in tools:
+            payload = json.loads(self.config.structure_path.read_text())
+        else:
+            payload = synthesize_extractions(prompt, self.config.extraction_rate, self.config.seed)
+
+        message: dict = {"role": "assistant", "content": None}
+        tool_name = next((name for name in (WORKER_TOOL, STRUCTURE_TOOL) if name in tools), None)
+        if tool_name and _tool_calls_since_user(messages) < self.config.tool_calls:
+            argument = next(iter(tools[tool_name].get("parameters", {}).get("properties", {})), "input")
+            message["tool_calls"] = [{
+                "id": draft_call_id(_tool_calls_since_user(messages)),
+                "type": "function",
+                "function": {"name": tool_name, "arguments": json.dumps({argument: json.dumps(payload)})},
+            }]
+            finish_reason = "tool_calls"
+            completion = message["tool_calls"][0]["function"]["arguments"]
+        else:
+            message["content"] = f"```json\n{json.dumps(payload, indent=2)}\n```"
+            finish_reason = "stop"
+            completion = message["content"]
+
+        prompt_tokens = sum(len(_content_text(m.get("content"))) for m in messages) // 4
+        completion_tokens = len(completion) // 4
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+
+def _error(message: str, error_type: str) -> dict:
+    return {"error": {"message": message, "type": error_type}}
+
+
+def _content_text(content) -> str:
+    """Text of an OpenAI message content (string or list of parts)."""
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+def _stream_chunks(completion: dict, include_usage: bool, delta_chars: int = 64) -> list[dict]:
+    """Split a chat completion into the chunk sequence of a streamed response."""
+    choice = completion["choices"][0]
+    message = choice["message"]
+
+    def chunk(delta: dict, finish_reason: str | None = None) -> dict:
+        return {
+            "id": completion["id"],
+            "object": "chat.completion.chunk",
+            "created": completion["created"],
+            "model": completion["model"],
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+
+    chunks = [chunk({"role": "assistant", "content": ""})]
+    content = message.get("content") or ""
+    chunks += [chunk({"content": content[i:i + delta_chars]}) for i in range(0, len(content), delta_chars)]
+    for index, call in enumerate(message.get("tool_calls") or []):
+        chunks.append(chunk({"tool_calls": [{"index": index, **call}]}))
+    chunks.append(chunk({}, choice["finish_reason"]))
+    if include_usage:
+        chunks.append({**chunk({}), "choices": [], "usage": completion["usage"]})
+    return chunks
+
+
+def _tool_calls_since_user(messages: list[dict]) -> int:
+    drafts = []
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            break
+        if message.get("role") == "tool":
+            drafts.append(draft_number(message.get("tool_call_id")))
+    # Compacted histories hold only the latest draft; its id carries the count
+    return max(len(drafts), max(drafts, default=-1) + 1)
+
+
+class ChatCompletionsHandler(BaseHTTPRequestHandler):
+    """HTTP/1.1 (keep-alive) handler for /v1/chat/completions, /stats, /reset."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length)
+        path = self.path.rstrip("/")
+        if path == "/reset":
+            self.server.state.reset()
+            self._send(200, {"status": "reset"})
+        elif path.endswith("/chat/completions"):
+            body = json.loads(raw)
+            status, payload, headers = self.server.state.handle(body)
+            if status == 200 and body.get("stream"):
+                include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+                self._send_stream(payload, include_usage)
+            else:
+                self._send(status, payload, headers)
+        else:
+            self._send(404, _error(f"Unknown path {self.path}", "not_found"))
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            with self.server.state._lock:
+                stats = self.server.state.stats.to_dict()
+            self._send(200, stats)
+        else:
+            self._send(404, _error(f"Unknown path {self.path}", "not_found"))
+
+    def _send(self, status: int, payload: dict, headers: dict | None = None) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, completion: dict, include_usage: bool) -> None:
+        """Send a completion as server-sent chat.completion.chunk events (chunked encoding)."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        tokens_per_second = self.server.state.config.tokens_per_second
+        for chunk in _stream_chunks(completion, include_usage):
+            delta = chunk["choices"][0]["delta"].get("content") if chunk["choices"] else None
+            if delta and tokens_per_second:
+                time.sleep(len(delta) / 4 / tokens_per_second)
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+    def log_message(self, format, *args):
+        pass  # Per-request logging would dominate at load-test rates
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    """Threaded server with a listen backlog sized for high concurrency."""
+
+    daemon_threads = True
+    request_queue_size = 2048
+
+    def __init__(self, address: tuple[str, int], config: ServerConfig):
+        super().__init__(address, ChatCompletionsHandler)
+        self.state = MockServerState(config)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+def start_server(config: ServerConfig, host: str = "127.0.0.1", port: int = 0) -> MockOpenAIServer:
+    """Start the server in a background thread (port 0 = any free port)."""
+    server = MockOpenAIServer((host, port), config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_server_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add ServerConfig options to a parser (shared with the load-test driver)."""
+    parser.add_argument("--latency", type=float, default=0.2, help="Median request latency (s)")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Log-normal latency spread")
+    parser.add_argument("--tokens-per-second", type=float, help="Extra generation time per output token")
+    parser.add_argument("--max-concurrent", type=int, help="429 beyond this many requests in progress")
+    parser.add_argument("--max-rps", type=float, help="429 beyond this many requests per second")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of injected 429s")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of injected 500s")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds on 429s")
+    parser.add_argument("--tool-calls", type=int, default=1, help="Validation tool calls per answer")
+    parser.add_argument("--extraction-rate", type=float, default=0.3, help="Extractions per dimension per line")
+
+
+def server_config_from_args(args: argparse.Namespace) -> ServerConfig:
+    return ServerConfig(
+        latency_median=args.latency,
+        latency_sigma=args.latency_sigma,
+        tokens_per_second=args.tokens_per_second,
+        max_concurrent=args.max_concurrent,
+        max_rps=args.max_rps,
+        rate_limit_rate=args.rate_limit_rate,
+        error_rate=args.error_rate,
+        retry_after=args.retry_after,
+        tool_calls=args.tool_calls,
+        extraction_rate=args.extraction_rate,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible mock server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockOpenAIServer((args.host, args.port), server_config_from_args(args))
+    print(f"Serving on {server.base_url}")
+    print(f"  OPENROUTER_BASE_URL={server.base_url} OPENROUTER_API_KEY=mock")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()